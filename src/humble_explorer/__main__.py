@@ -2,11 +2,33 @@
 from __future__ import annotations
 
 import asyncio
+import shlex
+import shutil
 import sys
 from argparse import ArgumentParser, Namespace
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from rich.console import Console
 
 from humble_explorer import __version__
 from humble_explorer.app import BLEScannerApp
+from humble_explorer.btsnoop import BtsnoopError, open_btsnoop, read_btsnoop
+from humble_explorer.daemon import ScannerDaemon
+from humble_explorer.headless import run_headless
+from humble_explorer.metrics import parse_metrics_address
+from humble_explorer.presence import parse_presence_class
+from humble_explorer.renderables import DEFAULT_PAYLOAD_BYTES
+from humble_explorer.sketches import (
+    DEFAULT_COUNTERS,
+    DEFAULT_PRECISION,
+    MAX_PRECISION,
+    MIN_PRECISION,
+)
+from humble_explorer.watchlist import Watchlist, load_watchlist
+
+if TYPE_CHECKING:
+    from humble_explorer.identity import IdentityResolver
 
 __author__ = "Koen Vervloesem"
 __copyright__ = "Koen Vervloesem"
@@ -30,9 +52,24 @@ async def main(args: list[str]) -> None:
       args (list[str]): command line parameters as list of strings
           (for example  ``["--scanning-mode", "passive"]``).
     """
+    if args[:1] == ["analyze"]:
+        run_analysis(args[1:])
+        return
+    if args[:1] == ["loadtest"]:
+        run_load_test(args[1:])
+        return
+    if args[:1] == ["render"]:
+        run_render(args[1:])
+        return
+
     cli_args = await parse_args(args)
-    app = BLEScannerApp(cli_args=cli_args)
-    await app.run_async()
+    if cli_args.daemon:
+        await ScannerDaemon(cli_args).run()
+    elif cli_args.headless:
+        await run_headless(cli_args)
+    else:
+        app = BLEScannerApp(cli_args=cli_args)
+        await app.run_async()
 
 
 async def parse_args(args: list[str]) -> Namespace:
@@ -45,13 +82,8 @@ async def parse_args(args: list[str]) -> Namespace:
     Returns:
       `argparse.Namespace`: command line parameters namespace
     """
-    parser = ArgumentParser(description="Human-friendly Bluetooth Low Energy Explorer")
-    parser.add_argument(
-        "--version",
-        action="version",
-        version=f"humble-explorer {__version__}",
-    )
-
+    adapters = None
+    default_adapter = None
     if sys.version_info[:2] >= (3, 9):
         from bluetooth_adapters import get_adapters
 
@@ -60,6 +92,37 @@ async def parse_args(args: list[str]) -> Namespace:
         adapters = sorted(bluetooth_adapters.adapters.keys())
         default_adapter = bluetooth_adapters.default_adapter
 
+    parser = create_parser(adapters, default_adapter)
+    return complete_args(parser, parser.parse_args(args))
+
+
+def create_parser(
+    adapters: list[str] | None = None,
+    default_adapter: str | None = None,
+) -> ArgumentParser:
+    """Create the parser of the command line parameters.
+
+    Args:
+      adapters (list[str], optional): The names of the Bluetooth adapters to choose
+          from, or ``None`` to accept any name.
+      default_adapter (str, optional): The name of the default Bluetooth adapter.
+
+    Returns:
+      `argparse.ArgumentParser`: The parser.
+    """
+    parser = ArgumentParser(
+        description="Human-friendly Bluetooth Low Energy Explorer",
+        epilog="Run 'humble-explorer analyze --help' to analyze a btsnoop file, "
+        "'humble-explorer render --help' to render a btsnoop file to a report and "
+        "'humble-explorer loadtest --help' to load-test the user interface.",
+    )
+    parser.add_argument(
+        "--version",
+        action="version",
+        version=f"humble-explorer {__version__}",
+    )
+
+    if adapters is not None:
         parser.add_argument(
             "-a",
             "--adapter",
@@ -91,8 +154,497 @@ async def parse_args(args: list[str]) -> Namespace:
         action="store_true",
         help="Use Bluetooth address instead of UUID on macOS",
     )
+    parser.add_argument(
+        "-c",
+        "--changes-only",
+        dest="changes_only",
+        action="store_true",
+        help="Only show advertisements that change the payload of their device",
+    )
+    parser.add_argument(
+        "-r",
+        "--rate-limit",
+        dest="rate_limit",
+        metavar="RATE",
+        help="Maximum number of advertisements per second shown for each device",
+        type=float,
+    )
+    parser.add_argument(
+        "--company-rate-limit",
+        dest="company_rate_limit",
+        metavar="RATE",
+        help="Maximum number of advertisements per second shown for each company ID",
+        type=float,
+    )
+    parser.add_argument(
+        "--payload-bytes",
+        dest="payload_bytes",
+        metavar="BYTES",
+        help="Maximum number of bytes shown of each payload, select an advertisement "
+        f"to show all (default: {DEFAULT_PAYLOAD_BYTES}, 0 shows all bytes)",
+        type=int,
+        default=DEFAULT_PAYLOAD_BYTES,
+    )
+    parser.add_argument(
+        "-f",
+        "--filter",
+        help="Only show advertisements matching this filter (e.g. address=DC)",
+        type=str,
+        default="",
+    )
+    connection = parser.add_mutually_exclusive_group()
+    connection.add_argument(
+        "--daemon",
+        metavar="SOCKET",
+        help="Run a scanner daemon publishing advertisements on this Unix socket",
+        type=str,
+    )
+    connection.add_argument(
+        "--connect",
+        metavar="SOCKET",
+        help="Receive advertisements from the scanner daemon on this Unix socket",
+        type=str,
+    )
+    connection.add_argument(
+        "--import-btsnoop",
+        dest="import_btsnoop",
+        metavar="FILE",
+        help="Import advertisements from this btsnoop file instead of scanning",
+        type=str,
+    )
+    connection.add_argument(
+        "--scanner-process",
+        dest="scanner_process",
+        action="store_true",
+        help="Scan in a child process that passes advertisements through shared "
+        "memory",
+    )
+    parser.add_argument(
+        "--export",
+        metavar="FILE",
+        help="Also write advertisements to this btsnoop file, or pcap file with "
+        "suffix .pcap or .cap",
+        type=str,
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="Write advertisements as JSON lines to standard output, without TUI",
+    )
+    parser.add_argument(
+        "--metrics",
+        metavar="[HOST:]PORT",
+        help="Serve Prometheus metrics on this port, with --headless or --daemon "
+        "(default host: 127.0.0.1)",
+        type=parse_metrics_address,
+    )
+
+    parser.add_argument(
+        "--irk-file",
+        dest="irk_file",
+        metavar="FILE",
+        help="Resolve private addresses of the devices with the identity resolving "
+        "keys in this file",
+        type=str,
+    )
+    parser.add_argument(
+        "--presence",
+        action="store_true",
+        help="Show devices that appear and devices that are gone",
+    )
+    parser.add_argument(
+        "--gone-after",
+        dest="gone_after",
+        metavar="SECONDS[:FILTER]",
+        help="Devices matching the filter are gone after this many seconds without "
+        "advertisements (default: 30), implies --presence, can be repeated",
+        type=parse_presence_class,
+        action="append",
+    )
+    parser.add_argument(
+        "--watchlist",
+        dest="watchlist_file",
+        metavar="FILE",
+        help="Alert on advertisements matching the addresses, names, company IDs and "
+        "byte signatures in this file",
+        type=str,
+    )
+    parser.add_argument(
+        "--alert-command",
+        dest="alert_command",
+        metavar="COMMAND",
+        help="Run this command for every watchlist alert, with the alert as JSON on "
+        "its standard input",
+        type=str,
+    )
+    parser.add_argument(
+        "--summary-counters",
+        dest="summary_counters",
+        metavar="NUMBER",
+        help="Number of counters to find the busiest devices, company IDs and service "
+        f"UUIDs in the summary: more counters are more accurate (default: "
+        f"{DEFAULT_COUNTERS})",
+        type=int,
+        default=DEFAULT_COUNTERS,
+    )
+    parser.add_argument(
+        "--summary-precision",
+        dest="summary_precision",
+        metavar="BITS",
+        help="Precision of the number of distinct addresses in the summary, from "
+        f"{MIN_PRECISION} to {MAX_PRECISION}: every bit more halves the variance and "
+        f"doubles the memory (default: {DEFAULT_PRECISION})",
+        type=int,
+        default=DEFAULT_PRECISION,
+    )
+    parser.add_argument(
+        "--profile-memory",
+        dest="profile_memory",
+        metavar="FILE",
+        help="Show the memory use of stored records, table rows, render caches and "
+        "lookup caches, and write it as JSON lines to this file",
+        type=str,
+    )
+
+    return parser
+
+
+def complete_args(parser: ArgumentParser, cli_args: Namespace) -> Namespace:
+    """Check parsed command line parameters and add the objects they describe.
+
+    Args:
+      parser (`argparse.ArgumentParser`): The parser, to report errors.
+      cli_args (`argparse.Namespace`): The parsed command line parameters.
+
+    Returns:
+      `argparse.Namespace`: command line parameters namespace
+    """
+    check_modes(parser, cli_args)
+    check_numbers(parser, cli_args)
+    cli_args.identity_resolver = load_identity_resolver(parser, cli_args)
+    cli_args.watchlist = load_watchlist_args(parser, cli_args)
+
+    # Check the btsnoop file before starting to import it
+    if cli_args.import_btsnoop:
+        try:
+            btsnoop_data, _ = open_btsnoop(cli_args.import_btsnoop)
+        except (OSError, BtsnoopError) as error:
+            parser.error(str(error))
+        else:
+            btsnoop_data.close()
+
+    return cli_args
+
+
+def check_modes(parser: ArgumentParser, cli_args: Namespace) -> None:
+    """Check the combination of modes and the options that need a mode.
+
+    Args:
+      parser (`argparse.ArgumentParser`): The parser, to report errors.
+      cli_args (`argparse.Namespace`): The parsed command line parameters.
+    """
+    if cli_args.gone_after:
+        cli_args.presence = True
+    if cli_args.presence and cli_args.daemon:
+        parser.error("--presence doesn't work with --daemon")
+    if cli_args.daemon and not is_socket_path(cli_args.daemon):
+        parser.error(f"{cli_args.daemon} exists and isn't a socket")
+    if cli_args.watchlist_file and cli_args.daemon:
+        parser.error("--watchlist doesn't work with --daemon")
+    if cli_args.changes_only and cli_args.daemon:
+        parser.error("--changes-only doesn't work with --daemon")
+    if (cli_args.rate_limit or cli_args.company_rate_limit) and cli_args.daemon:
+        parser.error("rate limits don't work with --daemon")
+    if cli_args.alert_command and not cli_args.watchlist_file:
+        parser.error("--alert-command needs --watchlist")
+    if cli_args.metrics and not (cli_args.headless or cli_args.daemon):
+        parser.error("--metrics needs --headless or --daemon")
+    if cli_args.profile_memory and (cli_args.headless or cli_args.daemon):
+        parser.error("--profile-memory needs the user interface")
+
+
+def check_numbers(parser: ArgumentParser, cli_args: Namespace) -> None:
+    """Check the ranges of the numeric options.
+
+    Args:
+      parser (`argparse.ArgumentParser`): The parser, to report errors.
+      cli_args (`argparse.Namespace`): The parsed command line parameters.
+    """
+    for rate in (cli_args.rate_limit, cli_args.company_rate_limit):
+        if rate is not None and not rate > 0:
+            parser.error("rate limits should be positive")
+    if cli_args.payload_bytes < 0:
+        parser.error("the number of payload bytes can't be negative")
+    if cli_args.summary_counters < 1:
+        parser.error("the number of summary counters should be at least 1")
+    if not MIN_PRECISION <= cli_args.summary_precision <= MAX_PRECISION:
+        parser.error(
+            f"the summary precision should be from {MIN_PRECISION} to "
+            f"{MAX_PRECISION}",
+        )
+
+
+def load_identity_resolver(
+    parser: ArgumentParser,
+    cli_args: Namespace,
+) -> IdentityResolver | None:
+    """Load the identity resolving keys of the ``--irk`` option, if given.
+
+    Args:
+      parser (`argparse.ArgumentParser`): The parser, to report errors.
+      cli_args (`argparse.Namespace`): The parsed command line parameters.
+
+    Returns:
+      `IdentityResolver` | None: The resolver of private addresses, if needed.
+    """
+    if not cli_args.irk_file:
+        return None
+    try:
+        from humble_explorer.identity import IdentityResolver, load_identities
+    except ImportError:
+        parser.error(
+            "resolving private addresses needs cryptography, install it with: "
+            "pip install humble-explorer[rpa]",
+        )
+    try:
+        return IdentityResolver(load_identities(cli_args.irk_file))
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+
+
+def load_watchlist_args(
+    parser: ArgumentParser,
+    cli_args: Namespace,
+) -> Watchlist | None:
+    """Load the watchlist and check the alert command, if given.
+
+    Args:
+      parser (`argparse.ArgumentParser`): The parser, to report errors.
+      cli_args (`argparse.Namespace`): The parsed command line parameters.
+
+    Returns:
+      `Watchlist` | None: The watchlist, if needed.
+    """
+    if cli_args.alert_command:
+        command = shlex.split(cli_args.alert_command)
+        if not command or not shutil.which(command[0]):
+            parser.error(f"alert command not found: {cli_args.alert_command}")
+    if not cli_args.watchlist_file:
+        return None
+    try:
+        return Watchlist(load_watchlist(cli_args.watchlist_file))
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+
+
+def is_socket_path(path: str) -> bool:
+    """Check whether a path can be used for the socket of the scanner daemon.
+
+    Args:
+        path (str): The path of the socket.
+
+    Returns:
+        bool: ``True`` if the path doesn't exist or is a socket, which the daemon
+        replaces, ``False`` if it's another file that the daemon must not remove.
+    """
+    socket_path = Path(path)
+    return socket_path.is_socket() or not socket_path.exists()
+
+
+def run_analysis(args: list[str]) -> None:
+    """Analyze the advertisements in a btsnoop file.
+
+    Args:
+      args (list[str]): command line parameters as list of strings, after
+          ``analyze`` (for example  ``["hci.btsnoop"]``).
+    """
+    parser = ArgumentParser(
+        prog="humble-explorer analyze",
+        description="Summarize the advertisements in a btsnoop file",
+    )
+    parser.add_argument("file", metavar="FILE", help="btsnoop file", type=str)
+    parser.add_argument(
+        "-f",
+        "--filter",
+        help="Only analyze advertisements matching this filter (e.g. address=DC)",
+        type=str,
+        default="",
+    )
+    cli_args = parser.parse_args(args)
+
+    try:
+        from humble_explorer.analysis import analyze
+    except ImportError:
+        parser.error(
+            "analysis needs NumPy, install it with: "
+            "pip install humble-explorer[analysis]",
+        )
+
+    try:
+        analyze(read_btsnoop(cli_args.file), Console(), cli_args.filter)
+    except (OSError, BtsnoopError) as error:
+        parser.error(str(error))
+
 
-    return parser.parse_args(args)
+def run_render(args: list[str]) -> None:
+    """Render the advertisements in a btsnoop file to a report.
+
+    Args:
+      args (list[str]): command line parameters as list of strings, after
+          ``render`` (for example  ``["hci.btsnoop", "--to", "html"]``).
+    """
+    from humble_explorer.render import DEFAULT_WIDTH, FORMATS, render
+
+    parser = ArgumentParser(
+        prog="humble-explorer render",
+        description="Render the advertisements in a btsnoop file the same way as "
+        "the user interface",
+    )
+    parser.add_argument("file", metavar="FILE", help="btsnoop file", type=str)
+    parser.add_argument(
+        "--to",
+        dest="output_format",
+        help="Format of the report (default: txt)",
+        type=str,
+        default="txt",
+        choices=FORMATS,
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        metavar="REPORT",
+        help="Write the report to this file (default: standard output)",
+        type=str,
+    )
+    parser.add_argument(
+        "-f",
+        "--filter",
+        help="Only render advertisements matching this filter (e.g. address=DC)",
+        type=str,
+        default="",
+    )
+    parser.add_argument(
+        "--width",
+        help=f"Width of the report in characters (default: {DEFAULT_WIDTH})",
+        type=int,
+        default=DEFAULT_WIDTH,
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        help="Number of processes to render with (default: number of CPUs)",
+        type=int,
+    )
+    cli_args = parser.parse_args(args)
+    if cli_args.jobs is not None and cli_args.jobs < 1:
+        parser.error("the number of processes should be at least 1")
+
+    try:
+        advertisements = read_btsnoop(cli_args.file)
+        if cli_args.output:
+            with open(cli_args.output, "w", encoding="utf-8") as report:  # noqa: PTH123
+                render(
+                    advertisements,
+                    report,
+                    cli_args.output_format,
+                    cli_args.filter,
+                    cli_args.width,
+                    cli_args.jobs,
+                )
+        else:
+            render(
+                advertisements,
+                sys.stdout,
+                cli_args.output_format,
+                cli_args.filter,
+                cli_args.width,
+                cli_args.jobs,
+            )
+    except (OSError, BtsnoopError) as error:
+        parser.error(str(error))
+
+
+def run_load_test(args: list[str]) -> None:
+    """Load-test the user interface with synthetic advertisements.
+
+    Args:
+      args (list[str]): command line parameters as list of strings, after
+          ``loadtest`` (for example  ``["--rates", "1000"]``).
+    """
+    from humble_explorer.loadtest import (
+        DEFAULT_DEVICES,
+        DEFAULT_DURATION,
+        DEFAULT_RATES,
+        app_arguments,
+        print_load_test,
+    )
+
+    parser = ArgumentParser(
+        prog="humble-explorer loadtest",
+        description="Measure how many advertisements per second the user interface "
+        "handles, with synthetic advertisements",
+    )
+    parser.add_argument(
+        "--rates",
+        metavar="RATE",
+        nargs="+",
+        help="Numbers of advertisements per second, one scenario per rate "
+        f"(default: {' '.join(str(rate) for rate in DEFAULT_RATES)})",
+        type=float,
+        default=DEFAULT_RATES,
+    )
+    parser.add_argument(
+        "--devices",
+        help=f"Number of advertising devices (default: {DEFAULT_DEVICES})",
+        type=int,
+        default=DEFAULT_DEVICES,
+    )
+    parser.add_argument(
+        "--duration",
+        metavar="SECONDS",
+        help=f"Duration of every scenario (default: {DEFAULT_DURATION:g})",
+        type=float,
+        default=DEFAULT_DURATION,
+    )
+    parser.add_argument(
+        "-c",
+        "--changes-only",
+        dest="changes_only",
+        action="store_true",
+        help="Only show advertisements that change the payload of their device",
+    )
+    parser.add_argument(
+        "-r",
+        "--rate-limit",
+        dest="rate_limit",
+        metavar="RATE",
+        help="Maximum number of advertisements per second shown for each device",
+        type=float,
+    )
+    parser.add_argument(
+        "-f",
+        "--filter",
+        help="Only show advertisements matching this filter (e.g. address=DC)",
+        type=str,
+        default="",
+    )
+    cli_args = parser.parse_args(args)
+    if cli_args.devices < 1:
+        parser.error("the number of devices should be at least 1")
+    if cli_args.rate_limit is not None and not cli_args.rate_limit > 0:
+        parser.error("rate limits should be positive")
+
+    print_load_test(
+        Console(),
+        app_arguments(
+            changes_only=cli_args.changes_only,
+            rate_limit=cli_args.rate_limit,
+            filter_expression=cli_args.filter,
+        ),
+        cli_args.rates,
+        cli_args.devices,
+        cli_args.duration,
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,411 @@
+"""This module analyzes the advertisements in a capture file.
+
+The advertisements are collected in one pass over the capture, into compact columns
+with one value per advertisement. All statistics are then computed on these columns
+with NumPy, without Python loops over the advertisements.
+
+NumPy is an optional dependency, installed with ``pip install
+humble-explorer[analysis]``.
+"""
+from __future__ import annotations
+
+from array import array
+from typing import TYPE_CHECKING, Callable
+from uuid import UUID
+
+import numpy as np
+from bluetooth_numbers import company, service
+from bluetooth_numbers.exceptions import UnknownCICError, UnknownUUIDError
+from rich.table import Table
+
+from humble_explorer.devices import fingerprint
+from humble_explorer.filters import BLUETOOTH_BASE_UUID, AdvertisementFilter
+from humble_explorer.records import datetime_to_monotonic_ns
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from datetime import datetime
+
+    from bleak.backends.scanner import AdvertisementData
+    from numpy.typing import NDArray
+    from rich.console import Console
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+# Advertising events are at least 20 ms apart, so shorter gaps between
+# advertisements are packets of the same advertising event, such as scan responses.
+MIN_ADVERTISING_INTERVAL_US = 20_000
+
+
+class CaptureAnalysis:
+    """Statistics of the advertisements in a capture."""
+
+    def __init__(self) -> None:
+        """Create an empty CaptureAnalysis object."""
+        self.addresses: dict[str, int] = {}
+        self.uuids: dict[str, int] = {}
+
+        # One value per advertisement
+        self.devices = array("q")
+        self.times = array("q")
+        self.rssis = array("h")
+        self.fingerprints = array("q")
+
+        # One value per company ID or service UUID in an advertisement
+        self.company_devices = array("q")
+        self.company_ids = array("q")
+        self.service_devices = array("q")
+        self.service_ids = array("q")
+
+    def add(
+        self,
+        time: datetime,
+        address: str,
+        advertisement_data: AdvertisementData,
+    ) -> None:
+        """Add an advertisement to the columns.
+
+        Args:
+            time (datetime): The time of the advertisement.
+            address (str): The address of the advertising device.
+            advertisement_data (AdvertisementData): The advertisement data.
+        """
+        device = self.addresses.setdefault(address, len(self.addresses))
+        self.devices.append(device)
+        self.times.append(round(time.timestamp() * 1_000_000))
+        self.rssis.append(advertisement_data.rssi)
+        self.fingerprints.append(fingerprint(advertisement_data))
+
+        for cic in advertisement_data.manufacturer_data:
+            self.company_devices.append(device)
+            self.company_ids.append(cic)
+        for uuid in {
+            *advertisement_data.service_data,
+            *advertisement_data.service_uuids,
+        }:
+            self.service_devices.append(device)
+            self.service_ids.append(self.uuids.setdefault(uuid, len(self.uuids)))
+
+    def add_all(
+        self,
+        advertisements: Iterable[tuple[datetime, str, AdvertisementData]],
+    ) -> None:
+        """Add advertisements to the columns.
+
+        Args:
+            advertisements (Iterable[tuple[datetime, str, AdvertisementData]]): The
+                time, address and advertisement data of each advertisement.
+        """
+        add = self.add
+        for advertisement in advertisements:
+            add(*advertisement)
+
+    def __len__(self) -> int:
+        """Return the number of advertisements.
+
+        Returns:
+            int: The number of advertisements.
+        """
+        return len(self.devices)
+
+    def device_table(self) -> Table:
+        """Summarize the advertisements of each device.
+
+        The summary has the number of advertisements, the median advertising
+        interval, the minimum, median and maximum RSSI, the number of payload changes
+        per minute and the company IDs and service UUIDs of each device.
+
+        Returns:
+            Table: A table with a row per device, sorted by number of advertisements.
+        """
+        device_count = len(self.addresses)
+        devices = np.frombuffer(self.devices, dtype=np.int64)
+        times = np.frombuffer(self.times, dtype=np.int64)
+        rssis = np.frombuffer(self.rssis, dtype=np.int16)
+        fingerprints = np.frombuffer(self.fingerprints, dtype=np.int64)
+
+        # Sort by device and time, so each device's advertisements are consecutive.
+        order = np.lexsort((times, devices))
+        devices = devices[order]
+        times = times[order]
+        rssis = rssis[order]
+        fingerprints = fingerprints[order]
+
+        counts = np.bincount(devices, minlength=device_count)
+        same_device = devices[1:] == devices[:-1]
+        next_devices = devices[1:]
+
+        # An advertising event starts with the first advertisement of a device
+        # after a gap of at least the minimum advertising interval. The median of
+        # the gaps between advertising events is robust against missed
+        # advertisements.
+        gaps = np.diff(times)
+        event_starts = np.r_[True, ~same_device | (gaps >= MIN_ADVERTISING_INTERVAL_US)]
+        event_devices = devices[event_starts]
+        same_event_device = event_devices[1:] == event_devices[:-1]
+        intervals = _group_medians(
+            event_devices[1:][same_event_device],
+            np.diff(times[event_starts])[same_event_device],
+            device_count,
+        )
+
+        changes = np.bincount(
+            next_devices[same_device & (fingerprints[1:] != fingerprints[:-1])],
+            minlength=device_count,
+        )
+        durations = np.bincount(
+            next_devices[same_device],
+            weights=gaps[same_device],
+            minlength=device_count,
+        )
+
+        starts = np.flatnonzero(np.r_[True, ~same_device])
+        rssi_min = np.minimum.reduceat(rssis, starts)
+        rssi_max = np.maximum.reduceat(rssis, starts)
+        rssi_median = _group_medians(devices, rssis, device_count)
+
+        companies = _group_labels(
+            self.company_devices,
+            self.company_ids,
+            device_count,
+            lambda cic: f"0x{cic:04x}",
+        )
+        uuids = list(self.uuids)
+        services = _group_labels(
+            self.service_devices,
+            self.service_ids,
+            device_count,
+            lambda uuid_id: _short_uuid(uuids[uuid_id]),
+        )
+
+        table = Table(title=f"{len(self)} advertisements of {device_count} devices")
+        table.add_column("Address", no_wrap=True)
+        table.add_column("Packets", justify="right")
+        table.add_column("Interval", justify="right")
+        table.add_column("RSSI", justify="right")
+        table.add_column("Changes/min", justify="right")
+        table.add_column("Companies")
+        table.add_column("Services")
+
+        addresses = list(self.addresses)
+        for device in np.argsort(-counts, kind="stable"):
+            table.add_row(
+                addresses[device],
+                str(counts[device]),
+                "-"
+                if np.isnan(intervals[device])
+                else f"{intervals[device] / 1000:.0f} ms",
+                f"{rssi_min[device]}/{rssi_median[device]:.0f}/{rssi_max[device]}",
+                "-"
+                if durations[device] == 0
+                else f"{changes[device] / durations[device] * 60_000_000:.1f}",
+                companies[device],
+                services[device],
+            )
+        return table
+
+    def company_table(self) -> Table:
+        """Summarize the advertisements of each company ID.
+
+        Returns:
+            Table: A table with a row per company ID, sorted by number of
+            advertisements.
+        """
+        ids, packets, devices = _breakdown(self.company_devices, self.company_ids)
+        table = Table(title="Companies")
+        table.add_column("Company ID")
+        table.add_column("Name")
+        table.add_column("Packets", justify="right")
+        table.add_column("Devices", justify="right")
+        for cic, packet_count, device_count in zip(ids, packets, devices):
+            try:
+                name = company[int(cic)]
+            except UnknownCICError:
+                name = "Unknown"
+            table.add_row(f"0x{cic:04x}", name, str(packet_count), str(device_count))
+        return table
+
+    def service_table(self) -> Table:
+        """Summarize the advertisements of each service UUID.
+
+        Returns:
+            Table: A table with a row per service UUID, sorted by number of
+            advertisements.
+        """
+        ids, packets, devices = _breakdown(self.service_devices, self.service_ids)
+        uuids = list(self.uuids)
+        table = Table(title="Services")
+        table.add_column("UUID")
+        table.add_column("Name")
+        table.add_column("Packets", justify="right")
+        table.add_column("Devices", justify="right")
+        for uuid_id, packet_count, device_count in zip(ids, packets, devices):
+            uuid = uuids[uuid_id]
+            try:
+                name = service[UUID(uuid)]
+            except UnknownUUIDError:
+                name = "Unknown"
+            table.add_row(
+                _short_uuid(uuid),
+                name,
+                str(packet_count),
+                str(device_count),
+            )
+        return table
+
+
+def _group_medians(
+    groups: NDArray[np.int64],
+    values: NDArray[np.integer],
+    group_count: int,
+) -> NDArray[np.float64]:
+    """Compute the median of the values in each group.
+
+    Args:
+        groups (NDArray[np.int64]): The group of each value.
+        values (NDArray[np.integer]): The values.
+        group_count (int): The number of groups.
+
+    Returns:
+        NDArray[np.float64]: The median of each group, or NaN for empty groups.
+    """
+    order = np.lexsort((values, groups))
+    sorted_values = values[order].astype(np.float64)
+    counts = np.bincount(groups, minlength=group_count)
+    starts = np.cumsum(counts) - counts
+    medians = np.full(group_count, np.nan)
+    nonempty = counts > 0
+    lower = starts[nonempty] + (counts[nonempty] - 1) // 2
+    upper = starts[nonempty] + counts[nonempty] // 2
+    medians[nonempty] = (sorted_values[lower] + sorted_values[upper]) / 2
+    return medians
+
+
+def _breakdown(
+    devices: array[int],
+    ids: array[int],
+) -> tuple[NDArray[np.int64], NDArray[np.int64], NDArray[np.int64]]:
+    """Count the advertisements and devices of each ID.
+
+    Args:
+        devices (array[int]): The device of each occurrence of an ID.
+        ids (array[int]): The IDs.
+
+    Returns:
+        tuple[NDArray[np.int64], NDArray[np.int64], NDArray[np.int64]]: The IDs, their
+        number of advertisements and their number of devices, sorted by number of
+        advertisements.
+    """
+    id_array = np.frombuffer(ids, dtype=np.int64)
+    unique_ids, packets = np.unique(id_array, return_counts=True)
+    pair_ids, _ = _unique_pairs(id_array, np.frombuffer(devices, dtype=np.int64))
+    device_counts = np.bincount(
+        np.searchsorted(unique_ids, pair_ids),
+        minlength=len(unique_ids),
+    )
+    order = np.argsort(-packets, kind="stable")
+    return unique_ids[order], packets[order], device_counts[order]
+
+
+def _group_labels(
+    devices: array[int],
+    ids: array[int],
+    device_count: int,
+    label: Callable[[int], str],
+) -> list[str]:
+    """Format the distinct IDs of each device.
+
+    Args:
+        devices (array[int]): The device of each occurrence of an ID.
+        ids (array[int]): The IDs.
+        device_count (int): The number of devices.
+        label (Callable[[int], str]): Function formatting an ID.
+
+    Returns:
+        list[str]: The comma-separated labels of the IDs of each device.
+    """
+    labels: list[list[str]] = [[] for _ in range(device_count)]
+    pair_devices, pair_ids = _unique_pairs(
+        np.frombuffer(devices, dtype=np.int64),
+        np.frombuffer(ids, dtype=np.int64),
+    )
+    for device, id_ in zip(pair_devices.tolist(), pair_ids.tolist()):
+        labels[device].append(label(id_))
+    return [", ".join(device_labels) for device_labels in labels]
+
+
+def _unique_pairs(
+    first: NDArray[np.int64],
+    second: NDArray[np.int64],
+) -> tuple[NDArray[np.int64], NDArray[np.int64]]:
+    """Return the distinct pairs of two columns of non-negative integers.
+
+    Each pair is combined in one integer, which is much faster to sort than the
+    pairs themselves.
+
+    Args:
+        first (NDArray[np.int64]): The first column.
+        second (NDArray[np.int64]): The second column.
+
+    Returns:
+        tuple[NDArray[np.int64], NDArray[np.int64]]: The first and second columns
+        of the distinct pairs, sorted.
+    """
+    if len(second) == 0:
+        return first, second
+    factor = int(second.max()) + 1
+    pairs = np.unique(first * factor + second)
+    return pairs // factor, pairs % factor
+
+
+def _short_uuid(uuid: str) -> str:
+    """Shorten a 128-bit UUID with the Bluetooth base UUID to 16 or 32 bits.
+
+    Args:
+        uuid (str): The 128-bit UUID.
+
+    Returns:
+        str: The shortest form of the UUID.
+    """
+    if uuid.endswith(BLUETOOTH_BASE_UUID):
+        return uuid[4:8] if uuid.startswith("0000") else uuid[:8]
+    return uuid
+
+
+def analyze(
+    advertisements: Iterable[tuple[datetime, str, AdvertisementData]],
+    console: Console,
+    filter_expression: str = "",
+) -> None:
+    """Analyze advertisements and print the statistics.
+
+    Args:
+        advertisements (Iterable[tuple[datetime, str, AdvertisementData]]): The
+            time, address and advertisement data of each advertisement.
+        console (Console): The console to print the statistics to.
+        filter_expression (str): Only analyze advertisements matching this filter
+            expression.
+    """
+    advertisement_filter = AdvertisementFilter(filter_expression)
+    analysis = CaptureAnalysis()
+    analysis.add_all(
+        advertisement
+        for advertisement in advertisements
+        if advertisement_filter.matches(
+            advertisement[1],
+            advertisement[2],
+            datetime_to_monotonic_ns(advertisement[0]),
+        )
+    )
+
+    if not analysis:
+        console.print("No advertisements found")
+        return
+
+    console.print(analysis.device_table())
+    if analysis.company_ids:
+        console.print(analysis.company_table())
+    if analysis.service_ids:
+        console.print(analysis.service_table())
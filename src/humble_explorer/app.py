@@ -1,29 +1,66 @@
 """Module with the Textual app that scans for Bluetooth Low Energy advertisements."""
 from __future__ import annotations
 
-from datetime import datetime
-from platform import system
-from typing import TYPE_CHECKING
+from array import array
+from bisect import bisect_left
+from time import monotonic_ns
+from typing import TYPE_CHECKING, Protocol
 
 from bleak import BleakScanner
 
 if TYPE_CHECKING:
     from argparse import Namespace
+    from collections.abc import Iterable
+    from datetime import datetime
 
     from bleak.backends.device import BLEDevice
     from bleak.backends.scanner import AdvertisementData
 
+    from humble_explorer.identity import IdentityResolver
+    from humble_explorer.presence import PresenceEvent
+    from humble_explorer.watchlist import Watchlist, WatchlistAlert
+
+from textual import cache as textual_cache
 from textual.app import App, ComposeResult
 from textual.reactive import reactive
 from textual.widgets import DataTable, Footer, Header, Input, Switch
-
-if system() == "Linux":
-    from bleak.assigned_numbers import AdvertisementDataType
-    from bleak.backends.bluezdbus.advertisement_monitor import OrPattern
-    from bleak.backends.bluezdbus.scanner import BlueZScannerArgs
-
-from humble_explorer.renderables import RichAdvertisement, RichDeviceAddress, RichTime
-from humble_explorer.widgets import FilterWidget, SettingsWidget
+from textual.widgets import _data_table as data_table
+
+from humble_explorer import devices, filters, hci, records, renderables, timeindex
+from humble_explorer.btsnoop import BtsnoopScanner
+from humble_explorer.capture import open_capture
+from humble_explorer.daemon import RemoteScanner
+from humble_explorer.devices import DeviceRegistry
+from humble_explorer.filters import AdvertisementFilter, parse_time
+from humble_explorer.ingest import ProcessScanner
+from humble_explorer.memory import SAMPLE_INTERVAL, open_profiler
+from humble_explorer.presence import TICK_NS, PresenceTracker
+from humble_explorer.ratelimit import RateLimiter
+from humble_explorer.records import AdvertisementRecord, datetime_to_monotonic_ns
+from humble_explorer.renderables import (
+    DisplayConfig,
+    RichAdvertisement,
+    RichDeviceAddress,
+    RichMemorySample,
+    RichPresenceEvent,
+    RichTime,
+    RichTrafficSummary,
+)
+from humble_explorer.scanner import get_scanner_kwargs
+from humble_explorer.sketches import TrafficSummary
+from humble_explorer.timeindex import TimeIndex
+from humble_explorer.watchlist import AlertCommand
+from humble_explorer.widgets import (
+    AdvertisementTable,
+    DeviceBrowser,
+    DeviceList,
+    FilterWidget,
+    JumpWidget,
+    MemoryStatus,
+    PresenceLog,
+    SettingsWidget,
+    TrafficSummaryWidget,
+)
 
 from . import __version__
 
@@ -31,6 +68,19 @@ __author__ = "Koen Vervloesem"
 __copyright__ = "Koen Vervloesem"
 __license__ = "MIT"
 
+# Seconds between two updates of the traffic summary
+SUMMARY_INTERVAL = 1
+
+
+class Scanner(Protocol):
+    """Source of advertisements that can be started and stopped."""
+
+    async def start(self) -> None:
+        """Start receiving advertisements."""
+
+    async def stop(self) -> None:
+        """Stop receiving advertisements."""
+
 
 class BLEScannerApp(App[None]):
     """A Textual app to scan for Bluetooth Low Energy advertisements."""
@@ -40,12 +90,16 @@ class BLEScannerApp(App[None]):
     BINDINGS = [
         ("q", "quit", "Quit"),
         ("f", "toggle_filter", "Filter"),
+        ("g", "toggle_jump", "Go to time"),
+        ("d", "toggle_devices", "Devices"),
         ("s", "toggle_settings", "Settings"),
         ("t", "toggle_scan", "Toggle scan"),
+        ("o", "toggle_summary", "Summary"),
         ("c", "clear_advertisements", "Clear"),
     ]
 
-    address_filter = reactive("")  #: :meta private:
+    #: :meta private:
+    advertisement_filter: reactive[AdvertisementFilter] = reactive(AdvertisementFilter)
 
     def __init__(self, cli_args: Namespace) -> None:
         """Initialize BLE scanner.
@@ -53,37 +107,61 @@ class BLEScannerApp(App[None]):
         Args:
             cli_args (argparse.Namespace): Command-line arguments.
         """
-        # Configure scanning mode
-        self.scanner_kwargs = {"scanning_mode": cli_args.scanning_mode}
-
-        if system() == "Linux":
-            if cli_args.scanning_mode == "passive":
-                # Passive scanning with BlueZ needs at least one or_pattern.
-                # The following matches all devices.
-                self.scanner_kwargs["bluez"] = BlueZScannerArgs(
-                    or_patterns=[
-                        OrPattern(0, AdvertisementDataType.FLAGS, b"\x06"),
-                        OrPattern(0, AdvertisementDataType.FLAGS, b"\x1a"),
-                    ],
-                )
-            elif cli_args.scanning_mode == "active":
-                # Disable duplicate detection of advertisement data
-                # for a more low-level view of what packets are really sent.
-                self.scanner_kwargs["bluez"] = BlueZScannerArgs(
-                    filters={"DuplicateData": True},
-                )
-        elif system() == "Darwin":
-            self.scanner_kwargs["cb"] = {"use_bdaddr": cli_args.macos_use_address}
+        self.cli_args = cli_args
+        self.scanner_kwargs = get_scanner_kwargs(cli_args, self.on_advertisement)
+        self.scanning = False
+
+        # Initialize empty list of compact records of the advertisements
+        self.advertisements: list[AdvertisementRecord] = []
+        # Sorted index of their times, and positions of the ones shown in the table
+        self.time_index = TimeIndex()
+        self.row_positions = array("q")
+
+        # Which advertisement data to show, shared by all rows in the table
+        self.display_config = DisplayConfig(cli_args.payload_bytes or None)
+
+        # Keep track of devices, and optionally only show changed advertisements
+        self.devices = DeviceRegistry()
+        # Optionally group the private addresses of known devices by device
+        self.resolver: IdentityResolver | None = cli_args.identity_resolver
+        # Device whose advertisements are shown in the device browser
+        self.selected_device: str | None = None
+        # Optionally keep track of devices that appear and are gone
+        self.presence = (
+            PresenceTracker(cli_args.gone_after or ()) if cli_args.presence else None
+        )
+        self.changes_only = cli_args.changes_only
+        # Optionally alert on devices and payloads on the watchlist
+        self.watchlist: Watchlist | None = cli_args.watchlist
+        self.alert_command = (
+            AlertCommand(cli_args.alert_command) if cli_args.alert_command else None
+        )
+        # Summarize the busiest devices, company IDs and service UUIDs and the number
+        # of distinct addresses in fixed memory
+        self.traffic_summary = TrafficSummary(
+            cli_args.summary_counters,
+            cli_args.summary_precision,
+        )
 
-        # Configure Bluetooth adapter
-        self.scanner_kwargs["adapter"] = cli_args.adapter
+        # Limit the rate of advertisements per device and per company ID
+        self.rate_limiter = RateLimiter(
+            cli_args.rate_limit,
+            cli_args.company_rate_limit,
+        )
 
-        # Configure scanner
-        self.scanner_kwargs["detection_callback"] = self.on_advertisement
-        self.scanning = False
+        # Optionally record the stored advertisements to a capture file
+        self.capture = (
+            open_capture(cli_args.export, cli_args.filter) if cli_args.export else None
+        )
 
-        # Initialize empty list of advertisements
-        self.advertisements: list[tuple[datetime, str, AdvertisementData]] = []
+        # Optionally profile the memory use of the subsystems, from the start
+        self.memory_profiler = None
+        if cli_args.profile_memory:
+            self.memory_profiler = open_profiler(
+                self.memory_subsystems(),
+                cli_args.profile_memory,
+            )
+            self.memory_profiler.start()
 
         super().__init__()
 
@@ -91,9 +169,18 @@ class BLEScannerApp(App[None]):
         """Set the title of the app with a description of the scanning status."""
         scanning_description = "Scanning" if self.scanning else "Stopped"
 
-        shown_advertisements = self.query_one(DataTable).row_count
+        shown_advertisements = self.query_one(
+            "#advertisements",
+            AdvertisementTable,
+        ).row_count
         all_advertisements = len(self.advertisements)
         self.title = f"HumBLE Explorer {__version__} - {shown_advertisements} / {all_advertisements} ({scanning_description})"  # noqa: E501
+        if self.changes_only:
+            self.title += f" - {self.devices.suppressed} unchanged"
+        if self.rate_limiter:
+            self.title += f" - {self.devices.throttled} throttled"
+        if self.presence is not None:
+            self.title += f" - {len(self.presence)} present"
 
     def action_toggle_settings(self) -> None:
         """Enable or disable settings widget."""
@@ -107,6 +194,35 @@ class BLEScannerApp(App[None]):
         if filter_widget.display:
             self.set_focus(filter_widget)
 
+    def action_toggle_jump(self) -> None:
+        """Enable or disable input widget to jump to a time."""
+        jump_widget = self.query_one(JumpWidget)
+        jump_widget.display = not jump_widget.display
+        if jump_widget.display:
+            self.set_focus(jump_widget)
+
+    def action_toggle_devices(self) -> None:
+        """Switch between the table of all advertisements and the device browser."""
+        browser = self.query_one(DeviceBrowser)
+        table = self.query_one("#advertisements", AdvertisementTable)
+        browser.display = not browser.display
+        table.display = not browser.display
+        if browser.display:
+            # The device list isn't updated while it's hidden.
+            device_list = browser.query_one(DeviceList)
+            for address, device in self.devices.devices.items():
+                if device.positions or device.throttled:
+                    device_list.update_device(address, device)
+            device_list.focus()
+        else:
+            table.focus()
+
+    def action_toggle_summary(self) -> None:
+        """Show or hide the traffic summary."""
+        summary_widget = self.query_one(TrafficSummaryWidget)
+        summary_widget.display = not summary_widget.display
+        self.show_summary()
+
     async def action_toggle_scan(self) -> None:
         """Start or stop BLE scanning."""
         if self.scanning:
@@ -117,7 +233,21 @@ class BLEScannerApp(App[None]):
     def action_clear_advertisements(self) -> None:
         """Clear the list of received advertisements."""
         self.advertisements = []
-        self.query_one(DataTable).clear()
+        self.time_index.clear()
+        self.row_positions = array("q")
+        self.devices.clear()
+        self.rate_limiter.clear()
+        self.traffic_summary.clear()
+        self.show_summary()
+        self.query_one("#advertisements", AdvertisementTable).clear()
+        self.selected_device = None
+        self.query_one(DeviceList).clear()
+        self.query_one("#device_history", AdvertisementTable).clear()
+        if self.presence is not None:
+            self.presence.clear()
+            self.query_one(PresenceLog).clear()
+        if self.watchlist is not None:
+            self.watchlist.clear()
 
     def compose(self) -> ComposeResult:
         """Create child widgets for the app.
@@ -129,23 +259,24 @@ class BLEScannerApp(App[None]):
         yield Footer()
         yield SettingsWidget(id="sidebar")
         yield FilterWidget(placeholder="address=")
-        yield DataTable(zebra_stripes=True)
-
-    def show_data_config(self) -> dict[str, bool]:
-        """Return dictionary with which advertisement data to show.
-
-        Returns:
-            dict[str, bool]: Each key has the value ``True`` if this advertisement
-                type should be shown and ``False`` if not.
-        """
-        return {
-            "local_name": self.query_one("#local_name", Switch).value,
-            "rssi": self.query_one("#rssi", Switch).value,
-            "tx_power": self.query_one("#tx_power", Switch).value,
-            "manufacturer_data": self.query_one("#manufacturer_data", Switch).value,
-            "service_data": self.query_one("#service_data", Switch).value,
-            "service_uuids": self.query_one("#service_uuids", Switch).value,
-        }
+        yield JumpWidget(placeholder="14:32:10")
+        yield AdvertisementTable(
+            self.display_config,
+            zebra_stripes=True,
+            id="advertisements",
+        )
+        # Show the per-device counts of advertisements that aren't stored
+        device_counts = {}
+        if self.changes_only:
+            device_counts["suppressed"] = "Unchanged"
+        if self.rate_limiter:
+            device_counts["throttled"] = "Throttled"
+        yield DeviceBrowser(self.display_config, device_counts)
+        yield TrafficSummaryWidget()
+        if self.presence is not None:
+            yield PresenceLog()
+        if self.memory_profiler:
+            yield MemoryStatus()
 
     async def on_advertisement(
         self,
@@ -159,44 +290,334 @@ class BLEScannerApp(App[None]):
             advertisement_data (~bleak.backends.scanner.AdvertisementData): The
                 advertised data.
         """
-        self.log(advertisement_data.local_name, device.address, advertisement_data)
+        self.add_advertisement(monotonic_ns(), device.address, advertisement_data)
 
-        # Append advertisement to list of all advertisements
-        now = datetime.now()
-        self.advertisements.append((now, device.address, advertisement_data))
+    def add_timed_advertisement(
+        self,
+        time: datetime,
+        address: str,
+        advertisement_data: AdvertisementData,
+    ) -> None:
+        """Store an advertisement from the scanner daemon or a btsnoop file.
+
+        Args:
+            time (datetime): The time of the advertisement.
+            address (str): The address of the advertising device.
+            advertisement_data (~bleak.backends.scanner.AdvertisementData): The
+                advertised data.
+        """
+        self.add_advertisement(
+            datetime_to_monotonic_ns(time),
+            address,
+            advertisement_data,
+        )
+
+    def add_advertisement(
+        self,
+        time: int,
+        address: str,
+        advertisement_data: AdvertisementData,
+    ) -> None:
+        """Store an advertisement and show it in the table.
+
+        Args:
+            time (int): The monotonic timestamp of the advertisement in nanoseconds.
+            address (str): The address of the advertising device.
+            advertisement_data (~bleak.backends.scanner.AdvertisementData): The
+                advertised data.
+        """
+        self.log(advertisement_data.local_name, address, advertisement_data)
+        device = self.device_key(address)
+
+        # Estimate the advertising interval from all received packets
+        interval = self.devices.observe(device, time)
+        self.traffic_summary.observe(device, address, advertisement_data, time)
+        if self.presence is not None:
+            self.show_presence_events(
+                self.presence.observe(device, advertisement_data, time),
+            )
+        # Match the watchlist once, and keep the label to highlight the address
+        watch_label = None
+        if self.watchlist is not None:
+            matches = self.watchlist.match(address, advertisement_data)
+            if matches:
+                watch_label = matches[0].label
+                self.show_alerts(self.watchlist.alerts(device, address, matches, time))
+
+        # Throttle chatty devices and companies
+        if self.rate_limiter and not self.rate_limiter.allow(
+            device,
+            advertisement_data.manufacturer_data,
+            time / 1_000_000_000,
+        ):
+            self.devices.throttle(device)
+            self.set_title()
+            self.update_device_list(device)
+            return
+
+        # Suppress advertisements that repeat the device's previous payload
+        if self.changes_only and self.devices.is_repeat(device, advertisement_data):
+            self.set_title()
+            self.update_device_list(device)
+            return
+
+        # Append a compact record of the advertisement to list of all advertisements
+        record = AdvertisementRecord.from_advertisement_data(
+            time,
+            address,
+            advertisement_data,
+            self.devices.previous_payloads(device, advertisement_data),
+            self.devices[device].record,
+            interval,
+            watch_label,
+        )
+        position = len(self.advertisements)
+        self.advertisements.append(record)
+        self.time_index.add(time, position)
+        self.devices.store(device, record, position)
+        if self.capture:
+            self.capture.export(record.wall_time, record.address, record)
 
         # Create renderables for advertisement and add them to table
-        table = self.query_one(DataTable)
-        self.add_advertisement_to_table(
-            table,
-            RichTime(now),
-            RichDeviceAddress(device.address),
-            RichAdvertisement(advertisement_data, self.show_data_config()),
+        self.add_record_to_table(
+            self.query_one("#advertisements", AdvertisementTable),
+            position,
         )
+        browser = self.query_one(DeviceBrowser)
+        if browser.display:
+            self.add_record_to_device_browser(browser, record)
+
+    def device_key(self, address: str) -> str:
+        """Return the key of the device using an address.
+
+        Args:
+            address (str): The address of the device.
+
+        Returns:
+            str: The name of the device if the address is a resolved private
+            address, else the address itself.
+        """
+        if self.resolver is None:
+            return address
+        return self.resolver.resolve(address) or address
 
     async def on_mount(self) -> None:
         """Initialize interface and start BLE scan."""
-        table = self.query_one(DataTable)
-        table.add_columns("Time", "Address", "Advertisement")
+        table = self.query_one("#advertisements", AdvertisementTable)
         # Set focus to table for immediate keyboard navigation
         table.focus()
 
-        # Set up Bleak scanner and start BLE scan
-        self.scanner = BleakScanner(**self.scanner_kwargs)
+        # Apply the filter from the command line
+        self.query_one(FilterWidget).value = self.cli_args.filter
+
+        # Set up Bleak scanner, connect to scanner daemon or import btsnoop file and
+        # start BLE scan
+        self.scanner = self.create_scanner()
         await self.start_scan()
 
+        # Advertisements from a btsnoop file have past times, so their devices are
+        # only gone when later advertisements in the file are read.
+        if self.presence is not None and not self.cli_args.import_btsnoop:
+            self.set_interval(TICK_NS / 1_000_000_000, self.expire_presence)
+
+        self.set_interval(SUMMARY_INTERVAL, self.show_summary)
+
+        if self.memory_profiler:
+            self.bind("m", "mark_memory", description="Mark memory")
+            self.sample_memory()
+            self.set_interval(SAMPLE_INTERVAL, self.sample_memory)
+
+    def memory_subsystems(self) -> dict[str, list[object]]:
+        """Define the subsystems whose memory use is profiled.
+
+        Returns:
+            dict[str, list[object]]: The packages, modules and functions whose
+            allocations are attributed to every subsystem.
+        """
+        lookup_caches: list[object] = [
+            filters,
+            hci.format_address,
+            hci._parse_ad_structures,  # noqa: SLF001
+            renderables.oui_description,
+            renderables.wall_clock_second,
+        ]
+        if self.resolver is not None:
+            lookup_caches.append(type(self.resolver).resolve)
+        return {
+            "stored records": [
+                records,
+                timeindex,
+                devices,
+                BLEScannerApp.add_timed_advertisement,
+                BLEScannerApp.add_advertisement,
+            ],
+            "table rows": [
+                data_table,
+                BLEScannerApp.recreate_table,
+                BLEScannerApp.add_record_row,
+            ],
+            "render caches": [
+                renderables,
+                textual_cache,
+                DataTable._render_cell,  # noqa: SLF001
+                DataTable._render_line_in_row,  # noqa: SLF001
+            ],
+            "lookup caches": lookup_caches,
+        }
+
+    def sample_memory(self) -> None:
+        """Show the memory use of the subsystems and write it to the profile."""
+        if self.memory_profiler:
+            sample = self.memory_profiler.sample()
+            self.query_one(MemoryStatus).update(RichMemorySample(sample))
+
+    def action_mark_memory(self) -> None:
+        """Compare the memory use from now on with the current memory use."""
+        if self.memory_profiler:
+            self.memory_profiler.mark()
+            self.sample_memory()
+            self.notify("Memory use is now compared with this point in time")
+
+    def show_summary(self) -> None:
+        """Show the traffic summary if it's visible."""
+        summary_widget = self.query_one(TrafficSummaryWidget)
+        if summary_widget.display:
+            # Advertisements from a btsnoop file have past times, so the sliding
+            # windows end at the most recent advertisement.
+            now = (
+                self.traffic_summary.latest
+                if self.cli_args.import_btsnoop
+                else monotonic_ns()
+            )
+            summary_widget.update(RichTrafficSummary(self.traffic_summary, now))
+
+    def create_scanner(self) -> Scanner:
+        """Create the source of advertisements for the app.
+
+        Returns:
+            Scanner: A client of the scanner daemon, an importer of a btsnoop file,
+            a scanner in a child process or a Bleak scanner, depending on the
+            command-line arguments.
+        """
+        if self.cli_args.connect:
+            return RemoteScanner(
+                self.cli_args.connect,
+                self.add_timed_advertisement,
+                self.cli_args.filter,
+            )
+        if self.cli_args.import_btsnoop:
+            return BtsnoopScanner(
+                self.cli_args.import_btsnoop,
+                self.add_timed_advertisement,
+            )
+        if self.cli_args.scanner_process:
+            return ProcessScanner(self.cli_args, self.add_timed_advertisement)
+        return BleakScanner(**self.scanner_kwargs)
+
+    def expire_presence(self) -> None:
+        """Show the devices that are gone."""
+        if self.presence is not None:
+            self.show_presence_events(self.presence.expire(monotonic_ns()))
+            self.set_title()
+
+    def show_presence_events(self, events: list[PresenceEvent]) -> None:
+        """Show presence events in the presence log.
+
+        Args:
+            events (list[PresenceEvent]): The presence events.
+        """
+        if events:
+            presence_log = self.query_one(PresenceLog)
+            for event in events:
+                presence_log.write(RichPresenceEvent(event))
+
+    def show_alerts(self, alerts: list[WatchlistAlert]) -> None:
+        """Show watchlist alerts as notifications with a bell, and run the command.
+
+        Args:
+            alerts (list[WatchlistAlert]): The watchlist alerts.
+        """
+        if not alerts:
+            return
+        self.bell()
+        for alert in alerts:
+            self.notify(
+                f"{alert.address}: {alert.entry.label}",
+                title="Watchlist",
+                severity="warning",
+            )
+            if self.alert_command:
+                try:
+                    self.alert_command.run(alert)
+                except OSError as error:
+                    self.notify(
+                        f"Can't run alert command: {error}",
+                        severity="error",
+                    )
+
+    def on_unmount(self) -> None:
+        """Close the capture file and stop profiling, if needed."""
+        if self.capture:
+            self.capture.close()
+        if self.memory_profiler:
+            self.memory_profiler.stop()
+
     def on_switch_changed(self, message: Switch.Changed) -> None:
         """React when the switch is ticked or unticked.
 
         Show or hide advertisement data depending on the state of
-        the switches.
+        the switches. This only changes the heights of the existing rows, the
+        table isn't recreated.
 
         Args:
             message (textual.widgets.Switch.Changed): The message with the changed
                 switch.
         """
-        if "view" in message.switch.classes:
-            self.recreate_table()
+        if "view" in message.switch.classes and message.switch.id:
+            self.display_config.set_shown(message.switch.id, show=message.value)
+            for table in self.query(AdvertisementTable):
+                table.update_row_heights()
+        elif message.switch.id == "highlight_changes":
+            self.display_config.set_highlight_changes(highlight=message.value)
+            for table in self.query(AdvertisementTable):
+                table.redraw()
+
+    def on_data_table_row_highlighted(self, message: DataTable.RowHighlighted) -> None:
+        """Show the advertisements of the device highlighted in the device list.
+
+        Args:
+            message (textual.widgets.DataTable.RowHighlighted): The message with the
+                highlighted row.
+        """
+        if isinstance(message.data_table, DeviceList) and message.row_key.value:
+            self.show_device(message.row_key.value)
+
+    def on_data_table_cell_selected(self, message: DataTable.CellSelected) -> None:
+        """Expand or collapse the advertisement in the selected row.
+
+        Args:
+            message (textual.widgets.DataTable.CellSelected): The message with the
+                selected cell.
+        """
+        if isinstance(message.data_table, AdvertisementTable):
+            message.data_table.toggle_expanded(message.cell_key.row_key)
+
+    def show_device(self, address: str) -> None:
+        """Show the advertisements of a device in the device browser.
+
+        Only the device's own advertisements are looked up in the list of stored
+        advertisements, so this takes time proportional to the number of
+        advertisements of the device.
+
+        Args:
+            address (str): The address of the device.
+        """
+        self.selected_device = address
+        history = self.query_one("#device_history", AdvertisementTable)
+        history.clear()
+        for position in self.devices[address].positions:
+            self.add_record_row(history, self.advertisements[position])
+        self.scroll_if_autoscroll(history)
 
     def on_input_changed(self, message: Input.Changed) -> None:
         """Filter advertisements with user-supplied filter.
@@ -205,63 +626,166 @@ class BLEScannerApp(App[None]):
             message (textual.widgets.Input.Changed): The message with the user's
                 changed input.
         """
-        if message.value.startswith("address="):
-            self.address_filter = message.value[8:].upper()
-        else:
-            self.address_filter = ""
+        if isinstance(message.input, FilterWidget):
+            self.advertisement_filter = AdvertisementFilter(message.value)
+
+    def on_input_submitted(self, message: Input.Submitted) -> None:
+        """Jump to the first shown advertisement at or after the user-supplied time.
+
+        Auto-scroll is disabled, so the table stays at that time.
+
+        Args:
+            message (textual.widgets.Input.Submitted): The message with the user's
+                submitted input.
+        """
+        if not isinstance(message.input, JumpWidget):
+            return
+        try:
+            time = parse_time(message.value)
+        except ValueError:
+            self.notify(f"Invalid time: {message.value}", severity="error")
+            return
+
+        table = self.query_one("#advertisements", AdvertisementTable)
+        message.input.display = False
+        table.focus()
+        if not table.row_count:
+            return
+        position = self.time_index.first_at_or_after(time)
+        row = (
+            table.row_count
+            if position is None
+            else bisect_left(self.row_positions, position)
+        )
+        self.query_one("#autoscroll", Switch).value = False
+        table.move_cursor(row=min(row, table.row_count - 1), animate=False)
 
-    def watch_address_filter(self, old_filter: str, new_filter: str) -> None:
-        """React when the reactive attribute address_filter changes.
+    def watch_advertisement_filter(
+        self,
+        old_filter: AdvertisementFilter,
+        new_filter: AdvertisementFilter,
+    ) -> None:
+        """React when the reactive attribute advertisement_filter changes.
 
-        This recreates the table.
+        This recreates the table. If the new filter narrows the old one, for instance
+        because the user typed more characters of a name, only the advertisements
+        that are already shown are checked again.
 
         Args:
-            old_filter (str): The old value of the filter.
-            new_filter (str): The new value of the filter.
+            old_filter (AdvertisementFilter): The old filter.
+            new_filter (AdvertisementFilter): The new filter.
         """
-        self.recreate_table()
+        if new_filter.narrows(old_filter):
+            self.recreate_table(self.row_positions)
+        else:
+            self.recreate_table()
+
+    def recreate_table(self, positions: Iterable[int] | None = None) -> None:
+        """Recreate table with advertisements.
 
-    def recreate_table(self) -> None:
-        """Recreate table with advertisements."""
-        table = self.query_one(DataTable)
+        Without positions and with a time range in the filter, only the
+        advertisements in that range are checked, found by binary search in the
+        time index.
+
+        Args:
+            positions (Iterable[int], optional): The positions of the stored
+                advertisements to check, or ``None`` to check all of them.
+        """
+        table = self.query_one("#advertisements", AdvertisementTable)
         table.clear()
-        for advertisement in self.advertisements:
-            self.add_advertisement_to_table(
-                table,
-                RichTime(advertisement[0]),
-                RichDeviceAddress(advertisement[1]),
-                RichAdvertisement(advertisement[2], self.show_data_config()),
+        self.row_positions = array("q")
+        if positions is None:
+            positions = (
+                self.time_index.positions_between(
+                    self.advertisement_filter.start,
+                    self.advertisement_filter.stop,
+                )
+                if self.advertisement_filter.has_time_range()
+                else range(len(self.advertisements))
             )
+        for position in positions:
+            self.add_record_to_table(table, position)
 
-    def scroll_if_autoscroll(self) -> None:
-        """Scroll to the end if autoscroll is enabled."""
+    def scroll_if_autoscroll(self, table: AdvertisementTable) -> None:
+        """Scroll a table to the end if autoscroll is enabled.
+
+        Args:
+            table (AdvertisementTable): The table to scroll.
+        """
         if self.query_one("#autoscroll", Switch).value:
-            self.query_one(DataTable).scroll_end(animate=False)
-            self.query_one(DataTable).refresh()
+            table.scroll_end(animate=False)
+            table.refresh()
 
-    def add_advertisement_to_table(
+    def add_record_row(
         self,
-        table: DataTable,
-        now: RichTime,
-        device_address: RichDeviceAddress,
-        rich_advertisement: RichAdvertisement,
+        table: AdvertisementTable,
+        record: AdvertisementRecord,
     ) -> None:
-        """Add new row to table with time, address and advertisement.
+        """Create renderables for a stored advertisement and add them to a table.
+
+        The address of an advertisement matching the watchlist is highlighted.
 
         Args:
-            table (textual.widgets.DataTable): The table to add an advertisement to.
-            now (RichTime): The time.
-            device_address (RichDeviceAddress): The device address.
-            rich_advertisement (RichAdvertisement): The advertisement.
+            table (AdvertisementTable): The table to add the advertisement to.
+            record (AdvertisementRecord): The record of the advertisement.
         """
-        if device_address.address.startswith(self.address_filter):
-            table.add_row(
-                now,
-                device_address,
-                rich_advertisement,
-                height=max(device_address.height(), rich_advertisement.height()),
-            )
-            self.scroll_if_autoscroll()
+        table.add_advertisement(
+            RichTime(record.time),
+            RichDeviceAddress(
+                record.address,
+                record.interval,
+                self.resolver.resolve(record.address) if self.resolver else None,
+                record.watch_label,
+            ),
+            RichAdvertisement(
+                record,
+                self.display_config,
+                record.previous_payloads,
+            ),
+        )
+
+    def update_device_list(self, device: str) -> None:
+        """Update the counts of a device in the device list, if it's shown.
+
+        Args:
+            device (str): The key of the device.
+        """
+        browser = self.query_one(DeviceBrowser)
+        state = self.devices[device]
+        if browser.display and (state.positions or state.throttled):
+            browser.query_one(DeviceList).update_device(device, state)
+
+    def add_record_to_device_browser(
+        self,
+        browser: DeviceBrowser,
+        record: AdvertisementRecord,
+    ) -> None:
+        """Update the device browser with a new stored advertisement.
+
+        Args:
+            browser (DeviceBrowser): The device browser.
+            record (AdvertisementRecord): The record of the advertisement.
+        """
+        device = self.device_key(record.address)
+        browser.query_one(DeviceList).update_device(device, self.devices[device])
+        if device == self.selected_device:
+            history = browser.query_one(AdvertisementTable)
+            self.add_record_row(history, record)
+            self.scroll_if_autoscroll(history)
+
+    def add_record_to_table(self, table: AdvertisementTable, position: int) -> None:
+        """Add a stored advertisement to the table if it matches the filter.
+
+        Args:
+            table (AdvertisementTable): The table to add the advertisement to.
+            position (int): The position of the advertisement in the list of stored
+                advertisements.
+        """
+        record = self.advertisements[position]
+        if self.advertisement_filter.matches(record.address, record, record.time):
+            self.add_record_row(table, record)
+            self.row_positions.append(position)
+            self.scroll_if_autoscroll(table)
 
         # Always update the title: the total number of advertisements also changes if
         # the advertisement isn't shown.
@@ -0,0 +1,236 @@
+"""This module imports advertisements from btsnoop files into HumBLE Explorer.
+
+A btsnoop file, as written by ``btmon -w`` or Android's Bluetooth HCI snoop log,
+starts with a 16-byte header, followed by packet records. Each record has a 24-byte
+header with the lengths, flags and timestamp of the packet, followed by the packet.
+All integers are big-endian.
+
+The file is memory-mapped and parsed record by record, so it's never loaded into
+memory as a whole. Only HCI events with advertising reports are parsed further.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import mmap
+import struct
+from datetime import datetime
+from typing import TYPE_CHECKING, Callable
+
+from humble_explorer.hci import HCI_LE_META_EVENT, AdvertisingReportParser
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+    from pathlib import Path
+
+    from bleak.backends.scanner import AdvertisementData
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+BTSNOOP_MAGIC = b"btsnoop\0"
+FILE_HEADER = struct.Struct(">8sII")
+RECORD_HEADER = struct.Struct(">IIIIq")
+
+# Datalink types
+DATALINK_HCI = 1001
+DATALINK_H4 = 1002
+DATALINK_MONITOR = 2001
+
+# Flags of an event received from the controller with the HCI datalink type
+HCI_FLAGS_EVENT = 0x03
+# Packet type indicator of an event with the H4 datalink type
+H4_EVENT = 0x04
+# Opcode of an event in the flags with the monitor datalink type
+MONITOR_OPCODE_EVENT = 0x03
+
+# Microseconds between the btsnoop epoch (midnight, January 1st, 0 AD) and the Unix
+# epoch
+BTSNOOP_EPOCH_OFFSET = 0x00DCDDB30F2F8000
+
+# Number of advertisements to import before letting the event loop run
+IMPORT_BATCH_SIZE = 1000
+
+
+class BtsnoopError(ValueError):
+    """Error raised when a file isn't a supported btsnoop file."""
+
+
+def open_btsnoop(path: str | Path) -> tuple[mmap.mmap, int]:
+    """Memory-map a btsnoop file and check its header.
+
+    Args:
+        path (str | Path): The path of the btsnoop file.
+
+    Returns:
+        tuple[mmap.mmap, int]: The memory-mapped file, which the caller closes, and
+        its datalink type.
+
+    Raises:
+        BtsnoopError: If the file isn't a btsnoop file with a supported datalink
+            type.
+    """
+    with open(path, "rb") as btsnoop_file:  # noqa: PTH123
+        try:
+            data = mmap.mmap(btsnoop_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # An empty file can't be memory-mapped.
+            msg = f"{path} is empty"
+            raise BtsnoopError(msg) from None
+
+    if len(data) < FILE_HEADER.size:
+        data.close()
+        msg = f"{path} is too short for a btsnoop file"
+        raise BtsnoopError(msg)
+    magic, _, datalink = FILE_HEADER.unpack_from(data)
+    if magic != BTSNOOP_MAGIC:
+        data.close()
+        msg = f"{path} isn't a btsnoop file"
+        raise BtsnoopError(msg)
+    if datalink not in (DATALINK_HCI, DATALINK_H4, DATALINK_MONITOR):
+        data.close()
+        msg = f"{path} has unsupported datalink type {datalink}"
+        raise BtsnoopError(msg)
+
+    return data, datalink
+
+
+def read_btsnoop(
+    path: str | Path,
+) -> Generator[tuple[datetime, str, AdvertisementData], None, None]:
+    """Read the advertisements from a btsnoop file.
+
+    The file header is checked immediately, the records are read while iterating.
+
+    Args:
+        path (str | Path): The path of the btsnoop file.
+
+    Returns:
+        Generator[tuple[datetime, str, AdvertisementData], None, None]: The time,
+        address and advertisement data of each advertisement in the file, in the
+        order of the file.
+
+    Raises:
+        BtsnoopError: If the file isn't a btsnoop file with a supported datalink
+            type.
+    """
+    return _read_records(*open_btsnoop(path))
+
+
+def _read_records(
+    data: mmap.mmap,
+    datalink: int,
+) -> Generator[tuple[datetime, str, AdvertisementData], None, None]:
+    """Read the advertisements from the records of a memory-mapped btsnoop file.
+
+    Args:
+        data (mmap.mmap): The memory-mapped file, closed after the last record.
+        datalink (int): The datalink type of the file.
+
+    Yields:
+        tuple[datetime, str, AdvertisementData]: The time, address and advertisement
+        data of each advertisement.
+    """
+    parser = AdvertisingReportParser()
+    # The H4 datalink type has a packet type indicator before the HCI event.
+    event_start = 1 if datalink == DATALINK_H4 else 0
+    unpack_record_header = RECORD_HEADER.unpack_from
+    record_header_size = RECORD_HEADER.size
+
+    with data:
+        end = len(data)
+        offset = FILE_HEADER.size
+        while offset + record_header_size <= end:
+            _, length, flags, _, timestamp = unpack_record_header(data, offset)
+            start = offset + record_header_size
+            offset = start + length
+            if offset > end:
+                # Truncated record at the end of a file that is still being written
+                return
+
+            # Check the event code before copying the packet, because most packets
+            # aren't advertisements.
+            if (
+                length <= event_start
+                or data[start + event_start] != HCI_LE_META_EVENT
+                or not _is_event(datalink, flags, data[start])
+            ):
+                continue
+
+            reports = parser.parse_event(data[start + event_start : offset])
+            if reports:
+                # A naive local time, the same as the times of scanned
+                # advertisements
+                time = datetime.fromtimestamp(  # noqa: DTZ006
+                    (timestamp - BTSNOOP_EPOCH_OFFSET) / 1_000_000,
+                )
+                for address, advertisement_data in reports:
+                    yield time, address, advertisement_data
+
+
+def _is_event(datalink: int, flags: int, first_byte: int) -> bool:
+    """Check whether a record has an HCI event from the controller.
+
+    Args:
+        datalink (int): The datalink type of the file.
+        flags (int): The flags of the record.
+        first_byte (int): The first byte of the packet.
+
+    Returns:
+        bool: ``True`` if the record has an HCI event, ``False`` otherwise.
+    """
+    if datalink == DATALINK_H4:
+        return first_byte == H4_EVENT
+    if datalink == DATALINK_MONITOR:
+        # The lower 16 bits are the opcode, the upper 16 bits the adapter index.
+        return flags & 0xFFFF == MONITOR_OPCODE_EVENT
+    return flags & HCI_FLAGS_EVENT == HCI_FLAGS_EVENT
+
+
+class BtsnoopScanner:
+    """Scanner that imports advertisements from a btsnoop file.
+
+    It has the same start and stop methods as :class:`bleak.BleakScanner`. Stopping
+    pauses the import and starting again resumes it.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        detection_callback: Callable[[datetime, str, AdvertisementData], None],
+    ) -> None:
+        """Create a BtsnoopScanner object.
+
+        Args:
+            path (str | Path): The path of the btsnoop file.
+            detection_callback (Callable[[datetime, str, AdvertisementData], None]):
+                The function to call with the time, address and advertisement data
+                of each imported advertisement.
+        """
+        self.detection_callback = detection_callback
+        self._advertisements = read_btsnoop(path)
+        self._importer: asyncio.Task[None] | None = None
+
+    async def start(self) -> None:
+        """Start or resume importing advertisements."""
+        if self._importer is None:
+            self._importer = asyncio.create_task(self._import())
+
+    async def stop(self) -> None:
+        """Pause importing advertisements."""
+        if self._importer:
+            self._importer.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._importer
+            self._importer = None
+
+    async def _import(self) -> None:
+        """Import advertisements in batches, letting other tasks run in between."""
+        while True:
+            for _ in range(IMPORT_BATCH_SIZE):
+                try:
+                    self.detection_callback(*next(self._advertisements))
+                except StopIteration:
+                    return
+            await asyncio.sleep(0)
@@ -0,0 +1,226 @@
+"""This module exports advertisements to capture files that Wireshark can open.
+
+Each advertisement is synthesized as the HCI events that a controller would send to
+report it, and written as a received HCI event packet to a btsnoop file (H4 datalink
+type) or a pcap file (Bluetooth HCI H4 with pseudo-header link type). The files are
+written through a large buffer while advertisements come in, so an export never
+needs all advertisements in memory.
+"""
+from __future__ import annotations
+
+import struct
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import IO, TYPE_CHECKING
+
+from humble_explorer.btsnoop import (
+    BTSNOOP_EPOCH_OFFSET,
+    BTSNOOP_MAGIC,
+    DATALINK_H4,
+    FILE_HEADER,
+    H4_EVENT,
+    HCI_FLAGS_EVENT,
+    RECORD_HEADER,
+)
+from humble_explorer.filters import AdvertisementFilter
+from humble_explorer.hci import encode_advertising_report
+from humble_explorer.records import datetime_to_monotonic_ns
+
+if TYPE_CHECKING:
+    from datetime import datetime
+
+    from bleak.backends.scanner import AdvertisementData
+
+    from humble_explorer.records import AdvertisementRecord
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+BTSNOOP_VERSION = 1
+
+PCAP_MAGIC = 0xA1B2C3D4
+PCAP_VERSION = (2, 4)
+PCAP_SNAPLEN = 0xFFFF
+LINKTYPE_BLUETOOTH_HCI_H4_WITH_PHDR = 201
+PCAP_FILE_HEADER = struct.Struct("<IHHiIII")
+PCAP_RECORD_HEADER = struct.Struct("<IIII")
+# Direction in the pseudo-header of a packet received from the controller
+PCAP_H4_RECEIVED = struct.pack(">I", 1)
+
+# Size of the write buffer of a capture file
+CAPTURE_BUFFER_SIZE = 1 << 20
+
+# File name suffixes of pcap files, all other files are written as btsnoop files
+PCAP_SUFFIXES = (".pcap", ".cap")
+
+
+class CaptureExporter(ABC):
+    """Exporter that writes advertisements as HCI events to a capture file.
+
+    Subclasses define the format of the file header and packet records.
+    Advertisements of devices without Bluetooth address, such as on macOS, can't be
+    written and are skipped.
+    """
+
+    def __init__(self, stream: IO[bytes], filter_expression: str = "") -> None:
+        """Create a CaptureExporter object and write the file header.
+
+        Args:
+            stream (IO[bytes]): The binary stream to write to.
+            filter_expression (str): Only export advertisements matching this
+                filter expression.
+        """
+        self.stream = stream
+        self.filter = AdvertisementFilter(filter_expression)
+        self.skipped = 0
+        self.stream.write(self.file_header())
+
+    @abstractmethod
+    def file_header(self) -> bytes:
+        """Return the header of the capture file.
+
+        Returns:
+            bytes: The file header.
+        """
+
+    @abstractmethod
+    def packet_record(self, time: datetime, event: bytes) -> bytes:
+        """Return the record of an HCI event packet.
+
+        Args:
+            time (datetime): The time of the packet.
+            event (bytes): The HCI event.
+
+        Returns:
+            bytes: The record with the packet.
+        """
+
+    def export(
+        self,
+        time: datetime,
+        address: str,
+        advertisement_data: AdvertisementData | AdvertisementRecord,
+    ) -> None:
+        """Export an advertisement if it matches the filter.
+
+        Args:
+            time (datetime): The time of the advertisement.
+            address (str): The address of the advertising device.
+            advertisement_data (AdvertisementData | AdvertisementRecord): The
+                advertisement data.
+        """
+        if not self.filter.matches(
+            address,
+            advertisement_data,
+            datetime_to_monotonic_ns(time),
+        ):
+            return
+        try:
+            events = encode_advertising_report(address, advertisement_data)
+        except ValueError:
+            self.skipped += 1
+            return
+        for event in events:
+            self.stream.write(self.packet_record(time, event))
+
+    def close(self) -> None:
+        """Flush and close the capture file."""
+        self.stream.close()
+
+
+class BtsnoopExporter(CaptureExporter):
+    """Exporter that writes advertisements to a btsnoop file."""
+
+    def file_header(self) -> bytes:
+        """Return the header of a btsnoop file with the H4 datalink type.
+
+        Returns:
+            bytes: The file header.
+        """
+        return FILE_HEADER.pack(BTSNOOP_MAGIC, BTSNOOP_VERSION, DATALINK_H4)
+
+    def packet_record(self, time: datetime, event: bytes) -> bytes:
+        """Return the btsnoop record of a received HCI event packet.
+
+        Args:
+            time (datetime): The time of the packet.
+            event (bytes): The HCI event.
+
+        Returns:
+            bytes: The record with the packet.
+        """
+        length = len(event) + 1
+        return (
+            RECORD_HEADER.pack(
+                length,
+                length,
+                HCI_FLAGS_EVENT,
+                0,
+                round(time.timestamp() * 1_000_000) + BTSNOOP_EPOCH_OFFSET,
+            )
+            + bytes((H4_EVENT,))
+            + event
+        )
+
+
+class PcapExporter(CaptureExporter):
+    """Exporter that writes advertisements to a pcap file."""
+
+    def file_header(self) -> bytes:
+        """Return the header of a pcap file with the HCI H4 pseudo-header link type.
+
+        Returns:
+            bytes: The file header.
+        """
+        return PCAP_FILE_HEADER.pack(
+            PCAP_MAGIC,
+            *PCAP_VERSION,
+            0,
+            0,
+            PCAP_SNAPLEN,
+            LINKTYPE_BLUETOOTH_HCI_H4_WITH_PHDR,
+        )
+
+    def packet_record(self, time: datetime, event: bytes) -> bytes:
+        """Return the pcap record of a received HCI event packet.
+
+        Args:
+            time (datetime): The time of the packet.
+            event (bytes): The HCI event.
+
+        Returns:
+            bytes: The record with the packet.
+        """
+        seconds, microseconds = divmod(round(time.timestamp() * 1_000_000), 1_000_000)
+        length = len(PCAP_H4_RECEIVED) + 1 + len(event)
+        return (
+            PCAP_RECORD_HEADER.pack(seconds, microseconds, length, length)
+            + PCAP_H4_RECEIVED
+            + bytes((H4_EVENT,))
+            + event
+        )
+
+
+def open_capture(path: str | Path, filter_expression: str = "") -> CaptureExporter:
+    """Create a capture file for exporting advertisements.
+
+    Files with a ``.pcap`` or ``.cap`` suffix are written as pcap files, all other
+    files as btsnoop files.
+
+    Args:
+        path (str | Path): The path of the capture file.
+        filter_expression (str): Only export advertisements matching this filter
+            expression.
+
+    Returns:
+        CaptureExporter: The exporter writing to the capture file.
+    """
+    path = Path(path)
+    exporter_class = (
+        PcapExporter if path.suffix.lower() in PCAP_SUFFIXES else BtsnoopExporter
+    )
+    return exporter_class(
+        path.open("wb", buffering=CAPTURE_BUFFER_SIZE),
+        filter_expression,
+    )
@@ -0,0 +1,293 @@
+"""This module contains the scanner daemon of HumBLE Explorer and its client.
+
+The daemon runs one BLE scanner and publishes the advertisements as a binary record
+stream on a Unix domain socket. Each client gets its own filter, applied by the
+daemon, and its own bounded queue: if a client can't keep up, its oldest queued
+records are dropped, so a slow client never slows down the scanner or the other
+clients.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from collections import deque
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from time import perf_counter
+from typing import TYPE_CHECKING, Callable
+
+from bleak import BleakScanner
+
+from humble_explorer.filters import AdvertisementFilter
+from humble_explorer.metrics import Metrics, MetricsServer
+from humble_explorer.protocol import (
+    decode_advertisement,
+    encode_advertisement,
+    frame,
+    read_frame,
+)
+from humble_explorer.records import datetime_to_monotonic_ns
+from humble_explorer.scanner import get_scanner_kwargs
+
+if TYPE_CHECKING:
+    from argparse import Namespace
+
+    from bleak.backends.device import BLEDevice
+    from bleak.backends.scanner import AdvertisementData
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+MAX_QUEUED_RECORDS = 4096
+
+
+class Subscriber:
+    """A client of the scanner daemon."""
+
+    def __init__(self, writer: asyncio.StreamWriter, filter_expression: str) -> None:
+        """Create a Subscriber object.
+
+        Args:
+            writer (asyncio.StreamWriter): The stream to the client.
+            filter_expression (str): The client's filter expression.
+        """
+        self.writer = writer
+        self.filter = AdvertisementFilter(filter_expression)
+        self.queue: deque[bytes] = deque(maxlen=MAX_QUEUED_RECORDS)
+        self.dropped = 0
+        self._ready = asyncio.Event()
+
+    def publish(self, record_frame: bytes) -> bool:
+        """Queue a record for the client, dropping the oldest record if it's full.
+
+        Args:
+            record_frame (bytes): The frame with the record.
+
+        Returns:
+            bool: ``True`` if the oldest record was dropped, ``False`` if not.
+        """
+        dropped = len(self.queue) == self.queue.maxlen
+        if dropped:
+            self.dropped += 1
+        self.queue.append(record_frame)
+        self._ready.set()
+        return dropped
+
+    async def send(self) -> None:
+        """Send queued records to the client until the connection is closed."""
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            # Send everything that has been queued in one write.
+            records = b"".join(self.queue)
+            self.queue.clear()
+            self.writer.write(records)
+            await self.writer.drain()
+
+
+class ScannerDaemon:
+    """Daemon that publishes advertisements of one BLE scanner to many clients."""
+
+    def __init__(self, cli_args: Namespace) -> None:
+        """Create a ScannerDaemon object.
+
+        Args:
+            cli_args (argparse.Namespace): Command-line arguments.
+        """
+        self.socket_path = cli_args.daemon
+        self.scanner_kwargs = get_scanner_kwargs(cli_args, self.on_advertisement)
+        self.subscribers: set[Subscriber] = set()
+        self.metrics = Metrics()
+        self.metrics_address: tuple[str, int] | None = cli_args.metrics
+
+    def on_advertisement(
+        self,
+        device: BLEDevice,
+        advertisement_data: AdvertisementData,
+    ) -> None:
+        """Publish a received advertisement to all clients with a matching filter.
+
+        The advertisement is counted in the metrics, with the time it took to
+        publish it as its latency.
+
+        Args:
+            device (~bleak.backends.device.BLEDevice): The device advertising the data.
+            advertisement_data (~bleak.backends.scanner.AdvertisementData): The
+                advertised data.
+        """
+        start = perf_counter()
+        now = datetime.now()
+        record_frame = None
+        dropped = 0
+        queue_depth = 0
+        for subscriber in self.subscribers:
+            if subscriber.filter.matches(
+                device.address,
+                advertisement_data,
+                datetime_to_monotonic_ns(now),
+            ):
+                # Only encode the advertisement if a client wants it, and only once.
+                if record_frame is None:
+                    record_frame = frame(
+                        encode_advertisement(now, device.address, advertisement_data),
+                    )
+                dropped += subscriber.publish(record_frame)
+            queue_depth += len(subscriber.queue)
+
+        self.metrics.dropped += dropped
+        self.metrics.queue_depth = queue_depth
+        self.metrics.observe(
+            device.address,
+            advertisement_data,
+            perf_counter() - start,
+        )
+
+    async def handle_client(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        """Publish advertisements to a client until it disconnects.
+
+        The client starts by sending its filter expression, and can change it by
+        sending a new one.
+
+        Args:
+            reader (asyncio.StreamReader): The stream from the client.
+            writer (asyncio.StreamWriter): The stream to the client.
+        """
+        try:
+            subscriber = Subscriber(writer, (await read_frame(reader)).decode())
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            writer.close()
+            return
+
+        self.subscribers.add(subscriber)
+        sender = asyncio.create_task(subscriber.send())
+        sender.add_done_callback(partial(self.drop_subscriber, subscriber))
+        try:
+            while True:
+                subscriber.filter = AdvertisementFilter(
+                    (await read_frame(reader)).decode(),
+                )
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self.subscribers.discard(subscriber)
+            sender.cancel()
+            writer.close()
+
+    def drop_subscriber(
+        self,
+        subscriber: Subscriber,
+        sender: asyncio.Task[None],
+    ) -> None:
+        """Stop publishing to a client when sending to it has stopped.
+
+        Sending fails if the client disconnects while records are being sent, so
+        the error is retrieved here and the connection is closed.
+
+        Args:
+            subscriber (Subscriber): The client.
+            sender (asyncio.Task[None]): The finished task sending to the client.
+        """
+        self.subscribers.discard(subscriber)
+        if not sender.cancelled() and sender.exception() is not None:
+            subscriber.writer.close()
+
+    def remove_stale_socket(self) -> None:
+        """Remove the socket of a previous daemon, but never another file.
+
+        Raises:
+            FileExistsError: If the socket path exists and isn't a socket.
+        """
+        socket_path = Path(self.socket_path)
+        if socket_path.is_socket():
+            socket_path.unlink()
+        elif socket_path.exists():
+            msg = f"{self.socket_path} exists and isn't a socket"
+            raise FileExistsError(msg)
+
+    async def run(self) -> None:
+        """Run the scanner and publish its advertisements until cancelled.
+
+        If the daemon has a metrics address, the metrics are served there. The
+        socket is removed when the daemon stops.
+        """
+        self.remove_stale_socket()
+
+        metrics_server = None
+        if self.metrics_address:
+            metrics_server = MetricsServer(self.metrics, *self.metrics_address)
+            metrics_server.start()
+
+        scanner = BleakScanner(**self.scanner_kwargs)
+        server = await asyncio.start_unix_server(self.handle_client, self.socket_path)
+        try:
+            async with server:
+                await scanner.start()
+                try:
+                    await server.serve_forever()
+                finally:
+                    await scanner.stop()
+        finally:
+            Path(self.socket_path).unlink(missing_ok=True)
+            if metrics_server:
+                metrics_server.stop()
+
+
+class RemoteScanner:
+    """Scanner that receives advertisements from a scanner daemon.
+
+    It has the same start and stop methods as :class:`bleak.BleakScanner`, but it
+    calls its callback with the time of the advertisement as given by the daemon.
+    """
+
+    def __init__(
+        self,
+        socket_path: str,
+        detection_callback: Callable[[datetime, str, AdvertisementData], None],
+        filter_expression: str = "",
+    ) -> None:
+        """Create a RemoteScanner object.
+
+        Args:
+            socket_path (str): The path of the daemon's socket.
+            detection_callback (Callable[[datetime, str, AdvertisementData], None]):
+                The function to call with the time, address and advertisement data
+                of each received advertisement.
+            filter_expression (str): Filter expression to let the daemon apply.
+        """
+        self.socket_path = socket_path
+        self.detection_callback = detection_callback
+        self.filter_expression = filter_expression
+        self._writer: asyncio.StreamWriter | None = None
+        self._receiver: asyncio.Task[None] | None = None
+
+    async def start(self) -> None:
+        """Connect to the daemon and start receiving advertisements."""
+        reader, self._writer = await asyncio.open_unix_connection(self.socket_path)
+        self._writer.write(frame(self.filter_expression.encode()))
+        await self._writer.drain()
+        self._receiver = asyncio.create_task(self._receive(reader))
+
+    async def stop(self) -> None:
+        """Stop receiving advertisements and disconnect from the daemon."""
+        if self._receiver:
+            self._receiver.cancel()
+            self._receiver = None
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+
+    async def _receive(self, reader: asyncio.StreamReader) -> None:
+        """Receive advertisements until the daemon disconnects.
+
+        Args:
+            reader (asyncio.StreamReader): The stream from the daemon.
+        """
+        with contextlib.suppress(asyncio.IncompleteReadError, ConnectionError):
+            while True:
+                self.detection_callback(*decode_advertisement(await read_frame(reader)))
@@ -0,0 +1,298 @@
+"""This module keeps track of the Bluetooth devices seen by HumBLE Explorer."""
+from __future__ import annotations
+
+from array import array
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from bleak.backends.scanner import AdvertisementData
+
+    from humble_explorer.records import AdvertisementRecord
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+# Packets of a device closer together than the minimum advertising interval of
+# Bluetooth Low Energy belong to the same advertising event, such as an advertisement
+# and its scan response.
+MIN_ADVERTISING_INTERVAL_NS = 20_000_000
+
+# Maximum random delay that a device adds to each advertising interval
+MAX_ADVERTISING_DELAY_NS = 10_000_000
+
+# Maximum number of intervals that the estimate is averaged over
+INTERVAL_SMOOTHING = 16
+
+# Number of consecutive gaps of several intervals after which a device is assumed to
+# advertise more slowly
+INTERVAL_SLOWDOWN_GAPS = 16
+
+
+def fingerprint(advertisement_data: AdvertisementData) -> int:
+    """Compute a fingerprint of the payload of an advertisement.
+
+    Only the local name, manufacturer data, service data and service UUIDs are
+    part of the fingerprint, so changes in RSSI don't change the fingerprint.
+
+    Args:
+        advertisement_data (AdvertisementData): The advertisement data.
+
+    Returns:
+        int: A hash of the advertisement's payload.
+    """
+    return hash(
+        (
+            advertisement_data.local_name,
+            frozenset(advertisement_data.manufacturer_data.items()),
+            frozenset(advertisement_data.service_data.items()),
+            frozenset(advertisement_data.service_uuids),
+        ),
+    )
+
+
+class IntervalEstimator:
+    """Online estimator of the advertising interval of a device.
+
+    The time between two advertising events is the advertising interval, or a
+    multiple of it if the scanner missed some advertisements. Each gap is divided by
+    its nearest multiple of the current estimate before it's averaged into the
+    estimate. A gap shorter than the estimate by more than the random advertising
+    delay can explain replaces it, because then the estimate was too long, for
+    instance a multiple of the interval. A run of gaps that are all
+    multiples of the estimate means that the device advertises more slowly now, and
+    then the shortest of these gaps replaces the estimate.
+
+    The estimator only keeps a few numbers, whatever the number of advertisements.
+    """
+
+    __slots__ = ("interval", "last_time", "long_gaps", "samples", "shortest_long_gap")
+
+    def __init__(self) -> None:
+        """Create an IntervalEstimator object without estimate."""
+        self.interval: float | None = None
+        self.last_time: int | None = None
+        self.long_gaps = 0
+        self.samples = 0
+        self.shortest_long_gap = 0
+
+    def update(self, time: int) -> None:
+        """Update the estimate with the time of a new packet.
+
+        Args:
+            time (int): The monotonic timestamp of the packet in nanoseconds.
+        """
+        last_time, self.last_time = self.last_time, time
+        if last_time is None:
+            return
+        gap = time - last_time
+        if gap < MIN_ADVERTISING_INTERVAL_NS:
+            return
+
+        if self.interval is None:
+            self._reset(gap)
+            return
+        if gap < self.interval - 2 * MAX_ADVERTISING_DELAY_NS:
+            self._reset(gap)
+            return
+        multiple = max(round(gap / self.interval), 1)
+        if multiple > 1:
+            self.shortest_long_gap = (
+                min(self.shortest_long_gap, gap) if self.long_gaps else gap
+            )
+            self.long_gaps += 1
+            if self.long_gaps >= INTERVAL_SLOWDOWN_GAPS:
+                self._reset(self.shortest_long_gap)
+                return
+        else:
+            self.long_gaps = 0
+
+        self.samples = min(self.samples + 1, INTERVAL_SMOOTHING)
+        self.interval += (gap / multiple - self.interval) / self.samples
+
+    def _reset(self, interval: int) -> None:
+        """Start a new estimate.
+
+        Args:
+            interval (int): The first estimate of the interval in nanoseconds.
+        """
+        self.interval = interval
+        self.samples = 1
+        self.long_gaps = 0
+
+    @property
+    def interval_ms(self) -> int | None:
+        """The estimated advertising interval in milliseconds.
+
+        Returns:
+            int, optional: The estimate, or ``None`` if there's none yet.
+        """
+        if self.interval is None:
+            return None
+        return round(self.interval / 1_000_000)
+
+
+class Device:
+    """State of a Bluetooth device."""
+
+    __slots__ = (
+        "address",
+        "fingerprint",
+        "interval",
+        "payloads",
+        "positions",
+        "record",
+        "suppressed",
+        "throttled",
+    )
+
+    def __init__(self, address: str) -> None:
+        """Create a Device object.
+
+        Args:
+            address (str): The address of the device.
+        """
+        self.address = address
+        self.fingerprint: int | None = None
+        self.interval = IntervalEstimator()
+        self.payloads: dict[int | str, bytes] = {}
+        # Positions of the device's stored advertisements, in the order they were
+        # stored
+        self.positions = array("q")
+        self.record: AdvertisementRecord | None = None
+        self.suppressed = 0
+        self.throttled = 0
+
+
+class DeviceRegistry:
+    """Registry of all Bluetooth devices that have been seen."""
+
+    def __init__(self) -> None:
+        """Create an empty DeviceRegistry object."""
+        self.devices: dict[str, Device] = {}
+        self.suppressed = 0
+        self.throttled = 0
+
+    def __getitem__(self, address: str) -> Device:
+        """Return the device with the given address, adding it if it's new.
+
+        Args:
+            address (str): The address of the device.
+
+        Returns:
+            Device: The device.
+        """
+        try:
+            return self.devices[address]
+        except KeyError:
+            device = self.devices[address] = Device(address)
+            return device
+
+    def __len__(self) -> int:
+        """Return the number of devices.
+
+        Returns:
+            int: The number of devices in the registry.
+        """
+        return len(self.devices)
+
+    def clear(self) -> None:
+        """Forget all devices."""
+        self.devices = {}
+        self.suppressed = 0
+        self.throttled = 0
+
+    def observe(self, address: str, time: int) -> int | None:
+        """Update the advertising interval of a device with a received packet.
+
+        Args:
+            address (str): The address of the device.
+            time (int): The monotonic timestamp of the packet in nanoseconds.
+
+        Returns:
+            int, optional: The estimated advertising interval of the device in
+            milliseconds, or ``None`` if there's no estimate yet.
+        """
+        interval = self[address].interval
+        interval.update(time)
+        return interval.interval_ms
+
+    def store(self, address: str, record: AdvertisementRecord, position: int) -> None:
+        """Remember a stored advertisement of a device.
+
+        Args:
+            address (str): The address of the device.
+            record (AdvertisementRecord): The record of the advertisement.
+            position (int): The position of the advertisement in the list of stored
+                advertisements.
+        """
+        device = self[address]
+        device.record = record
+        device.positions.append(position)
+
+    def throttle(self, address: str) -> None:
+        """Count a throttled advertisement of a device.
+
+        Args:
+            address (str): The address of the device.
+        """
+        self[address].throttled += 1
+        self.throttled += 1
+
+    def is_repeat(self, address: str, advertisement_data: AdvertisementData) -> bool:
+        """Check whether a device repeats its previous payload.
+
+        Repeated payloads are counted for the device and in total.
+
+        Args:
+            address (str): The address of the device.
+            advertisement_data (AdvertisementData): The advertisement data.
+
+        Returns:
+            bool: ``True`` if the payload is the same as the device's previous
+            payload, ``False`` if the payload has changed or it's the first payload
+            of the device.
+        """
+        device = self[address]
+        new_fingerprint = fingerprint(advertisement_data)
+        if new_fingerprint == device.fingerprint:
+            device.suppressed += 1
+            self.suppressed += 1
+            return True
+
+        device.fingerprint = new_fingerprint
+        return False
+
+    def previous_payloads(
+        self,
+        address: str,
+        advertisement_data: AdvertisementData,
+    ) -> dict[int | str, bytes]:
+        """Return the changed previous payloads of a device and remember the new ones.
+
+        Only the payloads with a company ID or service UUID in the new advertisement
+        and a different value than in the new advertisement are returned. The cost
+        is proportional to the number of payloads in the advertisement, not to the
+        number of advertisements of the device.
+
+        Args:
+            address (str): The address of the device.
+            advertisement_data (AdvertisementData): The new advertisement data.
+
+        Returns:
+            dict[int | str, bytes]: The previous manufacturer data by company ID and
+            previous service data by service UUID.
+        """
+        payloads = self[address].payloads
+        previous: dict[int | str, bytes] = {}
+        # Company IDs and service UUIDs never collide, because their types differ.
+        items: list[tuple[int | str, bytes]] = [
+            *advertisement_data.manufacturer_data.items(),
+            *advertisement_data.service_data.items(),
+        ]
+        new_payloads = dict(items)
+        for key, payload in new_payloads.items():
+            if key in payloads and payloads[key] != payload:
+                previous[key] = payloads[key]
+            payloads[key] = payload
+        return previous
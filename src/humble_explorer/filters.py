@@ -0,0 +1,335 @@
+"""This module contains the advertisement filters of HumBLE Explorer."""
+from __future__ import annotations
+
+import re
+from datetime import datetime, time
+from typing import TYPE_CHECKING
+from uuid import UUID
+
+from humble_explorer.records import datetime_to_monotonic_ns
+
+if TYPE_CHECKING:
+    from bleak.backends.scanner import AdvertisementData
+
+    from humble_explorer.records import AdvertisementRecord
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+BLUETOOTH_BASE_UUID = "-0000-1000-8000-00805f9b34fb"
+
+# Characters with a special meaning in regular expressions
+REGEX_SPECIAL_CHARS = frozenset(".^$*+?{}[]\\|()")
+
+# Maximum number of local names whose match result a filter remembers
+NAME_CACHE_SIZE = 4096
+
+
+def normalize_uuid(uuid: str) -> str:
+    """Convert a 16-bit, 32-bit or 128-bit UUID to a lowercase 128-bit UUID.
+
+    Args:
+        uuid (str): The UUID, for instance ``181a`` or
+            ``0000181a-0000-1000-8000-00805f9b34fb``.
+
+    Returns:
+        str: The UUID as a 128-bit UUID string.
+
+    Raises:
+        ValueError: If the UUID isn't valid.
+    """
+    if len(uuid) in (4, 8):
+        int(uuid, 16)  # Raises ValueError if this isn't hex
+        return f"{uuid.lower():0>8}{BLUETOOTH_BASE_UUID}"
+    return str(UUID(uuid))
+
+
+def parse_company_id(company_id: str) -> int:
+    """Convert a company ID in hex (with or without 0x prefix) to an integer.
+
+    Args:
+        company_id (str): The company ID, for instance ``0x0499`` or ``0499``.
+
+    Returns:
+        int: The company ID.
+
+    Raises:
+        ValueError: If the company ID isn't valid.
+    """
+    cic = int(company_id, 16)
+    if not 0 <= cic <= 0xFFFF:  # noqa: PLR2004
+        msg = f"Company ID {company_id} doesn't have 16 bits"
+        raise ValueError(msg)
+    return cic
+
+
+def parse_time(value: str) -> int:
+    """Convert a local time or date and time to a monotonic timestamp.
+
+    A time without date, such as ``14:32`` or ``14:32:10.5``, is a time of today.
+
+    Args:
+        value (str): The time in ISO 8601 format, for instance ``14:32:10`` or
+            ``2023-02-15T14:32:10``.
+
+    Returns:
+        int: The monotonic timestamp in nanoseconds.
+
+    Raises:
+        ValueError: If the time isn't valid.
+    """
+    try:
+        wall_time = datetime.combine(datetime.now().date(), time.fromisoformat(value))
+    except ValueError:
+        wall_time = datetime.fromisoformat(value)
+    return datetime_to_monotonic_ns(wall_time)
+
+
+class AdvertisementFilter:
+    """Filter for Bluetooth Low Energy advertisements.
+
+    A filter is written as an expression of space-separated ``key=value`` terms. An
+    advertisement matches the filter if it matches all terms. The following terms
+    are supported:
+
+    * ``address=DC``: the device address starts with ``DC``
+    * ``company=0x0499``: the advertisement has manufacturer data with this
+      company ID
+    * ``uuid=181a``: the advertisement has service data or a service UUID with this
+      16-bit, 32-bit or 128-bit UUID
+    * ``name=Ruuvi``: the local name starts with ``Ruuvi``
+    * ``name~uuv``: the local name contains a match of the regular expression
+      ``uuv``, ignoring case
+    * ``time>=14:32``: the advertisement was received at or after 14:32 today
+    * ``time<2023-02-15T14:33``: the advertisement was received before this date
+      and time
+
+    Unknown and invalid terms are ignored. The time terms are only checked for
+    advertisements with a known time.
+
+    The same local names are advertised over and over again, so the result of
+    matching the name terms is cached per local name.
+    """
+
+    def __init__(self, expression: str = "") -> None:
+        """Create an AdvertisementFilter object from a filter expression.
+
+        Args:
+            expression (str): The filter expression.
+        """
+        self.expression = expression
+        self.address = ""
+        self.company_id: int | None = None
+        self.uuid: str | None = None
+        self.name = ""
+        self.name_pattern: re.Pattern[str] | None = None
+        self.start: int | None = None
+        self.stop: int | None = None
+
+        for term in expression.split():
+            key, _, value = term.partition("=")
+            try:
+                if term.startswith("time>="):
+                    self.start = parse_time(term[6:])
+                elif term.startswith("time<"):
+                    self.stop = parse_time(term[5:])
+                elif term.startswith("name~"):
+                    self.name_pattern = re.compile(term[5:], re.IGNORECASE)
+                elif key == "address":
+                    self.address = value.upper()
+                elif key == "company":
+                    self.company_id = parse_company_id(value)
+                elif key == "uuid":
+                    self.uuid = normalize_uuid(value)
+                elif key == "name":
+                    self.name = value
+            except (ValueError, re.error):
+                continue
+
+        self._name_matches: dict[str | None, bool] = {}
+
+    def __eq__(self, other: object) -> bool:
+        """Check whether two filters filter the same advertisements.
+
+        Args:
+            other (object): The object to compare with.
+
+        Returns:
+            bool: ``True`` if both filters have the same terms, ``False`` if not.
+        """
+        if not isinstance(other, AdvertisementFilter):
+            return NotImplemented
+        return self.key() == other.key()
+
+    def __hash__(self) -> int:
+        """Compute a hash of the filter's terms.
+
+        Returns:
+            int: The hash of the filter.
+        """
+        return hash(self.key())
+
+    def key(self) -> tuple[str | int | None, ...]:
+        """Return the filter's terms, normalized.
+
+        Returns:
+            tuple[str | int | None, ...]: The values of all terms.
+        """
+        return (
+            self.address,
+            self.company_id,
+            self.uuid,
+            self.name,
+            self.name_pattern.pattern if self.name_pattern else None,
+            self.start,
+            self.stop,
+        )
+
+    def __bool__(self) -> bool:
+        """Return whether the filter filters anything.
+
+        Returns:
+            bool: ``False`` if the filter matches all advertisements.
+        """
+        return self.key() != ("", None, None, "", None, None, None)
+
+    def narrows(self, other: AdvertisementFilter) -> bool:
+        """Check whether this filter only matches advertisements that another matches.
+
+        This is the case if every term of this filter is the same as, or narrower
+        than, the term of the other filter, for instance ``name=Ruuvi`` and
+        ``name=Ru``. Then the advertisements matching this filter can be found among
+        the ones matching the other filter. Regular expressions are only compared if
+        they don't have special characters.
+
+        Args:
+            other (AdvertisementFilter): The other filter.
+
+        Returns:
+            bool: ``True`` if this filter is known to narrow the other filter,
+            ``False`` otherwise.
+        """
+        return (
+            self.address.startswith(other.address)
+            and other.company_id in (None, self.company_id)
+            and other.uuid in (None, self.uuid)
+            and self.name.startswith(other.name)
+            and _pattern_narrows(self.name_pattern, other.name_pattern)
+            and (
+                other.start is None
+                or (self.start is not None and self.start >= other.start)
+            )
+            and (
+                other.stop is None
+                or (self.stop is not None and self.stop <= other.stop)
+            )
+        )
+
+    def has_time_range(self) -> bool:
+        """Return whether the filter has a time term.
+
+        Returns:
+            bool: ``True`` if the filter has a ``time>=`` or ``time<`` term.
+        """
+        return self.start is not None or self.stop is not None
+
+    def matches(
+        self,
+        address: str,
+        advertisement_data: AdvertisementData | AdvertisementRecord,
+        time: int | None = None,
+    ) -> bool:
+        """Check whether an advertisement matches the filter.
+
+        Args:
+            address (str): The address of the advertising device.
+            advertisement_data (AdvertisementData | AdvertisementRecord): The
+                advertisement data.
+            time (int, optional): The monotonic timestamp of the advertisement in
+                nanoseconds. If it's ``None``, the time terms aren't checked.
+
+        Returns:
+            bool: ``True`` if the advertisement matches the filter, ``False`` if not.
+        """
+        if not address.startswith(self.address) or not self.matches_time(time):
+            return False
+        if (
+            self.company_id is not None
+            and self.company_id not in advertisement_data.manufacturer_data
+        ):
+            return False
+        if (
+            self.uuid is not None
+            and self.uuid not in advertisement_data.service_data
+            and self.uuid not in advertisement_data.service_uuids
+        ):
+            return False
+        if not self.name and self.name_pattern is None:
+            return True
+        local_name = advertisement_data.local_name
+        try:
+            return self._name_matches[local_name]
+        except KeyError:
+            if len(self._name_matches) >= NAME_CACHE_SIZE:
+                self._name_matches.clear()
+            result = self._name_matches[local_name] = self.matches_name(local_name)
+            return result
+
+    def matches_time(self, time: int | None) -> bool:
+        """Check whether a timestamp matches the time terms of the filter.
+
+        Args:
+            time (int, optional): The monotonic timestamp in nanoseconds, or
+                ``None`` to not check the time terms.
+
+        Returns:
+            bool: ``True`` if the timestamp matches the time terms, ``False`` if not.
+        """
+        return time is None or (
+            (self.start is None or time >= self.start)
+            and (self.stop is None or time < self.stop)
+        )
+
+    def matches_name(self, local_name: str | None) -> bool:
+        """Check whether a local name matches the name terms of the filter.
+
+        Args:
+            local_name (str, optional): The local name.
+
+        Returns:
+            bool: ``True`` if the local name matches the name terms, ``False`` if not.
+        """
+        local_name = local_name or ""
+        return local_name.startswith(self.name) and (
+            self.name_pattern is None
+            or self.name_pattern.search(local_name) is not None
+        )
+
+
+def _pattern_narrows(
+    pattern: re.Pattern[str] | None,
+    other: re.Pattern[str] | None,
+) -> bool:
+    """Check whether a name pattern only matches names that another one matches.
+
+    Args:
+        pattern (re.Pattern[str], optional): The pattern.
+        other (re.Pattern[str], optional): The other pattern.
+
+    Returns:
+        bool: ``True`` if the pattern is known to narrow the other pattern,
+        ``False`` otherwise.
+    """
+    if other is None:
+        return True
+    if pattern is None:
+        return False
+    if pattern.pattern == other.pattern:
+        return True
+    # Without special characters, the patterns are case-insensitive substrings.
+    return (
+        REGEX_SPECIAL_CHARS.isdisjoint(pattern.pattern)
+        and REGEX_SPECIAL_CHARS.isdisjoint(other.pattern)
+        and other.pattern.lower() in pattern.pattern.lower()
+    )
@@ -0,0 +1,542 @@
+"""This module parses and synthesizes Bluetooth HCI events with advertisements.
+
+Only the events with advertisements are handled: the LE Advertising Report and LE
+Extended Advertising Report subevents of the LE Meta event. Their advertising data
+is parsed into the same :class:`~bleak.backends.scanner.AdvertisementData` that Bleak
+returns, so they can be shown and exported in the same way. The other way around,
+advertisements are encoded as these events to write them to capture files.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import TYPE_CHECKING
+from uuid import UUID
+
+from bleak.backends.scanner import AdvertisementData
+
+from humble_explorer.filters import BLUETOOTH_BASE_UUID
+
+if TYPE_CHECKING:
+    from humble_explorer.records import AdvertisementRecord
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+# HCI event code and subevent codes
+HCI_LE_META_EVENT = 0x3E
+HCI_LE_ADVERTISING_REPORT = 0x02
+HCI_LE_EXTENDED_ADVERTISING_REPORT = 0x0D
+
+# Data status in the event type of an extended advertising report
+EXTENDED_DATA_STATUS_MASK = 0x60
+EXTENDED_DATA_INCOMPLETE = 0x20
+
+# Value of TX power and RSSI in extended advertising reports if they're unknown
+EXTENDED_POWER_UNKNOWN = 127
+
+# AD types
+AD_INCOMPLETE_LIST_SERVICE_UUID16 = 0x02
+AD_COMPLETE_LIST_SERVICE_UUID16 = 0x03
+AD_INCOMPLETE_LIST_SERVICE_UUID32 = 0x04
+AD_COMPLETE_LIST_SERVICE_UUID32 = 0x05
+AD_INCOMPLETE_LIST_SERVICE_UUID128 = 0x06
+AD_COMPLETE_LIST_SERVICE_UUID128 = 0x07
+AD_SHORTENED_LOCAL_NAME = 0x08
+AD_COMPLETE_LOCAL_NAME = 0x09
+AD_TX_POWER_LEVEL = 0x0A
+AD_SERVICE_DATA_UUID16 = 0x16
+AD_SERVICE_DATA_UUID32 = 0x20
+AD_SERVICE_DATA_UUID128 = 0x21
+AD_MANUFACTURER_SPECIFIC_DATA = 0xFF
+
+# Length of the UUIDs in service UUID lists and service data, by AD type
+UUID_LENGTHS = {
+    AD_INCOMPLETE_LIST_SERVICE_UUID16: 2,
+    AD_COMPLETE_LIST_SERVICE_UUID16: 2,
+    AD_INCOMPLETE_LIST_SERVICE_UUID32: 4,
+    AD_COMPLETE_LIST_SERVICE_UUID32: 4,
+    AD_INCOMPLETE_LIST_SERVICE_UUID128: 16,
+    AD_COMPLETE_LIST_SERVICE_UUID128: 16,
+    AD_SERVICE_DATA_UUID16: 2,
+    AD_SERVICE_DATA_UUID32: 4,
+    AD_SERVICE_DATA_UUID128: 16,
+}
+
+# Signed value of each byte
+SIGNED_BYTES = tuple(range(128)) + tuple(range(-128, 0))
+
+# Length of the fixed fields of a report, before its data
+ADVERTISING_REPORT_HEADER_LENGTH = 9
+EXTENDED_ADVERTISING_REPORT_HEADER_LENGTH = 24
+
+# Maximum length of the data in a legacy advertising report, in an AD structure and
+# in an extended advertising report event
+MAX_LEGACY_DATA_LENGTH = 31
+MAX_AD_VALUE_LENGTH = 254
+MAX_EXTENDED_REPORT_DATA_LENGTH = 229
+
+# Event type of a synthesized legacy report (ADV_IND) and an extended report
+# (connectable and scannable), and the address type (public)
+ADV_IND = 0x00
+EXTENDED_CONNECTABLE_SCANNABLE = 0x03
+PUBLIC_ADDRESS = 0x00
+LE_1M_PHY = 0x01
+NO_SECONDARY_PHY = 0x00
+NO_ADVERTISING_SID = 0xFF
+
+
+@lru_cache(maxsize=1024)
+def format_address(address: bytes) -> str:
+    """Format a little-endian Bluetooth address as a string.
+
+    Args:
+        address (bytes): The six bytes of the address, least significant first.
+
+    Returns:
+        str: The address, for instance ``D5:FE:15:49:AC:7D``.
+    """
+    return address[::-1].hex(":").upper()
+
+
+def parse_uuid(uuid: bytes) -> str:
+    """Convert a little-endian 16-bit, 32-bit or 128-bit UUID to a 128-bit UUID.
+
+    Args:
+        uuid (bytes): The UUID, least significant byte first.
+
+    Returns:
+        str: The UUID as a lowercase 128-bit UUID string.
+    """
+    if len(uuid) == 16:  # noqa: PLR2004
+        return str(UUID(bytes=uuid[::-1]))
+    return f"{int.from_bytes(uuid, 'little'):08x}{BLUETOOTH_BASE_UUID}"
+
+
+def parse_advertising_data(
+    data: bytes,
+    rssi: int,
+    tx_power: int | None = None,
+) -> AdvertisementData:
+    """Parse the AD structures of advertising data.
+
+    Malformed AD structures are skipped, as well as AD types that Bleak doesn't
+    return. Advertisements with the same data share their dictionaries and list,
+    which must not be modified.
+
+    Args:
+        data (bytes): The advertising data.
+        rssi (int): The RSSI of the advertisement.
+        tx_power (int, optional): The TX power of the advertisement, if the
+            controller reported it.
+
+    Returns:
+        AdvertisementData: The advertisement data.
+    """
+    (
+        local_name,
+        manufacturer_data,
+        service_data,
+        service_uuids,
+        ad_tx_power,
+    ) = _parse_ad_structures(data)
+    return AdvertisementData(
+        local_name=local_name,
+        manufacturer_data=manufacturer_data,
+        service_data=service_data,
+        service_uuids=service_uuids,
+        tx_power=tx_power if ad_tx_power is None else ad_tx_power,
+        rssi=rssi,
+        platform_data=(),
+    )
+
+
+@lru_cache(maxsize=4096)
+def _parse_ad_structures(
+    data: bytes,
+) -> tuple[str | None, dict[int, bytes], dict[str, bytes], list[str], int | None]:
+    """Parse the AD structures of advertising data, caching the result.
+
+    Most devices send the same advertising data over and over again, so this
+    is only parsed once.
+
+    Args:
+        data (bytes): The advertising data.
+
+    Returns:
+        tuple[str | None, dict[int, bytes], dict[str, bytes], list[str], int | None]:
+        The local name, manufacturer data, service data, service UUIDs and TX power
+        level.
+    """
+    local_name = None
+    manufacturer_data: dict[int, bytes] = {}
+    service_data: dict[str, bytes] = {}
+    service_uuids: list[str] = []
+    tx_power = None
+
+    offset = 0
+    end = len(data)
+    while offset < end:
+        length = data[offset]
+        if length == 0 or offset + 1 + length > end:
+            # Zero padding at the end or a truncated AD structure
+            break
+        ad_type = data[offset + 1]
+        value = data[offset + 2 : offset + 1 + length]
+        offset += 1 + length
+
+        if ad_type == AD_MANUFACTURER_SPECIFIC_DATA:
+            if len(value) >= 2:  # noqa: PLR2004
+                manufacturer_data[int.from_bytes(value[:2], "little")] = value[2:]
+        elif ad_type in (AD_COMPLETE_LOCAL_NAME, AD_SHORTENED_LOCAL_NAME):
+            # A complete name wins over a shortened name.
+            if local_name is None or ad_type == AD_COMPLETE_LOCAL_NAME:
+                local_name = value.decode(errors="replace")
+        elif ad_type == AD_TX_POWER_LEVEL:
+            if value:
+                tx_power = SIGNED_BYTES[value[0]]
+        elif ad_type in UUID_LENGTHS:
+            _parse_service_structure(ad_type, value, service_data, service_uuids)
+
+    return local_name, manufacturer_data, service_data, service_uuids, tx_power
+
+
+def _parse_service_structure(
+    ad_type: int,
+    value: bytes,
+    service_data: dict[str, bytes],
+    service_uuids: list[str],
+) -> None:
+    """Parse an AD structure with service data or a list of service UUIDs.
+
+    Args:
+        ad_type (int): The AD type, one of the keys of :data:`UUID_LENGTHS`.
+        value (bytes): The data of the AD structure.
+        service_data (dict[str, bytes]): The service data to add to.
+        service_uuids (list[str]): The service UUIDs to add to.
+    """
+    uuid_length = UUID_LENGTHS[ad_type]
+    if ad_type in (
+        AD_SERVICE_DATA_UUID16,
+        AD_SERVICE_DATA_UUID32,
+        AD_SERVICE_DATA_UUID128,
+    ):
+        if len(value) >= uuid_length:
+            service_data[parse_uuid(value[:uuid_length])] = value[uuid_length:]
+        return
+    for position in range(0, len(value) - uuid_length + 1, uuid_length):
+        uuid = parse_uuid(value[position : position + uuid_length])
+        if uuid not in service_uuids:
+            service_uuids.append(uuid)
+
+
+class AdvertisingReportParser:
+    """Parser of HCI events with advertising reports.
+
+    The data of an extended advertisement can be split over multiple reports. The
+    parser keeps the incomplete data until the last report of the advertisement.
+    """
+
+    def __init__(self) -> None:
+        """Create an AdvertisingReportParser object."""
+        self.fragments: dict[tuple[bytes, int], bytes] = {}
+
+    def parse_event(self, event: bytes) -> list[tuple[str, AdvertisementData]]:
+        """Parse the advertisements in an HCI event.
+
+        Args:
+            event (bytes): The HCI event, starting with its event code and without
+                packet type indicator.
+
+        Returns:
+            list[tuple[str, AdvertisementData]]: The address of the advertising
+            device and the advertisement data, for every complete advertisement in
+            the event.
+        """
+        if len(event) < 4 or event[0] != HCI_LE_META_EVENT:  # noqa: PLR2004
+            return []
+        if event[2] == HCI_LE_ADVERTISING_REPORT:
+            return self._parse_advertising_reports(event)
+        if event[2] == HCI_LE_EXTENDED_ADVERTISING_REPORT:
+            return self._parse_extended_advertising_reports(event)
+        return []
+
+    def _parse_advertising_reports(
+        self,
+        event: bytes,
+    ) -> list[tuple[str, AdvertisementData]]:
+        """Parse the reports of an LE Advertising Report event.
+
+        Args:
+            event (bytes): The HCI event.
+
+        Returns:
+            list[tuple[str, AdvertisementData]]: The address and advertisement data
+            of each report.
+        """
+        advertisements = []
+        offset = 4
+        for _ in range(event[3]):
+            # Event type, address type, address and data length
+            if offset + ADVERTISING_REPORT_HEADER_LENGTH > len(event):
+                break
+            address = event[offset + 2 : offset + 8]
+            data_length = event[offset + 8]
+            data_start = offset + ADVERTISING_REPORT_HEADER_LENGTH
+            # The RSSI follows the data.
+            offset = data_start + data_length + 1
+            if offset > len(event):
+                break
+            advertisements.append(
+                (
+                    format_address(address),
+                    parse_advertising_data(
+                        event[data_start : offset - 1],
+                        SIGNED_BYTES[event[offset - 1]],
+                    ),
+                ),
+            )
+        return advertisements
+
+    def _parse_extended_advertising_reports(
+        self,
+        event: bytes,
+    ) -> list[tuple[str, AdvertisementData]]:
+        """Parse the reports of an LE Extended Advertising Report event.
+
+        Args:
+            event (bytes): The HCI event.
+
+        Returns:
+            list[tuple[str, AdvertisementData]]: The address and advertisement data
+            of each complete advertisement.
+        """
+        advertisements = []
+        offset = 4
+        for _ in range(event[3]):
+            header_end = offset + EXTENDED_ADVERTISING_REPORT_HEADER_LENGTH
+            if header_end > len(event):
+                break
+            data_status = event[offset] & EXTENDED_DATA_STATUS_MASK
+            address = event[offset + 3 : offset + 9]
+            sid = event[offset + 11]
+            tx_power = SIGNED_BYTES[event[offset + 12]]
+            rssi = SIGNED_BYTES[event[offset + 13]]
+            data_length = event[offset + 23]
+            offset = header_end + data_length
+            if offset > len(event):
+                break
+
+            # Collect the fragments of the data until the advertisement is complete
+            # or truncated.
+            key = (address, sid)
+            data = self.fragments.pop(key, b"") + event[header_end:offset]
+            if data_status == EXTENDED_DATA_INCOMPLETE:
+                self.fragments[key] = data
+                continue
+
+            advertisements.append(
+                (
+                    format_address(address),
+                    parse_advertising_data(
+                        data,
+                        rssi,
+                        None if tx_power == EXTENDED_POWER_UNKNOWN else tx_power,
+                    ),
+                ),
+            )
+        return advertisements
+
+
+def encode_address(address: str) -> bytes:
+    """Convert a Bluetooth address to its little-endian bytes.
+
+    Args:
+        address (str): The address, for instance ``D5:FE:15:49:AC:7D``.
+
+    Returns:
+        bytes: The six bytes of the address, least significant first.
+
+    Raises:
+        ValueError: If the address isn't a Bluetooth address, such as the UUIDs
+            used on macOS.
+    """
+    msg = f"{address} isn't a Bluetooth address"
+    try:
+        address_bytes = bytes.fromhex(address.replace(":", ""))
+    except ValueError:
+        raise ValueError(msg) from None
+    if len(address_bytes) != 6:  # noqa: PLR2004
+        raise ValueError(msg)
+    return address_bytes[::-1]
+
+
+def encode_uuid(uuid: str) -> bytes:
+    """Convert a 128-bit UUID to its shortest little-endian form.
+
+    Args:
+        uuid (str): The UUID as a 128-bit UUID string.
+
+    Returns:
+        bytes: The 16-bit, 32-bit or 128-bit UUID, least significant byte first.
+    """
+    if uuid.endswith(BLUETOOTH_BASE_UUID):
+        uuid32 = int(uuid[:8], 16)
+        return uuid32.to_bytes(2 if uuid32 <= 0xFFFF else 4, "little")  # noqa: PLR2004
+    return UUID(uuid).bytes[::-1]
+
+
+def _ad_structure(ad_type: int, value: bytes) -> bytes:
+    """Encode an AD structure, truncating its value if it's too long.
+
+    Args:
+        ad_type (int): The AD type.
+        value (bytes): The value.
+
+    Returns:
+        bytes: The AD structure.
+    """
+    value = value[:MAX_AD_VALUE_LENGTH]
+    return bytes((len(value) + 1, ad_type)) + value
+
+
+def encode_advertising_data(
+    advertisement_data: AdvertisementData | AdvertisementRecord,
+) -> bytes:
+    """Encode advertisement data as AD structures.
+
+    Args:
+        advertisement_data (AdvertisementData | AdvertisementRecord): The
+            advertisement data.
+
+    Returns:
+        bytes: The advertising data.
+    """
+    ad_structures = []
+    if advertisement_data.local_name:
+        ad_structures.append(
+            _ad_structure(
+                AD_COMPLETE_LOCAL_NAME,
+                advertisement_data.local_name.encode(),
+            ),
+        )
+    if advertisement_data.tx_power is not None:
+        ad_structures.append(
+            _ad_structure(
+                AD_TX_POWER_LEVEL,
+                bytes((advertisement_data.tx_power & 0xFF,)),
+            ),
+        )
+
+    # Service UUIDs are grouped in a list per size.
+    uuid_lists: dict[int, list[bytes]] = {}
+    for uuid in advertisement_data.service_uuids:
+        uuid_bytes = encode_uuid(uuid)
+        uuid_lists.setdefault(len(uuid_bytes), []).append(uuid_bytes)
+    for ad_type in (
+        AD_COMPLETE_LIST_SERVICE_UUID16,
+        AD_COMPLETE_LIST_SERVICE_UUID32,
+        AD_COMPLETE_LIST_SERVICE_UUID128,
+    ):
+        if UUID_LENGTHS[ad_type] in uuid_lists:
+            ad_structures.append(
+                _ad_structure(ad_type, b"".join(uuid_lists[UUID_LENGTHS[ad_type]])),
+            )
+
+    service_data_types = {
+        UUID_LENGTHS[ad_type]: ad_type
+        for ad_type in (
+            AD_SERVICE_DATA_UUID16,
+            AD_SERVICE_DATA_UUID32,
+            AD_SERVICE_DATA_UUID128,
+        )
+    }
+    for uuid, data in advertisement_data.service_data.items():
+        uuid_bytes = encode_uuid(uuid)
+        ad_structures.append(
+            _ad_structure(service_data_types[len(uuid_bytes)], uuid_bytes + data),
+        )
+
+    for cic, data in advertisement_data.manufacturer_data.items():
+        ad_structures.append(
+            _ad_structure(
+                AD_MANUFACTURER_SPECIFIC_DATA,
+                cic.to_bytes(2, "little") + data,
+            ),
+        )
+
+    return b"".join(ad_structures)
+
+
+def encode_advertising_report(
+    address: str,
+    advertisement_data: AdvertisementData | AdvertisementRecord,
+) -> list[bytes]:
+    """Synthesize the HCI events reporting an advertisement.
+
+    Advertising data that fits in a legacy advertisement is reported in an LE
+    Advertising Report event, longer data in one or more LE Extended Advertising
+    Report events.
+
+    Args:
+        address (str): The address of the advertising device.
+        advertisement_data (AdvertisementData | AdvertisementRecord): The
+            advertisement data.
+
+    Returns:
+        list[bytes]: The HCI events, starting with their event code and without
+        packet type indicator.
+
+    Raises:
+        ValueError: If the address isn't a Bluetooth address.
+    """
+    address_bytes = encode_address(address)
+    data = encode_advertising_data(advertisement_data)
+    rssi = advertisement_data.rssi & 0xFF
+
+    if len(data) <= MAX_LEGACY_DATA_LENGTH:
+        report = (
+            bytes((ADV_IND, PUBLIC_ADDRESS))
+            + address_bytes
+            + bytes((len(data),))
+            + data
+            + bytes((rssi,))
+        )
+        return [_le_meta_event(HCI_LE_ADVERTISING_REPORT, report)]
+
+    tx_power = (
+        EXTENDED_POWER_UNKNOWN
+        if advertisement_data.tx_power is None
+        else advertisement_data.tx_power & 0xFF
+    )
+    events = []
+    for start in range(0, len(data), MAX_EXTENDED_REPORT_DATA_LENGTH):
+        fragment = data[start : start + MAX_EXTENDED_REPORT_DATA_LENGTH]
+        data_status = (
+            EXTENDED_DATA_INCOMPLETE
+            if start + MAX_EXTENDED_REPORT_DATA_LENGTH < len(data)
+            else 0
+        )
+        report = (
+            bytes((EXTENDED_CONNECTABLE_SCANNABLE | data_status, 0x00, PUBLIC_ADDRESS))
+            + address_bytes
+            + bytes((LE_1M_PHY, NO_SECONDARY_PHY, NO_ADVERTISING_SID, tx_power, rssi))
+            + bytes(9)  # No periodic advertising and no direct address
+            + bytes((len(fragment),))
+            + fragment
+        )
+        events.append(_le_meta_event(HCI_LE_EXTENDED_ADVERTISING_REPORT, report))
+    return events
+
+
+def _le_meta_event(subevent: int, report: bytes) -> bytes:
+    """Encode an LE Meta event with one report.
+
+    Args:
+        subevent (int): The subevent code.
+        report (bytes): The report.
+
+    Returns:
+        bytes: The HCI event.
+    """
+    return bytes((HCI_LE_META_EVENT, len(report) + 2, subevent, 1)) + report
@@ -0,0 +1,509 @@
+"""This module runs HumBLE Explorer without user interface.
+
+Advertisements are written to standard output as JSON lines, one object per line, or
+to a capture file, with the same rate limits and suppression of unchanged payloads as
+in the user interface. Optionally, devices that appear or are gone and alerts of the
+watchlist are written to standard output as JSON lines too, and metrics of the exported
+advertisements are served to Prometheus.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+from datetime import datetime
+from time import monotonic_ns, time_ns
+from typing import IO, TYPE_CHECKING, Any, Callable
+
+from bleak import BleakScanner
+
+from humble_explorer.btsnoop import read_btsnoop
+from humble_explorer.capture import CaptureExporter, open_capture
+from humble_explorer.daemon import RemoteScanner
+from humble_explorer.devices import DeviceRegistry
+from humble_explorer.filters import AdvertisementFilter
+from humble_explorer.ingest import ProcessScanner
+from humble_explorer.metrics import Metrics, MetricsServer
+from humble_explorer.presence import TICK_NS, PresenceTracker
+from humble_explorer.ratelimit import RateLimiter
+from humble_explorer.records import datetime_to_monotonic_ns, monotonic_ns_to_datetime
+from humble_explorer.scanner import get_scanner_kwargs
+from humble_explorer.watchlist import AlertCommand, alert_to_dict
+
+if TYPE_CHECKING:
+    from argparse import Namespace
+
+    from bleak.backends.device import BLEDevice
+    from bleak.backends.scanner import AdvertisementData
+
+    from humble_explorer.identity import IdentityResolver
+    from humble_explorer.presence import PresenceEvent
+    from humble_explorer.watchlist import Watchlist
+
+    ExportFunction = Callable[[datetime, str, AdvertisementData], None]
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+
+def advertisement_to_dict(
+    time: datetime,
+    address: str,
+    advertisement_data: AdvertisementData,
+    interval: int | None = None,
+    identity: str | None = None,
+) -> dict[str, Any]:
+    """Convert an advertisement to a dictionary that can be serialized to JSON.
+
+    Args:
+        time (datetime): The time of the advertisement.
+        address (str): The address of the advertising device.
+        advertisement_data (AdvertisementData): The advertisement data.
+        interval (int, optional): The estimated advertising interval of the device
+            in milliseconds.
+        identity (str, optional): The name of the device using the address, if it's
+            a resolved private address.
+
+    Returns:
+        dict[str, Any]: The advertisement as a dictionary, with payloads in hex.
+    """
+    return {
+        "time": time.isoformat(),
+        "address": address,
+        "local_name": advertisement_data.local_name,
+        "rssi": advertisement_data.rssi,
+        "tx_power": advertisement_data.tx_power,
+        "manufacturer_data": {
+            f"0x{cic:04x}": data.hex()
+            for cic, data in advertisement_data.manufacturer_data.items()
+        },
+        "service_data": {
+            uuid: data.hex() for uuid, data in advertisement_data.service_data.items()
+        },
+        "service_uuids": sorted(advertisement_data.service_uuids),
+        "interval_ms": interval,
+        "identity": identity,
+    }
+
+
+def presence_event_to_dict(event: PresenceEvent) -> dict[str, Any]:
+    """Convert a presence event to a dictionary that can be serialized to JSON.
+
+    Args:
+        event (PresenceEvent): The presence event.
+
+    Returns:
+        dict[str, Any]: The presence event as a dictionary.
+    """
+    return {
+        "time": monotonic_ns_to_datetime(event.time).isoformat(),
+        "event": event.kind,
+        "address": event.address,
+    }
+
+
+class JSONLinesExporter:
+    """Exporter that writes advertisements as JSON lines.
+
+    Every line has the estimated advertising interval of the device, estimated from
+    all its advertisements, including the ones that don't match the filter. With an
+    identity resolver, the advertisements of all private addresses of a known device
+    are grouped for this estimate, and every line has the name of the device.
+    """
+
+    def __init__(
+        self,
+        stream: IO[str],
+        filter_expression: str = "",
+        *,
+        flush: bool = True,
+        resolver: IdentityResolver | None = None,
+    ) -> None:
+        """Create a JSONLinesExporter object.
+
+        Args:
+            stream (IO[str]): The stream to write to.
+            filter_expression (str): Only export advertisements matching this
+                filter expression.
+            flush (bool): Whether to flush the stream after every advertisement.
+            resolver (IdentityResolver, optional): The resolver of private
+                addresses of known devices.
+        """
+        self.stream = stream
+        self.filter = AdvertisementFilter(filter_expression)
+        self.flush = flush
+        self.resolver = resolver
+        self.devices = DeviceRegistry()
+
+    def export(
+        self,
+        time: datetime,
+        address: str,
+        advertisement_data: AdvertisementData,
+    ) -> None:
+        """Export an advertisement if it matches the filter.
+
+        Args:
+            time (datetime): The time of the advertisement.
+            address (str): The address of the advertising device.
+            advertisement_data (AdvertisementData): The advertisement data.
+        """
+        timestamp = datetime_to_monotonic_ns(time)
+        identity = self.resolver.resolve(address) if self.resolver else None
+        interval = self.devices.observe(identity or address, timestamp)
+        if self.filter.matches(address, advertisement_data, timestamp):
+            self.stream.write(
+                json.dumps(
+                    advertisement_to_dict(
+                        time,
+                        address,
+                        advertisement_data,
+                        interval,
+                        identity,
+                    ),
+                )
+                + "\n",
+            )
+            if self.flush:
+                self.stream.flush()
+
+    def close(self) -> None:
+        """Flush the stream, without closing it."""
+        self.stream.flush()
+
+
+async def run_headless(cli_args: Namespace) -> None:
+    """Export advertisements from the scanner or daemon until cancelled.
+
+    Advertisements from a btsnoop file are exported until the end of the file.
+    Advertisements are written as JSON lines to standard output, or to a capture
+    file if one is given. With presence tracking, presence events are written as
+    JSON lines to standard output, and so are the alerts of a watchlist. With a
+    metrics address, the metrics of the exported advertisements are served there.
+
+    Args:
+        cli_args (argparse.Namespace): Command-line arguments.
+    """
+    exporter = create_exporter(cli_args)
+    presence = PresenceTracker(cli_args.gone_after or ()) if cli_args.presence else None
+    export = wrap_export(cli_args, exporter.export, presence)
+    metrics_server = None
+    if cli_args.metrics:
+        metrics = Metrics()
+        metrics_server = MetricsServer(metrics, *cli_args.metrics)
+        metrics_server.start()
+        # The times of advertisements in a btsnoop file are in the past.
+        export = count_exports(
+            export,
+            metrics,
+            measure_latency=not cli_args.import_btsnoop,
+        )
+
+    try:
+        if cli_args.import_btsnoop:
+            for advertisement in read_btsnoop(cli_args.import_btsnoop):
+                export(*advertisement)
+        elif presence is not None:
+            expiry = asyncio.create_task(expire_presence(presence, sys.stdout))
+            try:
+                await export_scanned_advertisements(cli_args, export)
+            finally:
+                expiry.cancel()
+        else:
+            await export_scanned_advertisements(cli_args, export)
+    finally:
+        exporter.close()
+        if metrics_server:
+            metrics_server.stop()
+
+
+def create_exporter(cli_args: Namespace) -> JSONLinesExporter | CaptureExporter:
+    """Create the exporter of the advertisements.
+
+    Args:
+        cli_args (argparse.Namespace): Command-line arguments.
+
+    Returns:
+        JSONLinesExporter | CaptureExporter: The exporter writing to the capture
+        file if one is given, or else writing JSON lines to standard output.
+    """
+    if cli_args.export:
+        return open_capture(cli_args.export, cli_args.filter)
+    # Don't flush every line of a btsnoop file: it's read as fast as possible.
+    return JSONLinesExporter(
+        sys.stdout,
+        cli_args.filter,
+        flush=not cli_args.import_btsnoop,
+        resolver=cli_args.identity_resolver,
+    )
+
+
+def wrap_export(
+    cli_args: Namespace,
+    export: ExportFunction,
+    presence: PresenceTracker | None = None,
+) -> ExportFunction:
+    """Wrap an export function with the options of the command-line arguments.
+
+    Like in the user interface, presence and the watchlist see all advertisements,
+    and throttled and unchanged advertisements aren't exported.
+
+    Args:
+        cli_args (argparse.Namespace): Command-line arguments.
+        export (ExportFunction): The function exporting an advertisement.
+        presence (PresenceTracker, optional): The tracker of the present devices.
+
+    Returns:
+        ExportFunction: The wrapped export function.
+    """
+    rate_limiter = RateLimiter(cli_args.rate_limit, cli_args.company_rate_limit)
+    if rate_limiter or cli_args.changes_only:
+        export = limit_exports(
+            export,
+            rate_limiter,
+            changes_only=cli_args.changes_only,
+            resolver=cli_args.identity_resolver,
+        )
+    if presence is not None:
+        export = track_presence(
+            export,
+            presence,
+            sys.stdout,
+            cli_args.identity_resolver,
+        )
+    if cli_args.watchlist is not None:
+        export = watch_exports(
+            export,
+            cli_args.watchlist,
+            sys.stdout,
+            AlertCommand(cli_args.alert_command) if cli_args.alert_command else None,
+            cli_args.identity_resolver,
+        )
+    return export
+
+
+def limit_exports(
+    export: ExportFunction,
+    rate_limiter: RateLimiter,
+    *,
+    changes_only: bool = False,
+    resolver: IdentityResolver | None = None,
+) -> ExportFunction:
+    """Wrap an export function to skip throttled and unchanged advertisements.
+
+    Args:
+        export (ExportFunction): The function exporting an advertisement.
+        rate_limiter (RateLimiter): The rate limiter of devices and company IDs.
+        changes_only (bool): Whether to skip advertisements that repeat the
+            previous payload of their device.
+        resolver (IdentityResolver, optional): The resolver of private addresses
+            of known devices, which are limited by name.
+
+    Returns:
+        ExportFunction: The function exporting an advertisement within the limits.
+    """
+    devices = DeviceRegistry()
+
+    def limited_export(
+        time: datetime,
+        address: str,
+        advertisement_data: AdvertisementData,
+    ) -> None:
+        identity = resolver.resolve(address) if resolver else None
+        device = identity or address
+        if rate_limiter and not rate_limiter.allow(
+            device,
+            advertisement_data.manufacturer_data,
+            datetime_to_monotonic_ns(time) / 1_000_000_000,
+        ):
+            devices.throttle(device)
+            return
+        if changes_only and devices.is_repeat(device, advertisement_data):
+            return
+        export(time, address, advertisement_data)
+
+    return limited_export
+
+
+def write_presence_events(events: list[PresenceEvent], stream: IO[str]) -> None:
+    """Write presence events as JSON lines.
+
+    Args:
+        events (list[PresenceEvent]): The presence events.
+        stream (IO[str]): The stream to write to.
+    """
+    for event in events:
+        stream.write(json.dumps(presence_event_to_dict(event)) + "\n")
+    if events:
+        stream.flush()
+
+
+def track_presence(
+    export: ExportFunction,
+    presence: PresenceTracker,
+    stream: IO[str],
+    resolver: IdentityResolver | None = None,
+) -> ExportFunction:
+    """Wrap an export function to write the presence events of advertisements.
+
+    The events are written before the advertisement, so a device appears before
+    its first advertisement is exported.
+
+    Args:
+        export (ExportFunction): The function exporting an advertisement.
+        presence (PresenceTracker): The tracker of the present devices.
+        stream (IO[str]): The stream to write the presence events to.
+        resolver (IdentityResolver, optional): The resolver of private addresses
+            of known devices, which are tracked by name.
+
+    Returns:
+        ExportFunction: The function tracking and exporting an advertisement.
+    """
+
+    def tracked_export(
+        time: datetime,
+        address: str,
+        advertisement_data: AdvertisementData,
+    ) -> None:
+        identity = resolver.resolve(address) if resolver else None
+        write_presence_events(
+            presence.observe(
+                identity or address,
+                advertisement_data,
+                datetime_to_monotonic_ns(time),
+            ),
+            stream,
+        )
+        export(time, address, advertisement_data)
+
+    return tracked_export
+
+
+def watch_exports(
+    export: ExportFunction,
+    watchlist: Watchlist,
+    stream: IO[str],
+    alert_command: AlertCommand | None = None,
+    resolver: IdentityResolver | None = None,
+) -> ExportFunction:
+    """Wrap an export function to write the watchlist alerts of advertisements.
+
+    The alerts are written before the advertisement, like presence events.
+
+    Args:
+        export (ExportFunction): The function exporting an advertisement.
+        watchlist (Watchlist): The watchlist to check the advertisements against.
+        stream (IO[str]): The stream to write the alerts to.
+        alert_command (AlertCommand, optional): The command to run for every alert.
+        resolver (IdentityResolver, optional): The resolver of private addresses
+            of known devices, which alert by name.
+
+    Returns:
+        ExportFunction: The function checking and exporting an advertisement.
+    """
+
+    def watched_export(
+        time: datetime,
+        address: str,
+        advertisement_data: AdvertisementData,
+    ) -> None:
+        matches = watchlist.match(address, advertisement_data)
+        if matches:
+            identity = resolver.resolve(address) if resolver else None
+            alerts = watchlist.alerts(
+                identity or address,
+                address,
+                matches,
+                datetime_to_monotonic_ns(time),
+            )
+            for alert in alerts:
+                stream.write(json.dumps(alert_to_dict(alert)) + "\n")
+                if alert_command:
+                    # A failing command shouldn't stop the export.
+                    try:
+                        alert_command.run(alert)
+                    except OSError as error:
+                        sys.stderr.write(f"Can't run alert command: {error}\n")
+            if alerts:
+                stream.flush()
+        export(time, address, advertisement_data)
+
+    return watched_export
+
+
+async def expire_presence(presence: PresenceTracker, stream: IO[str]) -> None:
+    """Write the devices that are gone every tick of the presence tracker.
+
+    Args:
+        presence (PresenceTracker): The tracker of the present devices.
+        stream (IO[str]): The stream to write the presence events to.
+    """
+    while True:
+        await asyncio.sleep(TICK_NS / 1_000_000_000)
+        write_presence_events(presence.expire(monotonic_ns()), stream)
+
+
+def count_exports(
+    export: ExportFunction,
+    metrics: Metrics,
+    *,
+    measure_latency: bool,
+) -> ExportFunction:
+    """Wrap an export function to count the advertisements in metrics.
+
+    Args:
+        export (ExportFunction): The function exporting an advertisement.
+        metrics (Metrics): The metrics to count the advertisements in.
+        measure_latency (bool): Whether to measure the time from the time of the
+            advertisement until it has been exported.
+
+    Returns:
+        ExportFunction: The function exporting and counting an advertisement.
+    """
+
+    def counted_export(
+        time: datetime,
+        address: str,
+        advertisement_data: AdvertisementData,
+    ) -> None:
+        export(time, address, advertisement_data)
+        metrics.observe(
+            address,
+            advertisement_data,
+            time_ns() / 1_000_000_000 - time.timestamp() if measure_latency else None,
+        )
+
+    return counted_export
+
+
+async def export_scanned_advertisements(
+    cli_args: Namespace,
+    export: ExportFunction,
+) -> None:
+    """Export advertisements from the scanner or daemon until cancelled.
+
+    Args:
+        cli_args (argparse.Namespace): Command-line arguments.
+        export (ExportFunction): The function exporting an advertisement.
+    """
+
+    def on_advertisement(
+        device: BLEDevice,
+        advertisement_data: AdvertisementData,
+    ) -> None:
+        export(datetime.now(), device.address, advertisement_data)
+
+    scanner: BleakScanner | RemoteScanner | ProcessScanner
+    if cli_args.connect:
+        scanner = RemoteScanner(cli_args.connect, export, cli_args.filter)
+    elif cli_args.scanner_process:
+        scanner = ProcessScanner(cli_args, export)
+    else:
+        scanner = BleakScanner(**get_scanner_kwargs(cli_args, on_advertisement))
+
+    await scanner.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await scanner.stop()
@@ -0,0 +1,157 @@
+"""This module resolves resolvable private addresses to the identities of devices.
+
+A device with a resolvable private address, such as a phone, changes its address
+every few minutes. The address consists of a 24-bit random part and a 24-bit hash of
+this random part, computed with the device's identity resolving key (IRK). With the
+IRKs of known devices, an address can be resolved to the device that uses it.
+
+Every resolution needs an AES encryption per IRK, so the result is cached for every
+address: resolving the addresses of the following advertisements is a dictionary
+lookup.
+
+The ``cryptography`` package is an optional dependency, installed with ``pip install
+humble-explorer[rpa]``.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+# Length of a Bluetooth address in the format 70:81:94:0D:FB:AA
+ADDRESS_LENGTH = 17
+
+# Number of resolved addresses to remember. Private addresses keep changing, so the
+# cache is cleared when it's full.
+RESOLVER_CACHE_SIZE = 65536
+
+IRK_LENGTH = 16
+
+
+def is_resolvable_private_address(address: str) -> bool:
+    """Check whether an address is a resolvable private address.
+
+    Args:
+        address (str): The Bluetooth address.
+
+    Returns:
+        bool: ``True`` if the two most significant bits of the address are 01,
+        ``False`` otherwise, including for the UUIDs that macOS uses as address.
+    """
+    if len(address) != ADDRESS_LENGTH:
+        return False
+    try:
+        return int(address[:2], 16) >> 6 == 1
+    except ValueError:
+        return False
+
+
+def ah(irk: bytes, prand: bytes) -> bytes:
+    """Compute the hash of the random part of a resolvable private address.
+
+    This is the random address hash function ``ah`` of the Bluetooth Core
+    Specification.
+
+    Args:
+        irk (bytes): The 16-byte identity resolving key, most significant byte first.
+        prand (bytes): The 3-byte random part of the address, most significant byte
+            first.
+
+    Returns:
+        bytes: The 3-byte hash, most significant byte first.
+    """
+    encryptor = Cipher(algorithms.AES(irk), modes.ECB()).encryptor()  # noqa: S305
+    return (encryptor.update(bytes(13) + prand) + encryptor.finalize())[-3:]
+
+
+def load_identities(path: str | Path) -> dict[str, bytes]:
+    """Load the identity resolving keys of known devices from a file.
+
+    Every line has an IRK as 32 hexadecimal digits, most significant byte first,
+    optionally followed by the name of the device. Empty lines and lines starting
+    with ``#`` are ignored.
+
+    Args:
+        path (str | Path): The path of the file.
+
+    Returns:
+        dict[str, bytes]: The IRK of every device by name. A device without name is
+        named after the first digits of its IRK.
+
+    Raises:
+        ValueError: If a line doesn't start with a valid IRK.
+    """
+    identities = {}
+    with open(path, encoding="utf-8") as irk_file:  # noqa: PTH123
+        for line_number, line in enumerate(irk_file, start=1):
+            line = line.strip()  # noqa: PLW2901
+            if not line or line.startswith("#"):
+                continue
+            irk_hex, _, name = line.partition(" ")
+            try:
+                irk = bytes.fromhex(irk_hex)
+            except ValueError:
+                irk = b""
+            if len(irk) != IRK_LENGTH:
+                msg = f"{path}:{line_number}: invalid IRK {irk_hex}"
+                raise ValueError(msg)
+            identities[name.strip() or f"IRK {irk.hex()[:8]}"] = irk
+    return identities
+
+
+class IdentityResolver:
+    """Resolver of resolvable private addresses to the names of known devices."""
+
+    def __init__(self, identities: dict[str, bytes]) -> None:
+        """Create an IdentityResolver object.
+
+        Args:
+            identities (dict[str, bytes]): The IRK of every device by name.
+        """
+        self.identities = identities
+        self._cache: dict[str, str | None] = {}
+
+    def resolve(self, address: str) -> str | None:
+        """Resolve an address to the name of the device using it.
+
+        Args:
+            address (str): The Bluetooth address.
+
+        Returns:
+            str, optional: The name of the device whose IRK generated the address,
+            or ``None`` if the address isn't a resolvable private address of a known
+            device.
+        """
+        try:
+            return self._cache[address]
+        except KeyError:
+            if len(self._cache) >= RESOLVER_CACHE_SIZE:
+                self._cache.clear()
+            identity = self._cache[address] = self._resolve(address)
+            return identity
+
+    def _resolve(self, address: str) -> str | None:
+        """Resolve an address by computing its hash with every IRK.
+
+        Args:
+            address (str): The Bluetooth address.
+
+        Returns:
+            str, optional: The name of the device whose IRK generated the address,
+            or ``None`` if there's no such device.
+        """
+        if not is_resolvable_private_address(address):
+            return None
+        address_bytes = bytes.fromhex(address.replace(":", ""))
+        prand, hash_value = address_bytes[:3], address_bytes[3:]
+        for name, irk in self.identities.items():
+            if ah(irk, prand) == hash_value:
+                return name
+        return None
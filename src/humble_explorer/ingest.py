@@ -0,0 +1,394 @@
+"""This module runs the BLE scanner of HumBLE Explorer in a child process.
+
+Parsing D-Bus messages and running Bleak's callbacks takes a core of its own at high
+advertisement rates, so the scanner can run in a child process. The child encodes
+each advertisement as a record of the scanner daemon's binary protocol and writes it
+to a ring buffer in shared memory. The main process reads all records in the ring
+buffer in one batch at a time, so advertisements aren't pickled and there's no
+system call per advertisement.
+
+The ring buffer has one writer, the child process, and one reader, the main process.
+Each of them only writes its own position, so they don't need a lock. The positions
+are byte counters that only grow, so the ring buffer is empty when they're equal. If
+the ring buffer is full, the child drops new advertisements instead of waiting, so a
+slow user interface never slows down the scanner.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import multiprocessing
+import signal
+import struct
+import sys
+from argparse import Namespace
+from datetime import datetime
+from multiprocessing.shared_memory import SharedMemory
+from typing import TYPE_CHECKING, Callable
+
+from bleak import BleakScanner
+from bleak.exc import BleakError
+
+from humble_explorer.protocol import (
+    FRAME_LENGTH,
+    decode_advertisement,
+    encode_advertisement,
+    frame,
+)
+from humble_explorer.scanner import get_scanner_kwargs
+
+if TYPE_CHECKING:
+    from multiprocessing.connection import Connection
+    from multiprocessing.synchronize import Event
+
+    from bleak.backends.device import BLEDevice
+    from bleak.backends.scanner import AdvertisementData
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+# Size in bytes of the data in the ring buffer, for tens of thousands of records
+RING_BUFFER_SIZE = 1 << 22
+
+# Seconds between two reads of the ring buffer
+POLL_INTERVAL = 0.01
+
+# Number of advertisements to receive before letting the event loop run
+RECEIVE_BATCH_SIZE = 1000
+
+# Seconds to wait for the scanner process to stop before terminating it
+STOP_TIMEOUT = 5
+
+# Seconds between two checks of the scanner process whether the main process exists
+PARENT_CHECK_INTERVAL = 1
+
+POSITION = struct.Struct("<Q")
+# Offsets of the fields in the header of the shared memory. The reader's position is
+# on another cache line than the fields the writer changes.
+WRITE_POSITION = 0
+DROPPED = 8
+CAPACITY = 16
+READ_POSITION = 64
+DATA = 128
+
+
+class RingBuffer:
+    """Ring buffer of records in shared memory, with one writer and one reader."""
+
+    def __init__(
+        self,
+        shared_memory: SharedMemory,
+        capacity: int | None = None,
+    ) -> None:
+        """Create a RingBuffer object on shared memory.
+
+        Use :meth:`create` or :meth:`attach` to get a RingBuffer object.
+
+        Args:
+            shared_memory (SharedMemory): The shared memory.
+            capacity (int, optional): The size in bytes of the data, to initialize
+                new shared memory, or ``None`` if it's already initialized.
+
+        Raises:
+            ValueError: If the shared memory is closed.
+        """
+        if shared_memory.buf is None:
+            msg = f"Shared memory {shared_memory.name} is closed"
+            raise ValueError(msg)
+        self.shared_memory = shared_memory
+        self._buffer = shared_memory.buf
+        if capacity is not None:
+            self._buffer[:DATA] = bytes(DATA)
+            # The size of the shared memory can be rounded up, so store the capacity.
+            POSITION.pack_into(self._buffer, CAPACITY, capacity)
+        (self.capacity,) = POSITION.unpack_from(self._buffer, CAPACITY)
+        # Only the writer changes the write position, and only the reader the read
+        # position, so each of them keeps its own position.
+        (self._write_position,) = POSITION.unpack_from(self._buffer, WRITE_POSITION)
+        (self._read_position,) = POSITION.unpack_from(self._buffer, READ_POSITION)
+
+    @classmethod
+    def create(
+        cls: type[RingBuffer],
+        capacity: int = RING_BUFFER_SIZE,
+    ) -> RingBuffer:
+        """Create an empty ring buffer in new shared memory.
+
+        Args:
+            capacity (int): The size in bytes of the data in the ring buffer.
+
+        Returns:
+            RingBuffer: The ring buffer.
+        """
+        return cls(SharedMemory(create=True, size=DATA + capacity), capacity)
+
+    @classmethod
+    def attach(cls: type[RingBuffer], name: str) -> RingBuffer:
+        """Attach to a ring buffer created by another process.
+
+        Args:
+            name (str): The name of the ring buffer's shared memory.
+
+        Returns:
+            RingBuffer: The ring buffer.
+        """
+        return cls(SharedMemory(name))
+
+    @property
+    def name(self) -> str:
+        """The name of the shared memory, to attach to it from another process."""
+        return self.shared_memory.name
+
+    @property
+    def dropped(self) -> int:
+        """The number of records the writer dropped because the buffer was full."""
+        return POSITION.unpack_from(self._buffer, DROPPED)[0]
+
+    def write(self, record: bytes) -> bool:
+        """Write a record to the ring buffer.
+
+        Args:
+            record (bytes): The record.
+
+        Returns:
+            bool: ``True`` if the record was written, ``False`` if it was dropped
+            because the ring buffer is full.
+        """
+        record_frame = frame(record)
+        length = len(record_frame)
+        (read_position,) = POSITION.unpack_from(self._buffer, READ_POSITION)
+        if self._write_position + length - read_position > self.capacity:
+            POSITION.pack_into(self._buffer, DROPPED, self.dropped + 1)
+            return False
+
+        offset = self._write_position % self.capacity
+        # Copy the part up to the end of the buffer, and the rest to its start.
+        first_length = min(length, self.capacity - offset)
+        self._buffer[DATA + offset : DATA + offset + first_length] = record_frame[
+            :first_length
+        ]
+        self._buffer[DATA : DATA + length - first_length] = record_frame[first_length:]
+        # Only publish the new position after the record has been written.
+        self._write_position += length
+        POSITION.pack_into(self._buffer, WRITE_POSITION, self._write_position)
+        return True
+
+    def read(self) -> list[bytes]:
+        """Read all records in the ring buffer.
+
+        Returns:
+            list[bytes]: The records that have been written since the previous read,
+            in order.
+        """
+        (write_position,) = POSITION.unpack_from(self._buffer, WRITE_POSITION)
+        if write_position == self._read_position:
+            return []
+
+        start = DATA + self._read_position % self.capacity
+        end = DATA + write_position % self.capacity
+        if start < end:
+            data = bytes(self._buffer[start:end])
+        else:
+            data = bytes(self._buffer[start : DATA + self.capacity]) + bytes(
+                self._buffer[DATA:end],
+            )
+        # Free the space of the records for the writer.
+        self._read_position = write_position
+        POSITION.pack_into(self._buffer, READ_POSITION, self._read_position)
+
+        records = []
+        offset = 0
+        while offset < len(data):
+            (length,) = FRAME_LENGTH.unpack_from(data, offset)
+            offset += FRAME_LENGTH.size
+            records.append(data[offset : offset + length])
+            offset += length
+        return records
+
+    def close(self) -> None:
+        """Detach from the shared memory."""
+        self.shared_memory.close()
+
+    def unlink(self) -> None:
+        """Free the shared memory, after all processes have detached from it."""
+        self.shared_memory.unlink()
+
+
+async def _scan(
+    ring_buffer: RingBuffer,
+    scanner_args: Namespace,
+    stop: Event,
+    started: Connection,
+) -> None:
+    """Write the advertisements of a BLE scanner to a ring buffer until stopped.
+
+    Args:
+        ring_buffer (RingBuffer): The ring buffer.
+        scanner_args (argparse.Namespace): The command-line arguments of the scanner.
+        stop (multiprocessing.synchronize.Event): The event that stops the scanner.
+        started (multiprocessing.connection.Connection): The connection to send
+            ``None`` to when the scanner has started, or the error message if it
+            couldn't start.
+    """
+
+    def on_advertisement(
+        device: BLEDevice,
+        advertisement_data: AdvertisementData,
+    ) -> None:
+        ring_buffer.write(
+            encode_advertisement(datetime.now(), device.address, advertisement_data),
+        )
+
+    scanner = BleakScanner(**get_scanner_kwargs(scanner_args, on_advertisement))
+    try:
+        await scanner.start()
+    except Exception as error:  # noqa: BLE001
+        started.send(str(error))
+        return
+    started.send(None)
+    parent = multiprocessing.parent_process()
+    loop = asyncio.get_running_loop()
+    try:
+        # Also stop when the main process has exited without stopping this process.
+        while not await loop.run_in_executor(None, stop.wait, PARENT_CHECK_INTERVAL):
+            if parent and not parent.is_alive():
+                break
+    finally:
+        await scanner.stop()
+
+
+def run_scanner_process(
+    name: str,
+    scanner_args: Namespace,
+    stop: Event,
+    started: Connection,
+) -> None:
+    """Run a BLE scanner in a child process, writing to a ring buffer.
+
+    Args:
+        name (str): The name of the ring buffer's shared memory.
+        scanner_args (argparse.Namespace): The command-line arguments of the scanner.
+        stop (multiprocessing.synchronize.Event): The event that stops the scanner.
+        started (multiprocessing.connection.Connection): The connection to report
+            whether the scanner has started.
+    """
+    # Ctrl+C stops the main process, which stops this process.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    ring_buffer = RingBuffer.attach(name)
+    try:
+        asyncio.run(_scan(ring_buffer, scanner_args, stop, started))
+    finally:
+        started.close()
+        ring_buffer.close()
+
+
+class ProcessScanner:
+    """Scanner that receives advertisements from a BLE scanner in a child process.
+
+    It has the same start and stop methods as :class:`bleak.BleakScanner`, but it
+    calls its callback with the time of the advertisement as given by the child.
+    """
+
+    def __init__(
+        self,
+        cli_args: Namespace,
+        detection_callback: Callable[[datetime, str, AdvertisementData], None],
+    ) -> None:
+        """Create a ProcessScanner object.
+
+        Args:
+            cli_args (argparse.Namespace): Command-line arguments.
+            detection_callback (Callable[[datetime, str, AdvertisementData], None]):
+                The function to call with the time, address and advertisement data
+                of each received advertisement.
+        """
+        # Only pass the arguments of the scanner to the child process.
+        self.scanner_args = Namespace(
+            scanning_mode=cli_args.scanning_mode,
+            adapter=cli_args.adapter,
+            filter=cli_args.filter,
+            macos_use_address=cli_args.macos_use_address,
+        )
+        self.detection_callback = detection_callback
+        self.dropped = 0
+        self._context = multiprocessing.get_context("spawn")
+        self._ring_buffer: RingBuffer | None = None
+        self._stop: Event | None = None
+        self._process: multiprocessing.process.BaseProcess | None = None
+        self._receiver: asyncio.Task[None] | None = None
+
+    async def start(self) -> None:
+        """Start the scanner process and start receiving advertisements.
+
+        Raises:
+            BleakError: If the scanner process couldn't start scanning.
+        """
+        # Textual replaces standard error by an object without file descriptor,
+        # which the resource tracker of multiprocessing passes to its process.
+        with contextlib.redirect_stderr(sys.__stderr__):
+            self._ring_buffer = RingBuffer.create()
+            self._stop = self._context.Event()
+            receiver, sender = self._context.Pipe(duplex=False)
+            self._process = self._context.Process(
+                target=run_scanner_process,
+                args=(self._ring_buffer.name, self.scanner_args, self._stop, sender),
+                daemon=True,
+            )
+            self._process.start()
+        # Only the child process writes to the pipe, so reading it ends when the
+        # child has exited.
+        sender.close()
+        try:
+            error = await asyncio.get_running_loop().run_in_executor(
+                None,
+                receiver.recv,
+            )
+        except EOFError:
+            error = "The scanner process has exited"
+        finally:
+            receiver.close()
+        if error is not None:
+            await self.stop()
+            raise BleakError(error)
+
+        self._receiver = asyncio.create_task(self._receive(self._ring_buffer))
+
+    async def stop(self) -> None:
+        """Stop receiving advertisements and stop the scanner process."""
+        if self._receiver:
+            self._receiver.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._receiver
+            self._receiver = None
+        if self._process and self._stop:
+            self._stop.set()
+            await asyncio.get_running_loop().run_in_executor(
+                None,
+                self._process.join,
+                STOP_TIMEOUT,
+            )
+            if self._process.is_alive():
+                self._process.terminate()
+            self._process = None
+        if self._ring_buffer:
+            # Receive the advertisements written after the last read.
+            for record in self._ring_buffer.read():
+                self.detection_callback(*decode_advertisement(record))
+            self.dropped += self._ring_buffer.dropped
+            self._ring_buffer.close()
+            self._ring_buffer.unlink()
+            self._ring_buffer = None
+
+    async def _receive(self, ring_buffer: RingBuffer) -> None:
+        """Receive advertisements from the ring buffer in batches until cancelled.
+
+        Args:
+            ring_buffer (RingBuffer): The ring buffer.
+        """
+        while True:
+            for count, record in enumerate(ring_buffer.read(), start=1):
+                self.detection_callback(*decode_advertisement(record))
+                if count % RECEIVE_BATCH_SIZE == 0:
+                    await asyncio.sleep(0)
+            await asyncio.sleep(POLL_INTERVAL)
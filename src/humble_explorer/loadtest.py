@@ -0,0 +1,536 @@
+"""This module load-tests HumBLE Explorer's user interface.
+
+The app runs headless with Textual's test pilot. A synthetic scanner replaces Bleak's
+scanner and delivers advertisements of a number of devices at a fixed rate, the same
+way as Bleak delivers them: every advertisement runs the app's callback in its own
+task. While it runs, the load test measures:
+
+* the latency from delivering an advertisement to adding its row to the table
+* the duration of every frame that Textual renders
+* the longest time the event loop is blocked
+* the advertisements that the scanner had to drop because its buffer was full, and
+  the ones that were still waiting to be handled at the end of the test
+* the peak resident set size of the process
+
+Every scenario runs in a fresh process, so its peak memory use isn't inflated by an
+earlier scenario.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import multiprocessing
+import sys
+from array import array
+from collections import deque
+from time import monotonic_ns
+from typing import TYPE_CHECKING, Any, Callable, NamedTuple
+
+from bleak.backends.device import BLEDevice
+from bleak.backends.scanner import AdvertisementData
+from rich.table import Table
+
+from humble_explorer.app import BLEScannerApp
+from humble_explorer.widgets import AdvertisementTable
+
+if TYPE_CHECKING:
+    from argparse import Namespace
+    from collections.abc import Iterable
+
+    from rich.console import Console
+
+    from humble_explorer.renderables import (
+        RichAdvertisement,
+        RichDeviceAddress,
+        RichTime,
+    )
+
+if sys.platform != "win32":
+    import resource
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+DEFAULT_RATES = (100, 1000, 10000)
+DEFAULT_DEVICES = 100
+DEFAULT_DURATION = 10.0
+
+# Number of advertisements the synthetic scanner buffers while the event loop is
+# blocked, like the buffers of a Bluetooth stack
+SCANNER_BUFFER_SIZE = 1000
+
+# Time between two rounds of advertisements of the synthetic scanner
+SCANNER_TICK = 0.005
+
+# Interval of the heartbeat that measures how long the event loop is blocked
+HEARTBEAT_INTERVAL = 1 / 60
+
+# Maximum time to wait for the delivered advertisements to be handled
+DRAIN_TIMEOUT = 5.0
+
+# Size of the terminal the app runs in
+TERMINAL_SIZE = (120, 40)
+
+# First random static device address of the synthetic devices
+RANDOM_STATIC = 0xC0_00_00_00_00_00
+
+# Company ID of Ruuvi Innovations, whose sensors change their payload every time
+RUUVI_COMPANY_ID = 0x0499
+
+
+class SyntheticScanner:
+    """Scanner that delivers synthetic advertisements at a fixed rate.
+
+    It has the same start and stop methods as :class:`bleak.BleakScanner`. Every
+    device advertises a sensor payload with a counter, so the payload changes with
+    every advertisement. Advertisements that become due while the event loop is
+    blocked are buffered, and the oldest ones are dropped if the buffer is full.
+    """
+
+    def __init__(
+        self,
+        detection_callback: Callable[[BLEDevice, AdvertisementData], None],
+        rate: float,
+        devices: int,
+        buffer_size: int = SCANNER_BUFFER_SIZE,
+    ) -> None:
+        """Create a SyntheticScanner object.
+
+        Args:
+            detection_callback (Callable[[BLEDevice, AdvertisementData], None]): The
+                function to call with each advertisement.
+            rate (float): The number of advertisements per second.
+            devices (int): The number of advertising devices.
+            buffer_size (int): The number of advertisements to buffer.
+        """
+        self.detection_callback = detection_callback
+        self.rate = rate
+        self.devices = [
+            BLEDevice(
+                ":".join(
+                    f"{byte:02X}"
+                    for byte in (RANDOM_STATIC + device).to_bytes(6, "big")
+                ),
+                None,
+                {},
+            )
+            for device in range(devices)
+        ]
+        self.buffer: deque[int] = deque(maxlen=buffer_size)
+        self.generated = 0
+        self.delivered = 0
+        self._generator: asyncio.Task[None] | None = None
+
+    @property
+    def dropped(self) -> int:
+        """The number of advertisements dropped because the buffer was full.
+
+        Returns:
+            int: The number of dropped advertisements.
+        """
+        return self.generated - self.delivered - len(self.buffer)
+
+    async def start(self) -> None:
+        """Start delivering advertisements."""
+        if self._generator is None:
+            self._generator = asyncio.create_task(self._generate())
+
+    async def stop(self) -> None:
+        """Stop delivering advertisements."""
+        if self._generator:
+            self._generator.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._generator
+            self._generator = None
+
+    def advertisement(self, number: int) -> tuple[BLEDevice, AdvertisementData]:
+        """Create an advertisement.
+
+        Args:
+            number (int): The sequence number of the advertisement.
+
+        Returns:
+            tuple[BLEDevice, AdvertisementData]: The advertising device and the
+            advertisement data.
+        """
+        counter, index = divmod(number, len(self.devices))
+        return self.devices[index], AdvertisementData(
+            local_name=f"Sensor {index}",
+            manufacturer_data={
+                RUUVI_COMPANY_ID: b"\x05"
+                + (counter & 0xFFFF).to_bytes(2, "big")
+                + bytes(21),
+            },
+            service_data={},
+            service_uuids=[],
+            tx_power=None,
+            rssi=-40 - number % 50,
+            platform_data=(),
+        )
+
+    async def _generate(self) -> None:
+        """Deliver the advertisements that are due, until cancelled."""
+        start = monotonic_ns()
+        while True:
+            due = int((monotonic_ns() - start) * self.rate / 1_000_000_000)
+            self.buffer.extend(range(self.generated, due))
+            self.generated = due
+            while self.buffer:
+                self.detection_callback(*self.advertisement(self.buffer.popleft()))
+                self.delivered += 1
+            await asyncio.sleep(SCANNER_TICK)
+
+
+class LoadTestResult(NamedTuple):
+    """Measurements of one load test scenario.
+
+    All times are in milliseconds.
+    """
+
+    rate: float
+    devices: int
+    generated: int
+    dropped: int
+    pending: int
+    latency_median: float
+    latency_p99: float
+    latency_max: float
+    frames: int
+    frame_median: float
+    frame_p99: float
+    max_blocked: float
+    peak_rss: int | None
+
+
+class LoadTestApp(BLEScannerApp):
+    """HumBLE Explorer app that receives advertisements from a synthetic scanner."""
+
+    def __init__(
+        self,
+        cli_args: Namespace,
+        rate: float,
+        devices: int,
+    ) -> None:
+        """Create a LoadTestApp object.
+
+        Args:
+            cli_args (argparse.Namespace): Command-line arguments.
+            rate (float): The number of advertisements per second.
+            devices (int): The number of advertising devices.
+        """
+        super().__init__(cli_args)
+        self.rate = rate
+        self.device_count = devices
+        self.handled = 0
+        self.latencies = array("q")
+        self._delivery_time = 0
+        self._background_tasks: set[asyncio.Task[None]] = set()
+
+    def create_scanner(self) -> SyntheticScanner:
+        """Create a synthetic scanner.
+
+        Returns:
+            SyntheticScanner: The scanner.
+        """
+        return SyntheticScanner(self.deliver, self.rate, self.device_count)
+
+    def deliver(self, device: BLEDevice, advertisement_data: AdvertisementData) -> None:
+        """Handle an advertisement in its own task, the same way as Bleak does.
+
+        Args:
+            device (BLEDevice): The device advertising the data.
+            advertisement_data (AdvertisementData): The advertised data.
+        """
+        task = asyncio.create_task(
+            self._handle(monotonic_ns(), device, advertisement_data),
+        )
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _handle(
+        self,
+        delivery_time: int,
+        device: BLEDevice,
+        advertisement_data: AdvertisementData,
+    ) -> None:
+        """Pass an advertisement to the app and count it.
+
+        Args:
+            delivery_time (int): The monotonic timestamp of the delivery in
+                nanoseconds.
+            device (BLEDevice): The device advertising the data.
+            advertisement_data (AdvertisementData): The advertised data.
+        """
+        self._delivery_time = delivery_time
+        await self.on_advertisement(device, advertisement_data)
+        self.handled += 1
+
+    async def on_mount(self) -> None:
+        """Measure the latency of every row added to the table.
+
+        Textual calls the mount handler of the base class after this one, which
+        starts the scan.
+        """
+        table = self.query_one("#advertisements", AdvertisementTable)
+        add_advertisement = table.add_advertisement
+
+        def add_measured_advertisement(
+            time: RichTime,
+            device_address: RichDeviceAddress,
+            rich_advertisement: RichAdvertisement,
+        ) -> Any:  # noqa: ANN401
+            row_key = add_advertisement(time, device_address, rich_advertisement)
+            self.latencies.append(monotonic_ns() - self._delivery_time)
+            return row_key
+
+        table.add_advertisement = (  # type: ignore[method-assign]
+            add_measured_advertisement
+        )
+
+
+async def run_load_test(
+    cli_args: Namespace,
+    rate: float,
+    devices: int,
+    duration: float,
+) -> LoadTestResult:
+    """Run the app with advertisements at a fixed rate and measure its performance.
+
+    Args:
+        cli_args (argparse.Namespace): Command-line arguments of the app.
+        rate (float): The number of advertisements per second.
+        devices (int): The number of advertising devices.
+        duration (float): The number of seconds to deliver advertisements.
+
+    Returns:
+        LoadTestResult: The measurements.
+    """
+    app = LoadTestApp(cli_args, rate, devices)
+    frame_times = array("q")
+    heartbeats = array("q")
+
+    async with app.run_test(size=TERMINAL_SIZE) as pilot:
+        # Time every frame that the screen's compositor renders.
+        compositor = app.screen._compositor  # noqa: SLF001
+        render_update = compositor.render_update
+
+        def render_measured_update(*args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+            start = monotonic_ns()
+            update = render_update(*args, **kwargs)
+            frame_times.append(monotonic_ns() - start)
+            return update
+
+        compositor.render_update = render_measured_update  # type: ignore[method-assign]
+        app.set_interval(HEARTBEAT_INTERVAL, lambda: heartbeats.append(monotonic_ns()))
+
+        await asyncio.sleep(duration)
+        scanner: SyntheticScanner = app.scanner  # type: ignore[assignment]
+        await scanner.stop()
+
+        # Give the app some time to handle the advertisements it has received.
+        deadline = monotonic_ns() + DRAIN_TIMEOUT * 1_000_000_000
+        while app.handled < scanner.delivered and monotonic_ns() < deadline:
+            await asyncio.sleep(SCANNER_TICK)
+        for task in list(app._background_tasks):  # noqa: SLF001
+            task.cancel()
+        await pilot.pause()
+
+    latencies = sorted(app.latencies)
+    frames = sorted(frame_times)
+    blocked = [
+        later - earlier for earlier, later in zip(heartbeats, heartbeats[1:])
+    ] or [0]
+    return LoadTestResult(
+        rate=rate,
+        devices=devices,
+        generated=scanner.generated,
+        dropped=scanner.dropped,
+        pending=scanner.delivered - app.handled,
+        latency_median=_milliseconds(_percentile(latencies, 0.5)),
+        latency_p99=_milliseconds(_percentile(latencies, 0.99)),
+        latency_max=_milliseconds(_percentile(latencies, 1)),
+        frames=len(frames),
+        frame_median=_milliseconds(_percentile(frames, 0.5)),
+        frame_p99=_milliseconds(_percentile(frames, 0.99)),
+        max_blocked=_milliseconds(max(blocked)),
+        peak_rss=peak_rss(),
+    )
+
+
+def _percentile(values: list[int], fraction: float) -> int:
+    """Return a percentile of sorted values.
+
+    Args:
+        values (list[int]): The sorted values.
+        fraction (float): The fraction of values below the percentile, between 0
+            and 1.
+
+    Returns:
+        int: The percentile, or 0 if there are no values.
+    """
+    if not values:
+        return 0
+    return values[min(int(fraction * len(values)), len(values) - 1)]
+
+
+def _milliseconds(nanoseconds: int) -> float:
+    """Convert nanoseconds to milliseconds.
+
+    Args:
+        nanoseconds (int): The time in nanoseconds.
+
+    Returns:
+        float: The time in milliseconds.
+    """
+    return nanoseconds / 1_000_000
+
+
+def peak_rss() -> int | None:
+    """Return the peak resident set size of the process.
+
+    Returns:
+        int, optional: The peak resident set size in bytes, or ``None`` on Windows.
+    """
+    if sys.platform == "win32":
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def _run_scenario(
+    cli_args: Namespace,
+    rate: float,
+    devices: int,
+    duration: float,
+) -> LoadTestResult:
+    """Run a load test scenario in the current process.
+
+    Args:
+        cli_args (argparse.Namespace): Command-line arguments of the app.
+        rate (float): The number of advertisements per second.
+        devices (int): The number of advertising devices.
+        duration (float): The number of seconds to deliver advertisements.
+
+    Returns:
+        LoadTestResult: The measurements.
+    """
+    return asyncio.run(run_load_test(cli_args, rate, devices, duration))
+
+
+def load_test(
+    cli_args: Namespace,
+    rates: Iterable[float],
+    devices: int,
+    duration: float,
+) -> list[LoadTestResult]:
+    """Run a load test scenario for every rate, each in a fresh process.
+
+    Args:
+        cli_args (argparse.Namespace): Command-line arguments of the app.
+        rates (Iterable[float]): The numbers of advertisements per second.
+        devices (int): The number of advertising devices.
+        duration (float): The number of seconds to deliver advertisements.
+
+    Returns:
+        list[LoadTestResult]: The measurements of every scenario.
+    """
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for rate in rates:
+        with context.Pool(1) as pool:
+            results.append(
+                pool.apply(_run_scenario, (cli_args, rate, devices, duration)),
+            )
+    return results
+
+
+def app_arguments(
+    changes_only: bool = False,  # noqa: FBT001, FBT002
+    rate_limit: float | None = None,
+    company_rate_limit: float | None = None,
+    filter_expression: str = "",
+) -> Namespace:
+    """Create the command-line arguments of an app without Bluetooth adapter.
+
+    All other arguments have their default value, as if the command line was empty.
+
+    Args:
+        changes_only (bool): Only show advertisements that change the payload.
+        rate_limit (float, optional): Maximum number of advertisements per second
+            shown for each device.
+        company_rate_limit (float, optional): Maximum number of advertisements per
+            second shown for each company ID.
+        filter_expression (str): Only show advertisements matching this filter.
+
+    Returns:
+        argparse.Namespace: The command-line arguments.
+    """
+    from humble_explorer.__main__ import complete_args, create_parser
+
+    parser = create_parser()
+    cli_args = parser.parse_args([])
+    cli_args.changes_only = changes_only
+    cli_args.rate_limit = rate_limit
+    cli_args.company_rate_limit = company_rate_limit
+    cli_args.filter = filter_expression
+    return complete_args(parser, cli_args)
+
+
+def results_table(results: Iterable[LoadTestResult]) -> Table:
+    """Create a table with the measurements of load test scenarios.
+
+    Args:
+        results (Iterable[LoadTestResult]): The measurements.
+
+    Returns:
+        Table: The table with a row for every scenario.
+    """
+    table = Table(title="Load test")
+    table.add_column("Rate", justify="right")
+    table.add_column("Devices", justify="right")
+    table.add_column("Generated", justify="right")
+    table.add_column("Dropped", justify="right")
+    table.add_column("Pending", justify="right")
+    table.add_column("Latency p50/p99/max", justify="right")
+    table.add_column("Frames", justify="right")
+    table.add_column("Frame p50/p99", justify="right")
+    table.add_column("Max blocked", justify="right")
+    table.add_column("Peak RSS", justify="right")
+    for result in results:
+        table.add_row(
+            f"{result.rate:g}/s",
+            str(result.devices),
+            str(result.generated),
+            str(result.dropped),
+            str(result.pending),
+            f"{result.latency_median:.1f}/{result.latency_p99:.1f}/"
+            f"{result.latency_max:.1f} ms",
+            str(result.frames),
+            f"{result.frame_median:.1f}/{result.frame_p99:.1f} ms",
+            f"{result.max_blocked:.1f} ms",
+            "-"
+            if result.peak_rss is None
+            else f"{result.peak_rss / (1 << 20):.0f} MiB",
+        )
+    return table
+
+
+def print_load_test(
+    console: Console,
+    cli_args: Namespace,
+    rates: Iterable[float],
+    devices: int,
+    duration: float,
+) -> None:
+    """Run the load test scenarios and print their measurements.
+
+    Args:
+        console (Console): The console to print the measurements to.
+        cli_args (argparse.Namespace): Command-line arguments of the app.
+        rates (Iterable[float]): The numbers of advertisements per second.
+        devices (int): The number of advertising devices.
+        duration (float): The number of seconds to deliver advertisements.
+    """
+    console.print(results_table(load_test(cli_args, rates, devices, duration)))
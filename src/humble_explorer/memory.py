@@ -0,0 +1,272 @@
+"""This module profiles where HumBLE Explorer uses its memory.
+
+The profiler traces all allocations with :mod:`tracemalloc` and periodically takes a
+snapshot. Every allocation is attributed to a subsystem by its traceback: from the
+innermost frame outward, the first frame in a function or module of a subsystem
+decides. A function is more specific than a module, so a subsystem can claim a
+function in a module of another subsystem.
+
+After marking a point in time, every sample also has the change in memory use of
+every subsystem since the mark, and the source lines whose allocations changed most.
+Every sample is written as a JSON line to a file.
+"""
+from __future__ import annotations
+
+import heapq
+import inspect
+import json
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from types import ModuleType
+from typing import IO, TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping
+
+    # Bytes allocated by every subsystem, and bytes and blocks allocated by every line
+    Totals = tuple[dict[str, int], dict[tuple[str, int], list[int]]]
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+# Number of frames stored for every allocation, to find a frame of a subsystem
+TRACEBACK_FRAMES = 4
+
+# Seconds between two samples. A sample of a long session takes a while, because every
+# traced allocation is attributed.
+SAMPLE_INTERVAL = 30
+
+# Number of source lines with the largest changes since the mark
+TOP_CHANGES = 10
+
+OTHER = "other"
+
+# Specificity of the rules to attribute a frame to a subsystem
+MODULE_RULE = 0
+FUNCTION_RULE = 1
+
+
+class MemorySample(NamedTuple):
+    """Memory use at a point in time."""
+
+    time: datetime
+    """The time of the sample."""
+    subsystems: dict[str, int]
+    """The number of bytes allocated by every subsystem."""
+    changes: dict[str, int] | None
+    """The change in bytes of every subsystem since the mark, if there's a mark."""
+    top_changes: list[tuple[str, int, int]]
+    """The source lines whose allocations changed most since the mark, with the
+    change in bytes and number of blocks."""
+
+
+def format_size(size: int, *, signed: bool = False) -> str:
+    """Format a number of bytes in mebibytes.
+
+    Args:
+        size (int): The number of bytes.
+        signed (bool): Whether to show the sign of a positive size, for a change.
+
+    Returns:
+        str: The size in MiB, with one decimal.
+    """
+    if signed:
+        return f"{size / 1_048_576:+.1f} MiB"
+    return f"{size / 1_048_576:.1f} MiB"
+
+
+class MemoryProfiler:
+    """Profiler of the memory use of subsystems."""
+
+    def __init__(
+        self,
+        subsystems: Mapping[str, Iterable[object]],
+        stream: IO[str] | None = None,
+    ) -> None:
+        """Create a MemoryProfiler object.
+
+        Args:
+            subsystems (Mapping[str, Iterable[object]]): The modules and functions
+                of every subsystem, by name of the subsystem.
+            stream (IO[str], optional): The stream to write every sample to, which
+                is closed when the profiler stops.
+        """
+        self.subsystems = list(subsystems)
+        self.stream = stream
+        # Rules by file name: first and last line, specificity and subsystem
+        self._rules: dict[str, list[tuple[int, int, int, str]]] = {}
+        for subsystem, parts in subsystems.items():
+            for part in parts:
+                self._add_rule(subsystem, part)
+        self._frames: dict[tuple[str, int], tuple[int, str] | None] = {}
+        self._mark: Totals | None = None
+
+    def _add_rule(self, subsystem: str, part: object) -> None:
+        """Add a rule to attribute the frames in a module or function.
+
+        Args:
+            subsystem (str): The name of the subsystem.
+            part (object): The module or function.
+        """
+        if isinstance(part, ModuleType):
+            self._rules.setdefault(inspect.getfile(part), []).append(
+                (0, 0, MODULE_RULE, subsystem),
+            )
+            return
+        function = inspect.unwrap(part)  # type: ignore[arg-type]
+        lines, first_line = inspect.getsourcelines(function)
+        self._rules.setdefault(inspect.getfile(function), []).append(
+            (first_line, first_line + len(lines) - 1, FUNCTION_RULE, subsystem),
+        )
+
+    def _frame_subsystem(self, filename: str, lineno: int) -> tuple[int, str] | None:
+        """Find the subsystem of a frame.
+
+        Args:
+            filename (str): The file name of the frame.
+            lineno (int): The line number of the frame.
+
+        Returns:
+            tuple[int, str], optional: The specificity of the most specific rule
+            matching the frame and its subsystem, or ``None`` if no rule matches.
+        """
+        try:
+            return self._frames[filename, lineno]
+        except KeyError:
+            pass
+        best = None
+        for first_line, last_line, specificity, subsystem in self._rules.get(
+            filename,
+            (),
+        ):
+            if (specificity == MODULE_RULE or first_line <= lineno <= last_line) and (
+                best is None or specificity > best[0]
+            ):
+                best = (specificity, subsystem)
+        self._frames[filename, lineno] = best
+        return best
+
+    def subsystem(self, traceback: tracemalloc.Traceback) -> str:
+        """Attribute an allocation to a subsystem.
+
+        Args:
+            traceback (tracemalloc.Traceback): The traceback of the allocation.
+
+        Returns:
+            str: The subsystem of the innermost frame that belongs to a subsystem,
+            or :data:`OTHER` if no frame belongs to a subsystem.
+        """
+        # The traceback is sorted from the oldest to the most recent frame.
+        for frame in reversed(traceback):
+            match = self._frame_subsystem(frame.filename, frame.lineno)
+            if match:
+                return match[1]
+        return OTHER
+
+    def start(self) -> None:
+        """Start tracing allocations."""
+        tracemalloc.start(TRACEBACK_FRAMES)
+
+    def stop(self) -> None:
+        """Stop tracing allocations and close the stream."""
+        tracemalloc.stop()
+        if self.stream:
+            self.stream.close()
+
+    def _take_snapshot(self) -> Totals:
+        """Take a snapshot of the allocations and attribute them to subsystems.
+
+        The snapshot itself isn't kept, only the totals needed for a comparison.
+
+        Returns:
+            Totals: The number of bytes allocated by every subsystem, and the number
+            of bytes and blocks allocated by every source line.
+        """
+        sizes = dict.fromkeys([*self.subsystems, OTHER], 0)
+        lines: dict[tuple[str, int], list[int]] = {}
+        for statistic in tracemalloc.take_snapshot().statistics("traceback"):
+            sizes[self.subsystem(statistic.traceback)] += statistic.size
+            frame = statistic.traceback[-1]
+            line = lines.setdefault((frame.filename, frame.lineno), [0, 0])
+            line[0] += statistic.size
+            line[1] += statistic.count
+        return sizes, lines
+
+    def mark(self) -> None:
+        """Mark the current point in time to compare the following samples with."""
+        self._mark = self._take_snapshot()
+
+    def sample(self) -> MemorySample:
+        """Sample the memory use of the subsystems and write it to the stream.
+
+        Returns:
+            MemorySample: The sample.
+        """
+        sizes, lines = self._take_snapshot()
+        changes = None
+        top_changes = []
+        if self._mark:
+            mark_sizes, mark_lines = self._mark
+            changes = {
+                subsystem: size - mark_sizes[subsystem]
+                for subsystem, size in sizes.items()
+            }
+            differences = []
+            for filename, lineno in lines.keys() | mark_lines.keys():
+                size, count = lines.get((filename, lineno), (0, 0))
+                mark_size, mark_count = mark_lines.get((filename, lineno), (0, 0))
+                differences.append(
+                    (f"{filename}:{lineno}", size - mark_size, count - mark_count),
+                )
+            top_changes = heapq.nlargest(
+                TOP_CHANGES,
+                differences,
+                key=lambda difference: abs(difference[1]),
+            )
+        sample = MemorySample(datetime.now(), sizes, changes, top_changes)
+        if self.stream:
+            self.stream.write(json.dumps(sample_to_dict(sample)) + "\n")
+            self.stream.flush()
+        return sample
+
+
+def open_profiler(
+    subsystems: Mapping[str, Iterable[object]],
+    path: str | Path,
+) -> MemoryProfiler:
+    """Create a memory profiler that writes every sample to a file.
+
+    The profiler owns the file and closes it when it stops.
+
+    Args:
+        subsystems (Mapping[str, Iterable[object]]): The modules and functions of
+            every subsystem, by name of the subsystem.
+        path (str | Path): The path of the profile file, in JSON Lines format.
+
+    Returns:
+        MemoryProfiler: The profiler writing to the file.
+    """
+    return MemoryProfiler(subsystems, Path(path).open("w", encoding="utf-8"))
+
+
+def sample_to_dict(sample: MemorySample) -> dict[str, object]:
+    """Convert a memory sample to a dictionary that can be serialized to JSON.
+
+    Args:
+        sample (MemorySample): The memory sample.
+
+    Returns:
+        dict[str, object]: The memory sample as a dictionary, with sizes in bytes.
+    """
+    return {
+        "time": sample.time.isoformat(),
+        "total": sum(sample.subsystems.values()),
+        "subsystems": sample.subsystems,
+        "since_mark": sample.changes,
+        "top_since_mark": [
+            {"location": location, "size": size, "count": count}
+            for location, size, count in sample.top_changes
+        ],
+    }
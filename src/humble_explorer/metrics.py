@@ -0,0 +1,255 @@
+"""This module exposes metrics of a long-running scanner in the Prometheus format.
+
+The counters are plain integers and dictionaries, updated in the ingestion path on the
+event loop. A small HTTP server in its own thread serves them to Prometheus. It only
+reads the counters, taking copies of the dictionaries, so a scrape never blocks the
+event loop.
+"""
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+    from bleak.backends.scanner import AdvertisementData
+
+    from humble_explorer.records import AdvertisementRecord
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+# Upper bounds of the buckets of the ingestion latency histogram, in seconds
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1, 1)
+
+# Maximum number of devices with their own time series. Advertisements of other
+# devices, for instance with ever-changing random addresses, are counted together.
+MAX_DEVICE_SERIES = 10_000
+OTHER_DEVICES = "other"
+
+DEFAULT_METRICS_HOST = "127.0.0.1"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def parse_metrics_address(value: str) -> tuple[str, int]:
+    """Convert a port or host and port to the address of the metrics server.
+
+    Args:
+        value (str): The port, for instance ``9101``, or host and port, for
+            instance ``0.0.0.0:9101``.
+
+    Returns:
+        tuple[str, int]: The host and port. Without host, the server only listens
+        on the loopback interface.
+
+    Raises:
+        ValueError: If the port isn't valid.
+    """
+    host, _, port = value.rpartition(":")
+    port_number = int(port)
+    if not 0 <= port_number <= 0xFFFF:  # noqa: PLR2004
+        msg = f"Invalid port {port}"
+        raise ValueError(msg)
+    return host or DEFAULT_METRICS_HOST, port_number
+
+
+class Histogram:
+    """Histogram with fixed buckets, as Prometheus expects it."""
+
+    __slots__ = ("bounds", "counts", "count", "sum")
+
+    def __init__(self, bounds: Iterable[float]) -> None:
+        """Create an empty Histogram object.
+
+        Args:
+            bounds (Iterable[float]): The increasing upper bounds of the buckets.
+        """
+        self.bounds = tuple(bounds)
+        # The last bucket counts the values above all bounds.
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Add a value to the histogram.
+
+        Args:
+            value (float): The value.
+        """
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def samples(self, name: str) -> Iterator[str]:
+        """Generate the samples of the histogram in the Prometheus text format.
+
+        Args:
+            name (str): The name of the metric.
+
+        Yields:
+            str: The cumulative count of each bucket, the sum and the count.
+        """
+        counts = list(self.counts)
+        cumulative = 0
+        for bound, count in zip((*self.bounds, "+Inf"), counts):
+            cumulative += count
+            yield f'{name}_bucket{{le="{bound}"}} {cumulative}'
+        yield f"{name}_sum {self.sum}"
+        yield f"{name}_count {cumulative}"
+
+
+class Metrics:
+    """Counters of the advertisements handled by a long-running scanner."""
+
+    def __init__(self, max_devices: int = MAX_DEVICE_SERIES) -> None:
+        """Create a Metrics object with all counters at zero.
+
+        Args:
+            max_devices (int): The maximum number of devices with their own
+                counter.
+        """
+        self.max_devices = max_devices
+        self.packets = 0
+        self.device_packets: dict[str, int] = {}
+        self.company_packets: dict[int, int] = {}
+        self.dropped = 0
+        self.queue_depth = 0
+        self.latency = Histogram(LATENCY_BUCKETS)
+
+    def observe(
+        self,
+        address: str,
+        advertisement_data: AdvertisementData | AdvertisementRecord,
+        latency: float | None = None,
+    ) -> None:
+        """Count a received advertisement.
+
+        Args:
+            address (str): The address of the advertising device.
+            advertisement_data (AdvertisementData | AdvertisementRecord): The
+                advertisement data.
+            latency (float, optional): The time in seconds from receiving the
+                advertisement until it was handled, if it's known.
+        """
+        self.packets += 1
+        device_packets = self.device_packets
+        if address not in device_packets and len(device_packets) >= self.max_devices:
+            address = OTHER_DEVICES
+        device_packets[address] = device_packets.get(address, 0) + 1
+        company_packets = self.company_packets
+        for company_id in advertisement_data.manufacturer_data:
+            company_packets[company_id] = company_packets.get(company_id, 0) + 1
+        if latency is not None:
+            self.latency.observe(latency)
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text format.
+
+        Returns:
+            str: The metrics.
+        """
+        # Copying a dictionary doesn't let the event loop's thread run in between.
+        device_packets = self.device_packets.copy()
+        company_packets = self.company_packets.copy()
+        lines = [
+            "# HELP humble_explorer_packets_total Advertisements received.",
+            "# TYPE humble_explorer_packets_total counter",
+            f"humble_explorer_packets_total {self.packets}",
+            (
+                "# HELP humble_explorer_device_packets_total Advertisements received "
+                "per device."
+            ),
+            "# TYPE humble_explorer_device_packets_total counter",
+            *(
+                f'humble_explorer_device_packets_total{{address="{address}"}} {count}'
+                for address, count in device_packets.items()
+            ),
+            (
+                "# HELP humble_explorer_company_packets_total Advertisements received "
+                "with manufacturer data per company ID."
+            ),
+            "# TYPE humble_explorer_company_packets_total counter",
+            *(
+                f'humble_explorer_company_packets_total{{company="0x{cic:04x}"}} '
+                f"{count}"
+                for cic, count in company_packets.items()
+            ),
+            (
+                "# HELP humble_explorer_dropped_total Advertisements dropped because a "
+                "client couldn't keep up."
+            ),
+            "# TYPE humble_explorer_dropped_total counter",
+            f"humble_explorer_dropped_total {self.dropped}",
+            "# HELP humble_explorer_queue_depth Advertisements queued for clients.",
+            "# TYPE humble_explorer_queue_depth gauge",
+            f"humble_explorer_queue_depth {self.queue_depth}",
+            (
+                "# HELP humble_explorer_ingestion_latency_seconds Time from receiving "
+                "an advertisement until it's handled."
+            ),
+            "# TYPE humble_explorer_ingestion_latency_seconds histogram",
+            *self.latency.samples("humble_explorer_ingestion_latency_seconds"),
+        ]
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """HTTP server that serves metrics to Prometheus from its own thread."""
+
+    def __init__(self, metrics: Metrics, host: str, port: int) -> None:
+        """Create a MetricsServer object and bind it to its address.
+
+        Args:
+            metrics (Metrics): The metrics to serve.
+            host (str): The host to listen on.
+            port (int): The port to listen on, or 0 for any free port.
+        """
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            """Handler of requests for the metrics."""
+
+            def do_GET(self) -> None:  # noqa: N802
+                """Send the metrics, on any path."""
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: object) -> None:
+                """Don't log requests."""
+
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self.server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def port(self) -> int:
+        """The port the server listens on.
+
+        Returns:
+            int: The port.
+        """
+        return self.server.server_address[1]
+
+    def start(self) -> None:
+        """Start serving metrics in a background thread."""
+        self._thread = threading.Thread(
+            target=self.server.serve_forever,
+            name="metrics",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop serving metrics."""
+        if self._thread:
+            self.server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.server.server_close()
@@ -0,0 +1,262 @@
+"""This module tracks which Bluetooth devices are present.
+
+A device appears with its first advertisement, and is gone when it hasn't advertised
+for the timeout of its device class. The deadlines of all devices are kept in a
+hashed timer wheel, so receiving an advertisement only updates the time the device
+was last seen, and expiring devices only looks at the devices whose deadline has
+passed, instead of at all devices.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, NamedTuple
+
+from humble_explorer.filters import AdvertisementFilter
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+    from bleak.backends.scanner import AdvertisementData
+
+    from humble_explorer.records import AdvertisementRecord
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+# Timeout in seconds of devices that don't match the filter of any device class
+DEFAULT_GONE_AFTER = 30
+
+# Resolution of the timer wheel: devices are declared gone at most this late
+TICK_NS = 1_000_000_000
+
+# Number of slots of the timer wheel. Deadlines more than this number of ticks in the
+# future share a slot with earlier deadlines and wait for later rounds.
+WHEEL_SLOTS = 256
+
+APPEARED = "appeared"
+GONE = "gone"
+
+
+class PresenceClass(NamedTuple):
+    """Class of devices with the same presence timeout."""
+
+    timeout: int
+    """Time in nanoseconds without advertisements after which a device is gone."""
+    device_filter: AdvertisementFilter | None = None
+    """Filter matching the devices of the class, or ``None`` to match all devices."""
+
+
+class PresenceEvent(NamedTuple):
+    """Event of a device that appeared or is gone."""
+
+    kind: str
+    """:data:`APPEARED` or :data:`GONE`."""
+    address: str
+    """The address of the device."""
+    time: int
+    """The monotonic timestamp of the event in nanoseconds."""
+
+
+def parse_presence_class(value: str) -> PresenceClass:
+    """Convert a timeout with an optional filter to a device class.
+
+    Args:
+        value (str): The timeout in seconds, optionally followed by a colon and a
+            filter expression, for instance ``300:company=0x004c``.
+
+    Returns:
+        PresenceClass: The device class.
+
+    Raises:
+        ValueError: If the timeout isn't a positive number.
+    """
+    seconds, _, filter_expression = value.partition(":")
+    timeout = float(seconds)
+    if timeout <= 0:
+        msg = f"Invalid timeout {seconds}"
+        raise ValueError(msg)
+    return PresenceClass(
+        round(timeout * 1_000_000_000),
+        AdvertisementFilter(filter_expression) if filter_expression else None,
+    )
+
+
+class TimerWheel:
+    """Hashed timer wheel of deadlines.
+
+    Time is divided in ticks, and each deadline is kept in the slot of its tick,
+    modulo the number of slots. Scheduling a deadline is an append, and advancing
+    the wheel by one tick only checks the deadlines in one slot.
+    """
+
+    def __init__(self, resolution: int = TICK_NS, slots: int = WHEEL_SLOTS) -> None:
+        """Create an empty TimerWheel object.
+
+        Args:
+            resolution (int): The duration of a tick in nanoseconds.
+            slots (int): The number of slots.
+        """
+        self.resolution = resolution
+        self.slots: list[list[tuple[int, str]]] = [[] for _ in range(slots)]
+        self.tick: int | None = None
+
+    def schedule(self, key: str, deadline: int) -> None:
+        """Schedule a deadline.
+
+        Args:
+            key (str): The key that is returned when the deadline has passed.
+            deadline (int): The monotonic timestamp of the deadline in nanoseconds.
+        """
+        tick = -(-deadline // self.resolution)
+        if self.tick is not None:
+            # A deadline that has already passed is checked on the next tick.
+            tick = max(tick, self.tick + 1)
+        self.slots[tick % len(self.slots)].append((tick, key))
+
+    def advance(self, now: int) -> Iterator[str]:
+        """Advance the wheel to the current time.
+
+        The first call only sets the current time of the wheel.
+
+        Args:
+            now (int): The monotonic timestamp of the current time in nanoseconds.
+
+        Yields:
+            str: The keys of the deadlines that have passed.
+        """
+        now_tick = now // self.resolution
+        if self.tick is None:
+            self.tick = now_tick
+            return
+        if now_tick <= self.tick:
+            return
+        # After a long pause, every slot only needs to be checked once.
+        first_tick = max(self.tick + 1, now_tick - len(self.slots) + 1)
+        self.tick = now_tick
+        for tick in range(first_tick, now_tick + 1):
+            slot = self.slots[tick % len(self.slots)]
+            if not slot:
+                continue
+            pending = []
+            for entry in slot:
+                if entry[0] <= now_tick:
+                    yield entry[1]
+                else:
+                    pending.append(entry)
+            slot[:] = pending
+
+    def clear(self) -> None:
+        """Remove all deadlines."""
+        self.slots = [[] for _ in self.slots]
+        self.tick = None
+
+
+class PresenceTracker:
+    """Tracker of the devices that are present.
+
+    The device class of a device is the first class whose filter matches the first
+    advertisement of the device.
+    """
+
+    def __init__(self, classes: Iterable[PresenceClass] = ()) -> None:
+        """Create a PresenceTracker object without devices.
+
+        Args:
+            classes (Iterable[PresenceClass]): The device classes, in order. If no
+                class matches all devices, a class with a timeout of
+                :data:`DEFAULT_GONE_AFTER` seconds is added for them.
+        """
+        self.classes = list(classes)
+        if all(presence_class.device_filter for presence_class in self.classes):
+            self.classes.append(PresenceClass(DEFAULT_GONE_AFTER * 1_000_000_000))
+        self.wheel = TimerWheel()
+        self.last_seen: dict[str, int] = {}
+        self.timeouts: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        """Return the number of present devices.
+
+        Returns:
+            int: The number of devices that have appeared and aren't gone.
+        """
+        return len(self.last_seen)
+
+    def clear(self) -> None:
+        """Forget all devices, without events."""
+        self.wheel.clear()
+        self.last_seen = {}
+        self.timeouts = {}
+
+    def timeout(
+        self,
+        address: str,
+        advertisement_data: AdvertisementData | AdvertisementRecord,
+    ) -> int:
+        """Find the timeout of the device class of an advertisement.
+
+        Args:
+            address (str): The address of the advertising device.
+            advertisement_data (AdvertisementData | AdvertisementRecord): The
+                advertisement data.
+
+        Returns:
+            int: The timeout in nanoseconds.
+        """
+        for presence_class in self.classes:
+            device_filter = presence_class.device_filter
+            if device_filter is None or device_filter.matches(
+                address,
+                advertisement_data,
+            ):
+                return presence_class.timeout
+        return self.classes[-1].timeout
+
+    def observe(
+        self,
+        address: str,
+        advertisement_data: AdvertisementData | AdvertisementRecord,
+        time: int,
+    ) -> list[PresenceEvent]:
+        """Update the presence of devices with a received advertisement.
+
+        Args:
+            address (str): The address of the advertising device.
+            advertisement_data (AdvertisementData | AdvertisementRecord): The
+                advertisement data.
+            time (int): The monotonic timestamp of the advertisement in nanoseconds.
+
+        Returns:
+            list[PresenceEvent]: The devices that are gone before this time, and the
+            advertising device if it has appeared.
+        """
+        events = self.expire(time)
+        if address not in self.last_seen:
+            timeout = self.timeouts[address] = self.timeout(address, advertisement_data)
+            self.wheel.schedule(address, time + timeout)
+            events.append(PresenceEvent(APPEARED, address, time))
+        self.last_seen[address] = time
+        return events
+
+    def expire(self, now: int) -> list[PresenceEvent]:
+        """Find the devices that are gone.
+
+        A device whose deadline has passed, but that has advertised since the
+        deadline was scheduled, is scheduled again at its new deadline.
+
+        Args:
+            now (int): The monotonic timestamp of the current time in nanoseconds.
+
+        Returns:
+            list[PresenceEvent]: The devices that are gone, at the time their
+            timeout passed.
+        """
+        events = []
+        for address in self.wheel.advance(now):
+            deadline = self.last_seen[address] + self.timeouts[address]
+            if deadline <= now:
+                del self.last_seen[address]
+                del self.timeouts[address]
+                events.append(PresenceEvent(GONE, address, deadline))
+            else:
+                self.wheel.schedule(address, deadline)
+        return events
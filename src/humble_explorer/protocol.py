@@ -0,0 +1,182 @@
+"""This module contains the binary record stream protocol of HumBLE Explorer.
+
+The scanner daemon sends each advertisement as a frame: a 32-bit little-endian
+length, followed by a record of that length. A record starts with a fixed header,
+followed by the variable-length fields:
+
+* timestamp in microseconds since the epoch (signed 64-bit)
+* RSSI and TX power in dBm (signed 8-bit, -128 if unknown)
+* lengths of the address and local name, and the number of manufacturer data,
+  service data and service UUIDs (unsigned 16-bit each, because extended
+  advertisements can have longer names and more UUIDs than 255)
+* address and local name (UTF-8)
+* each manufacturer data as company ID and length (unsigned 16-bit), and data
+* each service data as 128-bit UUID, length (unsigned 16-bit) and data
+* each service UUID as 128-bit UUID
+
+A client sends frames with a UTF-8 filter expression to the daemon.
+"""
+from __future__ import annotations
+
+import struct
+from datetime import datetime
+from typing import TYPE_CHECKING
+from uuid import UUID
+
+from bleak.backends.scanner import AdvertisementData
+
+if TYPE_CHECKING:
+    import asyncio
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+FRAME_LENGTH = struct.Struct("<I")
+RECORD_HEADER = struct.Struct("<qbbHHHHH")
+MANUFACTURER_DATA_HEADER = struct.Struct("<HH")
+DATA_LENGTH = struct.Struct("<H")
+UNKNOWN_POWER = -128
+MAX_FRAME_LENGTH = 1 << 16
+
+
+def frame(body: bytes) -> bytes:
+    """Put a record or filter expression in a frame.
+
+    Args:
+        body (bytes): The record or filter expression.
+
+    Returns:
+        bytes: The frame.
+    """
+    return FRAME_LENGTH.pack(len(body)) + body
+
+
+async def read_frame(reader: asyncio.StreamReader) -> bytes:
+    """Read a frame from a stream.
+
+    Args:
+        reader (asyncio.StreamReader): The stream to read from.
+
+    Returns:
+        bytes: The record or filter expression in the frame.
+
+    Raises:
+        asyncio.IncompleteReadError: If the stream ends.
+        ValueError: If the frame is too long.
+    """
+    (length,) = FRAME_LENGTH.unpack(await reader.readexactly(FRAME_LENGTH.size))
+    if length > MAX_FRAME_LENGTH:
+        msg = f"Frame of {length} bytes is too long"
+        raise ValueError(msg)
+    return await reader.readexactly(length)
+
+
+def encode_advertisement(
+    time: datetime,
+    address: str,
+    advertisement_data: AdvertisementData,
+) -> bytes:
+    """Encode an advertisement as a record.
+
+    Args:
+        time (datetime): The time of the advertisement.
+        address (str): The address of the advertising device.
+        advertisement_data (AdvertisementData): The advertisement data.
+
+    Returns:
+        bytes: The record.
+    """
+    address_bytes = address.encode()
+    name_bytes = (advertisement_data.local_name or "").encode()
+    parts = [
+        RECORD_HEADER.pack(
+            round(time.timestamp() * 1_000_000),
+            UNKNOWN_POWER
+            if advertisement_data.rssi is None
+            else advertisement_data.rssi,
+            UNKNOWN_POWER
+            if advertisement_data.tx_power is None
+            else advertisement_data.tx_power,
+            len(address_bytes),
+            len(name_bytes),
+            len(advertisement_data.manufacturer_data),
+            len(advertisement_data.service_data),
+            len(advertisement_data.service_uuids),
+        ),
+        address_bytes,
+        name_bytes,
+    ]
+    for cic, data in advertisement_data.manufacturer_data.items():
+        parts.append(MANUFACTURER_DATA_HEADER.pack(cic, len(data)))
+        parts.append(data)
+    for uuid, data in advertisement_data.service_data.items():
+        parts.append(UUID(uuid).bytes)
+        parts.append(DATA_LENGTH.pack(len(data)))
+        parts.append(data)
+    for uuid in advertisement_data.service_uuids:
+        parts.append(UUID(uuid).bytes)
+    return b"".join(parts)
+
+
+def decode_advertisement(record: bytes) -> tuple[datetime, str, AdvertisementData]:
+    """Decode a record to an advertisement.
+
+    Args:
+        record (bytes): The record.
+
+    Returns:
+        tuple[datetime, str, AdvertisementData]: The time of the advertisement, the
+        address of the advertising device and the advertisement data.
+    """
+    (
+        timestamp,
+        rssi,
+        tx_power,
+        address_length,
+        name_length,
+        manufacturer_data_count,
+        service_data_count,
+        service_uuid_count,
+    ) = RECORD_HEADER.unpack_from(record)
+    offset = RECORD_HEADER.size
+
+    address = record[offset : offset + address_length].decode()
+    offset += address_length
+    local_name = record[offset : offset + name_length].decode() or None
+    offset += name_length
+
+    manufacturer_data = {}
+    for _ in range(manufacturer_data_count):
+        cic, length = MANUFACTURER_DATA_HEADER.unpack_from(record, offset)
+        offset += MANUFACTURER_DATA_HEADER.size
+        manufacturer_data[cic] = record[offset : offset + length]
+        offset += length
+
+    service_data = {}
+    for _ in range(service_data_count):
+        uuid = str(UUID(bytes=record[offset : offset + 16]))
+        (length,) = DATA_LENGTH.unpack_from(record, offset + 16)
+        offset += 16 + DATA_LENGTH.size
+        service_data[uuid] = record[offset : offset + length]
+        offset += length
+
+    service_uuids = []
+    for _ in range(service_uuid_count):
+        service_uuids.append(str(UUID(bytes=record[offset : offset + 16])))
+        offset += 16
+
+    return (
+        # Local time without time zone, like the times of Bleak's callbacks
+        datetime.fromtimestamp(timestamp / 1_000_000),  # noqa: DTZ006
+        address,
+        AdvertisementData(
+            local_name=local_name,
+            manufacturer_data=manufacturer_data,
+            service_data=service_data,
+            service_uuids=service_uuids,
+            tx_power=None if tx_power == UNKNOWN_POWER else tx_power,
+            rssi=None if rssi == UNKNOWN_POWER else rssi,  # type: ignore[arg-type]
+            platform_data=(),
+        ),
+    )
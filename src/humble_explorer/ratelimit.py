@@ -0,0 +1,174 @@
+"""This module contains rate limiters for advertisements in HumBLE Explorer."""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+# Number of devices and company IDs whose token bucket is kept before the full
+# ones are forgotten
+BUCKET_STATE_SIZE = 10_000
+
+
+class TokenBucket:
+    """Token bucket that refills at a constant rate up to its capacity.
+
+    Each allowed event consumes one token. Checking and consuming a token takes
+    constant time and memory. The bucket is refilled lazily, when it's checked.
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: float) -> None:
+        """Create a full TokenBucket object.
+
+        Args:
+            rate (float): The number of tokens added per second.
+            capacity (float): The maximum number of tokens.
+            now (float): The current time in seconds.
+
+        Raises:
+            ValueError: If the rate isn't positive.
+        """
+        if not rate > 0:
+            msg = f"Rate {rate} isn't positive"
+            raise ValueError(msg)
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def refill(self, now: float) -> None:
+        """Add the tokens for the time since the bucket was last refilled.
+
+        Args:
+            now (float): The current time in seconds.
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def is_full(self, now: float) -> bool:
+        """Check whether the bucket would be full if it was refilled now.
+
+        Args:
+            now (float): The current time in seconds.
+
+        Returns:
+            bool: ``True`` if the bucket is full, ``False`` if not.
+        """
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+    def consume(self, now: float) -> bool:
+        """Consume a token if there's one.
+
+        Args:
+            now (float): The current time in seconds.
+
+        Returns:
+            bool: ``True`` if a token was consumed, ``False`` if the bucket is empty.
+        """
+        self.refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class RateLimiter:
+    """Rate limiter for advertisements per device and per company ID.
+
+    Every device and company ID has its own token bucket, which can hold one second
+    worth of advertisements, with a minimum of one. A full bucket is the same as a
+    new one, so the full buckets are forgotten when there are more than
+    :data:`BUCKET_STATE_SIZE` buckets.
+    """
+
+    def __init__(
+        self,
+        device_rate: float | None = None,
+        company_rate: float | None = None,
+    ) -> None:
+        """Create a RateLimiter object.
+
+        Args:
+            device_rate (float, optional): The maximum number of advertisements per
+                second for each device, or ``None`` for no limit.
+            company_rate (float, optional): The maximum number of advertisements per
+                second for each company ID, or ``None`` for no limit.
+        """
+        self.device_rate = device_rate
+        self.company_rate = company_rate
+        # Addresses are strings and company IDs are integers, so they never clash.
+        self.buckets: dict[str | int, TokenBucket] = {}
+
+    def __bool__(self) -> bool:
+        """Return whether the rate limiter limits anything.
+
+        Returns:
+            bool: ``False`` if all advertisements are allowed.
+        """
+        return self.device_rate is not None or self.company_rate is not None
+
+    def clear(self) -> None:
+        """Forget all token buckets."""
+        self.buckets = {}
+
+    def allow(self, address: str, company_ids: Iterable[int], now: float) -> bool:
+        """Check whether an advertisement is within the rate limits.
+
+        An advertisement consumes a token of the bucket of its device and of every
+        company ID, but only if all these buckets have a token. So an advertisement
+        throttled by one limit doesn't use up the budget of the other ones.
+
+        Args:
+            address (str): The address of the advertising device.
+            company_ids (Iterable[int]): The company IDs of the advertisement's
+                manufacturer data.
+            now (float): The current time in seconds.
+
+        Returns:
+            bool: ``True`` if the advertisement is allowed, ``False`` if it's
+            throttled.
+        """
+        buckets: dict[str | int, TokenBucket] = {}
+        if self.device_rate is not None:
+            buckets[address] = self._bucket(address, self.device_rate, now)
+        if self.company_rate is not None:
+            for cic in company_ids:
+                buckets[cic] = self._bucket(cic, self.company_rate, now)
+
+        for bucket in buckets.values():
+            bucket.refill(now)
+            if bucket.tokens < 1:
+                return False
+        for bucket in buckets.values():
+            bucket.tokens -= 1
+        return True
+
+    def _bucket(self, key: str | int, rate: float, now: float) -> TokenBucket:
+        """Return a bucket, creating it if it doesn't exist.
+
+        Args:
+            key (str | int): The address or company ID of the bucket.
+            rate (float): The rate of a new bucket.
+            now (float): The current time in seconds.
+
+        Returns:
+            TokenBucket: The bucket.
+        """
+        try:
+            return self.buckets[key]
+        except KeyError:
+            if len(self.buckets) >= BUCKET_STATE_SIZE:
+                self.buckets = {
+                    bucket_key: bucket
+                    for bucket_key, bucket in self.buckets.items()
+                    if not bucket.is_full(now)
+                }
+            bucket = self.buckets[key] = TokenBucket(rate, max(1.0, rate), now)
+            return bucket
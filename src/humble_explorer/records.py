@@ -0,0 +1,234 @@
+"""This module contains the compact records of advertisements stored by HumBLE Explorer.
+
+Bleak's :class:`~bleak.backends.scanner.AdvertisementData` objects carry
+platform-specific data and fresh dictionaries for every packet. HumBLE Explorer keeps
+every received advertisement, so it converts them to slotted records that share as
+much as possible with the previous record of the same device.
+"""
+from __future__ import annotations
+
+import sys
+from datetime import datetime
+from time import monotonic_ns, time_ns
+from types import MappingProxyType
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+    from bleak.backends.scanner import AdvertisementData
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+# Offset between the wall clock and the monotonic clock, measured once, so monotonic
+# timestamps can be shown as wall-clock time.
+WALL_CLOCK_OFFSET_NS = time_ns() - monotonic_ns()
+
+# Read-only empty mapping shared by all records without payloads
+EMPTY_PAYLOADS: Mapping[int | str, bytes] = MappingProxyType({})
+
+# One shared int object for every possible RSSI and TX power value
+_SMALL_INTS = tuple(range(-128, 128))
+
+
+def datetime_to_monotonic_ns(time: datetime) -> int:
+    """Convert a wall-clock time to a monotonic timestamp.
+
+    Args:
+        time (datetime): The wall-clock time.
+
+    Returns:
+        int: The monotonic timestamp in nanoseconds.
+    """
+    return round(time.timestamp() * 1_000_000) * 1000 - WALL_CLOCK_OFFSET_NS
+
+
+def monotonic_ns_to_datetime(timestamp: int) -> datetime:
+    """Convert a monotonic timestamp to a local wall-clock time.
+
+    Args:
+        timestamp (int): The monotonic timestamp in nanoseconds.
+
+    Returns:
+        datetime: The wall-clock time in the local time zone, without time zone.
+    """
+    wall_clock_ns = timestamp + WALL_CLOCK_OFFSET_NS
+    # Naive on purpose: the displayed times are local, like datetime.now() in Bleak
+    return datetime.fromtimestamp(wall_clock_ns / 1_000_000_000)  # noqa: DTZ006
+
+
+def _small_int(value: int | None) -> int | None:
+    """Return a shared int object for a signed byte.
+
+    Args:
+        value (int, optional): The value.
+
+    Returns:
+        int, optional: The shared object if the value fits in a signed byte, else
+        the value itself.
+    """
+    if value is not None and -128 <= value <= 127:  # noqa: PLR2004
+        return _SMALL_INTS[value + 128]
+    return value
+
+
+class AdvertisementRecord:
+    """Compact record of a received advertisement.
+
+    It has the same payload attributes as
+    :class:`~bleak.backends.scanner.AdvertisementData`, so it can be filtered and
+    shown in the same way. The records are immutable: attributes equal to those of
+    the previous record of the same device are shared with that record.
+    """
+
+    __slots__ = (
+        "time",
+        "address",
+        "local_name",
+        "rssi",
+        "tx_power",
+        "manufacturer_data",
+        "service_data",
+        "service_uuids",
+        "previous_payloads",
+        "interval",
+        "watch_label",
+    )
+
+    def __init__(  # noqa: PLR0913
+        self,
+        time: int,
+        address: str,
+        local_name: str | None,
+        rssi: int,
+        tx_power: int | None,
+        manufacturer_data: Mapping[int, bytes],
+        service_data: Mapping[str, bytes],
+        service_uuids: tuple[str, ...],
+        previous_payloads: Mapping[int | str, bytes],
+        interval: int | None = None,
+        watch_label: str | None = None,
+    ) -> None:
+        """Create an AdvertisementRecord object.
+
+        Args:
+            time (int): The monotonic timestamp in nanoseconds.
+            address (str): The address of the advertising device.
+            local_name (str, optional): The local name of the device.
+            rssi (int): The received signal strength.
+            tx_power (int, optional): The transmit power.
+            manufacturer_data (Mapping[int, bytes]): Manufacturer data by company ID.
+            service_data (Mapping[str, bytes]): Service data by service UUID.
+            service_uuids (tuple[str, ...]): The service UUIDs.
+            previous_payloads (Mapping[int | str, bytes]): The previous payloads of
+                the same device that differ from the ones in this advertisement, by
+                company ID or service UUID.
+            interval (int, optional): The estimated advertising interval of the
+                device in milliseconds.
+            watch_label (str, optional): The label of the first watchlist entry
+                that the advertisement matches.
+        """
+        self.time = time
+        self.address = address
+        self.local_name = local_name
+        self.rssi = rssi
+        self.tx_power = tx_power
+        self.manufacturer_data = manufacturer_data
+        self.service_data = service_data
+        self.service_uuids = service_uuids
+        self.previous_payloads = previous_payloads
+        self.interval = interval
+        self.watch_label = watch_label
+
+    @classmethod
+    def from_advertisement_data(  # noqa: PLR0913
+        cls: type[AdvertisementRecord],
+        time: int,
+        address: str,
+        advertisement_data: AdvertisementData,
+        previous_payloads: Mapping[int | str, bytes],
+        previous_record: AdvertisementRecord | None = None,
+        interval: int | None = None,
+        watch_label: str | None = None,
+    ) -> AdvertisementRecord:
+        """Create a compact record from Bleak's advertisement data.
+
+        Args:
+            time (int): The monotonic timestamp in nanoseconds.
+            address (str): The address of the advertising device.
+            advertisement_data (AdvertisementData): The advertisement data.
+            previous_payloads (Mapping[int | str, bytes]): The previous payloads of
+                the same device that differ from the ones in this advertisement.
+            previous_record (AdvertisementRecord, optional): The previous record of
+                the same device, to share equal attributes with.
+            interval (int, optional): The estimated advertising interval of the
+                device in milliseconds.
+            watch_label (str, optional): The label of the first watchlist entry
+                that the advertisement matches.
+
+        Returns:
+            AdvertisementRecord: The record.
+        """
+        if previous_record is None:
+            return cls(
+                time,
+                sys.intern(address),
+                advertisement_data.local_name,
+                _small_int(advertisement_data.rssi),  # type: ignore[arg-type]
+                _small_int(advertisement_data.tx_power),
+                _compact(advertisement_data.manufacturer_data),
+                _compact(advertisement_data.service_data),
+                tuple(advertisement_data.service_uuids),
+                previous_payloads or EMPTY_PAYLOADS,
+                interval,
+                watch_label,
+            )
+
+        local_name = advertisement_data.local_name
+        manufacturer_data: Mapping[int, bytes] = advertisement_data.manufacturer_data
+        service_data: Mapping[str, bytes] = advertisement_data.service_data
+        service_uuids = tuple(advertisement_data.service_uuids)
+        return cls(
+            time,
+            previous_record.address,
+            previous_record.local_name
+            if local_name == previous_record.local_name
+            else local_name,
+            _small_int(advertisement_data.rssi),  # type: ignore[arg-type]
+            _small_int(advertisement_data.tx_power),
+            previous_record.manufacturer_data
+            if manufacturer_data == previous_record.manufacturer_data
+            else _compact(manufacturer_data),
+            previous_record.service_data
+            if service_data == previous_record.service_data
+            else _compact(service_data),
+            previous_record.service_uuids
+            if service_uuids == previous_record.service_uuids
+            else service_uuids,
+            previous_payloads or EMPTY_PAYLOADS,
+            interval,
+            watch_label,
+        )
+
+    @property
+    def wall_time(self) -> datetime:
+        """The wall-clock time of the advertisement.
+
+        Returns:
+            datetime: The local time the advertisement was received.
+        """
+        return monotonic_ns_to_datetime(self.time)
+
+
+def _compact(payloads: Mapping[int, bytes] | Mapping[str, bytes]) -> Mapping:
+    """Copy a mapping of payloads, sharing one object for all empty mappings.
+
+    Args:
+        payloads (Mapping[int, bytes] | Mapping[str, bytes]): The payloads.
+
+    Returns:
+        Mapping: A copy of the payloads or the shared empty mapping.
+    """
+    return dict(payloads) if payloads else EMPTY_PAYLOADS
@@ -0,0 +1,319 @@
+"""This module renders the advertisements in a capture to a report.
+
+The advertisements are shown with the same renderables as in the user interface, and
+exported by Rich to HTML, SVG or text. The capture is read and filtered in one pass,
+which also estimates the advertising interval of each device, because that needs the
+advertisements in order. The advertisements are then split in chunks that are rendered
+in parallel by a pool of processes, and the rendered chunks are concatenated in order.
+Only a few chunks are rendered at the same time, so a large capture isn't loaded into
+memory as a whole.
+"""
+from __future__ import annotations
+
+import multiprocessing
+import os
+import re
+from collections import deque
+from io import StringIO
+from itertools import chain, islice
+from typing import IO, TYPE_CHECKING, NamedTuple
+
+from rich.console import Console
+from rich.table import Column, Table
+from rich.terminal_theme import DEFAULT_TERMINAL_THEME
+
+from humble_explorer import utils
+from humble_explorer.devices import DeviceRegistry
+from humble_explorer.filters import AdvertisementFilter
+from humble_explorer.records import datetime_to_monotonic_ns
+from humble_explorer.renderables import (
+    TIME_WIDTH,
+    DisplayConfig,
+    RichAdvertisement,
+    RichDeviceAddress,
+    RichTime,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+    from datetime import datetime
+    from multiprocessing.pool import AsyncResult
+
+    from bleak.backends.scanner import AdvertisementData
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+FORMATS = ("html", "svg", "txt")
+
+# Number of advertisements rendered by a process at a time
+CHUNK_SIZE = 2000
+
+# Document around the rendered chunks of an HTML report, with inline styles
+HTML_HEADER = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="UTF-8">
+<style>
+body {{
+    color: {foreground};
+    background-color: {background};
+}}
+</style>
+</head>
+<body>
+    <pre style="font-family:Menlo,'DejaVu Sans Mono',consolas,'Courier New',monospace"><code style="font-family:inherit">"""  # noqa: E501
+HTML_FOOTER = """</code></pre>
+</body>
+</html>
+"""
+
+# Width of the report in characters
+DEFAULT_WIDTH = 120
+
+# Width of the address column, which fits the OUI descriptions of most addresses
+ADDRESS_WIDTH = 40
+
+# Number of rendered chunks that are waiting to be written, per process
+CHUNKS_IN_FLIGHT = 2
+
+SVG_SIZE = re.compile(r'viewBox="0 0 ([\d.]+) ([\d.]+)"')
+
+
+class RenderChunk(NamedTuple):
+    """Chunk of advertisements to render."""
+
+    advertisements: list[tuple[datetime, str, AdvertisementData, int | None]]
+    """The time, address, data and advertising interval of the advertisements."""
+    output_format: str
+    """The format to render to: ``html``, ``svg`` or ``txt``."""
+    width: int
+    """The width of the report in characters."""
+    first: bool
+    """Whether this is the first chunk, which shows the column headers."""
+    title: str
+    """The title of the rendered chunk in SVG format."""
+
+
+def render_chunk(chunk: RenderChunk) -> str:
+    """Render a chunk of advertisements.
+
+    Args:
+        chunk (RenderChunk): The chunk.
+
+    Returns:
+        str: The rendered advertisements. HTML is a fragment without document, to
+        be put inside a ``<pre>`` element.
+    """
+    console = Console(
+        file=StringIO(),
+        record=True,
+        width=chunk.width,
+        color_system="truecolor",
+        force_terminal=True,
+    )
+    config = DisplayConfig()
+    table = Table(
+        Column("Time", width=TIME_WIDTH, no_wrap=True),
+        Column("Address", width=ADDRESS_WIDTH, no_wrap=True, overflow="ellipsis"),
+        Column("Advertisement"),
+        box=None,
+        padding=(0, 1),
+        show_header=chunk.first,
+        header_style="bold",
+    )
+    for time, address, advertisement_data, interval in chunk.advertisements:
+        table.add_row(
+            RichTime(datetime_to_monotonic_ns(time)),
+            RichDeviceAddress(address, interval),
+            RichAdvertisement(advertisement_data, config),
+        )
+    console.print(table)
+
+    if chunk.output_format == "html":
+        return console.export_html(inline_styles=True, code_format="{code}")
+    if chunk.output_format == "svg":
+        return console.export_svg(title=chunk.title)
+    return console.export_text()
+
+
+def _initialize_worker(permutation_table: list[int]) -> None:
+    """Initialize a rendering process with the hash of the main process.
+
+    The colors of addresses and times are derived from a hash with a random
+    permutation table, so every process needs the same table to render the same
+    address in the same color.
+
+    Args:
+        permutation_table (list[int]): The permutation table of the main process.
+    """
+    utils.permutation_table[:] = permutation_table
+
+
+def _chunks(
+    advertisements: Iterable[tuple[datetime, str, AdvertisementData, int | None]],
+    output_format: str,
+    width: int,
+    chunk_size: int,
+) -> Iterator[RenderChunk]:
+    """Split advertisements in chunks.
+
+    Args:
+        advertisements (Iterable[tuple[datetime, str, AdvertisementData, int | None]]):
+            The time, address, data and advertising interval of the advertisements.
+        output_format (str): The format to render to.
+        width (int): The width of the report in characters.
+        chunk_size (int): The number of advertisements in a chunk.
+
+    Yields:
+        RenderChunk: The chunks, in order.
+    """
+    iterator = iter(advertisements)
+    first = 1
+    while batch := list(islice(iterator, chunk_size)):
+        last = first + len(batch) - 1
+        yield RenderChunk(
+            batch,
+            output_format,
+            width,
+            first == 1,
+            f"HumBLE Explorer - advertisements {first}-{last}",
+        )
+        first = last + 1
+
+
+def _stack_svg(chunks: Iterable[str]) -> str:
+    """Stack rendered SVG chunks below each other in one SVG document.
+
+    Args:
+        chunks (Iterable[str]): The rendered chunks.
+
+    Returns:
+        str: The SVG document.
+    """
+    parts = []
+    width = 0.0
+    height = 0.0
+    for chunk in chunks:
+        size = SVG_SIZE.search(chunk)
+        if not size:
+            continue
+        chunk_width, chunk_height = float(size[1]), float(size[2])
+        parts.append(
+            chunk.replace(
+                "<svg ",
+                f'<svg y="{height:.1f}" width="{chunk_width:.1f}" '
+                f'height="{chunk_height:.1f}" ',
+                1,
+            ),
+        )
+        width = max(width, chunk_width)
+        height += chunk_height
+    return "\n".join(
+        [
+            f'<svg viewBox="0 0 {width:.1f} {height:.1f}" '
+            'xmlns="http://www.w3.org/2000/svg">',
+            *parts,
+            "</svg>\n",
+        ],
+    )
+
+
+def render(  # noqa: PLR0913
+    advertisements: Iterable[tuple[datetime, str, AdvertisementData]],
+    stream: IO[str],
+    output_format: str,
+    filter_expression: str = "",
+    width: int = DEFAULT_WIDTH,
+    processes: int | None = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> int:
+    """Render advertisements to a report.
+
+    Args:
+        advertisements (Iterable[tuple[datetime, str, AdvertisementData]]): The
+            time, address and data of each advertisement, in order.
+        stream (IO[str]): The stream to write the report to.
+        output_format (str): The format to render to: ``html``, ``svg`` or ``txt``.
+        filter_expression (str): Only render advertisements matching this filter
+            expression.
+        width (int): The width of the report in characters.
+        processes (int, optional): The number of processes to render with, or
+            ``None`` for the number of CPUs.
+        chunk_size (int): The number of advertisements rendered by a process at a
+            time.
+
+    Returns:
+        int: The number of rendered advertisements.
+    """
+    devices = DeviceRegistry()
+    advertisement_filter = AdvertisementFilter(filter_expression)
+    rendered = 0
+
+    def matching_advertisements() -> (
+        Iterator[tuple[datetime, str, AdvertisementData, int | None]]
+    ):
+        nonlocal rendered
+        for time, address, advertisement_data in advertisements:
+            timestamp = datetime_to_monotonic_ns(time)
+            # Estimate the advertising interval from all advertisements
+            interval = devices.observe(address, timestamp)
+            if advertisement_filter.matches(address, advertisement_data, timestamp):
+                rendered += 1
+                yield time, address, advertisement_data, interval
+
+    chunks = _chunks(matching_advertisements(), output_format, width, chunk_size)
+    if output_format == "svg":
+        stream.write(_stack_svg(_render_in_order(chunks, processes)))
+    elif output_format == "html":
+        stream.write(
+            HTML_HEADER.format(
+                foreground=DEFAULT_TERMINAL_THEME.foreground_color.hex,
+                background=DEFAULT_TERMINAL_THEME.background_color.hex,
+            ),
+        )
+        stream.writelines(_render_in_order(chunks, processes))
+        stream.write(HTML_FOOTER)
+    else:
+        stream.writelines(_render_in_order(chunks, processes))
+    return rendered
+
+
+def _render_in_order(
+    chunks: Iterable[RenderChunk],
+    processes: int | None,
+) -> Iterator[str]:
+    """Render chunks in parallel and yield them in order.
+
+    A capture with only one chunk is rendered in the current process.
+
+    Args:
+        chunks (Iterable[RenderChunk]): The chunks to render.
+        processes (int, optional): The number of processes to render with, or
+            ``None`` for the number of CPUs.
+
+    Yields:
+        str: The rendered chunks, in order.
+    """
+    iterator = iter(chunks)
+    first_chunks = list(islice(iterator, 2))
+    processes = processes or os.cpu_count() or 1
+    if len(first_chunks) < 2 or processes == 1:  # noqa: PLR2004
+        for chunk in chain(first_chunks, iterator):
+            yield render_chunk(chunk)
+        return
+
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(
+        processes,
+        _initialize_worker,
+        (utils.permutation_table,),
+    ) as pool:
+        pending: deque[AsyncResult[str]] = deque()
+        for chunk in chain(first_chunks, iterator):
+            pending.append(pool.apply_async(render_chunk, (chunk,)))
+            if len(pending) >= CHUNKS_IN_FLIGHT * processes:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
@@ -1,14 +1,23 @@
 """Module with Rich renderables for HumBLE Explorer's user interface."""
 from __future__ import annotations
 
+from datetime import datetime
+from functools import lru_cache
+from itertools import zip_longest
 from string import printable, whitespace
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, TypeVar
 from uuid import UUID
 
 if TYPE_CHECKING:
-    from datetime import datetime
+    from collections.abc import Mapping
 
     from bleak.backends.scanner import AdvertisementData
+    from rich.console import Console, ConsoleOptions, RenderResult
+
+    from humble_explorer.memory import MemorySample
+    from humble_explorer.presence import PresenceEvent
+    from humble_explorer.records import AdvertisementRecord
+    from humble_explorer.sketches import TrafficSummary
 
 from bluetooth_numbers import company, oui, service
 from bluetooth_numbers.exceptions import (
@@ -18,11 +27,14 @@ from bluetooth_numbers.exceptions import (
     WrongOUIFormatError,
 )
 from rich._palettes import EIGHT_BIT_PALETTE
+from rich.measure import Measurement
 from rich.style import Style
 from rich.table import Table
 from rich.text import Text
-from rich.tree import Tree
 
+from humble_explorer.memory import format_size
+from humble_explorer.presence import APPEARED
+from humble_explorer.records import WALL_CLOCK_OFFSET_NS
 from humble_explorer.utils import hash8
 
 __author__ = "Koen Vervloesem"
@@ -30,60 +42,198 @@ __copyright__ = "Koen Vervloesem"
 __license__ = "MIT"
 
 PRINTABLE_CHARS = printable.replace(whitespace, " ")
+CHANGED_BYTE_STYLE = "black on yellow"
+WATCH_STYLE = "bold red"
+
+# Guides to draw a tree in a flat list of lines, the same way as rich.tree.Tree.
+TREE_BRANCH = "├── "
+TREE_LAST_BRANCH = "└── "
+TREE_CONTINUE = "│   "
+TREE_SPACE = "    "
+
+Entry = TypeVar("Entry")
+
+# Width of a time in HH:MM:SS.ffffff format
+TIME_WIDTH = 15
+
+# Number of devices, company IDs and service UUIDs in the traffic summary
+SUMMARY_ROWS = 10
+
+# Default maximum number of bytes shown of a payload: the maximum length of a legacy
+# advertisement, so only payloads of extended advertisements are truncated
+DEFAULT_PAYLOAD_BYTES = 31
+
+# Maximum number of payloads or service UUIDs in a collapsed list
+COLLAPSED_ENTRIES = 4
+
+# Number of bytes on every line of the hex dump of an expanded payload
+DUMP_LINE_BYTES = 16
+
+
+@lru_cache(maxsize=4096)
+def oui_description(address: str) -> str:
+    """Look up the description of the OUI of a Bluetooth address.
+
+    The result is cached per address, because the same addresses are seen over and
+    over again.
+
+    Args:
+        address (str): The Bluetooth address.
+
+    Returns:
+        str: The description of the OUI, or an empty string if it's unknown.
+    """
+    try:
+        return oui[address[:8]]
+    except (UnknownOUIError, WrongOUIFormatError):
+        # This could be macOS that returns a UUID instead of Bluetooth address
+        return ""
+
+
+@lru_cache(maxsize=256)
+def wall_clock_second(second: int) -> tuple[str, Style]:
+    """Format a second of the wall clock and choose its color.
+
+    The result is cached, because all advertisements within the same second share
+    it.
+
+    Args:
+        second (int): The number of seconds since the Unix epoch.
+
+    Returns:
+        tuple[str, Style]: The local time of the second in ``HH:MM:SS`` format and
+        the style to show it in.
+    """
+    # A naive local time, like the other times in the table
+    local_time = datetime.fromtimestamp(second)  # noqa: DTZ006
+    formatted = local_time.strftime("%H:%M:%S")
+    return formatted, Style(color=EIGHT_BIT_PALETTE[hash8(formatted)].hex)
 
 
 class RichTime:
     """Rich renderable that shows a time.
 
-    All times within the same second are rendered in the same color.
+    The time is kept as a monotonic timestamp and only formatted when it's rendered,
+    which the table only does for visible rows. The width is fixed, so the table
+    can measure the column without rendering the time. All times within the same
+    second are rendered in the same color.
     """
 
-    def __init__(self, time: datetime) -> None:
+    __slots__ = ("time",)
+
+    def __init__(self, time: int) -> None:
         """Create a RichTime object.
 
         Args:
-            time (datetime): The time to show.
+            time (int): The monotonic timestamp to show, in nanoseconds.
         """
-        self.full_time = time.strftime("%H:%M:%S.%f")
-        self.style = Style(
-            color=EIGHT_BIT_PALETTE[hash8(time.strftime("%H:%M:%S"))].hex,
-        )
+        self.time = time
 
-    def __rich__(self) -> Text:
-        """Render the RichTime object.
+    @property
+    def full_time(self) -> str:
+        """The time in ``HH:MM:SS.ffffff`` format.
 
         Returns:
+            str: The formatted local time.
+        """
+        second, nanoseconds = divmod(self.time + WALL_CLOCK_OFFSET_NS, 1_000_000_000)
+        return f"{wall_clock_second(second)[0]}.{nanoseconds // 1000:06d}"
+
+    @property
+    def style(self) -> Style:
+        """The style of the time, the same for all times in the same second.
+
+        Returns:
+            Style: The style.
+        """
+        second = (self.time + WALL_CLOCK_OFFSET_NS) // 1_000_000_000
+        return wall_clock_second(second)[1]
+
+    def __rich_measure__(
+        self,
+        console: Console,
+        options: ConsoleOptions,
+    ) -> Measurement:
+        """Measure the width of the RichTime object without rendering it.
+
+        Args:
+            console (Console): The console.
+            options (ConsoleOptions): The console options.
+
+        Returns:
+            Measurement: The width of a time in ``HH:MM:SS.ffffff`` format.
+        """
+        return Measurement(TIME_WIDTH, TIME_WIDTH)
+
+    def __rich_console__(
+        self,
+        console: Console,
+        options: ConsoleOptions,
+    ) -> RenderResult:
+        """Render the RichTime object.
+
+        This isn't a ``__rich__`` method, because the table would call that to
+        measure the column, which would format every time.
+
+        Args:
+            console (Console): The console.
+            options (ConsoleOptions): The console options.
+
+        Yields:
             Text: The rendering of the RichTime object.
         """
-        return Text(self.full_time, style=self.style)
+        yield Text(self.full_time, style=self.style)
 
 
 class RichDeviceAddress:
     """Rich renderable that shows a Bluetooth device address aand OUI description.
 
-    Every address is rendered in its own color.
+    Every address is rendered in its own color. The address of a known device with a
+    resolvable private address is rendered in the color of the device, with its
+    name. If the advertising interval of the device is known, it's shown below the
+    address. The address of an advertisement on the watchlist is highlighted, with
+    the label of the matching term.
     """
 
-    def __init__(self, address: str) -> None:
+    def __init__(
+        self,
+        address: str,
+        interval: int | None = None,
+        identity: str | None = None,
+        watch_label: str | None = None,
+    ) -> None:
         """Create a RichDeviceAddress object.
 
         Args:
             address (str): The address to show.
+            interval (int, optional): The estimated advertising interval of the
+                device in milliseconds.
+            identity (str, optional): The name of the device using the address, if
+                it's a resolved private address.
+            watch_label (str, optional): The label of the first watchlist term that
+                the advertisement matches, if any.
         """
         self.address = address
-        self.style = Style(color=EIGHT_BIT_PALETTE[hash8(self.address)].hex)
-        try:
-            self.oui = oui[self.address[:8]]
-        except (UnknownOUIError, WrongOUIFormatError):
-            # This could be macOS that returns a UUID instead of Bluetooth address
-            self.oui = ""
+        self.style = Style(color=EIGHT_BIT_PALETTE[hash8(identity or address)].hex)
+        self.oui = oui_description(self.address)
+        self.lines = [
+            Text(
+                self.address,
+                style=self.style + Style(reverse=True) if watch_label else self.style,
+            ),
+        ]
+        if watch_label:
+            self.lines.append(Text(watch_label, style=WATCH_STYLE))
+        if identity:
+            self.lines.append(Text(identity, style=self.style + Style(bold=True)))
+        if self.oui:
+            self.lines.append(Text(self.oui))
+        if interval is not None:
+            self.lines.append(Text(f"every ~{interval} ms", style="dim"))
 
     def height(self) -> int:
         """Return the number of lines this Rich renderable uses."""
-        height = 1
-        if self.oui:
-            height += 1
-        return height
+        return len(self.lines)
 
     def __rich__(self) -> Text:
         """Render the RichDeviceAddress object.
@@ -91,10 +241,145 @@ class RichDeviceAddress:
         Returns:
             Text: The rendering of the RichDeviceAddress object.
         """
-        if self.oui:
-            return Text.assemble(Text(self.address, style=self.style), f"\n{self.oui}")
+        return Text("\n").join(self.lines)
+
+
+class RichPresenceEvent:
+    """Rich renderable that shows a device that appeared or is gone."""
+
+    def __init__(self, event: PresenceEvent) -> None:
+        """Create a RichPresenceEvent object.
+
+        Args:
+            event (PresenceEvent): The presence event to show.
+        """
+        self.event = event
+
+    def __rich__(self) -> Text:
+        """Render the RichPresenceEvent object.
 
-        return Text(self.address, style=self.style)
+        Returns:
+            Text: The rendering of the RichPresenceEvent object.
+        """
+        time = RichTime(self.event.time)
+        address = self.event.address
+        return Text.assemble(
+            (time.full_time, time.style),
+            " ",
+            ("appeared", "green")
+            if self.event.kind == APPEARED
+            else ("gone    ", "red"),
+            " ",
+            (address, Style(color=EIGHT_BIT_PALETTE[hash8(address)].hex)),
+        )
+
+
+class RichMemorySample:
+    """Rich renderable that shows the memory use of HumBLE Explorer's subsystems."""
+
+    def __init__(self, sample: MemorySample) -> None:
+        """Create a RichMemorySample object.
+
+        Args:
+            sample (MemorySample): The memory sample to show.
+        """
+        self.sample = sample
+
+    def __rich__(self) -> Text:
+        """Render the RichMemorySample object.
+
+        Returns:
+            Text: The rendering of the RichMemorySample object, with the change of
+            every subsystem since the mark, if there's one.
+        """
+        text = Text.assemble(
+            ("Memory ", "bold"),
+            format_size(sum(self.sample.subsystems.values())),
+        )
+        for subsystem, size in self.sample.subsystems.items():
+            text.append(" │ ")
+            text.append(subsystem, "bold")
+            text.append(f" {format_size(size)}")
+            if self.sample.changes is not None:
+                change = self.sample.changes[subsystem]
+                text.append(
+                    f" ({format_size(change, signed=True)})",
+                    "red" if change > 0 else "green",
+                )
+        return text
+
+
+def _count_cell(key: Text, count: int, error: int) -> Text:
+    """Show a key with its count in the traffic summary.
+
+    Args:
+        key (Text): The rendered key.
+        count (int): The estimated count of the key.
+        error (int): The maximum overestimation of the count.
+
+    Returns:
+        Text: The key with its count, and the error if there is one.
+    """
+    text = Text.assemble(key, f" {count}")
+    if error:
+        text.append(f" ±{error}", "dim")
+    return text
+
+
+class RichTrafficSummary:
+    """Rich renderable that shows the busiest devices and distinct addresses."""
+
+    def __init__(self, summary: TrafficSummary, now: int) -> None:
+        """Create a RichTrafficSummary object.
+
+        Args:
+            summary (TrafficSummary): The traffic summary to show.
+            now (int): The monotonic timestamp of the end of the sliding windows in
+                nanoseconds.
+        """
+        self.summary = summary
+        self.now = now
+
+    def __rich__(self) -> Table:
+        """Render the RichTrafficSummary object.
+
+        Returns:
+            Table: The rendering of the RichTrafficSummary object, with the
+            packet counts of the busiest keys. Counts that can be overestimated
+            show their maximum error.
+        """
+        table = Table(
+            title=Text.assemble(
+                ("Distinct addresses ", "bold"),
+                f"last minute ~{self.summary.last_minute.count(self.now)} │ "
+                f"last hour ~{self.summary.last_hour.count(self.now)}",
+            ),
+            expand=True,
+            box=None,
+        )
+        table.add_column(f"Devices ({self.summary.devices.total} packets)", ratio=1)
+        table.add_column("Company IDs", ratio=1)
+        table.add_column("Service UUIDs", ratio=2)
+
+        devices = [
+            _count_cell(
+                Text(device, Style(color=EIGHT_BIT_PALETTE[hash8(device)].hex)),
+                count,
+                error,
+            )
+            for device, count, error in self.summary.devices.top(SUMMARY_ROWS)
+        ]
+        companies = [
+            _count_cell(RichCompanyID(cic).__rich__(), count, error)
+            for cic, count, error in self.summary.companies.top(SUMMARY_ROWS)
+        ]
+        uuids = [
+            _count_cell(RichUUID(uuid).__rich__(), count, error)
+            for uuid, count, error in self.summary.uuids.top(SUMMARY_ROWS)
+        ]
+        for row in zip_longest(devices, companies, uuids, fillvalue=""):
+            table.add_row(*row)
+        return table
 
 
 class RichRSSI:
@@ -179,16 +464,63 @@ class RichCompanyID:
         return Text.assemble(f"0x{self.cic:04x} (", manufacturer_name, ")")
 
 
+def changed_bytes(data: bytes, previous: bytes | None) -> list[int]:
+    """Return the positions of the bytes that differ from the previous data.
+
+    The comparison is proportional to the length of the data. Bytes beyond the end
+    of the previous data count as changed.
+
+    Args:
+        data (bytes): The data.
+        previous (bytes, optional): The previous data to compare with, or ``None``
+            if there's no previous data.
+
+    Returns:
+        list[int]: The positions of all changed bytes, or an empty list if there's
+        no previous data.
+    """
+    if previous is None or data is previous:
+        return []
+    changed = [
+        position
+        for position, (byte, previous_byte) in enumerate(zip(data, previous))
+        if byte != previous_byte
+    ]
+    changed.extend(range(len(previous), len(data)))
+    return changed
+
+
+def _highlight_bytes(text: Text, positions: list[int]) -> Text:
+    """Highlight bytes in a text that shows three characters for each byte.
+
+    Args:
+        text (Text): The text with the bytes.
+        positions (list[int]): The positions of the bytes to highlight.
+
+    Returns:
+        Text: The text with the highlighted bytes.
+    """
+    for position in positions:
+        text.stylize(CHANGED_BYTE_STYLE, 3 * position, 3 * position + 2)
+    return text
+
+
 class RichHexData:
-    """Rich renderable that shows hex data."""
+    """Rich renderable that shows hex data.
 
-    def __init__(self, data: bytes) -> None:
+    Bytes that differ from previous data can be highlighted.
+    """
+
+    def __init__(self, data: bytes, previous: bytes | None = None) -> None:
         """Create a RichHexData object.
 
         Args:
             data (bytes): The hex data to show.
+            previous (bytes, optional): The previous data to highlight the changes
+                against, or ``None`` to highlight nothing.
         """
         self.data = data
+        self.previous = previous
 
     def __rich__(self) -> Text:
         """Render the RichHexData object.
@@ -201,24 +533,31 @@ class RichHexData:
         hex_data = " ".join(
             a + b for a, b in zip(hex_data_str[::2], hex_data_str[1::2])
         )
-        return Text(hex_data, style="cyan bold")
+        return _highlight_bytes(
+            Text(hex_data, style="cyan bold"),
+            changed_bytes(self.data, self.previous),
+        )
 
 
 class RichHexString:
     """Rich renderable that shows hex data as a string.
 
-    Non-printable characters are replaced by a dot.
+    Non-printable characters are replaced by a dot. Bytes that differ from previous
+    data can be highlighted.
     """
 
-    def __init__(self, data: bytes) -> None:
+    def __init__(self, data: bytes, previous: bytes | None = None) -> None:
         """Create a RichHexString object.
 
         Args:
             data (bytes): The hex data to show.
+            previous (bytes, optional): The previous data to highlight the changes
+                against, or ``None`` to highlight nothing.
         """
         self.data = data
+        self.previous = previous
 
-    def __rich__(self) -> str:
+    def __rich__(self) -> Text:
         """Render the RichHexString object.
 
         Returns:
@@ -232,99 +571,425 @@ class RichHexString:
             else:
                 result.append(" .")
 
-        return " ".join(result)
+        return _highlight_bytes(
+            Text(" ".join(result)),
+            changed_bytes(self.data, self.previous),
+        )
+
+
+class DisplayConfig:
+    """Configuration of which advertisement data to show, shared by all rows.
+
+    It also configures whether bytes that changed compared to the previous payload
+    of the same device are highlighted. Every change of the configuration increases
+    its version, so renderables can cheaply check whether what they computed earlier
+    is still valid.
+    """
+
+    DATA_TYPES = (
+        "local_name",
+        "rssi",
+        "tx_power",
+        "manufacturer_data",
+        "service_data",
+        "service_uuids",
+    )
+
+    def __init__(self, payload_bytes: int | None = None) -> None:
+        """Create a DisplayConfig object that shows all data types.
+
+        Args:
+            payload_bytes (int, optional): The maximum number of bytes shown of
+                every payload, or ``None`` to show all bytes. With a maximum, every
+                list of payloads or service UUIDs also shows at most
+                :data:`COLLAPSED_ENTRIES` entries, so the height of a row is
+                bounded. Expanded advertisements show everything.
+        """
+        self.payload_bytes = payload_bytes
+        self.show_data = dict.fromkeys(self.DATA_TYPES, True)
+        self.highlight_changes = False
+        self.version = 0
+        self._heights: dict[tuple[tuple[str, int], ...], int] = {}
+
+    def __getitem__(self, data_type: str) -> bool:
+        """Return whether a data type should be shown.
+
+        Args:
+            data_type (str): The advertisement data type.
+
+        Returns:
+            bool: ``True`` if this data type should be shown and ``False`` if not.
+        """
+        return self.show_data[data_type]
+
+    def set_shown(self, data_type: str, *, show: bool) -> None:
+        """Show or hide a data type.
+
+        Args:
+            data_type (str): The advertisement data type.
+            show (bool): ``True`` to show this data type, ``False`` to hide it.
+        """
+        if self.show_data[data_type] != show:
+            self.show_data[data_type] = show
+            self.version += 1
+            self._heights.clear()
+
+    def set_highlight_changes(self, *, highlight: bool) -> None:
+        """Highlight changed bytes in payloads or not.
+
+        Args:
+            highlight (bool): ``True`` to highlight changed bytes, ``False`` to show
+                all bytes the same way.
+        """
+        if self.highlight_changes != highlight:
+            self.highlight_changes = highlight
+            self.version += 1
+
+    def height(self, shape: tuple[tuple[str, int], ...]) -> int:
+        """Return the height of a layout with the current configuration.
+
+        Many advertisements share the same shape, so the height is computed only
+        once per shape and configuration.
+
+        Args:
+            shape (tuple[tuple[str, int], ...]): The number of lines of each data
+                type in the layout.
+
+        Returns:
+            int: The number of lines of the shown data types.
+        """
+        try:
+            return self._heights[shape]
+        except KeyError:
+            height = sum(
+                lines for data_type, lines in shape if self.show_data[data_type]
+            )
+            self._heights[shape] = height
+            return height
 
 
 class RichAdvertisement:
-    """Rich renderable that shows advertisement data."""
+    """Rich renderable that shows advertisement data.
+
+    The advertisement is laid out once in a flat list of lines, from which both the
+    height and the rendering are derived. Changes in the shared display
+    configuration only change which of these lines are used.
+
+    Long payloads are truncated as configured in the display configuration, until
+    the advertisement is expanded. An expanded advertisement shows the full hex dump
+    of every truncated payload.
+    """
 
-    def __init__(self, data: AdvertisementData, show_data: dict[str, bool]) -> None:
+    def __init__(
+        self,
+        data: AdvertisementData | AdvertisementRecord,
+        config: DisplayConfig,
+        previous_payloads: Mapping[int | str, bytes] | None = None,
+    ) -> None:
         """Create a RichAdvertisement object.
 
         Args:
-            data (AdvertisementData): The advertisement data to show.
-            show_data (dict[str, bool]): Which data to show.
+            data (AdvertisementData | AdvertisementRecord): The advertisement data
+                to show.
+            config (DisplayConfig): Which data to show.
+            previous_payloads (Mapping[int | str, bytes], optional): The previous
+                manufacturer data (by company ID) and service data (by service UUID)
+                of the same device, to highlight changed bytes.
         """
         self.data = data
-        self.show_data = show_data
+        self.config = config
+        self.previous_payloads = previous_payloads or {}
+        self._lines: list[tuple[str, Text]] | None = None
+        self._expanded = False
+        self._highlighted = False
+        self._shape: tuple[tuple[str, int], ...] = ()
+        self._height = 0
+        self._height_version = -1
+
+    @property
+    def expanded(self) -> bool:
+        """Whether the full payloads and all entries are shown.
 
-    def height(self) -> int:
-        """Return the number of lines this Rich renderable uses."""
-        height = 0
-        if self.data.local_name and self.show_data["local_name"]:
-            height += 1
-        if self.data.rssi and self.show_data["rssi"]:
-            height += 1
-        if self.data.tx_power and self.show_data["tx_power"]:
-            height += 1
-        if self.data.manufacturer_data and self.show_data["manufacturer_data"]:
-            height = height + 1 + 3 * len(self.data.manufacturer_data)
-        if self.data.service_data and self.show_data["service_data"]:
-            height = height + 1 + 3 * len(self.data.service_data)
-        if self.data.service_uuids and self.show_data["service_uuids"]:
-            height = height + 1 + len(self.data.service_uuids)
-        return height
+        Returns:
+            bool: ``True`` if the advertisement is expanded, ``False`` if its long
+            payloads and lists are truncated.
+        """
+        return self._expanded
 
-    def __rich__(self) -> Table:
-        """Render the RichAdvertisement object.
+    @expanded.setter
+    def expanded(self, expanded: bool) -> None:
+        """Expand or collapse the advertisement, which lays it out again.
+
+        Args:
+            expanded (bool): ``True`` to expand the advertisement, ``False`` to
+                collapse it.
+        """
+        if self._expanded != expanded:
+            self._expanded = expanded
+            self._lay_out()
+            self._height_version = -1
+
+    @property
+    def lines(self) -> list[tuple[str, Text]]:
+        """The lines of this advertisement, laid out on first use.
+
+        Returns:
+            list[tuple[str, Text]]: The data type and text of each line in the
+                rendering, including the lines of hidden data types.
+        """
+        if self._lines is None or (
+            self._highlighted != self.config.highlight_changes
+            and self.previous_payloads
+        ):
+            self._lay_out()
+        return self._lines  # type: ignore[return-value]
+
+    def _lay_out(self) -> None:
+        """Lay out the advertisement and count the lines of each data type."""
+        self._highlighted = self.config.highlight_changes
+        self._lines = self._layout()
+        section_heights: dict[str, int] = {}
+        for data_type, _ in self._lines:
+            section_heights[data_type] = section_heights.get(data_type, 0) + 1
+        self._shape = tuple(section_heights.items())
+
+    def _layout(self) -> list[tuple[str, Text]]:
+        """Lay out all advertisement data.
 
         Returns:
-            Table: The rendering of the RichAdvertisement object.
+            list[tuple[str, Text]]: The data type and text of each line in the
+                rendering.
         """
-        table = Table(show_header=False, show_edge=False, padding=0)
+        lines: list[tuple[str, Text]] = []
+        previous = self.previous_payloads if self._highlighted else {}
 
         # Show local name
-        if self.data.local_name and self.show_data["local_name"]:
-            table.add_row(
-                Text.assemble("local name: ", (self.data.local_name, "green bold")),
+        if self.data.local_name:
+            lines.append(
+                (
+                    "local_name",
+                    Text.assemble("local name: ", (self.data.local_name, "green bold")),
+                ),
             )
 
         # Show RSSI
-        if self.data.rssi and self.show_data["rssi"]:
-            table.add_row(Text.assemble("RSSI: ", RichRSSI(self.data.rssi).__rich__()))
-
-        # Show TX Power
-        if self.data.tx_power and self.show_data["tx_power"]:
-            table.add_row(
-                Text.assemble("TX power: ", RichRSSI(self.data.tx_power).__rich__()),
+        if self.data.rssi:
+            lines.append(
+                ("rssi", Text.assemble("RSSI: ", RichRSSI(self.data.rssi).__rich__())),
             )
 
-        # Show manufacturer data
-        if self.data.manufacturer_data and self.show_data["manufacturer_data"]:
-            tree = Tree("manufacturer data:")
-            for cic, value in self.data.manufacturer_data.items():
-                company_structure = Tree(
+        # Show TX Power
+        if self.data.tx_power:
+            lines.append(
+                (
+                    "tx_power",
                     Text.assemble(
-                        RichCompanyID(cic).__rich__(),
-                        f" → {len(value)} bytes",
+                        "TX power: ",
+                        RichRSSI(self.data.tx_power).__rich__(),
                     ),
-                )
-                company_structure.add(
-                    Text.assemble("hex  → ", RichHexData(value).__rich__()),
-                )
-                company_structure.add(
-                    Text.assemble("text → ", RichHexString(value).__rich__()),
-                )
-                tree.add(company_structure)
-            table.add_row(tree)
-
-        # Show service data
-        if self.data.service_data and self.show_data["service_data"]:
-            tree = Tree("service data:")
-            for uuid, value in self.data.service_data.items():
-                svc_uuid = Tree(
-                    Text.assemble(RichUUID(uuid).__rich__(), f" → {len(value)} bytes"),
-                )
-                svc_uuid.add(Text.assemble("hex  → ", RichHexData(value).__rich__()))
-                svc_uuid.add(Text.assemble("text → ", RichHexString(value).__rich__()))
-                tree.add(svc_uuid)
-            table.add_row(tree)
+                ),
+            )
+
+        # Show manufacturer data and service data, truncated if needed
+        limit = None if self._expanded else self.config.payload_bytes
+        dump = self._expanded and self.config.payload_bytes is not None
+        if self.data.manufacturer_data:
+            tree = [Text("manufacturer data:")]
+            tree.extend(
+                _payload_tree(
+                    [
+                        (RichCompanyID(cic).__rich__(), value, previous.get(cic))
+                        for cic, value in self.data.manufacturer_data.items()
+                    ],
+                    limit,
+                    dump=dump,
+                ),
+            )
+            lines.extend(("manufacturer_data", line) for line in tree)
+
+        if self.data.service_data:
+            tree = [Text("service data:")]
+            tree.extend(
+                _payload_tree(
+                    [
+                        (RichUUID(uuid).__rich__(), value, previous.get(uuid))
+                        for uuid, value in self.data.service_data.items()
+                    ],
+                    limit,
+                    dump=dump,
+                ),
+            )
+            lines.extend(("service_data", line) for line in tree)
 
         # Show service UUIDs with their description
-        if self.data.service_uuids and self.show_data["service_uuids"]:
-            tree = Tree("service UUIDs:")
-            for uuid in sorted(self.data.service_uuids):
-                tree.add(RichUUID(uuid))
-            table.add_row(tree)
+        if self.data.service_uuids:
+            tree = [Text("service UUIDs:")]
+            uuids = sorted(self.data.service_uuids)
+            shown = _collapse(uuids, limit)
+            for index, uuid in enumerate(shown):
+                guide = TREE_LAST_BRANCH if index == len(uuids) - 1 else TREE_BRANCH
+                tree.append(Text.assemble(guide, RichUUID(uuid).__rich__()))
+            if len(shown) < len(uuids):
+                tree.append(_more_entries(len(uuids) - len(shown), "UUIDs"))
+            lines.extend(("service_uuids", line) for line in tree)
+
+        return lines
+
+    @property
+    def shape(self) -> tuple[tuple[str, int], ...]:
+        """The number of lines of each data type in the layout.
 
-        return table
+        Returns:
+            tuple[tuple[str, int], ...]: The data types with their number of lines.
+        """
+        if self._lines is None:
+            self._lay_out()
+        return self._shape
+
+    def height(self) -> int:
+        """Return the number of lines this Rich renderable uses.
+
+        The height is only recomputed after the display configuration has changed.
+        """
+        if self._height_version != self.config.version:
+            if self._lines is None:
+                self._lay_out()
+            self._height = self.config.height(self._shape)
+            self._height_version = self.config.version
+        return self._height
+
+    def __rich__(self) -> Text:
+        """Render the RichAdvertisement object.
+
+        Returns:
+            Text: The rendering of the RichAdvertisement object.
+        """
+        show_data = self.config.show_data
+        return Text("\n").join(
+            line for data_type, line in self.lines if show_data[data_type]
+        )
+
+
+def _collapse(entries: list[Entry], limit: int | None) -> list[Entry]:
+    """Return the entries of a list that are shown.
+
+    Args:
+        entries (list[Entry]): All entries of the list.
+        limit (int, optional): The maximum number of payload bytes, or ``None`` if
+            nothing is truncated.
+
+    Returns:
+        list[Entry]: All entries if nothing is truncated, else at most
+        :data:`COLLAPSED_ENTRIES` entries.
+    """
+    if limit is None or len(entries) <= COLLAPSED_ENTRIES:
+        return entries
+    return entries[:COLLAPSED_ENTRIES]
+
+
+def _more_entries(number: int, name: str) -> Text:
+    """Show the number of entries that aren't shown in a collapsed list.
+
+    Args:
+        number (int): The number of hidden entries.
+        name (str): The name of the entries.
+
+    Returns:
+        Text: The last line of the collapsed list.
+    """
+    return Text.assemble(TREE_LAST_BRANCH, (f"+{number} {name}", "dim"))
+
+
+def _payload_tree(
+    payloads: list[tuple[Text, bytes, bytes | None]],
+    limit: int | None = None,
+    *,
+    dump: bool = False,
+) -> list[Text]:
+    """Lay out a tree of payloads with their hex data and text.
+
+    Args:
+        payloads (list[tuple[Text, bytes, bytes | None]]): The description, data
+            and previous data (to highlight changes against) of each payload.
+        limit (int, optional): The maximum number of bytes shown of each payload,
+            or ``None`` to show all bytes.
+        dump (bool): Whether to show a hex dump of the payloads that are truncated
+            when collapsed, instead of one line of hex data and text.
+
+    Returns:
+        list[Text]: Three lines of text for each payload, or more with a hex dump.
+    """
+    shown = _collapse(payloads, limit)
+    lines = []
+    for index, (description, value, previous) in enumerate(shown):
+        if index == len(payloads) - 1:
+            guide, indent = TREE_LAST_BRANCH, TREE_SPACE
+        else:
+            guide, indent = TREE_BRANCH, TREE_CONTINUE
+        lines.append(Text.assemble(guide, description, f" → {len(value)} bytes"))
+        if dump and len(value) > DUMP_LINE_BYTES:
+            lines.extend(_hex_dump(indent, value, previous))
+            continue
+
+        data, previous_data = value, previous
+        if limit is not None and len(value) > limit:
+            data = value[:limit]
+            previous_data = None if previous is None else previous[:limit]
+        hex_line = Text.assemble(
+            indent,
+            TREE_BRANCH,
+            "hex  → ",
+            RichHexData(data, previous_data).__rich__(),
+        )
+        if len(data) < len(value):
+            hex_line.append(f" … +{len(value) - len(data)} bytes", "dim")
+        lines.append(hex_line)
+        lines.append(
+            Text.assemble(
+                indent,
+                TREE_LAST_BRANCH,
+                "text → ",
+                RichHexString(data, previous_data).__rich__(),
+            ),
+        )
+    if len(shown) < len(payloads):
+        lines.append(_more_entries(len(payloads) - len(shown), "payloads"))
+    return lines
+
+
+def _hex_dump(indent: str, value: bytes, previous: bytes | None) -> list[Text]:
+    """Lay out a hex dump of a payload, with hex data and text on every line.
+
+    Args:
+        indent (str): The guides of the tree before every line.
+        value (bytes): The payload.
+        previous (bytes, optional): The previous payload to highlight changes
+            against, or ``None`` to highlight nothing.
+
+    Returns:
+        list[Text]: A line for every :data:`DUMP_LINE_BYTES` bytes of the payload.
+    """
+    lines = []
+    for offset in range(0, len(value), DUMP_LINE_BYTES):
+        end = offset + DUMP_LINE_BYTES
+        guide = TREE_LAST_BRANCH if end >= len(value) else TREE_BRANCH
+        hex_data = RichHexData(
+            value[offset:end],
+            None if previous is None else previous[offset:end],
+        ).__rich__()
+        # Pad the hex data of a short last line to align its text.
+        hex_data.pad_right(3 * DUMP_LINE_BYTES - 1 - len(hex_data))
+        lines.append(
+            Text.assemble(
+                indent,
+                guide,
+                f"{offset:04x} → ",
+                hex_data,
+                "  ",
+                RichHexString(
+                    value[offset:end],
+                    None if previous is None else previous[offset:end],
+                ).__rich__(),
+            ),
+        )
+    return lines
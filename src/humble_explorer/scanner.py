@@ -0,0 +1,195 @@
+"""This module configures the Bleak scanner for HumBLE Explorer."""
+from __future__ import annotations
+
+from platform import system
+from typing import TYPE_CHECKING, Any
+from uuid import UUID
+
+from humble_explorer.filters import BLUETOOTH_BASE_UUID, AdvertisementFilter
+
+if TYPE_CHECKING:
+    from argparse import Namespace
+
+    from bleak.backends.scanner import AdvertisementDataCallback
+
+if system() == "Linux":
+    from bleak.assigned_numbers import AdvertisementDataType
+    from bleak.backends.bluezdbus.advertisement_monitor import OrPattern
+    from bleak.backends.bluezdbus.scanner import BlueZScannerArgs
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+# Maximum length of the data in an AD structure of a legacy advertisement
+MAX_AD_DATA_LENGTH = 29
+
+
+def get_scanner_kwargs(
+    cli_args: Namespace,
+    detection_callback: AdvertisementDataCallback,
+) -> dict[str, Any]:
+    """Return the keyword arguments for a BleakScanner.
+
+    Args:
+        cli_args (argparse.Namespace): Command-line arguments.
+        detection_callback (AdvertisementDataCallback): The function to call for
+            each received advertisement.
+
+    Returns:
+        dict[str, Any]: The keyword arguments for :class:`bleak.BleakScanner`.
+    """
+    # Configure scanning mode
+    scanner_kwargs: dict[str, Any] = {"scanning_mode": cli_args.scanning_mode}
+
+    if system() == "Linux":
+        scanner_kwargs["bluez"] = get_bluez_scanner_args(
+            cli_args.scanning_mode,
+            AdvertisementFilter(cli_args.filter),
+        )
+    elif system() == "Darwin":
+        scanner_kwargs["cb"] = {"use_bdaddr": cli_args.macos_use_address}
+
+    # Configure Bluetooth adapter
+    scanner_kwargs["adapter"] = cli_args.adapter
+
+    # Configure scanner
+    scanner_kwargs["detection_callback"] = detection_callback
+
+    return scanner_kwargs
+
+
+def get_bluez_scanner_args(
+    scanning_mode: str,
+    advertisement_filter: AdvertisementFilter,
+) -> BlueZScannerArgs:
+    """Return the BlueZ arguments for a BleakScanner.
+
+    The filter is pushed down to BlueZ where possible, so advertisements that
+    don't match the filter don't even reach HumBLE Explorer. Advertisements that
+    BlueZ lets through are still filtered by HumBLE Explorer, because BlueZ can't
+    express every filter.
+
+    Args:
+        scanning_mode (str): The scanning mode, ``active`` or ``passive``.
+        advertisement_filter (AdvertisementFilter): The filter for advertisements.
+
+    Returns:
+        BlueZScannerArgs: The arguments for BlueZ.
+    """
+    if scanning_mode == "passive":
+        # Passive scanning with BlueZ needs at least one or_pattern.
+        or_patterns = get_or_patterns(advertisement_filter)
+        if not or_patterns:
+            # The following matches all devices.
+            or_patterns = [
+                OrPattern(0, AdvertisementDataType.FLAGS, b"\x06"),
+                OrPattern(0, AdvertisementDataType.FLAGS, b"\x1a"),
+            ]
+        return BlueZScannerArgs(or_patterns=or_patterns)
+
+    # Disable duplicate detection of advertisement data
+    # for a more low-level view of what packets are really sent.
+    bluez_args = BlueZScannerArgs(filters={"DuplicateData": True})
+    # BlueZ's pattern matches the prefix of the address or the name.
+    if advertisement_filter.address:
+        bluez_args["filters"]["Pattern"] = advertisement_filter.address
+    elif advertisement_filter.name:
+        bluez_args["filters"]["Pattern"] = advertisement_filter.name
+    return bluez_args
+
+
+def get_or_patterns(advertisement_filter: AdvertisementFilter) -> list[OrPattern]:
+    """Translate a filter to BlueZ advertisement monitor patterns.
+
+    BlueZ reports an advertisement if it matches any of the patterns, while an
+    advertisement matches the filter only if it matches all of its terms. So the
+    patterns of only one term are returned: the company ID if it's in the filter,
+    else the UUID, else the name. Addresses can't be expressed in patterns.
+
+    Args:
+        advertisement_filter (AdvertisementFilter): The filter for advertisements.
+
+    Returns:
+        list[OrPattern]: The patterns matching the advertisements of one of the
+        filter's terms, or an empty list if the filter can't be translated.
+    """
+    if advertisement_filter.company_id is not None:
+        return [
+            OrPattern(
+                0,
+                AdvertisementDataType.MANUFACTURER_SPECIFIC_DATA,
+                advertisement_filter.company_id.to_bytes(2, "little"),
+            ),
+        ]
+
+    if advertisement_filter.uuid is not None:
+        return _uuid_or_patterns(advertisement_filter.uuid)
+
+    if advertisement_filter.name:
+        name = advertisement_filter.name.encode()[:MAX_AD_DATA_LENGTH]
+        return [
+            OrPattern(0, AdvertisementDataType.COMPLETE_LOCAL_NAME, name),
+            OrPattern(0, AdvertisementDataType.SHORTENED_LOCAL_NAME, name),
+        ]
+
+    return []
+
+
+def _uuid_or_patterns(uuid: str) -> list[OrPattern]:
+    """Return the patterns matching service data or service UUIDs with a UUID.
+
+    A UUID can be in a list of UUIDs, so there's a pattern for each position in
+    the list.
+
+    Args:
+        uuid (str): The 128-bit UUID.
+
+    Returns:
+        list[OrPattern]: The patterns.
+    """
+    uuid_formats = [
+        (
+            UUID(uuid).bytes_le,
+            AdvertisementDataType.SERVICE_DATA_UUID128,
+            (
+                AdvertisementDataType.INCOMPLETE_LIST_SERVICE_UUID128,
+                AdvertisementDataType.COMPLETE_LIST_SERVICE_UUID128,
+            ),
+        ),
+    ]
+    if uuid.endswith(BLUETOOTH_BASE_UUID):
+        uuid32 = int(uuid[:8], 16)
+        uuid_formats.append(
+            (
+                uuid32.to_bytes(4, "little"),
+                AdvertisementDataType.SERVICE_DATA_UUID32,
+                (
+                    AdvertisementDataType.INCOMPLETE_LIST_SERVICE_UUID32,
+                    AdvertisementDataType.COMPLETE_LIST_SERVICE_UUID32,
+                ),
+            ),
+        )
+        if uuid32 <= 0xFFFF:  # noqa: PLR2004
+            uuid_formats.append(
+                (
+                    uuid32.to_bytes(2, "little"),
+                    AdvertisementDataType.SERVICE_DATA_UUID16,
+                    (
+                        AdvertisementDataType.INCOMPLETE_LIST_SERVICE_UUID16,
+                        AdvertisementDataType.COMPLETE_LIST_SERVICE_UUID16,
+                    ),
+                ),
+            )
+
+    or_patterns = []
+    for uuid_bytes, service_data_type, list_types in uuid_formats:
+        or_patterns.append(OrPattern(0, service_data_type, uuid_bytes))
+        for position in range(
+            0,
+            MAX_AD_DATA_LENGTH - len(uuid_bytes) + 1,
+            len(uuid_bytes),
+        ):
+            for list_type in list_types:
+                or_patterns.append(OrPattern(position, list_type, uuid_bytes))
+    return or_patterns
@@ -0,0 +1,381 @@
+"""This module summarizes traffic with probabilistic sketches of fixed size.
+
+In a crowded environment with tens of thousands of rotating addresses, exact counts
+per device grow without bound. The sketches in this module use a fixed amount of
+memory, whatever the number of distinct keys:
+
+* :class:`SpaceSaving` finds the keys with the highest counts with a fixed number of
+  counters. A new key replaces the key with the lowest count, and inherits its count
+  as the maximum error of its own count. Every key with a count higher than the
+  total count divided by the number of counters is guaranteed to be in the summary.
+* :class:`HyperLogLog` estimates the number of distinct keys from the longest runs
+  of zero bits in their hashes, with a relative standard error of
+  ``1.04 / sqrt(2 ** precision)``.
+* :class:`WindowedHyperLogLog` estimates the number of distinct keys in a sliding
+  window of time, with a ring of HyperLogLog sketches, one per part of the window.
+"""
+from __future__ import annotations
+
+import heapq
+from math import log
+from typing import TYPE_CHECKING, Generic, Hashable, TypeVar
+
+if TYPE_CHECKING:
+    from bleak.backends.scanner import AdvertisementData
+
+    from humble_explorer.records import AdvertisementRecord
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+# Default number of counters of a Space-Saving summary
+DEFAULT_COUNTERS = 256
+
+# Default precision of a HyperLogLog sketch: 4096 registers, with an error of 1.6%
+DEFAULT_PRECISION = 12
+MIN_PRECISION = 4
+MAX_PRECISION = 16
+
+HASH_BITS = 64
+HASH_MASK = (1 << HASH_BITS) - 1
+# Multipliers of the SplitMix64 finalizer, which spreads the bits of hashes of small
+# integers over all bits
+MIX_MULTIPLIER_1 = 0xBF58476D1CE4E5B9
+MIX_MULTIPLIER_2 = 0x94D049BB133111EB
+
+# Sliding windows of the distinct address counts, in nanoseconds, and the number of
+# parts of each window
+MINUTE_NS = 60_000_000_000
+HOUR_NS = 60 * MINUTE_NS
+MINUTE_WINDOW_PARTS = 6
+HOUR_WINDOW_PARTS = 60
+
+Key = TypeVar("Key", bound=Hashable)
+
+
+class SpaceSaving(Generic[Key]):
+    """Space-Saving summary of the keys with the highest counts.
+
+    The counters are kept in a min-heap, ordered by count. Incrementing the counter
+    of a key in the summary doesn't update the heap, so heap entries can have a lower
+    count than their counter. Those are corrected when they reach the top of the
+    heap while looking for the key with the lowest count.
+    """
+
+    def __init__(self, counters: int = DEFAULT_COUNTERS) -> None:
+        """Create an empty SpaceSaving object.
+
+        Args:
+            counters (int): The number of counters, which limits the memory use.
+        """
+        self.counters = counters
+        self.total = 0
+        self.counts: dict[Key, int] = {}
+        self.errors: dict[Key, int] = {}
+        # Exactly one entry of count and key for every key in the summary
+        self._heap: list[tuple[int, Key]] = []
+
+    def __len__(self) -> int:
+        """Return the number of keys in the summary.
+
+        Returns:
+            int: The number of keys, at most the number of counters.
+        """
+        return len(self.counts)
+
+    def add(self, key: Key, count: int = 1) -> None:
+        """Count a key.
+
+        Args:
+            key (Key): The key. All keys must be comparable with each other.
+            count (int): The number of times to count the key.
+        """
+        self.total += count
+        if key in self.counts:
+            self.counts[key] += count
+            return
+        if len(self.counts) < self.counters:
+            self.counts[key] = count
+            self.errors[key] = 0
+            heapq.heappush(self._heap, (count, key))
+            return
+
+        # Find the key with the lowest count, correcting outdated heap entries.
+        while True:
+            minimum, minimum_key = self._heap[0]
+            current = self.counts[minimum_key]
+            if current == minimum:
+                break
+            heapq.heapreplace(self._heap, (current, minimum_key))
+
+        # Replace it by the new key, which inherits its count as error.
+        del self.counts[minimum_key]
+        del self.errors[minimum_key]
+        self.counts[key] = minimum + count
+        self.errors[key] = minimum
+        heapq.heapreplace(self._heap, (minimum + count, key))
+
+    def top(self, number: int) -> list[tuple[Key, int, int]]:
+        """Return the keys with the highest counts.
+
+        Args:
+            number (int): The maximum number of keys to return.
+
+        Returns:
+            list[tuple[Key, int, int]]: The keys from the highest count to the
+            lowest, with their estimated count, which is never lower than the real
+            count, and the maximum overestimation of the count.
+        """
+        return [
+            (key, count, self.errors[key])
+            for key, count in heapq.nlargest(
+                number,
+                self.counts.items(),
+                key=lambda item: item[1],
+            )
+        ]
+
+    def clear(self) -> None:
+        """Forget all counts."""
+        self.total = 0
+        self.counts = {}
+        self.errors = {}
+        self._heap = []
+
+
+class HyperLogLog:
+    """HyperLogLog sketch of the number of distinct keys.
+
+    Keys are hashed with Python's :func:`hash`, which is randomized for strings in
+    every process, so sketches can only be merged within one process.
+    """
+
+    def __init__(self, precision: int = DEFAULT_PRECISION) -> None:
+        """Create an empty HyperLogLog object.
+
+        Args:
+            precision (int): The number of bits of the hash that select a register.
+                The sketch has ``2 ** precision`` registers of one byte.
+
+        Raises:
+            ValueError: If the precision is out of range.
+        """
+        if not MIN_PRECISION <= precision <= MAX_PRECISION:
+            msg = (
+                f"Precision {precision} isn't between {MIN_PRECISION} and "
+                f"{MAX_PRECISION}"
+            )
+            raise ValueError(msg)
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+        self._rank_bits = HASH_BITS - precision
+
+    def add(self, key: Hashable) -> None:
+        """Add a key.
+
+        Args:
+            key (Hashable): The key.
+        """
+        hash_value = hash(key) & HASH_MASK
+        hash_value = ((hash_value ^ hash_value >> 30) * MIX_MULTIPLIER_1) & HASH_MASK
+        hash_value = ((hash_value ^ hash_value >> 27) * MIX_MULTIPLIER_2) & HASH_MASK
+        hash_value ^= hash_value >> 31
+        register = hash_value >> self._rank_bits
+        # Position of the first one bit in the rest of the hash
+        rank = (
+            self._rank_bits
+            - (hash_value & ((1 << self._rank_bits) - 1)).bit_length()
+            + 1
+        )
+        self.registers[register] = max(rank, self.registers[register])
+
+    def merge(self, other: HyperLogLog) -> None:
+        """Add all keys of another sketch with the same precision.
+
+        Args:
+            other (HyperLogLog): The other sketch.
+        """
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        """Estimate the number of distinct keys.
+
+        Returns:
+            int: The estimated number of distinct keys.
+        """
+        return estimate_cardinality(self.registers)
+
+    def clear(self) -> None:
+        """Forget all keys."""
+        self.registers = bytearray(len(self.registers))
+
+
+# Powers of two of all possible register values, for the harmonic mean
+_INVERSE_POWERS = [2.0**-rank for rank in range(HASH_BITS + 1)]
+
+
+def estimate_cardinality(registers: bytes | bytearray) -> int:
+    """Estimate the number of distinct keys from the registers of a HyperLogLog.
+
+    Small numbers are estimated from the number of empty registers instead, which is
+    more accurate.
+
+    Args:
+        registers (bytes | bytearray): The registers.
+
+    Returns:
+        int: The estimated number of distinct keys.
+    """
+    size = len(registers)
+    alpha = 0.7213 / (1 + 1.079 / size)
+    estimate = alpha * size * size / sum(map(_INVERSE_POWERS.__getitem__, registers))
+    empty = registers.count(0)
+    if estimate <= 2.5 * size and empty:
+        estimate = size * log(size / empty)
+    return round(estimate)
+
+
+class WindowedHyperLogLog:
+    """Number of distinct keys in a sliding window of time.
+
+    The window is divided in parts with a HyperLogLog sketch each. The estimate
+    merges the sketches of all parts in the window, so the window slides one part at
+    a time.
+    """
+
+    def __init__(
+        self,
+        window: int,
+        parts: int,
+        precision: int = DEFAULT_PRECISION,
+    ) -> None:
+        """Create an empty WindowedHyperLogLog object.
+
+        Args:
+            window (int): The duration of the window in nanoseconds.
+            parts (int): The number of parts of the window.
+            precision (int): The precision of the HyperLogLog sketch of every part.
+        """
+        self.part_duration = -(-window // parts)
+        self.sketches = [HyperLogLog(precision) for _ in range(parts)]
+        # The part number of the time range of every sketch
+        self.parts: list[int | None] = [None] * parts
+
+    def _sketch(self, part: int) -> HyperLogLog:
+        """Return the sketch of a part, clearing it if it has an older part.
+
+        Args:
+            part (int): The part number, the time divided by the part duration.
+
+        Returns:
+            HyperLogLog: The sketch of the part.
+        """
+        index = part % len(self.sketches)
+        if self.parts[index] != part:
+            self.sketches[index].clear()
+            self.parts[index] = part
+        return self.sketches[index]
+
+    def add(self, key: Hashable, time: int) -> None:
+        """Add a key.
+
+        Args:
+            key (Hashable): The key.
+            time (int): The monotonic timestamp of the key in nanoseconds.
+        """
+        self._sketch(time // self.part_duration).add(key)
+
+    def count(self, now: int) -> int:
+        """Estimate the number of distinct keys in the window.
+
+        Args:
+            now (int): The monotonic timestamp of the end of the window in
+                nanoseconds.
+
+        Returns:
+            int: The estimated number of distinct keys in the parts of the window.
+        """
+        last_part = now // self.part_duration
+        first_part = last_part - len(self.sketches) + 1
+        registers: bytes | bytearray = bytes(len(self.sketches[0].registers))
+        for sketch, part in zip(self.sketches, self.parts):
+            if part is not None and first_part <= part <= last_part:
+                registers = bytearray(map(max, registers, sketch.registers))
+        return estimate_cardinality(registers)
+
+    def clear(self) -> None:
+        """Forget all keys."""
+        for sketch in self.sketches:
+            sketch.clear()
+        self.parts = [None] * len(self.sketches)
+
+
+class TrafficSummary:
+    """Summary of the busiest devices, company IDs and service UUIDs.
+
+    The summary also estimates the number of distinct addresses in the last minute
+    and the last hour.
+    """
+
+    def __init__(
+        self,
+        counters: int = DEFAULT_COUNTERS,
+        precision: int = DEFAULT_PRECISION,
+    ) -> None:
+        """Create an empty TrafficSummary object.
+
+        Args:
+            counters (int): The number of counters of every top-N summary.
+            precision (int): The precision of the HyperLogLog sketches.
+        """
+        self.devices: SpaceSaving[str] = SpaceSaving(counters)
+        self.companies: SpaceSaving[int] = SpaceSaving(counters)
+        self.uuids: SpaceSaving[str] = SpaceSaving(counters)
+        self.last_minute = WindowedHyperLogLog(
+            MINUTE_NS,
+            MINUTE_WINDOW_PARTS,
+            precision,
+        )
+        self.last_hour = WindowedHyperLogLog(HOUR_NS, HOUR_WINDOW_PARTS, precision)
+        # Monotonic timestamp of the most recent advertisement
+        self.latest = 0
+
+    def observe(
+        self,
+        device: str,
+        address: str,
+        advertisement_data: AdvertisementData | AdvertisementRecord,
+        time: int,
+    ) -> None:
+        """Count an advertisement.
+
+        Args:
+            device (str): The device that sent the advertisement: its address, or
+                its identity if it's resolved.
+            address (str): The address of the advertisement.
+            advertisement_data (AdvertisementData | AdvertisementRecord): The
+                advertisement data.
+            time (int): The monotonic timestamp of the advertisement in nanoseconds.
+        """
+        self.devices.add(device)
+        for cic in advertisement_data.manufacturer_data:
+            self.companies.add(cic)
+        # A UUID counts once per advertisement, with service data or as service UUID.
+        for uuid in {
+            *advertisement_data.service_data,
+            *advertisement_data.service_uuids,
+        }:
+            self.uuids.add(uuid)
+        self.last_minute.add(address, time)
+        self.last_hour.add(address, time)
+        self.latest = max(self.latest, time)
+
+    def clear(self) -> None:
+        """Forget all advertisements."""
+        self.devices.clear()
+        self.companies.clear()
+        self.uuids.clear()
+        self.last_minute.clear()
+        self.last_hour.clear()
+        self.latest = 0
@@ -0,0 +1,90 @@
+"""This module contains the time index of the advertisements stored by HumBLE Explorer.
+
+The index keeps the timestamps of all stored advertisements sorted, with the position
+of each advertisement in the list of stored advertisements. Looking up the
+advertisements in a time range is then a binary search instead of a scan of all
+advertisements.
+"""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, bisect_right
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+
+class TimeIndex:
+    """Sorted index of the timestamps of stored advertisements.
+
+    Advertisements almost always arrive in time order, so adding one is normally an
+    append. Advertisements that arrive out of order, for instance from a btsnoop
+    file written by several adapters, are inserted at their sorted position.
+    """
+
+    def __init__(self) -> None:
+        """Create an empty TimeIndex object."""
+        self.times = array("q")
+        self.positions = array("q")
+
+    def __len__(self) -> int:
+        """Return the number of indexed advertisements.
+
+        Returns:
+            int: The number of advertisements in the index.
+        """
+        return len(self.times)
+
+    def clear(self) -> None:
+        """Remove all advertisements from the index."""
+        self.times = array("q")
+        self.positions = array("q")
+
+    def add(self, time: int, position: int) -> None:
+        """Add an advertisement to the index.
+
+        Args:
+            time (int): The monotonic timestamp of the advertisement in nanoseconds.
+            position (int): The position of the advertisement in the list of stored
+                advertisements.
+        """
+        if not self.times or time >= self.times[-1]:
+            self.times.append(time)
+            self.positions.append(position)
+        else:
+            index = bisect_right(self.times, time)
+            self.times.insert(index, time)
+            self.positions.insert(index, position)
+
+    def first_at_or_after(self, time: int) -> int | None:
+        """Find the first advertisement at or after a time.
+
+        Args:
+            time (int): The monotonic timestamp in nanoseconds.
+
+        Returns:
+            int, optional: The position of the earliest advertisement at or after
+            the time, or ``None`` if all advertisements are earlier.
+        """
+        index = bisect_left(self.times, time)
+        if index == len(self.times):
+            return None
+        return self.positions[index]
+
+    def positions_between(self, start: int | None, stop: int | None) -> list[int]:
+        """Find the advertisements in a time range.
+
+        Args:
+            start (int, optional): The monotonic timestamp in nanoseconds of the
+                start of the range, included, or ``None`` for no lower bound.
+            stop (int, optional): The monotonic timestamp in nanoseconds of the end
+                of the range, excluded, or ``None`` for no upper bound.
+
+        Returns:
+            list[int]: The positions of the advertisements in the range, in the order
+            they were stored.
+        """
+        low = 0 if start is None else bisect_left(self.times, start)
+        high = len(self.times) if stop is None else bisect_left(self.times, stop)
+        return sorted(self.positions[low:high])
@@ -0,0 +1,479 @@
+"""This module checks advertisements against a watchlist of devices and payloads.
+
+A watchlist file has one term per line, optionally followed by a label for the
+alerts of the term. Empty lines and lines starting with ``#`` are ignored. The
+following terms are supported:
+
+* ``address=C0:00:00:00:00:01``: the device has this address
+* ``company=0x0499``: the advertisement has manufacturer data with this company ID
+* ``name=Ruuvi``: the local name starts with ``Ruuvi``
+* ``name~uuv``: the local name contains a match of the regular expression ``uuv``,
+  ignoring case
+* ``data=0215``: a manufacturer data or service data payload contains these bytes
+* ``data=0x004c:0215``: the manufacturer data payload of company ID ``0x004c``
+  contains these bytes
+
+All terms are compiled in one matcher, so checking an advertisement costs about the
+same with one term as with hundreds of them. Addresses and company IDs are looked up
+in dictionaries, the result of the name terms is cached per local name, and all byte
+signatures are found in one pass over every payload with the Aho-Corasick algorithm.
+"""
+from __future__ import annotations
+
+import contextlib
+import json
+import re
+import shlex
+import subprocess
+from collections import deque
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from humble_explorer.filters import parse_company_id
+from humble_explorer.records import monotonic_ns_to_datetime
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Sequence
+    from pathlib import Path
+
+    from bleak.backends.scanner import AdvertisementData
+
+    from humble_explorer.records import AdvertisementRecord
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+# Time in nanoseconds without matches after which a device alerts again for a term
+ALERT_AGAIN_AFTER = 60_000_000_000
+
+# Number of devices and terms whose last match is kept before the old ones are
+# forgotten
+ALERT_STATE_SIZE = 10_000
+
+# Maximum number of local names whose matching terms a watchlist remembers
+NAME_CACHE_SIZE = 4096
+
+ADDRESS_PATTERN = re.compile(r"^([0-9A-F]{2}:){5}[0-9A-F]{2}$")
+
+
+class WatchlistEntry(NamedTuple):
+    """Term of a watchlist with its label."""
+
+    term: str
+    """The term, for instance ``company=0x0499``."""
+    label: str
+    """The label of the alerts of the term."""
+
+
+class WatchlistAlert(NamedTuple):
+    """Alert of an advertisement that matches a term of the watchlist."""
+
+    time: int
+    """The monotonic timestamp of the advertisement in nanoseconds."""
+    address: str
+    """The address of the advertising device."""
+    entry: WatchlistEntry
+    """The matching term."""
+
+
+def load_watchlist(path: str | Path) -> list[WatchlistEntry]:
+    """Load the terms of a watchlist from a file.
+
+    Every line has a term, optionally followed by a label. Empty lines and lines
+    starting with ``#`` are ignored.
+
+    Args:
+        path (str | Path): The path of the file.
+
+    Returns:
+        list[WatchlistEntry]: The terms with their label. A term without label is
+        labeled with the term itself.
+
+    Raises:
+        ValueError: If a line doesn't start with a valid term.
+    """
+    entries = []
+    with open(path, encoding="utf-8") as watchlist_file:  # noqa: PTH123
+        for line_number, line in enumerate(watchlist_file, start=1):
+            line = line.strip()  # noqa: PLW2901
+            if not line or line.startswith("#"):
+                continue
+            term, _, label = line.partition(" ")
+            try:
+                parse_term(term)
+            except ValueError as error:
+                msg = f"{path}:{line_number}: {error}"
+                raise ValueError(msg) from None
+            entries.append(WatchlistEntry(term, label.strip() or term))
+    return entries
+
+
+def parse_term(term: str) -> tuple[str, Any]:
+    """Parse a term of a watchlist.
+
+    Args:
+        term (str): The term, for instance ``company=0x0499``.
+
+    Returns:
+        tuple[str, Any]: The kind of the term (``address``, ``company``, ``name``,
+        ``name~`` or ``data``) and its parsed value: an uppercase address, a company
+        ID, a name prefix, a compiled regular expression, or an optional company ID
+        and the signature bytes.
+
+    Raises:
+        ValueError: If the term isn't valid.
+    """
+    if term.startswith("name~"):
+        try:
+            return "name~", re.compile(term[5:], re.IGNORECASE)
+        except re.error as error:
+            msg = f"invalid regular expression in {term}: {error}"
+            raise ValueError(msg) from None
+    kind, _, value = term.partition("=")
+    if kind == "address":
+        address = value.upper()
+        if not ADDRESS_PATTERN.match(address):
+            msg = f"invalid address in {term}"
+            raise ValueError(msg)
+        return kind, address
+    if kind == "company":
+        try:
+            return kind, parse_company_id(value)
+        except ValueError:
+            msg = f"invalid company ID in {term}"
+            raise ValueError(msg) from None
+    if kind == "name" and value:
+        return kind, value
+    if kind == "data":
+        return kind, _parse_signature(term, value)
+    msg = f"unknown term {term}"
+    raise ValueError(msg)
+
+
+def _parse_signature(term: str, value: str) -> tuple[int | None, bytes]:
+    """Parse the byte signature of a ``data`` term.
+
+    Args:
+        term (str): The term, for error messages.
+        value (str): The bytes in hex, optionally preceded by a company ID and a
+            colon.
+
+    Returns:
+        tuple[int | None, bytes]: The company ID, or ``None`` to match all
+        payloads, and the signature bytes.
+
+    Raises:
+        ValueError: If the company ID or the bytes aren't valid.
+    """
+    company_id, _, signature_hex = value.rpartition(":")
+    try:
+        signature = bytes.fromhex(signature_hex)
+        cic = parse_company_id(company_id) if company_id else None
+    except ValueError:
+        signature = b""
+    if not signature:
+        msg = f"invalid byte signature in {term}"
+        raise ValueError(msg)
+    return cic, signature
+
+
+class AhoCorasick:
+    """Automaton that finds all occurrences of many byte patterns in one pass.
+
+    The trie of the patterns is extended with the transitions of the failure links,
+    except those of the root, which every state falls back to. So every byte of the
+    searched data costs at most two dictionary lookups, whatever the number of
+    patterns, without copying the transitions of the root into every state.
+    """
+
+    def __init__(self, patterns: Sequence[bytes]) -> None:
+        """Build an AhoCorasick object.
+
+        Args:
+            patterns (Sequence[bytes]): The non-empty patterns to find.
+        """
+        # Transitions and indices of the found patterns of every state
+        self._transitions: list[dict[int, int]] = [{}]
+        outputs: list[list[int]] = [[]]
+        for index, pattern in enumerate(patterns):
+            state = 0
+            for byte in pattern:
+                next_state = self._transitions[state].get(byte)
+                if next_state is None:
+                    next_state = len(self._transitions)
+                    self._transitions.append({})
+                    outputs.append([])
+                    self._transitions[state][byte] = next_state
+                state = next_state
+            outputs[state].append(index)
+
+        # Visit the states breadth first, so the failure state of a state, which is
+        # less deep, is completed before the state itself.
+        root = self._transitions[0]
+        failures = [0] * len(self._transitions)
+        queue = deque(root.values())
+        while queue:
+            state = queue.popleft()
+            failure = failures[state]
+            outputs[state].extend(outputs[failure])
+            trie_transitions = self._transitions[state]
+            failure_transitions = self._transitions[failure] if failure else {}
+            for byte, next_state in trie_transitions.items():
+                failures[next_state] = failure_transitions.get(byte) or root.get(
+                    byte,
+                    0,
+                )
+                queue.append(next_state)
+            self._transitions[state] = {**failure_transitions, **trie_transitions}
+        self._outputs = [tuple(output) for output in outputs]
+
+    def search(self, data: bytes) -> set[int]:
+        """Find the patterns that occur in data.
+
+        Args:
+            data (bytes): The data to search.
+
+        Returns:
+            set[int]: The indices of the patterns that occur in the data.
+        """
+        transitions = self._transitions
+        root = transitions[0]
+        outputs = self._outputs
+        found: set[int] = set()
+        state = 0
+        for byte in data:
+            # No transition leads back to the root, so a missing one is falsy.
+            state = transitions[state].get(byte) or root.get(byte, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        return found
+
+
+class Watchlist:
+    """Matcher of advertisements against the terms of a watchlist.
+
+    A device alerts for a term when an advertisement matches it for the first time,
+    and again when it matches after :data:`ALERT_AGAIN_AFTER` without matches.
+    """
+
+    def __init__(self, entries: Iterable[WatchlistEntry]) -> None:
+        """Create a Watchlist object.
+
+        Args:
+            entries (Iterable[WatchlistEntry]): The terms with their label.
+
+        Raises:
+            ValueError: If a term isn't valid.
+        """
+        self.entries = list(entries)
+        self.addresses: dict[str, list[WatchlistEntry]] = {}
+        self.companies: dict[int, list[WatchlistEntry]] = {}
+        self.names: list[tuple[str, re.Pattern[str] | None, WatchlistEntry]] = []
+        # Company ID, or None for all payloads, and entry of every byte signature
+        self.signatures: list[tuple[int | None, WatchlistEntry]] = []
+        patterns = []
+        for entry in self.entries:
+            kind, value = parse_term(entry.term)
+            if kind == "address":
+                self.addresses.setdefault(value, []).append(entry)
+            elif kind == "company":
+                self.companies.setdefault(value, []).append(entry)
+            elif kind == "name":
+                self.names.append((value, None, entry))
+            elif kind == "name~":
+                self.names.append(("", value, entry))
+            else:
+                cic, signature = value
+                self.signatures.append((cic, entry))
+                patterns.append(signature)
+        self.automaton = AhoCorasick(patterns) if patterns else None
+        self._order = {entry: index for index, entry in enumerate(self.entries)}
+        self._name_matches: dict[str | None, list[WatchlistEntry]] = {}
+        self._last_matches: dict[tuple[str, WatchlistEntry], int] = {}
+
+    def __len__(self) -> int:
+        """Return the number of terms.
+
+        Returns:
+            int: The number of terms in the watchlist.
+        """
+        return len(self.entries)
+
+    def match(
+        self,
+        address: str,
+        advertisement_data: AdvertisementData | AdvertisementRecord,
+    ) -> list[WatchlistEntry]:
+        """Find the terms matching an advertisement.
+
+        Args:
+            address (str): The address of the advertising device.
+            advertisement_data (AdvertisementData | AdvertisementRecord): The
+                advertisement data.
+
+        Returns:
+            list[WatchlistEntry]: The matching terms, in the order of the watchlist.
+            The list is empty if no term matches.
+        """
+        matches = list(self.addresses.get(address, ()))
+        for cic in advertisement_data.manufacturer_data:
+            matches.extend(self.companies.get(cic, ()))
+        if self.names:
+            matches.extend(self._match_name(advertisement_data.local_name))
+        if self.automaton:
+            matches.extend(self._match_signatures(self.automaton, advertisement_data))
+        if len(matches) > 1:
+            # Remove duplicates and restore the order of the watchlist.
+            matches = sorted(set(matches), key=self._order.__getitem__)
+        return matches
+
+    def _match_signatures(
+        self,
+        automaton: AhoCorasick,
+        advertisement_data: AdvertisementData | AdvertisementRecord,
+    ) -> list[WatchlistEntry]:
+        """Find the byte signatures in the payloads of an advertisement.
+
+        Args:
+            automaton (AhoCorasick): The automaton of the byte signatures.
+            advertisement_data (AdvertisementData | AdvertisementRecord): The
+                advertisement data.
+
+        Returns:
+            list[WatchlistEntry]: The terms of the found byte signatures.
+        """
+        matches = []
+        for cic, payload in advertisement_data.manufacturer_data.items():
+            for index in automaton.search(payload):
+                signature_cic, entry = self.signatures[index]
+                if signature_cic is None or signature_cic == cic:
+                    matches.append(entry)
+        for payload in advertisement_data.service_data.values():
+            for index in automaton.search(payload):
+                signature_cic, entry = self.signatures[index]
+                if signature_cic is None:
+                    matches.append(entry)
+        return matches
+
+    def _match_name(self, local_name: str | None) -> list[WatchlistEntry]:
+        """Find the name terms matching a local name.
+
+        Args:
+            local_name (str, optional): The local name.
+
+        Returns:
+            list[WatchlistEntry]: The matching name terms.
+        """
+        try:
+            return self._name_matches[local_name]
+        except KeyError:
+            if len(self._name_matches) >= NAME_CACHE_SIZE:
+                self._name_matches.clear()
+            name = local_name or ""
+            result = self._name_matches[local_name] = [
+                entry
+                for prefix, pattern, entry in self.names
+                if name.startswith(prefix)
+                and (pattern is None or pattern.search(name) is not None)
+            ]
+            return result
+
+    def alerts(
+        self,
+        device: str,
+        address: str,
+        matches: list[WatchlistEntry],
+        time: int,
+    ) -> list[WatchlistAlert]:
+        """Find the new alerts of the terms matching an advertisement.
+
+        Args:
+            device (str): The device that sent the advertisement: its address, or
+                its identity if it's resolved.
+            address (str): The address of the advertisement.
+            matches (list[WatchlistEntry]): The terms matching the advertisement.
+            time (int): The monotonic timestamp of the advertisement in nanoseconds.
+
+        Returns:
+            list[WatchlistAlert]: The alerts of the matching terms that the device
+            hasn't matched in the last :data:`ALERT_AGAIN_AFTER` nanoseconds.
+        """
+        alerts = []
+        for entry in matches:
+            last_match = self._last_matches.get((device, entry))
+            if last_match is None or time - last_match >= ALERT_AGAIN_AFTER:
+                alerts.append(WatchlistAlert(time, address, entry))
+            self._last_matches[device, entry] = time
+        if len(self._last_matches) > ALERT_STATE_SIZE:
+            self._last_matches = {
+                key: last_match
+                for key, last_match in self._last_matches.items()
+                if time - last_match < ALERT_AGAIN_AFTER
+            }
+        return alerts
+
+    def clear(self) -> None:
+        """Forget all matches, so all devices alert again."""
+        self._last_matches = {}
+
+
+def alert_to_dict(alert: WatchlistAlert) -> dict[str, Any]:
+    """Convert a watchlist alert to a dictionary that can be serialized to JSON.
+
+    Args:
+        alert (WatchlistAlert): The watchlist alert.
+
+    Returns:
+        dict[str, Any]: The watchlist alert as a dictionary.
+    """
+    return {
+        "time": monotonic_ns_to_datetime(alert.time).isoformat(),
+        "event": "watchlist",
+        "address": alert.address,
+        "term": alert.entry.term,
+        "label": alert.entry.label,
+    }
+
+
+class AlertCommand:
+    """Command that is run for every watchlist alert.
+
+    The alert is written as a JSON object to the standard input of the command. The
+    command runs in the background, so a slow command doesn't delay the
+    advertisements.
+    """
+
+    def __init__(self, command: str) -> None:
+        """Create an AlertCommand object.
+
+        Args:
+            command (str): The command line, split like a shell does, but without
+                running a shell.
+        """
+        self.args = shlex.split(command)
+        self.processes: list[subprocess.Popen[bytes]] = []
+
+    def run(self, alert: WatchlistAlert) -> None:
+        """Run the command for an alert.
+
+        Args:
+            alert (WatchlistAlert): The watchlist alert.
+
+        Raises:
+            OSError: If the command can't be run.
+        """
+        # Reap the processes that have finished.
+        self.processes = [
+            process for process in self.processes if process.poll() is None
+        ]
+        # Its output would garble the user interface or the JSON lines.
+        process = subprocess.Popen(
+            self.args,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        if process.stdin:
+            with contextlib.suppress(BrokenPipeError), process.stdin as stdin:
+                stdin.write(json.dumps(alert_to_dict(alert)).encode() + b"\n")
+        self.processes.append(process)
@@ -4,15 +4,252 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
+    from collections.abc import Mapping
+
     from textual.app import ComposeResult
+    from textual.widgets._data_table import Row, RowKey
+    from typing_extensions import Self
+
+    from humble_explorer.devices import Device
+    from humble_explorer.renderables import (
+        DisplayConfig,
+        RichAdvertisement,
+        RichDeviceAddress,
+        RichTime,
+    )
+
+    # Height of the device address and shape of the advertisement of a row
+    RowShape = tuple[int, tuple[tuple[str, int], ...]]
 
 from textual.containers import Horizontal
-from textual.widgets import Input, Static, Switch
+from textual.geometry import Size
+from textual.widgets import DataTable, Input, RichLog, Static, Switch
 
 __author__ = "Koen Vervloesem"
 __copyright__ = "Koen Vervloesem"
 __license__ = "MIT"
 
+# Number of presence events kept in the presence log
+PRESENCE_LOG_LINES = 1000
+
+
+class AdvertisementTable(DataTable):
+    """A Textual widget to show Bluetooth Low Energy advertisements in a table.
+
+    Its rows consist of a time, device address and advertisement renderable. The
+    rows are grouped by the shape of their renderables, so changes in the display
+    configuration only need one height computation for each group of rows. The table
+    keeps track of the total height of its rows, so a redraw doesn't depend on the
+    number of rows.
+    """
+
+    def __init__(
+        self,
+        config: DisplayConfig,
+        *,
+        zebra_stripes: bool = False,
+        id: str | None = None,  # noqa: A002
+    ) -> None:
+        """Create new AdvertisementTable.
+
+        Args:
+            config (DisplayConfig): The display configuration shared by all rows.
+            zebra_stripes (bool): Whether to use alternating row colors.
+            id (str, optional): Id of the table.
+        """
+        super().__init__(zebra_stripes=zebra_stripes, id=id)
+        self.config = config
+        self._rows_by_shape: dict[RowShape, dict[RowKey, Row]] = {}
+        self._total_height = 0
+
+    def on_mount(self) -> None:
+        """Add the table's columns."""
+        self.add_column("Time", key="time")
+        self.add_column("Address", key="address")
+        self.add_column("Advertisement", key="advertisement")
+
+    def add_advertisement(
+        self,
+        time: RichTime,
+        device_address: RichDeviceAddress,
+        rich_advertisement: RichAdvertisement,
+    ) -> RowKey:
+        """Add a row with the time, address and advertisement.
+
+        Args:
+            time (RichTime): The time.
+            device_address (RichDeviceAddress): The device address.
+            rich_advertisement (RichAdvertisement): The advertisement.
+
+        Returns:
+            RowKey: The key of the new row.
+        """
+        height = max(device_address.height(), rich_advertisement.height())
+        row_key = self.add_row(time, device_address, rich_advertisement, height=height)
+        shape = (device_address.height(), rich_advertisement.shape)
+        self._rows_by_shape.setdefault(shape, {})[row_key] = self.rows[row_key]
+        self._total_height += height
+        return row_key
+
+    def toggle_expanded(self, row_key: RowKey) -> None:
+        """Expand or collapse the advertisement in a row.
+
+        Only this row gets a new height, and the total height changes by its
+        difference, so expanding a row is cheap, whatever the number of rows.
+
+        Args:
+            row_key (RowKey): The key of the row.
+        """
+        row = self.rows[row_key]
+        device_address = self.get_cell(row_key, "address")
+        rich_advertisement = self.get_cell(row_key, "advertisement")
+        shape = (device_address.height(), rich_advertisement.shape)
+        del self._rows_by_shape[shape][row_key]
+        rich_advertisement.expanded = not rich_advertisement.expanded
+        shape = (device_address.height(), rich_advertisement.shape)
+        self._rows_by_shape.setdefault(shape, {})[row_key] = row
+        height = max(device_address.height(), rich_advertisement.height())
+        self._total_height += height - row.height
+        row.height = height
+        self.redraw()
+
+    def clear(self, columns: bool = False) -> Self:  # noqa: FBT001, FBT002
+        """Clear the table.
+
+        Args:
+            columns (bool): Also clear the columns.
+
+        Returns:
+            AdvertisementTable: The cleared table.
+        """
+        self._rows_by_shape = {}
+        self._total_height = 0
+        return super().clear(columns)
+
+    def update_row_heights(self) -> None:
+        """Recompute the height of all rows and redraw the table.
+
+        The rows keep their renderables, which derive their height from the shared
+        display configuration. This is much cheaper than recreating the table.
+        """
+        self._total_height = 0
+        for (address_height, shape), rows in self._rows_by_shape.items():
+            height = max(address_height, self.config.height(shape))
+            for row in rows.values():
+                row.height = height
+            self._total_height += height * len(rows)
+
+        self.redraw()
+
+    def redraw(self) -> None:
+        """Redraw the table after its renderables or the heights of its rows changed.
+
+        This invalidates the cached renderings and line offsets of the table, and
+        sets its virtual size from the total height of the rows. The order of the
+        rows and the widths of the columns don't change, so they aren't computed
+        again.
+        """
+        self._row_render_cache.clear()
+        self._cell_render_cache.clear()
+        self._line_cache.clear()
+        self._offset_cache.clear()
+        header_height = self.header_height if self.show_header else 0
+        self.virtual_size = Size(
+            self.virtual_size.width,
+            self._total_height + header_height,
+        )
+        self.refresh()
+
+
+class DeviceList(DataTable):
+    """A Textual widget to list the Bluetooth devices with stored advertisements.
+
+    Besides the number of stored advertisements of every device, it can show other
+    counts of the device, such as its number of suppressed advertisements.
+    """
+
+    def __init__(self, counts: Mapping[str, str] | None = None) -> None:
+        """Create new DeviceList.
+
+        Args:
+            counts (Mapping[str, str], optional): The column labels of the extra
+                counts to show, by the name of their attribute of
+                :class:`humble_explorer.devices.Device`.
+        """
+        super().__init__(cursor_type="row")
+        self.counts = dict(counts or {})
+
+    def on_mount(self) -> None:
+        """Add the list's columns."""
+        self.add_column("Device", key="device")
+        self.add_column("Packets", key="packets")
+        for name, label in self.counts.items():
+            self.add_column(label, key=name)
+
+    def update_device(self, address: str, device: Device) -> None:
+        """Add a device to the list or update its counts.
+
+        Args:
+            address (str): The address of the device, or its name if its private
+                addresses are resolved.
+            device (Device): The state of the device.
+        """
+        values = {"packets": len(device.positions)}
+        for name in self.counts:
+            values[name] = getattr(device, name)
+        if address in self.rows:
+            for key, value in values.items():
+                self.update_cell(address, key, value)
+        else:
+            self.add_row(address, *values.values(), key=address)
+
+
+class DeviceBrowser(Horizontal):
+    """A Textual widget to browse the advertisements of one device at a time.
+
+    It shows a list of devices, and the advertisements of the selected device in an
+    :class:`AdvertisementTable`.
+    """
+
+    def __init__(
+        self,
+        config: DisplayConfig,
+        counts: Mapping[str, str] | None = None,
+    ) -> None:
+        """Create new DeviceBrowser.
+
+        Args:
+            config (DisplayConfig): The display configuration shared by all rows.
+            counts (Mapping[str, str], optional): The column labels of the extra
+                counts of every device in the device list, by the name of their
+                attribute of :class:`humble_explorer.devices.Device`.
+        """
+        super().__init__()
+        self.config = config
+        self.counts = counts
+        self.display = False
+
+    def compose(self) -> ComposeResult:
+        """Show the device list and the selected device's advertisements."""
+        yield DeviceList(self.counts)
+        yield AdvertisementTable(self.config, zebra_stripes=True, id="device_history")
+
+
+class PresenceLog(RichLog):
+    """A Textual widget to show the devices that appeared or are gone."""
+
+    def __init__(self) -> None:
+        """Create new PresenceLog."""
+        super().__init__(max_lines=PRESENCE_LOG_LINES)
+
+
+class MemoryStatus(Static):
+    """A Textual widget to show the memory use of HumBLE Explorer's subsystems."""
+
+
+class TrafficSummaryWidget(Static):
+    """A Textual widget to show a summary of the received advertisements."""
+
 
 class FilterWidget(Input):
     """A Textual widget to filter Bluetooth Low Energy advertisements."""
@@ -31,6 +268,23 @@ class FilterWidget(Input):
         self.display = False
 
 
+class JumpWidget(Input):
+    """A Textual widget to jump to the advertisements at a time."""
+
+    def __init__(self, placeholder: str = "") -> None:
+        """Create new JumpWidget.
+
+        Args:
+            placeholder (str): Placeholder to show in the jump widget.
+        """
+        super().__init__(placeholder=placeholder)
+        self.display = False
+
+    def on_blur(self) -> None:
+        """Automatically hide widget on losing focus."""
+        self.display = False
+
+
 class SettingsWidget(Static):
     """A Textual widget to let the user choose settings."""
 
@@ -79,7 +333,12 @@ class SettingsWidget(Static):
         yield Static("\n[b]Other settings[/b]\n")
         yield Horizontal(
             Static("Auto-scroll      ", classes="label"),
-            Switch(value=True, id="autoscroll", classes="view"),
+            Switch(value=True, id="autoscroll"),
+            classes="container",
+        )
+        yield Horizontal(
+            Static("Payload changes  ", classes="label"),
+            Switch(value=False, id="highlight_changes"),
             classes="container",
         )
 
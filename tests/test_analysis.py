@@ -0,0 +1,104 @@
+"""Tests for analysis module."""
+from datetime import datetime, timedelta
+
+import pytest
+from bleak.backends.scanner import AdvertisementData
+
+np = pytest.importorskip("numpy")
+
+from humble_explorer.analysis import (  # noqa: E402
+    CaptureAnalysis,
+    _group_medians,
+    _unique_pairs,
+)
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+TIME = datetime(2023, 3, 19, 14, 32, 10)  # noqa: DTZ001
+
+
+def advertisement(manufacturer_data: bytes, rssi: int) -> AdvertisementData:
+    """Create advertisement data with the given manufacturer data and RSSI."""
+    return AdvertisementData(
+        local_name=None,
+        manufacturer_data={0x0499: manufacturer_data},
+        service_data={},
+        service_uuids=["0000feaa-0000-1000-8000-00805f9b34fb"],
+        tx_power=None,
+        rssi=rssi,
+        platform_data=(),
+    )
+
+
+def test_group_medians() -> None:
+    """Test computing the median of each group."""
+    groups = np.array([1, 0, 1, 1, 0, 1])
+    values = np.array([7, 3, 1, 4, 5, 2])
+    assert _group_medians(groups, values, 3).tolist()[:2] == [4.0, 3.0]
+    assert np.isnan(_group_medians(groups, values, 3)[2])
+
+
+def test_unique_pairs() -> None:
+    """Test finding distinct pairs."""
+    first, second = _unique_pairs(np.array([1, 0, 1, 1]), np.array([5, 7, 5, 0]))
+    assert first.tolist() == [0, 1, 1]
+    assert second.tolist() == [7, 0, 5]
+
+
+def test_device_table() -> None:
+    """Test summarizing the advertisements of each device."""
+    analysis = CaptureAnalysis()
+    # One device advertising every 100 ms, with a scan response after 1 ms and a
+    # payload change every second
+    for i in range(50):
+        time = TIME + timedelta(milliseconds=100 * i)
+        data = advertisement(bytes([i // 10]), -60 - i % 5)
+        analysis.add(time, "D5:FE:15:49:AC:7D", data)
+        analysis.add(time + timedelta(milliseconds=1), "D5:FE:15:49:AC:7D", data)
+    analysis.add(TIME, "58:2D:34:54:2D:2C", advertisement(b"", -90))
+    assert len(analysis) == 101  # noqa: PLR2004
+
+    table = analysis.device_table()
+    rows = list(zip(*(column.cells for column in table.columns)))
+    assert rows == [
+        ("D5:FE:15:49:AC:7D", "100", "100 ms", "-64/-62/-60", "49.0", "0x0499", "feaa"),
+        ("58:2D:34:54:2D:2C", "1", "-", "-90/-90/-90", "-", "0x0499", "feaa"),
+    ]
+
+    company_table = analysis.company_table()
+    assert [list(column.cells) for column in company_table.columns] == [
+        ["0x0499"],
+        ["Ruuvi Innovations Ltd."],
+        ["101"],
+        ["2"],
+    ]
+
+
+def test_service_table() -> None:
+    """Test summarizing the advertisements of each service UUID."""
+    analysis = CaptureAnalysis()
+    analysis.add(TIME, "D5:FE:15:49:AC:7D", advertisement(b"", -60))
+    analysis.add(TIME, "58:2D:34:54:2D:2C", advertisement(b"", -70))
+    analysis.add(
+        TIME,
+        "58:2D:34:54:2D:2C",
+        AdvertisementData(
+            local_name=None,
+            manufacturer_data={},
+            service_data={"22110000-554a-4546-5542-46534450464d": b"\x01"},
+            service_uuids=[],
+            tx_power=None,
+            rssi=-70,
+            platform_data=(),
+        ),
+    )
+
+    service_table = analysis.service_table()
+    assert [list(column.cells) for column in service_table.columns] == [
+        ["feaa", "22110000-554a-4546-5542-46534450464d"],
+        ["Eddystone", "Unknown"],
+        ["2", "1"],
+        ["2", "1"],
+    ]
@@ -0,0 +1,114 @@
+"""Tests for btsnoop module."""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+import pytest
+
+from humble_explorer.btsnoop import (
+    BTSNOOP_EPOCH_OFFSET,
+    DATALINK_H4,
+    DATALINK_MONITOR,
+    FILE_HEADER,
+    RECORD_HEADER,
+    BtsnoopError,
+    open_btsnoop,
+    read_btsnoop,
+)
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+TIME = datetime(2023, 3, 19, 14, 32, 10, 123456)  # noqa: DTZ001
+# LE Advertising Report event with manufacturer data of Ruuvi Innovations
+ADVERTISING_REPORT = bytes.fromhex("3e1202010001 7dac4915fed5 06 05ff99040512 ba")
+# Command Complete event of a Reset command
+COMMAND_COMPLETE = bytes.fromhex("0e0401030c00")
+
+
+def btsnoop_file(path: Path, datalink: int, records: list[tuple[int, bytes]]) -> Path:
+    """Write a btsnoop file with the given datalink type and records."""
+    timestamp = round(TIME.timestamp() * 1_000_000) + BTSNOOP_EPOCH_OFFSET
+    path.write_bytes(
+        FILE_HEADER.pack(b"btsnoop\0", 1, datalink)
+        + b"".join(
+            RECORD_HEADER.pack(len(packet), len(packet), flags, 0, timestamp) + packet
+            for flags, packet in records
+        ),
+    )
+    return path
+
+
+def test_read_h4(tmp_path: Path) -> None:
+    """Test reading advertisements from a file with the H4 datalink type."""
+    path = btsnoop_file(
+        tmp_path / "h4.btsnoop",
+        DATALINK_H4,
+        [
+            (0, b"\x01\x03\x0c\x00"),  # Reset command
+            (1, b"\x04" + COMMAND_COMPLETE),
+            (1, b"\x04" + ADVERTISING_REPORT),
+        ],
+    )
+    ((time, address, advertisement_data),) = read_btsnoop(path)
+    assert time == TIME
+    assert address == "D5:FE:15:49:AC:7D"
+    assert advertisement_data.manufacturer_data == {0x0499: b"\x05\x12"}
+    assert advertisement_data.rssi == -70  # noqa: PLR2004
+
+
+def test_open_btsnoop(tmp_path: Path) -> None:
+    """Test checking the header of a btsnoop file without reading its records."""
+    path = btsnoop_file(tmp_path / "h4.btsnoop", DATALINK_H4, [])
+    data, datalink = open_btsnoop(path)
+    with data:
+        assert datalink == DATALINK_H4
+        assert len(data) == FILE_HEADER.size
+    assert data.closed
+
+
+def test_read_monitor(tmp_path: Path) -> None:
+    """Test reading advertisements from a file written by btmon."""
+    path = btsnoop_file(
+        tmp_path / "btmon.btsnoop",
+        DATALINK_MONITOR,
+        [
+            (0x00000003, COMMAND_COMPLETE),  # Event on hci0
+            (0x00010003, ADVERTISING_REPORT),  # Event on hci1
+            (0x00000002, ADVERTISING_REPORT),  # Command, not an event
+        ],
+    )
+    assert [address for _, address, _ in read_btsnoop(path)] == ["D5:FE:15:49:AC:7D"]
+
+
+def test_truncated_file(tmp_path: Path) -> None:
+    """Test reading a file with a truncated last record."""
+    path = btsnoop_file(
+        tmp_path / "truncated.btsnoop",
+        DATALINK_MONITOR,
+        [(3, ADVERTISING_REPORT), (3, ADVERTISING_REPORT)],
+    )
+    path.write_bytes(path.read_bytes()[:-1])
+    assert len(list(read_btsnoop(path))) == 1
+
+
+def test_invalid_files(tmp_path: Path) -> None:
+    """Test reading files that aren't supported btsnoop files."""
+    empty = tmp_path / "empty"
+    empty.write_bytes(b"")
+    with pytest.raises(BtsnoopError, match="empty"):
+        read_btsnoop(empty)
+
+    text = tmp_path / "text"
+    text.write_bytes(b"This is not a btsnoop file.")
+    with pytest.raises(BtsnoopError, match="isn't a btsnoop file"):
+        read_btsnoop(text)
+
+    pcap = btsnoop_file(tmp_path / "unsupported.btsnoop", 1003, [])
+    with pytest.raises(BtsnoopError, match="unsupported datalink type 1003"):
+        read_btsnoop(pcap)
@@ -0,0 +1,73 @@
+"""Tests for capture module."""
+from datetime import datetime
+from pathlib import Path
+
+from bleak.backends.scanner import AdvertisementData
+
+from humble_explorer.btsnoop import read_btsnoop
+from humble_explorer.capture import (
+    LINKTYPE_BLUETOOTH_HCI_H4_WITH_PHDR,
+    PCAP_FILE_HEADER,
+    PCAP_RECORD_HEADER,
+    BtsnoopExporter,
+    PcapExporter,
+    open_capture,
+)
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+TIME = datetime(2023, 3, 19, 14, 32, 10, 123456)  # noqa: DTZ001
+ADVERTISEMENT_DATA = AdvertisementData(
+    local_name="Ruuvi AC7D",
+    manufacturer_data={0x0499: b"\x05\x12"},
+    service_data={},
+    service_uuids=[],
+    tx_power=None,
+    rssi=-70,
+    platform_data=(),
+)
+
+
+def test_btsnoop_round_trip(tmp_path: Path) -> None:
+    """Test exporting advertisements to a btsnoop file and importing them."""
+    path = tmp_path / "capture.btsnoop"
+    exporter = open_capture(path, "name=Ruuvi")
+    assert isinstance(exporter, BtsnoopExporter)
+    exporter.export(TIME, "D5:FE:15:49:AC:7D", ADVERTISEMENT_DATA)
+    exporter.export(
+        TIME,
+        "58:2D:34:54:2D:2C",
+        ADVERTISEMENT_DATA._replace(local_name="Qingping"),
+    )
+    # Addresses on macOS aren't Bluetooth addresses
+    exporter.export(TIME, "5C1C2B36-6FE0-4D2A-9B62-3B0E5D1E8E4B", ADVERTISEMENT_DATA)
+    exporter.close()
+
+    assert list(read_btsnoop(path)) == [
+        (TIME, "D5:FE:15:49:AC:7D", ADVERTISEMENT_DATA),
+    ]
+    assert exporter.skipped == 1
+
+
+def test_pcap(tmp_path: Path) -> None:
+    """Test exporting advertisements to a pcap file."""
+    path = tmp_path / "capture.pcap"
+    exporter = open_capture(path)
+    assert isinstance(exporter, PcapExporter)
+    exporter.export(TIME, "D5:FE:15:49:AC:7D", ADVERTISEMENT_DATA)
+    exporter.close()
+
+    pcap = path.read_bytes()
+    assert PCAP_FILE_HEADER.unpack_from(pcap)[-1] == LINKTYPE_BLUETOOTH_HCI_H4_WITH_PHDR
+    seconds, microseconds, length, _ = PCAP_RECORD_HEADER.unpack_from(
+        pcap,
+        PCAP_FILE_HEADER.size,
+    )
+    time = datetime.fromtimestamp(seconds)  # noqa: DTZ006
+    assert time.replace(microsecond=microseconds) == TIME
+    packet = pcap[PCAP_FILE_HEADER.size + PCAP_RECORD_HEADER.size :]
+    assert len(packet) == length
+    # Received packet with an LE Meta event
+    assert packet[:6] == b"\x00\x00\x00\x01\x04\x3e"
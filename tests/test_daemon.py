@@ -0,0 +1,212 @@
+"""Tests for daemon module."""
+from __future__ import annotations
+
+import asyncio
+import socket
+from argparse import Namespace
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pytest
+from bleak.backends.device import BLEDevice
+from bleak.backends.scanner import AdvertisementData
+
+from humble_explorer.daemon import (
+    MAX_QUEUED_RECORDS,
+    RemoteScanner,
+    ScannerDaemon,
+    Subscriber,
+)
+from humble_explorer.protocol import frame
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from datetime import datetime
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+
+def daemon_arguments(socket_path: Path) -> Namespace:
+    """Create the command-line arguments of a daemon."""
+    return Namespace(
+        daemon=str(socket_path),
+        scanning_mode="active",
+        filter="",
+        macos_use_address=False,
+        adapter=None,
+        metrics=None,
+    )
+
+
+def advertisement(local_name: str) -> AdvertisementData:
+    """Create advertisement data with a local name."""
+    return AdvertisementData(
+        local_name=local_name,
+        manufacturer_data={},
+        service_data={},
+        service_uuids=[],
+        tx_power=None,
+        rssi=-70,
+        platform_data=(),
+    )
+
+
+async def wait_for(condition: Callable[[], bool], timeout: float = 5) -> None:
+    """Wait until a condition function returns ``True``."""
+
+    async def poll() -> None:
+        while not condition():
+            await asyncio.sleep(0.01)
+
+    await asyncio.wait_for(poll(), timeout)
+
+
+async def fan_out(socket_path: Path) -> None:
+    """Publish advertisements to two clients with a different filter."""
+    daemon = ScannerDaemon(daemon_arguments(socket_path))
+    server = await asyncio.start_unix_server(daemon.handle_client, str(socket_path))
+    async with server:
+        received: dict[str, list[str]] = {"all": [], "filtered": []}
+
+        def callback(
+            name: str,
+        ) -> Callable[[datetime, str, AdvertisementData], None]:
+            def receive(_time: datetime, address: str, _: AdvertisementData) -> None:
+                received[name].append(address)
+
+            return receive
+
+        all_client = RemoteScanner(str(socket_path), callback("all"))
+        filtered_client = RemoteScanner(
+            str(socket_path),
+            callback("filtered"),
+            "address=C0:00:00:00:00:01",
+        )
+        await all_client.start()
+        await filtered_client.start()
+        await wait_for(lambda: len(daemon.subscribers) == 2)  # noqa: PLR2004
+
+        for number in range(4):
+            daemon.on_advertisement(
+                BLEDevice(f"C0:00:00:00:00:0{number % 2}", None, {}),
+                advertisement(f"Device {number}"),
+            )
+        await wait_for(lambda: len(received["all"]) == 4)  # noqa: PLR2004
+        await wait_for(lambda: len(received["filtered"]) == 2)  # noqa: PLR2004
+        assert received["all"] == [
+            "C0:00:00:00:00:00",
+            "C0:00:00:00:00:01",
+            "C0:00:00:00:00:00",
+            "C0:00:00:00:00:01",
+        ]
+        assert received["filtered"] == ["C0:00:00:00:00:01", "C0:00:00:00:00:01"]
+        assert daemon.metrics.dropped == 0
+
+        # A disconnected client doesn't get advertisements anymore.
+        await filtered_client.stop()
+        await wait_for(lambda: len(daemon.subscribers) == 1)
+        await all_client.stop()
+
+
+def test_fan_out(tmp_path: Path) -> None:
+    """Test publishing advertisements to all clients with a matching filter."""
+    asyncio.run(fan_out(tmp_path / "daemon.sock"))
+
+
+async def bounded_queue() -> None:
+    """Queue more records for a subscriber than its queue holds."""
+    first, second = socket.socketpair()
+    with first, second:
+        _, writer = await asyncio.open_connection(sock=first)
+        subscriber = Subscriber(writer, "")
+        for number in range(MAX_QUEUED_RECORDS):
+            assert not subscriber.publish(number.to_bytes(4, "big"))
+        # The oldest records are dropped.
+        assert subscriber.publish(b"new1")
+        assert subscriber.publish(b"new2")
+        assert subscriber.dropped == 2  # noqa: PLR2004
+        assert len(subscriber.queue) == MAX_QUEUED_RECORDS
+        assert subscriber.queue[0] == (2).to_bytes(4, "big")
+        assert subscriber.queue[-1] == b"new2"
+        writer.close()
+
+
+def test_bounded_queue() -> None:
+    """Test dropping the oldest records of a client that can't keep up."""
+    asyncio.run(bounded_queue())
+
+
+def test_socket_path(tmp_path: Path) -> None:
+    """Test replacing the socket of a previous daemon, but not another file."""
+    stale = tmp_path / "daemon.sock"
+    with socket.socket(socket.AF_UNIX) as previous:
+        previous.bind(str(stale))
+    ScannerDaemon(daemon_arguments(stale)).remove_stale_socket()
+    assert not stale.exists()
+
+    notes = tmp_path / "notes.txt"
+    notes.write_text("Don't remove me")
+    with pytest.raises(FileExistsError, match=r"notes\.txt exists and isn't a socket"):
+        asyncio.run(ScannerDaemon(daemon_arguments(notes)).run())
+    assert notes.read_text() == "Don't remove me"
+
+
+async def failing_client() -> None:
+    """Publish to a client that stops reading while its filter stream stays open."""
+    daemon = ScannerDaemon(daemon_arguments(Path("daemon.sock")))
+    filter_client, filter_server = socket.socketpair()
+    record_client, record_server = socket.socketpair()
+    with filter_client, filter_server, record_client, record_server:
+        reader, filter_writer = await asyncio.open_connection(sock=filter_server)
+        _, writer = await asyncio.open_connection(sock=record_server)
+        filter_client.sendall(frame(b""))
+        client = asyncio.create_task(daemon.handle_client(reader, writer))
+        await wait_for(lambda: len(daemon.subscribers) == 1)
+
+        # Sending fails because the client doesn't read anymore.
+        record_client.shutdown(socket.SHUT_RD)
+        daemon.on_advertisement(
+            BLEDevice("C0:00:00:00:00:00", None, {}),
+            advertisement("Device"),
+        )
+        await wait_for(lambda: not daemon.subscribers)
+        assert writer.is_closing()
+        client.cancel()
+        filter_writer.close()
+
+
+def test_failing_client() -> None:
+    """Test dropping a client when sending to it fails."""
+    asyncio.run(failing_client())
+
+
+class FakeScanner:
+    """Scanner that doesn't receive advertisements."""
+
+    def __init__(self, **_kwargs: object) -> None:
+        """Create a FakeScanner object."""
+
+    async def start(self) -> None:
+        """Start scanning."""
+
+    async def stop(self) -> None:
+        """Stop scanning."""
+
+
+async def shutdown(socket_path: Path) -> None:
+    """Stop a daemon after it has created its socket."""
+    daemon = asyncio.create_task(ScannerDaemon(daemon_arguments(socket_path)).run())
+    await wait_for(socket_path.is_socket)
+    daemon.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await daemon
+
+
+def test_shutdown(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test removing the socket when the daemon stops."""
+    monkeypatch.setattr("humble_explorer.daemon.BleakScanner", FakeScanner)
+    socket_path = tmp_path / "daemon.sock"
+    asyncio.run(shutdown(socket_path))
+    assert not socket_path.exists()
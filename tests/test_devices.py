@@ -0,0 +1,127 @@
+"""Tests for devices module."""
+from bleak.backends.scanner import AdvertisementData
+
+from humble_explorer.devices import DeviceRegistry, IntervalEstimator
+from humble_explorer.records import AdvertisementRecord
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+
+def advertisement(manufacturer_data: bytes, rssi: int = -70) -> AdvertisementData:
+    """Create advertisement data with the given manufacturer data and RSSI."""
+    return AdvertisementData(
+        local_name="Ruuvi 1234",
+        manufacturer_data={0x0499: manufacturer_data},
+        service_data={},
+        service_uuids=[],
+        tx_power=None,
+        rssi=rssi,
+        platform_data=(),
+    )
+
+
+def test_is_repeat() -> None:
+    """Test detection of repeated payloads."""
+    devices = DeviceRegistry()
+    address = "D5:FE:15:49:AC:7D"
+
+    # The first payload of a device is never a repeat
+    assert not devices.is_repeat(address, advertisement(b"\x05\x12"))
+    # The same payload with another RSSI is a repeat
+    assert devices.is_repeat(address, advertisement(b"\x05\x12", rssi=-80))
+    # A changed payload isn't a repeat
+    assert not devices.is_repeat(address, advertisement(b"\x05\x13"))
+    # Another device has its own previous payload
+    assert not devices.is_repeat("58:2D:34:54:2D:2C", advertisement(b"\x05\x13"))
+
+    assert devices[address].suppressed == 1
+    assert devices.suppressed == 1
+    assert len(devices) == 2  # noqa: PLR2004
+
+    devices.clear()
+    assert len(devices) == 0
+    assert devices.suppressed == 0
+
+
+def test_previous_payloads() -> None:
+    """Test the cache with the previous payload of each device."""
+    devices = DeviceRegistry()
+    address = "D5:FE:15:49:AC:7D"
+
+    assert devices.previous_payloads(address, advertisement(b"\x05\x12")) == {}
+    assert devices.previous_payloads(address, advertisement(b"\x05\x13")) == {
+        0x0499: b"\x05\x12",
+    }
+    # Unchanged payloads aren't returned
+    assert devices.previous_payloads(address, advertisement(b"\x05\x13")) == {}
+    assert devices.previous_payloads("58:2D:34:54:2D:2C", advertisement(b"")) == {}
+
+
+def test_throttle() -> None:
+    """Test counting throttled advertisements."""
+    registry = DeviceRegistry()
+    registry.throttle("D5:FE:15:49:AC:7D")
+    registry.throttle("D5:FE:15:49:AC:7D")
+    registry.throttle("58:2D:34:54:2D:2C")
+    assert registry["D5:FE:15:49:AC:7D"].throttled == 2  # noqa: PLR2004
+    assert registry.throttled == 3  # noqa: PLR2004
+    registry.clear()
+    assert registry.throttled == 0
+
+
+def test_store() -> None:
+    """Test remembering the positions of the stored advertisements of a device."""
+    registry = DeviceRegistry()
+    address = "D5:FE:15:49:AC:7D"
+    for position, device in enumerate((address, "58:2D:34:54:2D:2C", address)):
+        record = AdvertisementRecord.from_advertisement_data(
+            position,
+            device,
+            advertisement(b"\x05"),
+            {},
+        )
+        registry.store(device, record, position)
+    assert registry[address].record is record
+    assert list(registry[address].positions) == [0, 2]
+    assert list(registry["58:2D:34:54:2D:2C"].positions) == [1]
+
+
+def test_observe_interval() -> None:
+    """Test estimating the advertising interval of a device."""
+    registry = DeviceRegistry()
+    address = "D5:FE:15:49:AC:7D"
+
+    # Every 100 ms, with a random delay and a scan response, and with missed packets
+    times = [0, 107, 209, 513, 620, 1025, 1128, 1230, 1335]
+    intervals = []
+    for time in times:
+        intervals.append(registry.observe(address, time * 1_000_000))
+        registry.observe(address, (time + 1) * 1_000_000)
+
+    assert intervals[0] is None
+    assert 100 <= intervals[-1] <= 110  # noqa: PLR2004
+
+
+def test_interval_estimator_changes() -> None:
+    """Test that the interval estimate follows a changing advertising interval."""
+    estimator = IntervalEstimator()
+    time = 0
+    # A missed packet at the start makes the first estimate too long.
+    for gap in (2000, 1000, 1000, 1000):
+        time += gap
+        estimator.update(time * 1_000_000)
+    assert estimator.interval_ms == 1000  # noqa: PLR2004
+
+    # A device that advertises more slowly
+    for _ in range(20):
+        time += 5000
+        estimator.update(time * 1_000_000)
+    assert estimator.interval_ms == 5000  # noqa: PLR2004
+
+    # A device that advertises faster
+    for _ in range(5):
+        time += 100
+        estimator.update(time * 1_000_000)
+    assert estimator.interval_ms == 100  # noqa: PLR2004
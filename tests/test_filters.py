@@ -0,0 +1,120 @@
+"""Tests for filters module."""
+from datetime import datetime
+
+from bleak.backends.scanner import AdvertisementData
+
+from humble_explorer.filters import AdvertisementFilter, normalize_uuid, parse_time
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+ADDRESS = "D5:FE:15:49:AC:7D"
+ADVERTISEMENT_DATA = AdvertisementData(
+    local_name="Ruuvi 1234",
+    manufacturer_data={0x0499: b"\x05\x12\xfc"},
+    service_data={"0000181a-0000-1000-8000-00805f9b34fb": b"\x01\x02"},
+    service_uuids=["0000fe9a-0000-1000-8000-00805f9b34fb"],
+    tx_power=None,
+    rssi=-70,
+    platform_data=(),
+)
+
+
+def test_normalize_uuid() -> None:
+    """Test conversion of UUIDs to 128-bit UUIDs."""
+    assert normalize_uuid("181A") == "0000181a-0000-1000-8000-00805f9b34fb"
+    assert normalize_uuid("0000181a") == "0000181a-0000-1000-8000-00805f9b34fb"
+    assert (
+        normalize_uuid("22110000-554A-4546-5542-46534450464D")
+        == "22110000-554a-4546-5542-46534450464d"
+    )
+
+
+def test_filter_matches() -> None:
+    """Test matching advertisements with filters."""
+    assert AdvertisementFilter("").matches(ADDRESS, ADVERTISEMENT_DATA)
+    assert AdvertisementFilter("address=d5:fe").matches(ADDRESS, ADVERTISEMENT_DATA)
+    assert not AdvertisementFilter("address=58").matches(ADDRESS, ADVERTISEMENT_DATA)
+    assert AdvertisementFilter("company=0x0499").matches(ADDRESS, ADVERTISEMENT_DATA)
+    assert not AdvertisementFilter("company=004c").matches(ADDRESS, ADVERTISEMENT_DATA)
+    # A UUID matches service data as well as service UUIDs
+    assert AdvertisementFilter("uuid=181a").matches(ADDRESS, ADVERTISEMENT_DATA)
+    assert AdvertisementFilter("uuid=fe9a").matches(ADDRESS, ADVERTISEMENT_DATA)
+    assert not AdvertisementFilter("uuid=fe9b").matches(ADDRESS, ADVERTISEMENT_DATA)
+    assert AdvertisementFilter("name=Ruu").matches(ADDRESS, ADVERTISEMENT_DATA)
+    assert not AdvertisementFilter("name=Tile").matches(ADDRESS, ADVERTISEMENT_DATA)
+    # All terms should match
+    assert not AdvertisementFilter("address=D5 name=Tile").matches(
+        ADDRESS,
+        ADVERTISEMENT_DATA,
+    )
+
+
+def test_filter_terms() -> None:
+    """Test parsing of filter expressions."""
+    # Invalid and unknown terms are ignored
+    assert not AdvertisementFilter("company=0xZZ uuid=12 foo=bar")
+    # Filters with the same normalized terms are equal
+    assert AdvertisementFilter("company=0x0499") == AdvertisementFilter("company=499")
+    assert AdvertisementFilter("address=dc") != AdvertisementFilter("address=DD")
+
+
+def test_filter_time() -> None:
+    """Test filtering advertisements on their time."""
+    start = parse_time("2023-02-15T14:32:10")
+    time_filter = AdvertisementFilter(
+        "time>=2023-02-15T14:32:10 time<2023-02-15T14:33",
+    )
+    assert time_filter.has_time_range()
+    assert time_filter.matches(ADDRESS, ADVERTISEMENT_DATA, start)
+    assert not time_filter.matches(ADDRESS, ADVERTISEMENT_DATA, start - 1)
+    assert not time_filter.matches(
+        ADDRESS,
+        ADVERTISEMENT_DATA,
+        start + 50_000_000_000,
+    )
+    # Without time, the time terms aren't checked
+    assert time_filter.matches(ADDRESS, ADVERTISEMENT_DATA)
+
+    # A time without date is a time of today
+    assert parse_time("14:32:10") == parse_time(f"{datetime.now().date()}T14:32:10")
+    # Invalid times are ignored
+    assert not AdvertisementFilter("time>=25:00 time<yesterday")
+
+
+def test_filter_name_pattern() -> None:
+    """Test filtering local names on a regular expression."""
+    assert AdvertisementFilter("name~uuv").matches(ADDRESS, ADVERTISEMENT_DATA)
+    # The regular expression ignores case
+    assert AdvertisementFilter("name~^ruuvi\\s").matches(ADDRESS, ADVERTISEMENT_DATA)
+    assert not AdvertisementFilter("name~^uuv").matches(ADDRESS, ADVERTISEMENT_DATA)
+    # Invalid regular expressions are ignored
+    assert not AdvertisementFilter("name~Ruuvi(")
+
+    # The result is remembered per local name
+    name_filter = AdvertisementFilter("name~Tile name=T")
+    assert not name_filter.matches(ADDRESS, ADVERTISEMENT_DATA)
+    assert name_filter._name_matches == {"Ruuvi 1234": False}  # noqa: SLF001
+    assert name_filter.matches_name("Tile Mate")
+
+
+def test_filter_narrows() -> None:
+    """Test recognizing filters that narrow other filters."""
+    assert AdvertisementFilter("name=Ruuvi").narrows(AdvertisementFilter("name=Ru"))
+    assert AdvertisementFilter("name~uuvi").narrows(AdvertisementFilter("name~UUV"))
+    assert AdvertisementFilter("address=D5:FE company=0499").narrows(
+        AdvertisementFilter("address=D5"),
+    )
+    assert AdvertisementFilter("time>=14:33").narrows(
+        AdvertisementFilter("time>=14:32"),
+    )
+    assert AdvertisementFilter("name=Ru").narrows(AdvertisementFilter(""))
+
+    assert not AdvertisementFilter("name=Ru").narrows(AdvertisementFilter("name=Ruuvi"))
+    assert not AdvertisementFilter("").narrows(AdvertisementFilter("company=0499"))
+    # Regular expressions with special characters are never compared
+    assert not AdvertisementFilter("name~uuvi.").narrows(AdvertisementFilter("name~uu"))
+    assert not AdvertisementFilter("time<14:33").narrows(
+        AdvertisementFilter("time<14:32"),
+    )
@@ -0,0 +1,125 @@
+"""Tests for hci module."""
+import pytest
+from bleak.backends.scanner import AdvertisementData
+
+from humble_explorer.hci import (
+    AdvertisingReportParser,
+    encode_advertising_report,
+    format_address,
+    parse_advertising_data,
+    parse_uuid,
+)
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+ADDRESS = bytes.fromhex("7dac4915fed5")
+AD_DATA = bytes.fromhex(
+    "020106"  # Flags
+    "0b0952757576692041433744"  # Complete local name "Ruuvi AC7D"
+    "05ff99040512"  # Manufacturer data of Ruuvi Innovations
+    "0303aafe"  # Complete list of 16-bit service UUIDs
+    "05161a180102"  # Service data of Environmental Sensing
+    "020a04"  # TX power level
+    "0000",  # Zero padding
+)
+
+
+def test_format_address() -> None:
+    """Test formatting little-endian addresses."""
+    assert format_address(ADDRESS) == "D5:FE:15:49:AC:7D"
+
+
+def test_parse_uuid() -> None:
+    """Test parsing little-endian UUIDs."""
+    assert parse_uuid(b"\x1a\x18") == "0000181a-0000-1000-8000-00805f9b34fb"
+    assert parse_uuid(b"\x1a\x18\x01\x00") == "0001181a-0000-1000-8000-00805f9b34fb"
+    assert (
+        parse_uuid(bytes.fromhex("9ecadc240ee5a9e093f3a3b50100406e"))
+        == "6e400001-b5a3-f393-e0a9-e50e24dcca9e"
+    )
+
+
+def test_parse_advertising_data() -> None:
+    """Test parsing AD structures."""
+    assert parse_advertising_data(AD_DATA, -70) == AdvertisementData(
+        local_name="Ruuvi AC7D",
+        manufacturer_data={0x0499: b"\x05\x12"},
+        service_data={"0000181a-0000-1000-8000-00805f9b34fb": b"\x01\x02"},
+        service_uuids=["0000feaa-0000-1000-8000-00805f9b34fb"],
+        tx_power=4,
+        rssi=-70,
+        platform_data=(),
+    )
+
+    # A truncated AD structure is ignored
+    advertisement_data = parse_advertising_data(bytes.fromhex("05ff990405"), -70)
+    assert advertisement_data.manufacturer_data == {}
+
+
+def test_parse_advertising_report() -> None:
+    """Test parsing an LE Advertising Report event with two reports."""
+    reports = b"".join(
+        bytes([0x00, 0x01]) + ADDRESS + bytes([len(data)]) + data + bytes([rssi])
+        for data, rssi in ((AD_DATA, 0xBA), (b"", 0xB0))
+    )
+    event = bytes([0x3E, len(reports) + 2, 0x02, 2]) + reports
+
+    (address1, data1), (address2, data2) = AdvertisingReportParser().parse_event(event)
+    assert address1 == address2 == "D5:FE:15:49:AC:7D"
+    assert data1.local_name == "Ruuvi AC7D"
+    assert data1.rssi == -70  # noqa: PLR2004
+    assert data2.local_name is None
+    assert data2.rssi == -80  # noqa: PLR2004
+
+
+def test_parse_extended_advertising_report() -> None:
+    """Test parsing fragmented LE Extended Advertising Report events."""
+
+    def event(data_status: int, data: bytes) -> bytes:
+        report = (
+            bytes([data_status, 0x00, 0x01])
+            + ADDRESS
+            + bytes([0x01, 0x00, 0x03, 0x7F, 0xBA, 0x00, 0x00, 0x00])
+            + bytes(6)
+            + bytes([len(data)])
+            + data
+        )
+        return bytes([0x3E, len(report) + 2, 0x0D, 1]) + report
+
+    parser = AdvertisingReportParser()
+    assert list(parser.parse_event(event(0x20, AD_DATA[:10]))) == []
+    ((address, advertisement_data),) = parser.parse_event(event(0x00, AD_DATA[10:]))
+    assert address == "D5:FE:15:49:AC:7D"
+    assert advertisement_data == parse_advertising_data(AD_DATA, -70)
+    assert parser.fragments == {}
+
+    # Other events are ignored
+    assert list(parser.parse_event(bytes.fromhex("0e0401030c00"))) == []
+
+
+def test_encode_advertising_report() -> None:
+    """Test synthesizing advertising report events."""
+    advertisement_data = parse_advertising_data(AD_DATA, -70)
+    parser = AdvertisingReportParser()
+
+    (event,) = encode_advertising_report("D5:FE:15:49:AC:7D", advertisement_data)
+    assert event[2] == 0x02  # noqa: PLR2004
+    assert parser.parse_event(event) == [("D5:FE:15:49:AC:7D", advertisement_data)]
+
+    # Long data is split over extended advertising reports.
+    advertisement_data = advertisement_data._replace(
+        manufacturer_data={0x0499: bytes(240)},
+        service_uuids=["6e400001-b5a3-f393-e0a9-e50e24dcca9e"],
+        tx_power=None,
+    )
+    events = encode_advertising_report("D5:FE:15:49:AC:7D", advertisement_data)
+    assert [event[2] for event in events] == [0x0D, 0x0D]
+    assert parser.parse_event(events[0]) == []
+    assert parser.parse_event(events[1]) == [
+        ("D5:FE:15:49:AC:7D", advertisement_data),
+    ]
+
+    with pytest.raises(ValueError, match="isn't a Bluetooth address"):
+        encode_advertising_report("5C1C2B36-6FE0-4D2A-9B62", advertisement_data)
@@ -0,0 +1,159 @@
+"""Tests for headless module."""
+from __future__ import annotations
+
+import asyncio
+import json
+from argparse import Namespace
+from datetime import datetime, timedelta
+from io import StringIO
+from typing import TYPE_CHECKING
+
+from bleak.backends.scanner import AdvertisementData
+
+from humble_explorer.btsnoop import read_btsnoop
+from humble_explorer.capture import open_capture
+from humble_explorer.headless import run_headless, watch_exports
+from humble_explorer.watchlist import AlertCommand, Watchlist, WatchlistEntry
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    import pytest
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+TIME = datetime(2023, 3, 19, 14, 32, 10, 123456)  # noqa: DTZ001
+RUUVI = AdvertisementData(
+    local_name="Ruuvi AC7D",
+    manufacturer_data={0x0499: b"\x05\x12"},
+    service_data={},
+    service_uuids=[],
+    tx_power=None,
+    rssi=-70,
+    platform_data=(),
+)
+# Two advertisements of the same device with the same payload, then another device
+ADVERTISEMENTS = [
+    (TIME, "D5:FE:15:49:AC:7D", RUUVI),
+    (TIME + timedelta(milliseconds=100), "D5:FE:15:49:AC:7D", RUUVI),
+    (
+        TIME + timedelta(milliseconds=200),
+        "58:2D:34:54:2D:2C",
+        RUUVI._replace(manufacturer_data={0x004C: b"\x10\x05"}),
+    ),
+]
+
+
+def headless_arguments(import_btsnoop: Path, **options: object) -> Namespace:
+    """Create the command-line arguments to export a btsnoop file headless."""
+    arguments = Namespace(
+        import_btsnoop=str(import_btsnoop),
+        export=None,
+        filter="",
+        changes_only=False,
+        rate_limit=None,
+        company_rate_limit=None,
+        identity_resolver=None,
+        presence=False,
+        gone_after=None,
+        watchlist=None,
+        alert_command=None,
+        metrics=None,
+    )
+    vars(arguments).update(options)
+    return arguments
+
+
+def btsnoop_file(path: Path) -> Path:
+    """Write the advertisements to a btsnoop file."""
+    exporter = open_capture(path)
+    for advertisement in ADVERTISEMENTS:
+        exporter.export(*advertisement)
+    exporter.close()
+    return path
+
+
+def test_json_lines(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """Test exporting advertisements as JSON lines."""
+    path = btsnoop_file(tmp_path / "input.btsnoop")
+    asyncio.run(run_headless(headless_arguments(path)))
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [line["address"] for line in lines] == [
+        address for _, address, _ in ADVERTISEMENTS
+    ]
+    assert lines[0]["time"] == TIME.isoformat()
+    assert lines[0]["local_name"] == "Ruuvi AC7D"
+    assert lines[0]["manufacturer_data"] == {"0x0499": "0512"}
+    assert lines[1]["interval_ms"] == 100  # noqa: PLR2004
+
+    # Unchanged advertisements aren't exported.
+    asyncio.run(run_headless(headless_arguments(path, changes_only=True)))
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [line["address"] for line in lines] == [
+        "D5:FE:15:49:AC:7D",
+        "58:2D:34:54:2D:2C",
+    ]
+
+
+def test_events(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """Test writing presence events and alerts before the advertisements."""
+    path = btsnoop_file(tmp_path / "input.btsnoop")
+    watchlist = Watchlist([WatchlistEntry("address=58:2D:34:54:2D:2C", "Thermometer")])
+    asyncio.run(
+        run_headless(headless_arguments(path, presence=True, watchlist=watchlist)),
+    )
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [(line.get("event"), line["address"]) for line in lines] == [
+        ("appeared", "D5:FE:15:49:AC:7D"),
+        (None, "D5:FE:15:49:AC:7D"),
+        (None, "D5:FE:15:49:AC:7D"),
+        ("watchlist", "58:2D:34:54:2D:2C"),
+        ("appeared", "58:2D:34:54:2D:2C"),
+        (None, "58:2D:34:54:2D:2C"),
+    ]
+    assert lines[3]["label"] == "Thermometer"
+
+
+def test_capture(tmp_path: Path) -> None:
+    """Test exporting advertisements to a capture file."""
+    path = btsnoop_file(tmp_path / "input.btsnoop")
+    export = tmp_path / "output.btsnoop"
+    asyncio.run(run_headless(headless_arguments(path, export=str(export))))
+    assert list(read_btsnoop(export)) == ADVERTISEMENTS
+
+    # Throttled advertisements aren't exported.
+    asyncio.run(
+        run_headless(
+            headless_arguments(
+                path,
+                export=str(export),
+                filter="company=0499",
+                company_rate_limit=1,
+            ),
+        ),
+    )
+    assert list(read_btsnoop(export)) == ADVERTISEMENTS[:1]
+
+
+def test_watch_exports_failing_command(capsys: pytest.CaptureFixture[str]) -> None:
+    """Test exporting advertisements when the alert command can't be run."""
+    exported = []
+
+    def export(time: datetime, address: str, _: AdvertisementData) -> None:
+        exported.append((time, address))
+
+    alerts = StringIO()
+    watched_export = watch_exports(
+        export,
+        Watchlist([WatchlistEntry("address=C0:00:00:00:00:01", "Tracker")]),
+        alerts,
+        AlertCommand("humble-explorer-missing-alert-command"),
+    )
+    watched_export(TIME, "C0:00:00:00:00:01", RUUVI)
+    watched_export(TIME, "C0:00:00:00:00:02", RUUVI)
+
+    assert exported == [(TIME, "C0:00:00:00:00:01"), (TIME, "C0:00:00:00:00:02")]
+    assert json.loads(alerts.getvalue())["label"] == "Tracker"
+    assert "Can't run alert command" in capsys.readouterr().err
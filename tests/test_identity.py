@@ -0,0 +1,63 @@
+"""Tests for identity module."""
+from pathlib import Path
+
+import pytest
+
+from humble_explorer.identity import (
+    IdentityResolver,
+    ah,
+    is_resolvable_private_address,
+    load_identities,
+)
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+# Sample data of the random address hash function in the Bluetooth Core Specification
+IRK = bytes.fromhex("ec0234a357c8ad05341010a60a397d9b")
+RESOLVABLE_ADDRESS = "70:81:94:0D:FB:AA"
+
+
+def test_ah() -> None:
+    """Test the random address hash function."""
+    assert ah(IRK, bytes.fromhex("708194")) == bytes.fromhex("0dfbaa")
+
+
+def test_is_resolvable_private_address() -> None:
+    """Test recognizing resolvable private addresses."""
+    assert is_resolvable_private_address(RESOLVABLE_ADDRESS)
+    # Static random address
+    assert not is_resolvable_private_address("D5:FE:15:49:AC:7D")
+    # Public address
+    assert not is_resolvable_private_address("00:1A:7D:DA:71:13")
+    # UUID on macOS
+    assert not is_resolvable_private_address("4B2E2A4B-4C1E-4C5F-8A6B-1C2D3E4F5A6B")
+
+
+def test_identity_resolver() -> None:
+    """Test resolving addresses to known devices."""
+    resolver = IdentityResolver({"Other": bytes(16), "Phone": IRK})
+    assert resolver.resolve(RESOLVABLE_ADDRESS) == "Phone"
+    assert resolver.resolve("70:81:94:0D:FB:AB") is None
+    assert resolver.resolve("D5:FE:15:49:AC:7D") is None
+
+    # The result is cached, so the hash isn't computed again.
+    resolver.identities = {}
+    assert resolver.resolve(RESOLVABLE_ADDRESS) == "Phone"
+
+
+def test_load_identities(tmp_path: Path) -> None:
+    """Test loading IRKs from a file."""
+    irk_file = tmp_path / "irks.txt"
+    irk_file.write_text(
+        f"# Known devices\n\n{IRK.hex()} Koen's phone\n{bytes(16).hex()}\n",
+    )
+    assert load_identities(irk_file) == {
+        "Koen's phone": IRK,
+        "IRK 00000000": bytes(16),
+    }
+
+    irk_file.write_text("ec0234a357c8ad05 Phone\n")
+    with pytest.raises(ValueError, match=r"irks.txt:1: invalid IRK ec0234a357c8ad05"):
+        load_identities(irk_file)
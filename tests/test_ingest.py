@@ -0,0 +1,100 @@
+"""Tests for ingest module."""
+from __future__ import annotations
+
+from datetime import datetime
+from multiprocessing.shared_memory import SharedMemory
+from typing import TYPE_CHECKING
+
+import pytest
+from bleak.backends.scanner import AdvertisementData
+
+from humble_explorer.ingest import DATA, RingBuffer
+from humble_explorer.protocol import decode_advertisement, encode_advertisement
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+
+@pytest.fixture()
+def ring_buffer() -> Iterator[RingBuffer]:
+    """Create a small ring buffer, and free it after the test."""
+    ring_buffer = RingBuffer.create(64)
+    yield ring_buffer
+    ring_buffer.close()
+    ring_buffer.unlink()
+
+
+def test_write_read(ring_buffer: RingBuffer) -> None:
+    """Test reading records in order."""
+    assert ring_buffer.read() == []
+    assert ring_buffer.write(b"first")
+    assert ring_buffer.write(b"")
+    assert ring_buffer.write(b"second")
+    assert ring_buffer.read() == [b"first", b"", b"second"]
+    assert ring_buffer.read() == []
+
+
+def test_wrap_around() -> None:
+    """Test records that wrap around the end of the ring buffer."""
+    # The shared memory can be bigger than the ring buffer, such as on macOS and
+    # Windows, where its size is rounded up to a page. Fill the padding after the
+    # ring buffer, which should never be read.
+    shared_memory = SharedMemory(create=True, size=DATA + 4096)
+    ring_buffer = RingBuffer(shared_memory, 64)
+    try:
+        assert shared_memory.buf is not None
+        shared_memory.buf[DATA + 64 :] = b"\xff" * (shared_memory.size - DATA - 64)
+        # Every frame has 4 bytes length and 20 bytes data, so most of them are
+        # split over the end and the start of the buffer at some point.
+        for number in range(20):
+            record = bytes([number]) * 20
+            assert ring_buffer.write(record)
+            assert ring_buffer.read() == [record]
+    finally:
+        ring_buffer.close()
+        ring_buffer.unlink()
+
+
+def test_full(ring_buffer: RingBuffer) -> None:
+    """Test dropping records when the ring buffer is full."""
+    assert ring_buffer.write(bytes(28))
+    assert ring_buffer.write(bytes(28))
+    assert not ring_buffer.write(b"dropped")
+    assert ring_buffer.dropped == 1
+    assert ring_buffer.read() == [bytes(28), bytes(28)]
+    # Reading frees the space of the records.
+    assert ring_buffer.write(b"written")
+    assert ring_buffer.read() == [b"written"]
+
+
+def test_attach(ring_buffer: RingBuffer) -> None:
+    """Test writing and reading the same ring buffer from two objects."""
+    time = datetime(2023, 2, 15, 14, 32, 10, 123456)  # noqa: DTZ001
+    advertisement_data = AdvertisementData(
+        local_name="Ruuvi",
+        manufacturer_data={0x0499: b"\x05\x12"},
+        service_data={},
+        service_uuids=[],
+        tx_power=None,
+        rssi=-60,
+        platform_data=(),
+    )
+    writer = RingBuffer.attach(ring_buffer.name)
+    try:
+        assert writer.capacity == ring_buffer.capacity
+        writer.write(
+            encode_advertisement(time, "C0:00:00:00:00:01", advertisement_data),
+        )
+        (record,) = ring_buffer.read()
+    finally:
+        writer.close()
+
+    assert decode_advertisement(record) == (
+        time,
+        "C0:00:00:00:00:01",
+        advertisement_data,
+    )
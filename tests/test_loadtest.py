@@ -0,0 +1,40 @@
+"""Tests for loadtest module."""
+import asyncio
+
+from humble_explorer.loadtest import (
+    SyntheticScanner,
+    app_arguments,
+    results_table,
+    run_load_test,
+)
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+
+def test_synthetic_advertisements() -> None:
+    """Test the advertisements of the synthetic scanner."""
+    scanner = SyntheticScanner(lambda _device, _data: None, 100, 3)
+    device, advertisement_data = scanner.advertisement(0)
+    assert device.address == "C0:00:00:00:00:00"
+    assert scanner.advertisement(5)[0].address == "C0:00:00:00:00:02"
+    # The payload of a device changes with every advertisement
+    assert (
+        scanner.advertisement(3)[1].manufacturer_data
+        != advertisement_data.manufacturer_data
+    )
+    assert scanner.dropped == 0
+
+
+def test_load_test() -> None:
+    """Test a short load test of the app."""
+    result = asyncio.run(run_load_test(app_arguments(), 200, 5, 0.5))
+    assert result.generated > 0
+    assert result.dropped == 0
+    assert result.pending == 0
+    assert 0 < result.latency_median <= result.latency_p99 <= result.latency_max
+    assert result.frames > 0
+
+    table = results_table([result])
+    assert table.row_count == 1
@@ -0,0 +1,100 @@
+"""Tests for memory module."""
+from __future__ import annotations
+
+import json
+import sys
+from io import StringIO
+from typing import TYPE_CHECKING
+
+from humble_explorer.memory import OTHER, MemoryProfiler, format_size, open_profiler
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+ALLOCATION_SIZE = 1_000_000
+
+allocations: list[bytearray] = []
+
+
+def allocate() -> None:
+    """Allocate memory that is kept until the end of the test."""
+    allocations.append(bytearray(ALLOCATION_SIZE))
+
+
+def test_format_size() -> None:
+    """Test formatting sizes."""
+    assert format_size(0) == "0.0 MiB"
+    assert format_size(1_572_864) == "1.5 MiB"
+    assert format_size(1_572_864, signed=True) == "+1.5 MiB"
+    assert format_size(-1_572_864, signed=True) == "-1.5 MiB"
+
+
+def test_attribution() -> None:
+    """Test attributing allocations to the most specific subsystem."""
+    profiler = MemoryProfiler(
+        {"module": [sys.modules[__name__]], "function": [allocate]},
+    )
+    profiler.start()
+    try:
+        allocate()
+        allocations.append(bytearray(ALLOCATION_SIZE))
+        sample = profiler.sample()
+    finally:
+        profiler.stop()
+        allocations.clear()
+
+    assert list(sample.subsystems) == ["module", "function", OTHER]
+    assert ALLOCATION_SIZE <= sample.subsystems["function"] < 2 * ALLOCATION_SIZE
+    assert ALLOCATION_SIZE <= sample.subsystems["module"] < 2 * ALLOCATION_SIZE
+    assert sample.changes is None
+    assert sample.top_changes == []
+
+
+def test_mark() -> None:
+    """Test comparing samples with a mark."""
+    stream = StringIO()
+    profiler = MemoryProfiler({"function": [allocate]}, stream)
+    profiler.start()
+    try:
+        profiler.mark()
+        allocate()
+        sample = profiler.sample()
+        sample_json = json.loads(stream.getvalue())
+    finally:
+        profiler.stop()
+        allocations.clear()
+
+    assert sample.changes is not None
+    assert ALLOCATION_SIZE <= sample.changes["function"] < 2 * ALLOCATION_SIZE
+    location, size, count = sample.top_changes[0]
+    assert location.startswith(__file__)
+    assert size >= ALLOCATION_SIZE
+    assert count >= 1
+
+    assert sample_json["subsystems"] == sample.subsystems
+    assert sample_json["since_mark"] == sample.changes
+    assert sample_json["top_since_mark"][0] == {
+        "location": location,
+        "size": size,
+        "count": count,
+    }
+    assert stream.closed
+
+
+def test_open_profiler(tmp_path: Path) -> None:
+    """Test writing samples to a profile file that the profiler closes."""
+    path = tmp_path / "profile.jsonl"
+    profiler = open_profiler({"function": [allocate]}, path)
+    profiler.start()
+    try:
+        sample = profiler.sample()
+    finally:
+        profiler.stop()
+
+    assert profiler.stream is not None
+    assert profiler.stream.closed
+    assert json.loads(path.read_text())["subsystems"] == sample.subsystems
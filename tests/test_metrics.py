@@ -0,0 +1,97 @@
+"""Tests for metrics module."""
+from __future__ import annotations
+
+from urllib.request import urlopen
+
+import pytest
+from bleak.backends.scanner import AdvertisementData
+
+from humble_explorer.metrics import (
+    Histogram,
+    Metrics,
+    MetricsServer,
+    parse_metrics_address,
+)
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+
+def advertisement_data(manufacturer_data: dict[int, bytes]) -> AdvertisementData:
+    """Create advertisement data with manufacturer data."""
+    return AdvertisementData(
+        local_name=None,
+        manufacturer_data=manufacturer_data,
+        service_data={},
+        service_uuids=[],
+        tx_power=None,
+        rssi=-60,
+        platform_data=(),
+    )
+
+
+def test_parse_metrics_address() -> None:
+    """Test parsing the address of the metrics server."""
+    assert parse_metrics_address("9101") == ("127.0.0.1", 9101)
+    assert parse_metrics_address("0.0.0.0:9101") == ("0.0.0.0", 9101)  # noqa: S104
+    with pytest.raises(ValueError, match="Invalid port"):
+        parse_metrics_address("70000")
+    with pytest.raises(ValueError, match="invalid literal"):
+        parse_metrics_address("localhost")
+
+
+def test_histogram() -> None:
+    """Test the cumulative buckets of a histogram."""
+    histogram = Histogram((1, 2))
+    for value in (0.5, 1, 1.5, 3):
+        histogram.observe(value)
+    assert list(histogram.samples("x")) == [
+        'x_bucket{le="1"} 2',
+        'x_bucket{le="2"} 3',
+        'x_bucket{le="+Inf"} 4',
+        "x_sum 6.0",
+        "x_count 4",
+    ]
+
+
+def test_metrics() -> None:
+    """Test counting advertisements."""
+    metrics = Metrics(max_devices=2)
+    metrics.observe("A", advertisement_data({0x004C: b"\x02"}), 0.0002)
+    metrics.observe("B", advertisement_data({}))
+    metrics.observe("A", advertisement_data({0x004C: b"\x02", 0x0006: b""}))
+    # Devices above the maximum are counted together.
+    metrics.observe("C", advertisement_data({}))
+    metrics.observe("D", advertisement_data({}))
+    metrics.dropped = 3
+    metrics.queue_depth = 5
+
+    lines = metrics.render().splitlines()
+    assert "humble_explorer_packets_total 5" in lines
+    assert 'humble_explorer_device_packets_total{address="A"} 2' in lines
+    assert 'humble_explorer_device_packets_total{address="B"} 1' in lines
+    assert 'humble_explorer_device_packets_total{address="other"} 2' in lines
+    assert 'humble_explorer_company_packets_total{company="0x004c"} 2' in lines
+    assert 'humble_explorer_company_packets_total{company="0x0006"} 1' in lines
+    assert "humble_explorer_dropped_total 3" in lines
+    assert "humble_explorer_queue_depth 5" in lines
+    assert 'humble_explorer_ingestion_latency_seconds_bucket{le="0.00025"} 1' in lines
+    assert "humble_explorer_ingestion_latency_seconds_count 1" in lines
+
+
+def test_metrics_server() -> None:
+    """Test scraping the metrics server."""
+    metrics = Metrics()
+    metrics.observe("A", advertisement_data({}))
+    server = MetricsServer(metrics, "127.0.0.1", 0)
+    server.start()
+    try:
+        with urlopen(  # noqa: S310
+            f"http://127.0.0.1:{server.port}/metrics",
+        ) as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            body = response.read().decode()
+    finally:
+        server.stop()
+    assert "humble_explorer_packets_total 1\n" in body
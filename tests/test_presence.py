@@ -0,0 +1,100 @@
+"""Tests for presence module."""
+import pytest
+from bleak.backends.scanner import AdvertisementData
+
+from humble_explorer.presence import (
+    APPEARED,
+    GONE,
+    PresenceEvent,
+    PresenceTracker,
+    TimerWheel,
+    parse_presence_class,
+)
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+SECOND = 1_000_000_000
+
+
+def advertisement(local_name: str) -> AdvertisementData:
+    """Create advertisement data with the given local name."""
+    return AdvertisementData(
+        local_name=local_name,
+        manufacturer_data={},
+        service_data={},
+        service_uuids=[],
+        tx_power=None,
+        rssi=-70,
+        platform_data=(),
+    )
+
+
+def test_parse_presence_class() -> None:
+    """Test parsing device classes."""
+    presence_class = parse_presence_class("2.5")
+    assert presence_class.timeout == 2_500_000_000  # noqa: PLR2004
+    assert presence_class.device_filter is None
+
+    presence_class = parse_presence_class("300:address=DC:23")
+    assert presence_class.timeout == 300 * SECOND
+    assert presence_class.device_filter
+    assert presence_class.device_filter.address == "DC:23"
+
+    with pytest.raises(ValueError, match="Invalid timeout"):
+        parse_presence_class("0")
+
+
+def test_timer_wheel() -> None:
+    """Test expiring deadlines in a timer wheel."""
+    wheel = TimerWheel(resolution=10, slots=4)
+    assert list(wheel.advance(0)) == []
+    wheel.schedule("a", 15)
+    wheel.schedule("b", 20)
+    # Shares a slot with "a", but a round later
+    wheel.schedule("c", 55)
+    assert list(wheel.advance(19)) == []
+    assert list(wheel.advance(20)) == ["a", "b"]
+    assert list(wheel.advance(50)) == []
+    # A long pause checks every slot once
+    assert list(wheel.advance(1000)) == ["c"]
+    # A deadline in the past is checked on the next tick
+    wheel.schedule("d", 500)
+    assert list(wheel.advance(1010)) == ["d"]
+
+
+def test_presence_tracker() -> None:
+    """Test presence events with timeouts per device class."""
+    tracker = PresenceTracker(
+        [parse_presence_class("10:name=Ruuvi"), parse_presence_class("2")],
+    )
+    assert tracker.observe("A", advertisement("Ruuvi 1234"), 0) == [
+        PresenceEvent(APPEARED, "A", 0),
+    ]
+    assert tracker.observe("B", advertisement("Other"), SECOND) == [
+        PresenceEvent(APPEARED, "B", SECOND),
+    ]
+    # Advertisements of present devices don't create events.
+    assert tracker.observe("B", advertisement("Other"), 2 * SECOND) == []
+    assert len(tracker) == 2  # noqa: PLR2004
+
+    assert tracker.expire(3 * SECOND) == []
+    assert tracker.expire(4 * SECOND) == [PresenceEvent(GONE, "B", 4 * SECOND)]
+    assert tracker.observe("A", advertisement("Ruuvi 1234"), 9 * SECOND) == []
+    assert tracker.expire(15 * SECOND) == []
+    assert tracker.expire(20 * SECOND) == [PresenceEvent(GONE, "A", 19 * SECOND)]
+    assert len(tracker) == 0
+
+    # A gone device appears again.
+    assert tracker.observe("B", advertisement("Other"), 21 * SECOND) == [
+        PresenceEvent(APPEARED, "B", 21 * SECOND),
+    ]
+
+
+def test_presence_tracker_default_class() -> None:
+    """Test the default timeout for devices without matching device class."""
+    tracker = PresenceTracker([parse_presence_class("5:name=Ruuvi")])
+    tracker.observe("A", advertisement("Other"), 0)
+    assert tracker.expire(29 * SECOND) == []
+    assert tracker.expire(30 * SECOND) == [PresenceEvent(GONE, "A", 30 * SECOND)]
@@ -0,0 +1,65 @@
+"""Tests for protocol module."""
+from datetime import datetime
+
+from bleak.backends.scanner import AdvertisementData
+
+from humble_explorer.protocol import decode_advertisement, encode_advertisement
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+
+def test_advertisement_round_trip() -> None:
+    """Test encoding and decoding an advertisement."""
+    time = datetime(2023, 3, 19, 14, 32, 10, 123456)  # noqa: DTZ001
+    address = "D5:FE:15:49:AC:7D"
+    advertisement_data = AdvertisementData(
+        local_name="Ruuvi 1234",
+        manufacturer_data={0x0499: b"\x05\x12\xfc", 0x004C: b""},
+        service_data={"0000181a-0000-1000-8000-00805f9b34fb": b"\x01\x02"},
+        service_uuids=["0000fe9a-0000-1000-8000-00805f9b34fb"],
+        tx_power=None,
+        rssi=-70,
+        platform_data=(),
+    )
+
+    record = encode_advertisement(time, address, advertisement_data)
+    assert decode_advertisement(record) == (time, address, advertisement_data)
+
+
+def test_empty_advertisement() -> None:
+    """Test encoding and decoding an advertisement without data."""
+    time = datetime(2023, 3, 19, 14, 32, 10)  # noqa: DTZ001
+    advertisement_data = AdvertisementData(
+        local_name=None,
+        manufacturer_data={},
+        service_data={},
+        service_uuids=[],
+        tx_power=4,
+        rssi=-90,
+        platform_data=(),
+    )
+
+    record = encode_advertisement(time, "58:2D:34:54:2D:2C", advertisement_data)
+    assert decode_advertisement(record)[2] == advertisement_data
+
+
+def test_long_advertisement() -> None:
+    """Test encoding and decoding an advertisement with long fields."""
+    time = datetime(2023, 3, 19, 14, 32, 10)  # noqa: DTZ001
+    advertisement_data = AdvertisementData(
+        local_name="Ruuvi " * 60,
+        manufacturer_data={},
+        service_data={},
+        service_uuids=[
+            f"0000{uuid:04x}-0000-1000-8000-00805f9b34fb" for uuid in range(300)
+        ],
+        tx_power=None,
+        rssi=None,  # type: ignore[arg-type]
+        platform_data=(),
+    )
+
+    record = encode_advertisement(time, "58:2D:34:54:2D:2C", advertisement_data)
+    # An unknown RSSI stays unknown.
+    assert decode_advertisement(record)[2] == advertisement_data
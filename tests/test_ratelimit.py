@@ -0,0 +1,85 @@
+"""Tests for ratelimit module."""
+import pytest
+
+from humble_explorer.ratelimit import RateLimiter, TokenBucket
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+
+def test_token_bucket() -> None:
+    """Test TokenBucket class."""
+    bucket = TokenBucket(rate=2, capacity=2, now=0)
+    # A full bucket allows a burst up to its capacity
+    assert bucket.consume(0)
+    assert bucket.consume(0)
+    assert not bucket.consume(0.1)
+    # After half a second, the bucket has one token again
+    assert bucket.consume(0.5)
+    assert not bucket.consume(0.5)
+    # The bucket never holds more than its capacity
+    assert bucket.consume(100)
+    assert bucket.consume(100)
+    assert not bucket.consume(100)
+
+    for rate in (0, -1, float("nan")):
+        with pytest.raises(ValueError, match="isn't positive"):
+            TokenBucket(rate=rate, capacity=1, now=0)
+
+
+def test_rate_limiter() -> None:
+    """Test RateLimiter class."""
+    assert not RateLimiter()
+    assert RateLimiter().allow("D5:FE:15:49:AC:7D", [0x0499], 0)
+
+    limiter = RateLimiter(device_rate=1)
+    assert limiter.allow("D5:FE:15:49:AC:7D", [], 0)
+    assert not limiter.allow("D5:FE:15:49:AC:7D", [], 0.5)
+    # Each device has its own bucket
+    assert limiter.allow("58:2D:34:54:2D:2C", [], 0.5)
+    assert limiter.allow("D5:FE:15:49:AC:7D", [], 1.5)
+
+    limiter = RateLimiter(company_rate=1)
+    assert limiter.allow("D5:FE:15:49:AC:7D", [0x0499], 0)
+    # Devices from the same company share the company's bucket
+    assert not limiter.allow("58:2D:34:54:2D:2C", [0x0499], 0)
+    assert limiter.allow("58:2D:34:54:2D:2C", [0x004C], 0)
+
+
+def test_rate_limiter_budget() -> None:
+    """Test that a throttled advertisement doesn't use up the other limits."""
+    limiter = RateLimiter(device_rate=1, company_rate=1)
+    assert limiter.allow("D5:FE:15:49:AC:7D", [0x0499], 0)
+    # The company's bucket is empty, so the other device keeps its token.
+    assert not limiter.allow("58:2D:34:54:2D:2C", [0x0499], 0)
+    assert limiter.allow("58:2D:34:54:2D:2C", [0x004C], 0)
+
+    # The device's bucket is empty, so the company keeps its token.
+    limiter = RateLimiter(device_rate=1, company_rate=1)
+    assert limiter.allow("D5:FE:15:49:AC:7D", [], 0)
+    assert not limiter.allow("D5:FE:15:49:AC:7D", [0x0499], 0)
+    assert limiter.allow("58:2D:34:54:2D:2C", [0x0499], 0)
+
+    # One empty company bucket throttles the advertisement for all its company IDs.
+    limiter = RateLimiter(company_rate=1)
+    assert limiter.allow("D5:FE:15:49:AC:7D", [0x004C], 0)
+    assert not limiter.allow("D5:FE:15:49:AC:7D", [0x0499, 0x004C], 0)
+    assert limiter.allow("D5:FE:15:49:AC:7D", [0x0499], 0)
+
+
+def test_rate_limiter_state(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test forgetting the full buckets when there are too many."""
+    monkeypatch.setattr("humble_explorer.ratelimit.BUCKET_STATE_SIZE", 2)
+    limiter = RateLimiter(device_rate=1)
+    assert limiter.allow("D5:FE:15:49:AC:7D", [], 0)
+    assert limiter.allow("58:2D:34:54:2D:2C", [], 0.5)
+    # The first bucket is full again, so it's forgotten for the new device.
+    assert limiter.allow("C0:00:00:00:00:00", [], 1)
+    assert set(limiter.buckets) == {"58:2D:34:54:2D:2C", "C0:00:00:00:00:00"}
+    # The bucket of the second device still throttles it.
+    assert not limiter.allow("58:2D:34:54:2D:2C", [], 1)
+
+    # The buckets aren't full, so none are forgotten.
+    assert limiter.allow("D5:FE:15:49:AC:7D", [], 1)
+    assert len(limiter.buckets) == 3  # noqa: PLR2004
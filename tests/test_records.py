@@ -0,0 +1,83 @@
+"""Tests for records module."""
+from datetime import datetime
+
+from bleak.backends.scanner import AdvertisementData
+
+from humble_explorer.records import (
+    EMPTY_PAYLOADS,
+    AdvertisementRecord,
+    datetime_to_monotonic_ns,
+    monotonic_ns_to_datetime,
+)
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+
+def advertisement(manufacturer_data: bytes, rssi: int = -70) -> AdvertisementData:
+    """Create advertisement data with the given manufacturer data and RSSI."""
+    return AdvertisementData(
+        local_name="Ruuvi AC7D",
+        manufacturer_data={0x0499: manufacturer_data},
+        service_data={},
+        service_uuids=["6e400001-b5a3-f393-e0a9-e50e24dcca9e"],
+        tx_power=None,
+        rssi=rssi,
+        platform_data=("/org/bluez/hci0/dev_D5_FE_15_49_AC_7D", {}),
+    )
+
+
+def test_time_conversion() -> None:
+    """Test conversion between wall-clock time and monotonic timestamps."""
+    time = datetime(2023, 3, 14, 15, 9, 26, 535897)  # noqa: DTZ001
+    assert monotonic_ns_to_datetime(datetime_to_monotonic_ns(time)) == time
+
+
+def test_record() -> None:
+    """Test creating records from advertisement data."""
+    address = "D5:FE:15:49:AC:7D"
+    first = AdvertisementRecord.from_advertisement_data(
+        1000,
+        address,
+        advertisement(b"\x05\x12"),
+        {},
+    )
+    assert first.time == 1000  # noqa: PLR2004
+    assert first.address == address
+    assert first.local_name == "Ruuvi AC7D"
+    assert first.rssi == -70  # noqa: PLR2004
+    assert first.tx_power is None
+    assert first.manufacturer_data == {0x0499: b"\x05\x12"}
+    assert first.service_data is EMPTY_PAYLOADS
+    assert first.service_uuids == ("6e400001-b5a3-f393-e0a9-e50e24dcca9e",)
+    assert first.previous_payloads is EMPTY_PAYLOADS
+    assert first.watch_label is None
+    assert not hasattr(first, "__dict__")
+
+    # Equal attributes are shared with the previous record of the device
+    repeat = AdvertisementRecord.from_advertisement_data(
+        2000,
+        address,
+        advertisement(b"\x05\x12", rssi=-71),
+        {},
+        first,
+    )
+    assert repeat.rssi == -71  # noqa: PLR2004
+    assert repeat.local_name is first.local_name
+    assert repeat.manufacturer_data is first.manufacturer_data
+    assert repeat.service_uuids is first.service_uuids
+
+    # Changed payloads aren't shared
+    changed = AdvertisementRecord.from_advertisement_data(
+        3000,
+        address,
+        advertisement(b"\x05\x13"),
+        {0x0499: b"\x05\x12"},
+        repeat,
+        watch_label="Ruuvi tag",
+    )
+    assert changed.watch_label == "Ruuvi tag"
+    assert changed.manufacturer_data == {0x0499: b"\x05\x13"}
+    assert changed.previous_payloads == {0x0499: b"\x05\x12"}
+    assert changed.service_uuids is first.service_uuids
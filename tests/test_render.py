@@ -0,0 +1,83 @@
+"""Tests for render module."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from io import StringIO
+
+from bleak.backends.scanner import AdvertisementData
+
+from humble_explorer.render import render
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+
+def advertisements(count: int) -> list[tuple[datetime, str, AdvertisementData]]:
+    """Create advertisements of two devices, 100 ms apart."""
+    start = datetime(2023, 3, 1, 14, 32)  # noqa: DTZ001
+    return [
+        (
+            start + timedelta(milliseconds=100 * number),
+            f"D5:FE:15:49:AC:{number % 2:02X}",
+            AdvertisementData(
+                local_name=f"Ruuvi {number % 2}",
+                manufacturer_data={0x0499: bytes([5, number])},
+                service_data={},
+                service_uuids=[],
+                tx_power=None,
+                rssi=-70,
+                platform_data=(),
+            ),
+        )
+        for number in range(count)
+    ]
+
+
+def test_render_text() -> None:
+    """Test rendering advertisements to text in chunks."""
+    report = StringIO()
+    assert render(advertisements(10), report, "txt", processes=1) == 10  # noqa: PLR2004
+    lines = report.getvalue().splitlines()
+    assert lines[0].split() == ["Time", "Address", "Advertisement"]
+    assert "14:32:00.000000" in lines[1]
+    assert "Ruuvi 0" in report.getvalue()
+    # The advertising interval is estimated in order, before rendering.
+    assert "every ~200 ms" in report.getvalue()
+
+    # Rendering in chunks gives the same report.
+    chunked_report = StringIO()
+    render(advertisements(10), chunked_report, "txt", processes=1, chunk_size=3)
+    assert chunked_report.getvalue() == report.getvalue()
+
+
+def test_render_filter() -> None:
+    """Test rendering only the advertisements matching a filter."""
+    report = StringIO()
+    rendered = render(advertisements(10), report, "txt", "address=D5:FE:15:49:AC:01")
+    assert rendered == 5  # noqa: PLR2004
+    assert "Ruuvi 0" not in report.getvalue()
+
+
+def test_render_html_in_processes() -> None:
+    """Test rendering advertisements to HTML in a pool of processes."""
+    report = StringIO()
+    render(advertisements(6), report, "html", processes=1)
+    parallel_report = StringIO()
+    render(advertisements(6), parallel_report, "html", processes=2, chunk_size=2)
+    # Addresses have the same color in every process.
+    assert parallel_report.getvalue() == report.getvalue()
+    assert report.getvalue().startswith("<!DOCTYPE html>")
+    assert report.getvalue().count("<pre") == 1
+    assert report.getvalue().endswith("</code></pre>\n</body>\n</html>\n")
+
+
+def test_render_svg() -> None:
+    """Test stacking the chunks of an SVG report."""
+    report = StringIO()
+    render(advertisements(6), report, "svg", processes=1, chunk_size=4)
+    svg = report.getvalue()
+    assert svg.startswith("<svg viewBox=")
+    assert svg.count('class="rich-terminal"') == 2  # noqa: PLR2004
+    assert 'y="0.0"' in svg
+    assert "advertisements&#160;5-6" in svg
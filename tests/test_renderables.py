@@ -1,9 +1,17 @@
 """Tests for renderables module."""
 from datetime import datetime
 
+from bleak.backends.scanner import AdvertisementData
+from rich.console import Console
+from rich.measure import Measurement
 from rich.text import Span, Text
 
+from humble_explorer.records import datetime_to_monotonic_ns
 from humble_explorer.renderables import (
+    CHANGED_BYTE_STYLE,
+    COLLAPSED_ENTRIES,
+    DisplayConfig,
+    RichAdvertisement,
     RichCompanyID,
     RichDeviceAddress,
     RichHexData,
@@ -11,6 +19,7 @@ from humble_explorer.renderables import (
     RichRSSI,
     RichTime,
     RichUUID,
+    changed_bytes,
 )
 
 __author__ = "Koen Vervloesem"
@@ -20,15 +29,25 @@ __license__ = "MIT"
 
 def test_time() -> None:
     """Test RichTime class."""
-    time1 = RichTime(datetime.now())
-    time2 = RichTime(datetime.now())
-    # Make time1 and time2 times within the same second
-    while time1.full_time.split(".")[0] != time2.full_time.split(".")[0]:
-        time1 = RichTime(datetime.now())
+    time = datetime(2023, 2, 15, 14, 32, 10, 123456)  # noqa: DTZ001
+    timestamp = datetime_to_monotonic_ns(time)
+    time1 = RichTime(timestamp)
+    time2 = RichTime(timestamp + 500_000_000)
+    assert time1.full_time == "14:32:10.123456"
+    assert time2.full_time == "14:32:10.623456"
 
     # Times within the same second should have the same color
     assert time1.style == time2.style
 
+    # The time is measured without rendering it
+    console = Console()
+    assert Measurement.get(console, console.options, time1).maximum == len(
+        time1.full_time,
+    )
+    with console.capture() as capture:
+        console.print(time1)
+    assert capture.get() == "14:32:10.123456\n"
+
 
 def test_device_address() -> None:
     """Test RichDeviceAddress class."""
@@ -50,6 +69,17 @@ def test_device_address() -> None:
     assert str(device_address_qingping.__rich__()) == full_address_string_qingping
     assert device_address_qingping.height() == 2  # noqa: PLR2004
 
+    # The advertising interval is shown below the address
+    device_address_interval = RichDeviceAddress(address_string, 102)
+    assert str(device_address_interval.__rich__()) == f"{address_string}\nevery ~102 ms"
+    assert device_address_interval.height() == 2  # noqa: PLR2004
+
+    # Private addresses of the same device have the color of the device
+    phone = RichDeviceAddress("70:81:94:0D:FB:AA", identity="Phone")
+    phone2 = RichDeviceAddress("4A:13:8E:22:01:9C", identity="Phone")
+    assert str(phone.__rich__()) == "70:81:94:0D:FB:AA\nPhone"
+    assert phone.style == phone2.style
+
 
 def test_rssi() -> None:
     """Test RichRSSI class."""
@@ -114,3 +144,99 @@ def test_hex_string() -> None:
         str(RichHexString(data).__rich__())
         == " .  N  .  #  .  .  .  .  .  .  .  .  .  ."
     )
+
+
+def test_advertisement() -> None:
+    """Test RichAdvertisement class."""
+    data = AdvertisementData(
+        local_name="Ruuvi 1234",
+        manufacturer_data={0x0499: b"\x05\x12\xfc", 0x004C: b"\x02\x15"},
+        service_data={},
+        service_uuids=["0000181a-0000-1000-8000-00805f9b34fb"],
+        tx_power=None,
+        rssi=-70,
+        platform_data=(),
+    )
+    config = DisplayConfig()
+    advertisement = RichAdvertisement(data, config)
+    rendered = str(advertisement.__rich__())
+    assert rendered.splitlines() == [
+        "local name: Ruuvi 1234",
+        "RSSI: -70 dBm",
+        "manufacturer data:",
+        "├── 0x0499 (Ruuvi Innovations Ltd.) → 3 bytes",
+        "│   ├── hex  → 05 12 fc",
+        "│   └── text →  .  .  .",
+        "└── 0x004c (Apple, Inc.) → 2 bytes",
+        "    ├── hex  → 02 15",
+        "    └── text →  .  .",
+        "service UUIDs:",
+        "└── 0000181a-0000-1000-8000-00805f9b34fb (Environmental Sensing)",
+    ]
+    # The height should be derived from the same layout as the rendering
+    assert advertisement.height() == len(rendered.splitlines())
+
+    # Hiding a data type in the shared configuration changes the existing renderable
+    version = config.version
+    config.set_shown("manufacturer_data", show=False)
+    assert config.version > version
+    assert advertisement.height() == 4  # noqa: PLR2004
+    assert "manufacturer data" not in str(advertisement.__rich__())
+
+
+def test_truncated_advertisement() -> None:
+    """Test truncating long payloads and lists, and expanding them."""
+    data = AdvertisementData(
+        local_name=None,
+        manufacturer_data={0x0499: bytes(range(40))},
+        service_data={},
+        service_uuids=[
+            f"0000{number:04x}-0000-1000-8000-00805f9b34fb" for number in range(6)
+        ],
+        tx_power=None,
+        rssi=None,
+        platform_data=(),
+    )
+    config = DisplayConfig(payload_bytes=4)
+    advertisement = RichAdvertisement(data, config)
+    lines = str(advertisement.__rich__()).splitlines()
+    assert lines[:4] == [
+        "manufacturer data:",
+        "└── 0x0499 (Ruuvi Innovations Ltd.) → 40 bytes",
+        "    ├── hex  → 00 01 02 03 … +36 bytes",
+        "    └── text →  .  .  .  .",
+    ]
+    assert lines[-1] == "└── +2 UUIDs"
+    assert advertisement.height() == 4 + 1 + COLLAPSED_ENTRIES + 1
+
+    # An expanded advertisement shows a hex dump of 16 bytes per line.
+    advertisement.expanded = True
+    lines = str(advertisement.__rich__()).splitlines()
+    assert lines[2].startswith("    ├── 0000 → 00 01 02 03 04 05 06 07 08 09 0a 0b")
+    # The hex data of the short last line is padded to align its text.
+    hex_data = "20 21 22 23 24 25 26 27".ljust(47)
+    text = str(RichHexString(bytes(range(32, 40))).__rich__())
+    assert lines[4] == f"    └── 0020 → {hex_data}  {text}"
+    assert advertisement.height() == 5 + 1 + 6
+    assert advertisement.height() == len(lines)
+
+
+def test_hex_data_changes() -> None:
+    """Test highlighting of changed bytes in RichHexData and RichHexString."""
+    previous = b"\x05\x12\xfc"
+    data = b"\x05\x13\xfc\x41"
+    # The changed byte and the new byte at the end should be highlighted
+    assert changed_bytes(data, previous) == [1, 3]
+    assert changed_bytes(data, None) == []
+
+    hex_data = RichHexData(data, previous).__rich__()
+    assert str(hex_data) == "05 13 fc 41"
+    assert {Span(3, 5, CHANGED_BYTE_STYLE), Span(9, 11, CHANGED_BYTE_STYLE)} <= set(
+        hex_data.spans,
+    )
+    hex_string = RichHexString(data, previous).__rich__()
+    assert str(hex_string) == " .  .  .  A"
+    assert Span(9, 11, CHANGED_BYTE_STYLE) in hex_string.spans
+
+    # Without previous data nothing should be highlighted
+    assert not RichHexData(data).__rich__().spans
@@ -0,0 +1,65 @@
+"""Tests for scanner module."""
+from platform import system
+
+import pytest
+
+from humble_explorer.filters import AdvertisementFilter
+from humble_explorer.scanner import get_bluez_scanner_args, get_or_patterns
+
+if system() == "Linux":
+    from bleak.assigned_numbers import AdvertisementDataType
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+pytestmark = pytest.mark.skipif(system() != "Linux", reason="BlueZ is Linux-only")
+
+
+def test_or_patterns_company_id() -> None:
+    """Test translation of a company ID filter to BlueZ patterns."""
+    (pattern,) = get_or_patterns(AdvertisementFilter("company=0x0499"))
+    assert pattern == (0, AdvertisementDataType.MANUFACTURER_SPECIFIC_DATA, b"\x99\x04")
+
+
+def test_or_patterns_uuid() -> None:
+    """Test translation of a UUID filter to BlueZ patterns."""
+    patterns = get_or_patterns(AdvertisementFilter("uuid=181a"))
+    assert (0, AdvertisementDataType.SERVICE_DATA_UUID16, b"\x1a\x18") in patterns
+    # The UUID can be at any position in a list of UUIDs
+    assert (
+        26,
+        AdvertisementDataType.COMPLETE_LIST_SERVICE_UUID16,
+        b"\x1a\x18",
+    ) in patterns
+
+    # A custom 128-bit UUID is only matched in its 128-bit form
+    patterns = get_or_patterns(
+        AdvertisementFilter("uuid=22110000-554a-4546-5542-46534450464d"),
+    )
+    assert {pattern[1] for pattern in patterns} == {
+        AdvertisementDataType.SERVICE_DATA_UUID128,
+        AdvertisementDataType.INCOMPLETE_LIST_SERVICE_UUID128,
+        AdvertisementDataType.COMPLETE_LIST_SERVICE_UUID128,
+    }
+
+
+def test_or_patterns_name() -> None:
+    """Test translation of a name filter to BlueZ patterns."""
+    assert get_or_patterns(AdvertisementFilter("name=Ruuvi")) == [
+        (0, AdvertisementDataType.COMPLETE_LOCAL_NAME, b"Ruuvi"),
+        (0, AdvertisementDataType.SHORTENED_LOCAL_NAME, b"Ruuvi"),
+    ]
+
+
+def test_bluez_scanner_args() -> None:
+    """Test BlueZ arguments for filters that can't be translated to patterns."""
+    # An address can't be expressed in patterns, so all devices are matched
+    bluez_args = get_bluez_scanner_args("passive", AdvertisementFilter("address=DC"))
+    assert {pattern[1] for pattern in bluez_args["or_patterns"]} == {
+        AdvertisementDataType.FLAGS,
+    }
+
+    # With active scanning, the address is matched by BlueZ's discovery filter
+    bluez_args = get_bluez_scanner_args("active", AdvertisementFilter("address=DC"))
+    assert bluez_args["filters"] == {"DuplicateData": True, "Pattern": "DC"}
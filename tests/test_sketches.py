@@ -0,0 +1,155 @@
+"""Tests for sketches module."""
+import pytest
+from bleak.backends.scanner import AdvertisementData
+
+from humble_explorer.sketches import (
+    MAX_PRECISION,
+    MINUTE_NS,
+    HyperLogLog,
+    SpaceSaving,
+    TrafficSummary,
+    WindowedHyperLogLog,
+)
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+SECOND_NS = 1_000_000_000
+
+
+def random_address(number: int) -> str:
+    """Create a distinct address for a number."""
+    return ":".join(f"{byte:02X}" for byte in number.to_bytes(6, "big"))
+
+
+def test_space_saving() -> None:
+    """Test finding the keys with the highest counts with few counters."""
+    summary: SpaceSaving[str] = SpaceSaving(counters=3)
+    summary.add("a", 10)
+    summary.add("b", 5)
+    summary.add("c")
+    assert summary.top(2) == [("a", 10, 0), ("b", 5, 0)]
+
+    # A new key replaces the key with the lowest count and inherits its count.
+    summary.add("d")
+    assert len(summary) == 3  # noqa: PLR2004
+    assert summary.top(3) == [("a", 10, 0), ("b", 5, 0), ("d", 2, 1)]
+    # The outdated heap entry of "b" is corrected before it's replaced.
+    summary.add("d", 5)
+    summary.add("e")
+    assert summary.top(3) == [("a", 10, 0), ("d", 7, 1), ("e", 6, 5)]
+    assert summary.total == 23  # noqa: PLR2004
+
+    summary.clear()
+    assert summary.top(3) == []
+    assert summary.total == 0
+
+
+def test_space_saving_heavy_hitters() -> None:
+    """Test that busy keys are found between many rotating keys."""
+    summary: SpaceSaving[str] = SpaceSaving(counters=50)
+    for number in range(10_000):
+        summary.add(random_address(number))
+        if number % 10 == 0:
+            summary.add("busy")
+        if number % 20 == 0:
+            summary.add("less busy")
+
+    (busy, busy_count, busy_error), (less_busy, less_busy_count, _) = summary.top(2)
+    assert (busy, less_busy) == ("busy", "less busy")
+    # The estimated count is never lower than the real count.
+    assert busy_count - busy_error <= 1000 <= busy_count  # noqa: PLR2004
+    assert less_busy_count >= 500  # noqa: PLR2004
+    assert len(summary) == 50  # noqa: PLR2004
+
+
+@pytest.mark.parametrize("number", [0, 10, 1000, 100_000])
+def test_hyperloglog(number: int) -> None:
+    """Test estimating the number of distinct keys."""
+    sketch = HyperLogLog(precision=12)
+    for key in range(number):
+        sketch.add(random_address(key))
+        # Repeated keys don't count.
+        sketch.add(random_address(key))
+    # The relative standard error is 1.6%, so allow 5 times this, and a collision of
+    # two keys in a register for small numbers.
+    assert sketch.count() == pytest.approx(number, rel=0.08, abs=1)
+
+
+def test_hyperloglog_merge() -> None:
+    """Test merging two sketches with overlapping keys."""
+    first = HyperLogLog(precision=10)
+    second = HyperLogLog(precision=10)
+    for key in range(3000):
+        first.add(key)
+    for key in range(2000, 5000):
+        second.add(key)
+    first.merge(second)
+    assert first.count() == pytest.approx(5000, rel=0.16)
+
+    first.clear()
+    assert first.count() == 0
+
+
+def test_hyperloglog_precision() -> None:
+    """Test rejecting a precision out of range."""
+    with pytest.raises(ValueError, match="Precision 3"):
+        HyperLogLog(precision=3)
+    with pytest.raises(ValueError, match="Precision 17"):
+        HyperLogLog(precision=17)
+
+
+def test_windowed_hyperloglog() -> None:
+    """Test counting distinct keys in a sliding window."""
+    window = WindowedHyperLogLog(MINUTE_NS, parts=6)
+    # 100 keys in the first ten seconds, and 100 other ones 30 seconds later
+    for key in range(100):
+        window.add(key, key * 10_000_000)
+        window.add(key + 100, 30 * SECOND_NS)
+    assert window.count(30 * SECOND_NS) == pytest.approx(200, abs=5)
+    # The first part slides out of the window.
+    assert window.count(65 * SECOND_NS) == pytest.approx(100, abs=5)
+    assert window.count(95 * SECOND_NS) == 0
+
+    # A new key in the part of an old one replaces its keys.
+    window.add("new", 60 * SECOND_NS)
+    assert window.count(60 * SECOND_NS) == pytest.approx(101, abs=5)
+
+
+def test_traffic_summary() -> None:
+    """Test summarizing advertisements."""
+    # With the maximum precision, small counts are accurate for any hash seed.
+    summary = TrafficSummary(counters=10, precision=MAX_PRECISION)
+    advertisement_data = AdvertisementData(
+        local_name=None,
+        manufacturer_data={0x004C: b"\x10\x05"},
+        service_data={"0000fcf1-0000-1000-8000-00805f9b34fb": b"\x01"},
+        service_uuids=[
+            "0000fcf1-0000-1000-8000-00805f9b34fb",
+            "0000180f-0000-1000-8000-00805f9b34fb",
+        ],
+        tx_power=None,
+        rssi=-60,
+        platform_data=(),
+    )
+    for number in range(100):
+        summary.observe(
+            "Phone",
+            random_address(number),
+            advertisement_data,
+            number * SECOND_NS,
+        )
+
+    assert summary.devices.top(1) == [("Phone", 100, 0)]
+    assert summary.companies.top(1) == [(0x004C, 100, 0)]
+    assert sorted(summary.uuids.top(3)) == [
+        ("0000180f-0000-1000-8000-00805f9b34fb", 100, 0),
+        ("0000fcf1-0000-1000-8000-00805f9b34fb", 100, 0),
+    ]
+    assert summary.last_minute.count(summary.latest) == pytest.approx(60, abs=3)
+    assert summary.last_hour.count(summary.latest) == pytest.approx(100, abs=3)
+
+    summary.clear()
+    assert summary.devices.top(1) == []
+    assert summary.last_hour.count(0) == 0
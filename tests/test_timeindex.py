@@ -0,0 +1,31 @@
+"""Tests for timeindex module."""
+from humble_explorer.timeindex import TimeIndex
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+
+def test_time_index() -> None:
+    """Test looking up advertisements by time."""
+    index = TimeIndex()
+    assert index.first_at_or_after(0) is None
+    assert index.positions_between(None, None) == []
+
+    for position, time in enumerate([10, 20, 20, 40, 30, 50]):
+        index.add(time, position)
+    assert len(index) == 6  # noqa: PLR2004
+    # The out-of-order advertisement is inserted at its sorted position
+    assert list(index.times) == [10, 20, 20, 30, 40, 50]
+
+    assert index.first_at_or_after(20) == 1
+    assert index.first_at_or_after(25) == 4  # noqa: PLR2004
+    assert index.first_at_or_after(51) is None
+
+    # The positions are returned in the order the advertisements were stored
+    assert index.positions_between(20, 45) == [1, 2, 3, 4]
+    assert index.positions_between(None, 20) == [0]
+    assert index.positions_between(40, None) == [3, 5]
+
+    index.clear()
+    assert len(index) == 0
@@ -0,0 +1,178 @@
+"""Tests for watchlist module."""
+from __future__ import annotations
+
+import json
+import sys
+from typing import TYPE_CHECKING
+
+import pytest
+from bleak.backends.scanner import AdvertisementData
+
+from humble_explorer.watchlist import (
+    ALERT_AGAIN_AFTER,
+    AhoCorasick,
+    AlertCommand,
+    Watchlist,
+    WatchlistAlert,
+    WatchlistEntry,
+    alert_to_dict,
+    load_watchlist,
+)
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+SECOND = 1_000_000_000
+
+IBEACON = WatchlistEntry("data=0x004c:0215", "iBeacon")
+RUUVI = WatchlistEntry("company=0x0499", "Ruuvi tag")
+TRACKER = WatchlistEntry("address=C0:00:00:00:00:01", "Tracker")
+NAME = WatchlistEntry("name=Ruuvi", "Ruuvi name")
+NAME_PATTERN = WatchlistEntry("name~tag$", "Tag name")
+SIGNATURE = WatchlistEntry("data=cafe", "Signature")
+
+
+def advertisement(
+    local_name: str | None = None,
+    manufacturer_data: dict[int, bytes] | None = None,
+    service_data: dict[str, bytes] | None = None,
+) -> AdvertisementData:
+    """Create advertisement data."""
+    return AdvertisementData(
+        local_name=local_name,
+        manufacturer_data=manufacturer_data or {},
+        service_data=service_data or {},
+        service_uuids=[],
+        tx_power=None,
+        rssi=-70,
+        platform_data=(),
+    )
+
+
+def test_aho_corasick() -> None:
+    """Test finding overlapping patterns in one pass."""
+    automaton = AhoCorasick([b"he", b"she", b"his", b"hers"])
+    assert automaton.search(b"ushers") == {0, 1, 3}
+    assert automaton.search(b"ahishe") == {0, 1, 2}
+    assert automaton.search(b"") == set()
+    assert automaton.search(b"hxs") == set()
+
+    automaton = AhoCorasick([bytes.fromhex("0215"), bytes.fromhex("1502")])
+    assert automaton.search(bytes.fromhex("00021502")) == {0, 1}
+
+
+def test_load_watchlist(tmp_path: Path) -> None:
+    """Test loading a watchlist from a file."""
+    watchlist_file = tmp_path / "watchlist.txt"
+    watchlist_file.write_text(
+        "# Devices to watch\n\ndata=0x004c:0215 iBeacon\nname~tag$\n",
+    )
+    assert load_watchlist(watchlist_file) == [
+        IBEACON,
+        WatchlistEntry("name~tag$", "name~tag$"),
+    ]
+
+    for line, error in [
+        ("address=C0:00", "invalid address in address=C0:00"),
+        ("company=0x10000", "invalid company ID in company=0x10000"),
+        ("data=0x004c:", "invalid byte signature in data=0x004c:"),
+        ("data=xy:0215", "invalid byte signature in data=xy:0215"),
+        ("name~(", "invalid regular expression in name~\\("),
+        ("uuid=181a", "unknown term uuid=181a"),
+    ]:
+        watchlist_file.write_text(f"# Watchlist\n{line} Label\n")
+        with pytest.raises(ValueError, match=f"watchlist.txt:2: {error}"):
+            load_watchlist(watchlist_file)
+
+
+def test_watchlist_match() -> None:
+    """Test matching advertisements against all kinds of terms."""
+    watchlist = Watchlist([IBEACON, RUUVI, TRACKER, NAME, NAME_PATTERN, SIGNATURE])
+    assert len(watchlist) == 6  # noqa: PLR2004
+    assert watchlist.match("C0:00:00:00:00:02", advertisement()) == []
+    assert watchlist.match("C0:00:00:00:00:01", advertisement()) == [TRACKER]
+
+    # The results are in the order of the watchlist, without duplicates.
+    assert watchlist.match(
+        "C0:00:00:00:00:01",
+        advertisement(
+            "Ruuvi tag",
+            {0x0499: b"\x05\xca\xfe", 0x004C: b"\x02\x15\xca\xfe"},
+        ),
+    ) == [IBEACON, RUUVI, TRACKER, NAME, NAME_PATTERN, SIGNATURE]
+
+    # A signature with a company ID only matches the payload of that company ID.
+    assert (
+        watchlist.match(
+            "C0:00:00:00:00:02",
+            advertisement(manufacturer_data={0x0006: b"\x02\x15"}),
+        )
+        == []
+    )
+    assert watchlist.match(
+        "C0:00:00:00:00:02",
+        advertisement(
+            service_data={"0000feaa-0000-1000-8000-00805f9b34fb": b"\xca\xfe"},
+        ),
+    ) == [SIGNATURE]
+    assert watchlist.match("C0:00:00:00:00:02", advertisement("Ruuvi")) == [NAME]
+    assert watchlist.match("C0:00:00:00:00:02", advertisement("Price TAG")) == [
+        NAME_PATTERN,
+    ]
+
+
+def test_watchlist_alerts() -> None:
+    """Test alerting once for every device and term until the device is quiet."""
+    watchlist = Watchlist([RUUVI, TRACKER])
+    alert = WatchlistAlert(0, "C0:00:00:00:00:01", TRACKER)
+    assert watchlist.alerts("C0:00:00:00:00:01", "C0:00:00:00:00:01", [TRACKER], 0) == [
+        alert,
+    ]
+    assert not watchlist.alerts("C0:00:00:00:00:01", "C0:00:00:00:00:01", [TRACKER], 0)
+    # Every term of a device alerts separately.
+    assert watchlist.alerts(
+        "C0:00:00:00:00:01",
+        "C0:00:00:00:00:01",
+        [RUUVI, TRACKER],
+        SECOND,
+    ) == [WatchlistAlert(SECOND, "C0:00:00:00:00:01", RUUVI)]
+    # The device alerts again after a quiet period.
+    assert not watchlist.alerts(
+        "C0:00:00:00:00:01",
+        "C0:00:00:00:00:01",
+        [TRACKER],
+        ALERT_AGAIN_AFTER,
+    )
+    time = 2 * ALERT_AGAIN_AFTER
+    assert watchlist.alerts(
+        "C0:00:00:00:00:01",
+        "C0:00:00:00:00:01",
+        [TRACKER],
+        time,
+    ) == [WatchlistAlert(time, "C0:00:00:00:00:01", TRACKER)]
+
+    watchlist.clear()
+    assert watchlist.alerts("C0:00:00:00:00:01", "C0:00:00:00:00:01", [TRACKER], time)
+
+    alert_dict = alert_to_dict(alert)
+    assert alert_dict["event"] == "watchlist"
+    assert alert_dict["term"] == "address=C0:00:00:00:00:01"
+    assert alert_dict["label"] == "Tracker"
+
+
+def test_alert_command(tmp_path: Path) -> None:
+    """Test running a command with the alert on its standard input."""
+    output = tmp_path / "alert.json"
+    command = AlertCommand(
+        f"{sys.executable} -c 'import shutil, sys; "
+        f'shutil.copyfileobj(sys.stdin, open(sys.argv[1], "w"))\' {output}',
+    )
+    alert = WatchlistAlert(0, "C0:00:00:00:00:01", TRACKER)
+    command.run(alert)
+    (process,) = command.processes
+    assert process.wait(timeout=10) == 0
+    assert json.loads(output.read_text()) == alert_to_dict(alert)
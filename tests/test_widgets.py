@@ -0,0 +1,191 @@
+"""Tests for widgets module."""
+from __future__ import annotations
+
+import asyncio
+
+import textual.widgets._data_table
+from bleak.backends.scanner import AdvertisementData
+from textual.app import App, ComposeResult
+
+from humble_explorer.devices import Device
+from humble_explorer.renderables import (
+    DisplayConfig,
+    RichAdvertisement,
+    RichDeviceAddress,
+    RichTime,
+)
+from humble_explorer.widgets import AdvertisementTable, DeviceList
+
+__author__ = "Koen Vervloesem"
+__copyright__ = "Koen Vervloesem"
+__license__ = "MIT"
+
+
+class DeviceListApp(App[None]):
+    """App with only a device list."""
+
+    def compose(self) -> ComposeResult:
+        """Show the device list with the number of suppressed advertisements."""
+        yield DeviceList({"suppressed": "Unchanged"})
+
+
+class TableApp(App[None]):
+    """App with only an advertisement table."""
+
+    def __init__(self, config: DisplayConfig) -> None:
+        """Create the app with a display configuration."""
+        super().__init__()
+        self.config = config
+
+    def compose(self) -> ComposeResult:
+        """Show the table."""
+        yield AdvertisementTable(self.config)
+
+
+def advertisement(payload: bytes) -> AdvertisementData:
+    """Create advertisement data with manufacturer data and a service UUID."""
+    return AdvertisementData(
+        local_name="Test",
+        manufacturer_data={0x0499: payload},
+        service_data={},
+        service_uuids=["0000181a-0000-1000-8000-00805f9b34fb"],
+        tx_power=None,
+        rssi=-70,
+        platform_data=(),
+    )
+
+
+async def check_row_heights() -> None:
+    """Change the heights of the rows of a table and check them."""
+    config = DisplayConfig(payload_bytes=4)
+    app = TableApp(config)
+    async with app.run_test() as pilot:
+        table = app.query_one(AdvertisementTable)
+        short = RichAdvertisement(advertisement(b"\x01\x02"), config)
+        long = RichAdvertisement(advertisement(bytes(range(64))), config)
+        table.add_advertisement(
+            RichTime(0),
+            RichDeviceAddress("C0:00:00:00:00:01"),
+            short,
+        )
+        long_key = table.add_advertisement(
+            RichTime(0),
+            RichDeviceAddress("C0:00:00:00:00:02"),
+            long,
+        )
+        await pilot.pause()
+
+        def heights() -> list[int]:
+            row_heights = [row.height for row in table.ordered_rows]
+            # The scrollable height includes the header.
+            assert table.virtual_size.height == sum(row_heights) + 1
+            return row_heights
+
+        all_data = [short.height(), long.height()]
+        assert heights() == all_data
+
+        # Hiding a data type makes all rows lower, without recreating them.
+        config.set_shown("manufacturer_data", show=False)
+        table.update_row_heights()
+        await pilot.pause()
+        assert heights() == [short.height(), long.height()]
+        assert short.height() < all_data[0]
+
+        config.set_shown("manufacturer_data", show=True)
+        table.update_row_heights()
+        await pilot.pause()
+        assert heights() == all_data
+
+        # Expanding a row replaces the hex and text lines of its truncated payload
+        # by a hex dump of four lines, without changing the other rows.
+        table.toggle_expanded(long_key)
+        await pilot.pause()
+        expanded = [all_data[0], all_data[1] + 2]
+        assert heights() == expanded
+        # An expanded row keeps its height when all rows get their height again.
+        table.update_row_heights()
+        await pilot.pause()
+        assert heights() == expanded
+
+        table.toggle_expanded(long_key)
+        await pilot.pause()
+        assert heights() == all_data
+
+
+def test_row_heights() -> None:
+    """Test changing the row heights of an advertisement table."""
+    asyncio.run(check_row_heights())
+
+
+async def count_redraw_measurements(rows: int) -> int:
+    """Redraw a table with a number of rows and count the measured cells."""
+    config = DisplayConfig(payload_bytes=31)
+    app = TableApp(config)
+    async with app.run_test() as pilot:
+        table = app.query_one(AdvertisementTable)
+        # The first row is narrower than the others.
+        table.add_advertisement(
+            RichTime(0),
+            RichDeviceAddress("C0:00:00:00:00:00"),
+            RichAdvertisement(advertisement(b"\x01"), config),
+        )
+        for row in range(1, rows):
+            row_key = table.add_advertisement(
+                RichTime(0),
+                RichDeviceAddress(f"C0:00:00:00:{row // 256:02X}:{row % 256:02X}"),
+                RichAdvertisement(advertisement(bytes(range(20))), config),
+            )
+        await pilot.pause()
+
+        measurements = 0
+        measure = textual.widgets._data_table.measure  # noqa: SLF001
+
+        def counting_measure(*args: object, **kwargs: object) -> int:
+            nonlocal measurements
+            measurements += 1
+            return measure(*args, **kwargs)  # type: ignore[arg-type]
+
+        textual.widgets._data_table.measure = counting_measure  # noqa: SLF001
+        try:
+            config.set_shown("rssi", show=False)
+            table.update_row_heights()
+            await pilot.pause()
+            table.toggle_expanded(row_key)
+            await pilot.pause()
+        finally:
+            textual.widgets._data_table.measure = measure  # noqa: SLF001
+        assert table.virtual_size.height == (
+            sum(row.height for row in table.ordered_rows) + 1
+        )
+        return measurements
+
+
+def test_redraw_cost() -> None:
+    """Test that redrawing a table doesn't measure its cells again."""
+    assert asyncio.run(count_redraw_measurements(10)) == asyncio.run(
+        count_redraw_measurements(1000),
+    )
+
+
+async def check_device_list() -> None:
+    """Add and update a device in a device list and check its counts."""
+    app = DeviceListApp()
+    async with app.run_test() as pilot:
+        device_list = app.query_one(DeviceList)
+        device = Device("C0:00:00:00:00:01")
+        device.positions.extend([0, 2])
+        device_list.update_device("C0:00:00:00:00:01", device)
+        await pilot.pause()
+        assert device_list.get_row("C0:00:00:00:00:01") == ["C0:00:00:00:00:01", 2, 0]
+
+        device.positions.append(5)
+        device.suppressed = 3
+        device_list.update_device("C0:00:00:00:00:01", device)
+        await pilot.pause()
+        assert device_list.row_count == 1
+        assert device_list.get_row("C0:00:00:00:00:01") == ["C0:00:00:00:00:01", 3, 3]
+
+
+def test_device_list() -> None:
+    """Test showing the counts of devices in a device list."""
+    asyncio.run(check_device_list())